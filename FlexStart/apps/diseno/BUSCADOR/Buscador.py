@@ -1,10 +1,9 @@
 import os
-import shutil
+import sys
 import threading
 import queue
 import tkinter as tk
 from tkinter import filedialog, messagebox
-import concurrent.futures  # ### CAMBIO v2.5: Filtrado por depto
 
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
@@ -12,6 +11,139 @@ from ttkbootstrap.scrolled import ScrolledText
 
 import openpyxl  # pip install openpyxl
 import csv  # Módulo csv es parte de la librería estándar de Python
+
+from indice_carpetas import IndiceCarpetas
+
+# Módulos compartidos de las apps de diseño (apps/diseno)
+_diseno_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _diseno_dir not in sys.path:
+    sys.path.insert(0, _diseno_dir)
+
+from motor_transferencia import MotorTransferencia, ItemTransferencia, MODO_COPIAR, CONFLICTO_RENOMBRAR
+
+
+def buscar_y_copiar(nombres_carpetas, ruta_base, destino, cola, cancelado=lambda: False):
+    """
+    Núcleo sin ventana: busca las carpetas por nombre exacto bajo `ruta_base` y las copia
+    a `destino`. Informa el avance con mensajes (tipo, dato) en `cola`, como los de la GUI.
+    """
+    # Fase 1: búsqueda
+    buscados = {n.lower() for n in nombres_carpetas}
+    encontrados = {}
+    cola.put(("progress_mode", "indeterminate"))
+    cola.put(("progress_start", 10))
+    cola.put(("status", f"Buscando {len(buscados)} carpetas..."))
+    try:
+        # Índice persistente: solo se re-listan las carpetas que cambiaron desde la última búsqueda
+        with IndiceCarpetas(ruta_base) as indice:
+            total, reescaneadas = indice.actualizar(
+                cancelado=cancelado,
+                progreso=lambda msg: cola.put(("status", msg))
+            )
+            cola.put(("log", f"Índice de carpetas listo: {total} carpetas ({reescaneadas} re-escaneadas)."))
+            encontrados = indice.buscar_exacto(buscados)
+    except InterruptedError:
+        cola.put(("cancelled", None))
+        return
+    except Exception as e:
+        cola.put(("error", f"Error en escaneo: {e}"))
+        return
+    cola.put(("progress_stop", None))
+    cola.put(("progress_mode", "determinate"))
+    cola.put(("status", "Iniciando copia paralela..."))
+    cola.put(("progress_config", len(nombres_carpetas)))
+
+    # Fase 2: copia (motor compartido: pool acotado, copias grandes y progreso por lotes)
+    processed = 0
+    copied = 0
+    not_found = []
+    items = []
+    for n in nombres_carpetas:
+        key = n.lower()
+        if key in encontrados:
+            for path in encontrados[key]:
+                items.append(ItemTransferencia(path, os.path.join(destino, os.path.basename(path)), etiqueta=n))
+        else:
+            not_found.append(n)
+    # log no encontrados
+    for n in not_found:
+        cola.put(("log", f"NO ENCONTRADA: '{n}'"))
+    processed += len(not_found)
+    cola.put(("progress_value", processed))
+
+    def al_progreso(lote, hechos, total):
+        nonlocal processed, copied
+        for item, estado, detalle in lote:
+            if estado == "ok":
+                cola.put(("log", f"COPIA FINALIZADA: '{item.etiqueta}'"))
+                copied += 1
+            elif estado == "omitido":
+                cola.put(("log", f"OMITIDA: '{item.etiqueta}' {detalle}"))
+            elif estado == "error":
+                cola.put(("log", f"ERROR al copiar '{item.etiqueta}': {detalle}"))
+        processed += len(lote)
+        pct = int(processed / len(nombres_carpetas) * 100)
+        cola.put(("progress_value", processed))
+        cola.put(("status", f"Procesando {processed}/{len(nombres_carpetas)}... {pct}%"))
+
+    motor = MotorTransferencia(MODO_COPIAR, conflicto=CONFLICTO_RENOMBRAR, cancelado=cancelado)
+    motor.ejecutar(items, al_progreso=al_progreso)
+
+    if cancelado():
+        cola.put(("cancelled", None))
+        return
+
+    # Fase 3: reporte
+    if not_found:
+        try:
+            rpt = os.path.join(destino, "reporte_carpetas_no_encontradas.txt")
+            with open(rpt, "w", encoding="utf-8") as f:
+                f.write("Carpetas no encontradas:\n")
+                for x in not_found:
+                    f.write(f"- {x}\n")
+            cola.put(("finished", f"Completado. {copied} copiadas. Reporte en {rpt}"))
+        except Exception as e:
+            cola.put(("finished", f"Completado, pero error al crear reporte: {e}"))
+    else:
+        cola.put(("finished", f"Completado. Todas las {copied} carpetas copiadas."))
+
+
+def leer_nombres_carpetas(archivo, nombre_columna_especificado=None):
+    """
+    Nombres de carpeta (primera columna o la indicada) y depto de cada fila de la planilla.
+    Raises:
+        ValueError si la planilla no tiene encabezados, la columna o un formato soportado.
+    """
+    nombres, deptos = [], []
+    ext = os.path.splitext(archivo)[1].lower()
+    if ext in ['.xlsx', '.xls']:
+        wb = openpyxl.load_workbook(archivo)
+        sheet = wb.active
+        headers = [str(c.value or '').strip().lower() for c in sheet[1]]
+        filas = sheet.iter_rows(min_row=2, values_only=True)
+    elif ext == '.csv':
+        with open(archivo, 'r', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            headers = [h.strip().lower() for h in next(reader)]
+            filas = list(reader)
+    else:
+        raise ValueError(f"Formato no soportado: {ext}")
+    if not any(headers):
+        raise ValueError(f"'{os.path.basename(archivo)}' sin encabezados.")
+    name_idx = 0
+    if nombre_columna_especificado:
+        try:
+            name_idx = headers.index(nombre_columna_especificado.lower())
+        except ValueError:
+            raise ValueError(f"Columna '{nombre_columna_especificado}' no existe.")
+    dept_idx = headers.index('depto') if 'depto' in headers else None
+    for row in filas:
+        if row and len(row) > name_idx and row[name_idx]:
+            nombres.append(str(row[name_idx]).strip())
+            deptos.append(str(row[dept_idx]).strip() if dept_idx is not None and len(row) > dept_idx and row[dept_idx] else '')
+    return nombres, deptos
+
+
 # Función de tema compatible multiplataforma
 def setup_theme(window=None):
     import ttkbootstrap as ttk
@@ -228,96 +360,9 @@ class BuscadorCarpetasApp:
     def cancelar_busqueda_func(self):
         self.cancelar_busqueda = True
 
-    def _copiar_una_carpeta(self, nombre_original, ruta_encontrada, destino_base):
-        try:
-            self.queue.put(("log", f"COPIANDO '{nombre_original}'..."))
-            base = os.path.basename(ruta_encontrada)
-            dest = os.path.join(destino_base, base)
-            count = 2
-            while os.path.exists(dest):
-                dest = os.path.join(destino_base, f"{base} ({count})")
-                count += 1
-            shutil.copytree(ruta_encontrada, dest)
-            return ("COPIED", nombre_original)
-        except Exception as e:
-            return ("ERROR", nombre_original, str(e))
-
     def trabajo_en_hilo(self, nombres_carpetas, ruta_base, destino):
-        # Fase 1: búsqueda
-        buscados = {n.lower() for n in nombres_carpetas}
-        encontrados = {}
-        self.queue.put(("progress_mode", "indeterminate"))
-        self.queue.put(("progress_start", 10))
-        self.queue.put(("status", f"Buscando {len(buscados)} carpetas..."))
-        try:
-            for root, dirs, files in os.walk(ruta_base):
-                if self.cancelar_busqueda: break
-                for d in list(dirs):
-                    if d.lower() in buscados:
-                        encontrados.setdefault(d.lower(), []).append(os.path.join(root, d))
-                        dirs.remove(d)
-        except Exception as e:
-            self.queue.put(("error", f"Error en escaneo: {e}"))
-            return
-        self.queue.put(("progress_stop", None))
-        self.queue.put(("progress_mode", "determinate"))
-        self.queue.put(("status", "Iniciando copia paralela..."))
-        self.queue.put(("progress_config", len(nombres_carpetas)))
-
-        # Fase 2: copia
-        processed = 0
-        copied = 0
-        not_found = []
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as exec:
-            futures = {}
-            for n in nombres_carpetas:
-                key = n.lower()
-                if key in encontrados:
-                    for path in encontrados[key]:
-                        futures[exec.submit(self._copiar_una_carpeta, n, path, destino)] = n
-                else:
-                    not_found.append(n)
-            # log no encontrados
-            for n in not_found:
-                if self.cancelar_busqueda: break
-                self.queue.put(("log", f"NO ENCONTRADA: '{n}'"))
-                processed += 1
-                pct = int(processed / len(nombres_carpetas) * 100)
-                self.queue.put(("progress_value", processed))
-                self.queue.put(("status", f"Procesando {processed}/{len(nombres_carpetas)}... {pct}%"))
-            # procesar copias
-            for fut in concurrent.futures.as_completed(futures):
-                if self.cancelar_busqueda:
-                    fut.cancel()
-                    continue
-                status, name, *err = fut.result()
-                if status == "COPIED":
-                    self.queue.put(("log", f"COPIA FINALIZADA: '{name}'"))
-                    copied += 1
-                else:
-                    self.queue.put(("log", f"ERROR al copiar '{name}': {err[0]}"))
-                processed += 1
-                pct = int(processed / len(nombres_carpetas) * 100)
-                self.queue.put(("progress_value", processed))
-                self.queue.put(("status", f"Procesando {processed}/{len(nombres_carpetas)}... {pct}%"))
-
-        if self.cancelar_busqueda:
-            self.queue.put(("cancelled", None))
-            return
-
-        # Fase 3: reporte
-        if not_found:
-            try:
-                rpt = os.path.join(destino, "reporte_carpetas_no_encontradas.txt")
-                with open(rpt, "w", encoding="utf-8") as f:
-                    f.write("Carpetas no encontradas:\n")
-                    for x in not_found:
-                        f.write(f"- {x}\n")
-                self.queue.put(("finished", f"Completado. {copied} copiadas. Reporte en {rpt}"))
-            except Exception as e:
-                self.queue.put(("finished", f"Completado, pero error al crear reporte: {e}"))
-        else:
-            self.queue.put(("finished", f"Completado. Todas las {copied} carpetas copiadas."))
+        buscar_y_copiar(nombres_carpetas, ruta_base, destino, self.queue,
+                        cancelado=lambda: self.cancelar_busqueda)
 
     def check_queue(self):
         try:
@@ -366,54 +411,13 @@ class BuscadorCarpetasApp:
                 self.barra_progreso.configure(bootstyle="danger")
 
     def leer_nombres_carpetas(self, archivo, nombre_columna_especificado=None):
-        nombres, deptos = [], []
-        ext = os.path.splitext(archivo)[1].lower()
         try:
-            if ext in ['.xlsx', '.xls']:
-                wb = openpyxl.load_workbook(archivo)
-                sheet = wb.active
-                headers = [str(c.value or '').strip().lower() for c in sheet[1]]
-                if not any(headers):
-                    messagebox.showerror("Error Planilla", f"'{os.path.basename(archivo)}' sin encabezados.")
-                    return [], []
-                name_idx = 0
-                if nombre_columna_especificado:
-                    try:
-                        name_idx = headers.index(nombre_columna_especificado.lower())
-                    except ValueError:
-                        messagebox.showerror("Error Planilla", f"Columna '{nombre_columna_especificado}' no existe.")
-                        return [], []
-                dept_idx = headers.index('depto') if 'depto' in headers else None
-                for row in sheet.iter_rows(min_row=2, values_only=True):
-                    if row and len(row) > name_idx and row[name_idx]:
-                        nombres.append(str(row[name_idx]).strip())
-                        deptos.append(str(row[dept_idx]).strip() if dept_idx is not None and len(row) > dept_idx and row[dept_idx] else '')
-            elif ext == '.csv':
-                with open(archivo, 'r', encoding='utf-8-sig') as f:
-                    reader = csv.reader(f)
-                    headers = [h.strip().lower() for h in next(reader)]
-                    if not any(headers):
-                        messagebox.showerror("Error Planilla", f"'{os.path.basename(archivo)}' sin encabezados.")
-                        return [], []
-                    name_idx = 0
-                    if nombre_columna_especificado:
-                        try:
-                            name_idx = headers.index(nombre_columna_especificado.lower())
-                        except ValueError:
-                            messagebox.showerror("Error Planilla", f"Columna '{nombre_columna_especificado}' no existe.")
-                            return [], []
-                    dept_idx = headers.index('depto') if 'depto' in headers else None
-                    for row in reader:
-                        if row and len(row) > name_idx and row[name_idx]:
-                            nombres.append(row[name_idx].strip())
-                            deptos.append(row[dept_idx].strip() if dept_idx is not None and len(row) > dept_idx and row[dept_idx] else '')
-            else:
-                messagebox.showerror("Error Archivo", f"Formato no soportado: {ext}")
-                return [], []
+            return leer_nombres_carpetas(archivo, nombre_columna_especificado)
+        except ValueError as e:
+            messagebox.showerror("Error Planilla", str(e))
         except Exception as e:
             messagebox.showerror("Error Lectura", str(e))
-            return [], []
-        return nombres, deptos
+        return [], []
 
 
 if __name__ == '__main__':
@@ -0,0 +1,205 @@
+"""
+Índice persistente de carpetas (SQLite) para el Buscador.
+
+En lugar de recorrer con os.walk todo el share de red en cada búsqueda, se guarda
+un índice de directorios por ruta raíz en ~/.cache/buscador/. La primera vez se
+construye con varios hilos haciendo scandir en paralelo; las siguientes se
+actualiza de forma incremental: solo se vuelven a listar las carpetas cuyo mtime
+cambió (crear, borrar o renombrar una subcarpeta actualiza el mtime de su padre).
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+INDEX_DIR = os.path.join(os.path.expanduser("~"), ".cache", "buscador")
+# Listar carpetas en SMB/OneDrive es latencia de red: más hilos que núcleos
+SCAN_WORKERS = 16
+
+
+def _listar_subcarpetas(ruta):
+    """(mtime_ns, [subcarpetas]) de una carpeta, o (None, []) si no es accesible."""
+    try:
+        mtime_ns = os.stat(ruta).st_mtime_ns
+        with os.scandir(ruta) as entradas:
+            subcarpetas = [e.path for e in entradas if e.is_dir(follow_symlinks=False)]
+        return mtime_ns, subcarpetas
+    except OSError:
+        return None, []
+
+
+def _mtime(ruta):
+    try:
+        return os.stat(ruta).st_mtime_ns
+    except OSError:
+        return None
+
+
+class IndiceCarpetas:
+    """Índice de carpetas bajo una ruta raíz: búsqueda exacta y por prefijo del nombre."""
+
+    def __init__(self, ruta_raiz, index_dir=INDEX_DIR, workers=SCAN_WORKERS):
+        self.ruta_raiz = os.path.abspath(ruta_raiz)
+        self.workers = workers
+        os.makedirs(index_dir, exist_ok=True)
+        digest = hashlib.sha1(self.ruta_raiz.encode("utf-8")).hexdigest()[:16]
+        self.db_path = os.path.join(index_dir, f"indice_{digest}.sqlite")
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS carpetas (
+                ruta TEXT PRIMARY KEY,
+                padre TEXT,
+                nombre TEXT NOT NULL,
+                mtime_ns INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS idx_carpetas_nombre ON carpetas(nombre);
+            CREATE INDEX IF NOT EXISTS idx_carpetas_padre ON carpetas(padre);
+            CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor TEXT);
+        """)
+
+    def cerrar(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    # --- Construcción / actualización ---
+    def _escanear_subarboles(self, raices, cancelado=None):
+        """Escanea en paralelo los subárboles indicados y devuelve las filas a insertar."""
+        filas = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pendientes = {executor.submit(_listar_subcarpetas, r): r for r in raices}
+            while pendientes:
+                if cancelado and cancelado():
+                    for futuro in pendientes:
+                        futuro.cancel()
+                    raise InterruptedError("Escaneo cancelado")
+                hechos, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+                for futuro in hechos:
+                    ruta = pendientes.pop(futuro)
+                    mtime_ns, subcarpetas = futuro.result()
+                    filas.append((ruta, os.path.dirname(ruta), os.path.basename(ruta).lower(), mtime_ns))
+                    for sub in subcarpetas:
+                        pendientes[executor.submit(_listar_subcarpetas, sub)] = sub
+        return filas
+
+    def _borrar_subarbol(self, ruta):
+        prefijo = ruta.rstrip(os.sep) + os.sep
+        self.conn.execute(
+            "DELETE FROM carpetas WHERE ruta = ? OR (ruta >= ? AND ruta < ?)",
+            (ruta, prefijo, prefijo + "\U0010ffff")
+        )
+
+    def actualizar(self, cancelado=None, progreso=None):
+        """
+        Construye o actualiza el índice. Retorna (carpetas_indexadas, carpetas_reescaneadas).
+
+        Args:
+            cancelado: callable que devuelve True para abortar (lanza InterruptedError)
+            progreso: callable(mensaje) opcional para informar avance
+        """
+        with self._lock:
+            total = self.conn.execute("SELECT COUNT(*) FROM carpetas").fetchone()[0]
+            if total == 0:
+                if progreso:
+                    progreso("Construyendo índice de carpetas (primera vez)...")
+                filas = self._escanear_subarboles([self.ruta_raiz], cancelado)
+                with self.conn:
+                    self.conn.executemany("INSERT OR REPLACE INTO carpetas VALUES (?, ?, ?, ?)", filas)
+                self._guardar_meta()
+                return len(filas), len(filas)
+
+            # Incremental: stat en paralelo de todas las carpetas conocidas
+            conocidas = self.conn.execute("SELECT ruta, mtime_ns FROM carpetas").fetchall()
+            if progreso:
+                progreso(f"Verificando cambios en {len(conocidas)} carpetas indexadas...")
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                mtimes = list(executor.map(_mtime, (ruta for ruta, _ in conocidas)))
+            if cancelado and cancelado():
+                raise InterruptedError("Escaneo cancelado")
+
+            cambiadas = [ruta for (ruta, anterior), actual in zip(conocidas, mtimes)
+                         if actual is not None and actual != anterior]
+            eliminadas = [ruta for (ruta, _), actual in zip(conocidas, mtimes) if actual is None]
+
+            # Primero se calcula todo (listados y escaneo de subárboles nuevos) y recién
+            # después se escribe en una sola transacción: si el escaneo se cancela o falla,
+            # los padres conservan su mtime anterior y se vuelven a revisar la próxima vez
+            borrar = list(eliminadas)
+            nuevos_mtimes = []
+            nuevas_raices = []
+            for ruta in cambiadas:
+                mtime_ns, subcarpetas = _listar_subcarpetas(ruta)
+                if mtime_ns is None:
+                    borrar.append(ruta)
+                    continue
+                actuales = set(subcarpetas)
+                indexadas = {r for (r,) in self.conn.execute(
+                    "SELECT ruta FROM carpetas WHERE padre = ?", (ruta,))}
+                borrar.extend(indexadas - actuales)
+                nuevas_raices.extend(actuales - indexadas)
+                nuevos_mtimes.append((mtime_ns, ruta))
+
+            filas = self._escanear_subarboles(nuevas_raices, cancelado) if nuevas_raices else []
+            with self.conn:
+                for ruta in borrar:
+                    self._borrar_subarbol(ruta)
+                self.conn.executemany("UPDATE carpetas SET mtime_ns = ? WHERE ruta = ?", nuevos_mtimes)
+                self.conn.executemany("INSERT OR REPLACE INTO carpetas VALUES (?, ?, ?, ?)", filas)
+            self._guardar_meta()
+            total = self.conn.execute("SELECT COUNT(*) FROM carpetas").fetchone()[0]
+            return total, len(cambiadas) + len(nuevas_raices)
+
+    def _guardar_meta(self):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('actualizado', ?)", (str(time.time()),))
+
+    # --- Consultas ---
+    def buscar_exacto(self, nombres):
+        """
+        {nombre_en_minúsculas: [rutas]} para los nombres buscados (sin distinguir mayúsculas).
+
+        Igual que el recorrido original, no se devuelven carpetas que estén dentro de
+        otra carpeta que ya coincidió (no se desciende en una coincidencia).
+        """
+        buscados = {n.lower() for n in nombres}
+        encontrados = {}
+        lista = list(buscados)
+        for inicio in range(0, len(lista), 500):
+            lote = lista[inicio:inicio + 500]
+            marcadores = ",".join("?" * len(lote))
+            for ruta, nombre in self.conn.execute(
+                    f"SELECT ruta, nombre FROM carpetas WHERE nombre IN ({marcadores}) AND ruta != ?",
+                    (*lote, self.ruta_raiz)):
+                encontrados.setdefault(nombre, []).append(ruta)
+
+        def dentro_de_coincidencia(ruta):
+            relativa = os.path.relpath(os.path.dirname(ruta), self.ruta_raiz)
+            if relativa == ".":
+                return False
+            return any(parte.lower() in buscados for parte in relativa.split(os.sep))
+
+        resultado = {}
+        for nombre, rutas in encontrados.items():
+            rutas = sorted(r for r in rutas if not dentro_de_coincidencia(r))
+            if rutas:
+                resultado[nombre] = rutas
+        return resultado
+
+    def buscar_prefijo(self, prefijo, limite=200):
+        """Rutas de carpetas cuyo nombre empieza por `prefijo` (sin distinguir mayúsculas)."""
+        prefijo = prefijo.lower()
+        filas = self.conn.execute(
+            "SELECT ruta FROM carpetas WHERE nombre >= ? AND nombre < ? AND ruta != ? ORDER BY nombre LIMIT ?",
+            (prefijo, prefijo + "\U0010ffff", self.ruta_raiz, limite)
+        )
+        return [ruta for (ruta,) in filas]
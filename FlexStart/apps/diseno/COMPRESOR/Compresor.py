@@ -1,7 +1,11 @@
 import os
 import io
+import json
+import hashlib
 import threading
 import queue
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import ttkbootstrap as ttk
@@ -34,43 +38,218 @@ def setup_theme(window=None):
     return style
 
 # --- Lógica de Compresión WEBP ---
-def _compress_single_webp(image_obj: Image.Image, size_threshold_bytes: int, min_quality: int = 10, initial_quality: int = 90, compression_method: int = 6) -> bytes | None:
-    low = min_quality
-    high = initial_quality
-    best_image_bytes = None
+MAX_WORKERS = os.cpu_count() or 1
+PROBE_METHOD = 2        # Método rápido para explorar calidades
+FINAL_METHOD = 6        # Método final (mejor compresión), se codifica una sola vez
+QUALITY_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "compresor_webp", "calidades.json")
 
-    img_to_compress = image_obj
-    if img_to_compress.mode == 'P' and 'transparency' in img_to_compress.info:
-        img_to_compress = image_obj.convert('RGBA')
-    elif img_to_compress.mode == 'LA': # LA (Luminance Alpha) a RGBA
-        img_to_compress = image_obj.convert('RGBA')
+# Caché de calidades por contenido, cargada en cada proceso del pool: {"sha1:umbral": calidad | None}
+_QUALITY_CACHE = {}
 
+
+def _prepare_for_webp(image_obj: Image.Image) -> Image.Image:
+    if image_obj.mode == 'P' and 'transparency' in image_obj.info:
+        return image_obj.convert('RGBA')
+    if image_obj.mode == 'LA': # LA (Luminance Alpha) a RGBA
+        return image_obj.convert('RGBA')
+    return image_obj
+
+
+def _encode_webp(image_obj: Image.Image, quality: int, method: int) -> bytes | None:
+    buffer = io.BytesIO()
+    try:
+        image_obj.save(buffer, format="WEBP", quality=quality, method=method)
+    except Exception:
+        return None
+    return buffer.getvalue()
+
+
+def _predict_quality(image_obj: Image.Image, original_size: int, size_threshold_bytes: int,
+                     min_quality: int, max_quality: int) -> int:
+    """Calidad inicial estimada según la reducción pedida y la entropía de la imagen."""
+    ratio = min(1.0, size_threshold_bytes / max(original_size, 1))
+    quality = max_quality * ratio ** 0.6
+    try:
+        # Imágenes con más detalle (entropía alta) necesitan bajar más la calidad
+        entropy = image_obj.convert('L').entropy()
+        quality -= (entropy - 6.0) * 4
+    except Exception:
+        pass
+    return int(min(max_quality, max(min_quality, quality)))
+
+
+def _search_quality(image_obj: Image.Image, size_threshold_bytes: int, start_quality: int,
+                    min_quality: int, max_quality: int) -> int | None:
+    """
+    Mayor calidad cuyo WebP (método rápido) queda bajo el umbral.
+
+    Parte de la calidad estimada y avanza en saltos para acotar el rango antes de
+    la búsqueda binaria, por lo que con una buena estimación bastan 2-4 codificaciones.
+    """
+    def fits(quality):
+        encoded = _encode_webp(image_obj, quality, PROBE_METHOD)
+        return encoded is not None and len(encoded) <= size_threshold_bytes
+
+    step = 8
+    if fits(start_quality):
+        low, high = start_quality, max_quality
+        while low < high:
+            candidate = min(high, low + step)
+            if fits(candidate):
+                low = candidate
+                step *= 2
+            else:
+                high = candidate - 1
+                break
+        best = low
+    else:
+        high, low = start_quality - 1, min_quality
+        best = None
+        while high >= low:
+            candidate = max(low, high - step)
+            if fits(candidate):
+                best = candidate
+                low = candidate + 1
+                break
+            high = candidate - 1
+            step *= 2
+        if best is None:
+            return None
+
+    # Búsqueda binaria dentro del rango acotado
     while low <= high:
         current_quality = (low + high) // 2
-        if current_quality == 0: 
-            current_quality = 1 
-            
-        buffer = io.BytesIO()
-        try:
-            img_to_compress.save(buffer, format="WEBP", quality=current_quality, method=compression_method)
-            current_size = buffer.tell()
+        if current_quality <= best:
+            low = best + 1
+            continue
+        if fits(current_quality):
+            best = current_quality
+            low = current_quality + 1
+        else:
+            high = current_quality - 1
+    return best
+
+
+def _compress_single_webp(image_obj: Image.Image, size_threshold_bytes: int, min_quality: int = 10, initial_quality: int = 90, compression_method: int = FINAL_METHOD, original_size: int | None = None, known_quality: int | None = None) -> tuple[bytes, int] | None:
+    """
+    Comprime la imagen bajo el umbral; retorna (bytes, calidad) o None si no es posible.
+
+    Las calidades se exploran con PROBE_METHOD, que genera archivos más grandes que el
+    método final: la calidad encontrada es una cota inferior y se reacota con el método
+    final por búsqueda binaria entre esa calidad y `initial_quality`.
+    """
+    img_to_compress = _prepare_for_webp(image_obj)
+
+    def encode_final(quality):
+        encoded = _encode_webp(img_to_compress, quality, compression_method)
+        if encoded is not None and len(encoded) <= size_threshold_bytes:
+            return encoded
+        return None
+
+    if known_quality is not None:
+        # Calidad ya calculada con el método final para este mismo contenido
+        encoded = encode_final(known_quality)
+        if encoded is not None:
+            return encoded, known_quality
+
+    start_quality = _predict_quality(img_to_compress, original_size or size_threshold_bytes * 2,
+                                     size_threshold_bytes, min_quality, initial_quality)
+    probe_quality = _search_quality(img_to_compress, size_threshold_bytes, start_quality, min_quality, initial_quality)
+
+    best = None
+    if probe_quality is not None:
+        encoded = encode_final(probe_quality)
+        if encoded is not None:
+            best = (encoded, probe_quality)
+            low, high = probe_quality + 1, initial_quality
+        else:
+            low, high = min_quality, probe_quality - 1
+    else:
+        low, high = min_quality, initial_quality
 
-            if current_size <= size_threshold_bytes:
-                best_image_bytes = buffer.getvalue()
-                low = current_quality + 1
-            else:
-                high = current_quality - 1
-        except Exception as e:
+    while low <= high:
+        current_quality = (low + high) // 2
+        encoded = encode_final(current_quality)
+        if encoded is not None:
+            best = (encoded, current_quality)
+            low = current_quality + 1
+        else:
             high = current_quality - 1
-            if low > high and best_image_bytes is None: 
-                return None 
-    return best_image_bytes
+    return best
+
+
+def _load_quality_cache() -> dict:
+    try:
+        with open(QUALITY_CACHE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_quality_cache(cache: dict):
+    try:
+        os.makedirs(os.path.dirname(QUALITY_CACHE_PATH), exist_ok=True)
+        tmp_path = QUALITY_CACHE_PATH + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, QUALITY_CACHE_PATH)
+    except OSError:
+        pass
+
+
+def _init_worker(quality_cache: dict):
+    global _QUALITY_CACHE
+    _QUALITY_CACHE = quality_cache
+
+
+def _compress_file(img_path: str, size_threshold_bytes: int, threshold_kb: int) -> dict:
+    """Procesa un archivo dentro del pool. Retorna un dict con el resultado para el hilo principal."""
+    base_name = os.path.basename(img_path)
+    result = {"file": img_path, "status": "error", "cache": {}}
+    try:
+        original_size = os.path.getsize(img_path)
+        if original_size <= size_threshold_bytes:
+            result.update(status="skipped", log=f"OMITIDO (ya cumple): {base_name} ({original_size/1024:.2f} KB)")
+            return result
+
+        with open(img_path, "rb") as f_in:
+            content = f_in.read()
+        cache_key = f"{hashlib.sha1(content).hexdigest()}:{size_threshold_bytes}"
+        error_msg = f"No se pudo comprimir por debajo de {threshold_kb} KB."
+
+        if cache_key in _QUALITY_CACHE and _QUALITY_CACHE[cache_key] is None:
+            result.update(error=error_msg, log=f"ERROR ({error_msg}, según caché): {base_name}")
+            return result
+
+        with Image.open(io.BytesIO(content)) as img_obj:
+            compressed = _compress_single_webp(img_obj, size_threshold_bytes, original_size=original_size,
+                                               known_quality=_QUALITY_CACHE.get(cache_key))
+
+        if compressed:
+            compressed_bytes, quality = compressed
+            with open(img_path, "wb") as f_out:
+                f_out.write(compressed_bytes)
+            new_size = len(compressed_bytes)
+            result.update(
+                status="compressed",
+                log=f"COMPRIMIDO: {base_name} (de {original_size/1024:.2f} KB a {new_size/1024:.2f} KB, calidad {quality})",
+                cache={cache_key: quality}
+            )
+        else:
+            result.update(error=error_msg, log=f"ERROR ({error_msg}): {base_name}", cache={cache_key: None})
+    except FileNotFoundError:
+        error_msg = "Archivo no encontrado."
+        result.update(error=error_msg, log=f"ERROR ({error_msg}): {base_name}.")
+    except Exception as e:
+        error_msg = f"Error inesperado: {e}"
+        result.update(error=error_msg, log=f"ERROR (procesando {base_name}): {error_msg}")
+    return result
+
 
 # --- Worker en Hilo ---
 def compression_worker(folder_path: str, threshold_kb: int, update_queue: queue.Queue):
     size_threshold_bytes = threshold_kb * 1024
     images_to_scan = []
-    files_processed_count = 0
     files_compressed_count = 0
     files_skipped_count = 0
     error_details = [] 
@@ -92,40 +271,34 @@ def compression_worker(folder_path: str, threshold_kb: int, update_queue: queue.
     update_queue.put(("progress_max", total_images_to_scan))
     update_queue.put(("log", f"Se encontraron {total_images_to_scan} imágenes .webp para analizar."))
 
-    for idx, img_path in enumerate(images_to_scan):
-        files_processed_count += 1
-        base_name = os.path.basename(img_path)
-        update_queue.put(("progress_value", idx + 1))
-        update_queue.put(("status", f"Procesando: {base_name} ({idx+1}/{total_images_to_scan})"))
-
-        try:
-            original_size = os.path.getsize(img_path)
-            if original_size <= size_threshold_bytes:
-                update_queue.put(("log", f"OMITIDO (ya cumple): {base_name} ({original_size/1024:.2f} KB)"))
-                files_skipped_count += 1
-                continue
-
-            with Image.open(img_path) as img_obj:
-                compressed_bytes = _compress_single_webp(img_obj, size_threshold_bytes)
+    quality_cache = _load_quality_cache()
+    workers = min(MAX_WORKERS, total_images_to_scan)
+    update_queue.put(("log", f"Procesando con {workers} procesos en paralelo."))
 
-            if compressed_bytes:
-                with open(img_path, "wb") as f_out:
-                    f_out.write(compressed_bytes)
-                new_size = len(compressed_bytes)
-                update_queue.put(("log", f"COMPRIMIDO: {base_name} (de {original_size/1024:.2f} KB a {new_size/1024:.2f} KB)"))
-                files_compressed_count += 1
-            else:
-                error_msg = f"No se pudo comprimir por debajo de {threshold_kb} KB."
-                update_queue.put(("log", f"ERROR ({error_msg}): {base_name}"))
-                error_details.append({"file": img_path, "error": error_msg})
-        except FileNotFoundError:
-            error_msg = "Archivo no encontrado."
-            update_queue.put(("log", f"ERROR ({error_msg}): {base_name}."))
-            error_details.append({"file": img_path, "error": error_msg})
-        except Exception as e:
-            error_msg = f"Error inesperado: {e}"
-            update_queue.put(("log", f"ERROR (procesando {base_name}): {error_msg}"))
-            error_details.append({"file": img_path, "error": error_msg})
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(quality_cache,)) as executor:
+            futures = [executor.submit(_compress_file, img_path, size_threshold_bytes, threshold_kb)
+                       for img_path in images_to_scan]
+            for idx, future in enumerate(as_completed(futures)):
+                result = future.result()
+                update_queue.put(("progress_value", idx + 1))
+                update_queue.put(("status", f"Procesado: {os.path.basename(result['file'])} ({idx+1}/{total_images_to_scan})"))
+                update_queue.put(("log", result["log"]))
+                quality_cache.update(result["cache"])
+
+                if result["status"] == "compressed":
+                    files_compressed_count += 1
+                elif result["status"] == "skipped":
+                    files_skipped_count += 1
+                else:
+                    error_details.append({"file": result["file"], "error": result["error"]})
+    except Exception as e:
+        error_msg = f"Error en el pool de procesos: {e}"
+        update_queue.put(("log", f"ERROR: {error_msg}"))
+        error_details.append({"file": folder_path, "error": error_msg})
+    finally:
+        _save_quality_cache(quality_cache)
             
     results = {
         "total": total_images_to_scan,
@@ -323,5 +496,6 @@ class WebpCompressorApp(ttk.Window):
             self.destroy()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     app = WebpCompressorApp()
     app.mainloop()
\ No newline at end of file
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Tests de la compresión WebP del Compresor (Compresor.py).
+
+Verifica que:
+1. La calidad elegida queda a poca distancia de la búsqueda exhaustiva con el método final
+2. El resultado siempre queda bajo el umbral
+3. Una calidad de la caché que cumple se usa sin volver a buscar
+
+Uso:
+    python3 -m pytest test_compresor.py
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+pytest.importorskip("ttkbootstrap")
+Image = pytest.importorskip("PIL.Image")
+from PIL import ImageDraw, features
+
+if not features.check("webp"):
+    pytest.skip("Pillow sin soporte WebP", allow_module_level=True)
+
+import Compresor
+
+TOLERANCIA_CALIDAD = 3
+
+
+def _imagen(tamano=(200, 200)):
+    """Foto sintética con degradado, ruido y figuras (no se comprime trivialmente)."""
+    gradiente = Image.linear_gradient("L")
+    imagen = Image.merge("RGB", (
+        gradiente.resize(tamano),
+        Image.effect_noise(tamano, 25),
+        gradiente.rotate(90).resize(tamano),
+    ))
+    dibujo = ImageDraw.Draw(imagen)
+    dibujo.ellipse((20, 20, 120, 100), fill=(200, 30, 60))
+    dibujo.rectangle((90, 110, 190, 190), fill=(20, 120, 220))
+    return imagen
+
+
+def _tamano(imagen, calidad):
+    return len(Compresor._encode_webp(imagen, calidad, Compresor.FINAL_METHOD))
+
+
+def _exhaustiva(imagen, umbral, min_quality=10, max_quality=90):
+    """Mayor calidad cuyo WebP con el método final queda bajo el umbral."""
+    validas = [q for q in range(min_quality, max_quality + 1) if _tamano(imagen, q) <= umbral]
+    return max(validas) if validas else None
+
+
+@pytest.mark.parametrize("calidad_objetivo", [30, 60, 85])
+def test_calidad_cercana_a_busqueda_exhaustiva(calidad_objetivo):
+    imagen = _imagen()
+    umbral = _tamano(imagen, calidad_objetivo)
+    original = len(Compresor._encode_webp(imagen, 100, Compresor.FINAL_METHOD))
+
+    codificado, calidad = Compresor._compress_single_webp(imagen, umbral, original_size=original)
+
+    assert len(codificado) <= umbral
+    assert calidad >= _exhaustiva(imagen, umbral) - TOLERANCIA_CALIDAD
+
+
+def test_calidad_de_cache_se_usa_directamente(monkeypatch):
+    imagen = _imagen()
+    umbral = _tamano(imagen, 50)
+    llamadas = []
+    monkeypatch.setattr(Compresor, "_search_quality", lambda *args: llamadas.append(args))
+
+    codificado, calidad = Compresor._compress_single_webp(imagen, umbral, known_quality=50)
+
+    assert calidad == 50 and len(codificado) <= umbral
+    assert llamadas == []
@@ -1,6 +1,9 @@
 import os
+import json
 import threading
 import queue
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import ttkbootstrap as ttk
@@ -33,67 +36,63 @@ def setup_theme(window=None):
     
     return style
 
+# --- Encoder settings per target format (PIL format name + save params) ---
+ENCODER_SETTINGS = {
+    "jpg": {"format": "JPEG", "params": {"quality": 90, "optimize": True}},
+    "png": {"format": "PNG", "params": {"compress_level": 6}},
+    "webp": {"format": "WEBP", "params": {"quality": 85, "method": 4}},
+}
+MAX_WORKERS = os.cpu_count() or 1
+# Manifest (per root folder) of converted sources: skips re-encoding unchanged files
+MANIFEST_FILENAME = ".convertidor_manifest.json"
+
+
+def _flatten_alpha_to_rgb(img):
+    """
+    Composites an image with transparency over white for formats without alpha (JPEG).
+    The alpha band is used directly as the mask, without an intermediate RGBA copy when
+    the source already is RGBA/LA.
+    """
+    if img.mode == "P":
+        img = img.convert("RGBA")
+    background = Image.new("RGB", img.size, (255, 255, 255))
+    background.paste(img, mask=img.getchannel("A"))
+    return background
+
+
 # --- Helper function for single file conversion (extracted and made standalone) ---
 def convert_single_image_file(filepath, target_format_str):
     """
     Converts a single image file to the target format.
     Deletes the original if the new filename is different.
-    Raises an exception on failure.
+    Decoding and encoding happen in the same process (the pixel buffer never leaves
+    the worker); only paths travel back to the caller.
+    Returns the new file path. Raises an exception on failure.
     """
+    target = target_format_str.lower()
+    settings = ENCODER_SETTINGS[target]
+
+    directory, filename = os.path.split(filepath)
+    base, _ = os.path.splitext(filename) # Original extension is discarded
+    new_filename = f"{base}.{target}"
+    new_filepath = os.path.join(directory, new_filename)
+
     with Image.open(filepath) as img:
-        original_mode = img.mode
         img_to_save = img
 
         # Handle transparency for JPG conversion
-        if target_format_str.lower() == "jpg":
-            if img.mode in ("RGBA", "LA", "P"): # P (palette) mode can also have transparency
-                # Check for actual transparency in P mode before converting
-                has_transparency_in_palette = False
-                if img.mode == "P" and 'transparency' in img.info:
-                    # Check if any transparent pixels are actually used (can be slow for many images)
-                    # For simplicity, we assume if 'transparency' key exists, we should handle it.
-                    has_transparency_in_palette = True
-
-                if img.mode in ("RGBA", "LA") or has_transparency_in_palette:
-                    try:
-                        # Create a white background and paste the image with its alpha mask
-                        background = Image.new("RGB", img.size, (255, 255, 255))
-                        # Ensure img has an alpha channel to use as a mask
-                        if img.mode != 'RGBA':
-                           img_with_alpha = img.convert('RGBA')
-                        else:
-                           img_with_alpha = img
-                        background.paste(img_with_alpha, mask=img_with_alpha.split()[-1])
-                        img_to_save = background
-                    except Exception as e_alpha: # Fallback if alpha handling fails
-                        # print(f"Alpha handling fallback for {filepath}: {e_alpha}")
-                        img_to_save = img.convert("RGB")
-
-                elif img.mode != "RGB": # If not RGBA/LA/P with transp, but also not RGB
+        if target == "jpg":
+            # P (palette) mode can also have transparency; if the 'transparency' key exists, we handle it.
+            has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and 'transparency' in img.info)
+            if has_alpha:
+                try:
+                    img_to_save = _flatten_alpha_to_rgb(img)
+                except Exception: # Fallback if alpha handling fails
                     img_to_save = img.convert("RGB")
-        
-        # WEBP specific: Pillow saves P mode WEBP as lossless by default.
-        # If lossy is desired (usually for smaller files), convert from P to RGB/RGBA.
-        # However, the original code didn't have WEBP specific quality settings, so keeping it simple.
-        # if target_format_str.lower() == "webp" and img_to_save.mode == 'P':
-        #    img_to_save = img_to_save.convert('RGB')
-
-
-        directory, filename = os.path.split(filepath)
-        base, _ = os.path.splitext(filename) # Original extension is discarded
-        new_filename = f"{base}.{target_format_str.lower()}"
-        new_filepath = os.path.join(directory, new_filename)
+            elif img.mode == "P": # Palette without transparency
+                img_to_save = img.convert("RGB")
 
-        # Save parameters can be added here if needed (e.g., quality for jpg/webp)
-        save_params = {}
-        if target_format_str.lower() == 'jpg':
-            save_params['quality'] = 90 # Example quality
-            save_params['optimize'] = True
-        elif target_format_str.lower() == 'webp':
-            save_params['quality'] = 85 # Example quality
-            # save_params['lossless'] = False
-
-        img_to_save.save(new_filepath, target_format_str.upper(), **save_params)
+        img_to_save.save(new_filepath, settings["format"], **settings["params"])
 
     # Delete original if conversion resulted in a new file name (different extension)
     # and the new file was successfully created.
@@ -103,6 +102,38 @@ def convert_single_image_file(filepath, target_format_str):
         else:
             # This case should ideally not happen if img.save didn't raise error
             raise Exception(f"Nuevo archivo '{new_filename}' no fue creado después de guardar.")
+    return new_filepath
+
+
+def _load_manifest(folder_path_str):
+    try:
+        with open(os.path.join(folder_path_str, MANIFEST_FILENAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(folder_path_str, manifest):
+    manifest_path = os.path.join(folder_path_str, MANIFEST_FILENAME)
+    try:
+        with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(manifest_path + ".tmp", manifest_path)
+    except OSError:
+        pass
+
+
+def _already_converted(entry, source_stat, target_format_str, output_path):
+    """True if the manifest says this exact source (size/mtime) was already converted to output_path."""
+    if not entry or entry.get("format") != target_format_str.lower():
+        return False
+    if entry.get("size") != source_stat.st_size or entry.get("mtime_ns") != source_stat.st_mtime_ns:
+        return False
+    try:
+        return os.path.getsize(output_path) == entry.get("output_size")
+    except OSError:
+        return False
+
 
 # --- Helper function to add extensions to files without extensions ---
 def add_extension_to_file(filepath, target_format_str):
@@ -192,19 +223,69 @@ def conversion_worker_thread(folder_path_str, target_format_str, update_queue):
             update_queue.put(('log', err_msg))
         update_queue.put(('progress_update', current_progress))
 
-    # Then, process regular conversions
+    # Then, process regular conversions in a process pool
+    manifest = _load_manifest(folder_path_str)
+    files_skipped_count = 0
+    pending = {}  # filepath -> (manifest key, source stat)
+
     for filepath in files_to_convert:
-        current_progress += 1
-        original_filename = os.path.basename(filepath)
-        update_queue.put(('status', f"Convirtiendo: {original_filename} ({current_progress}/{total_files})"))
+        manifest_key = os.path.relpath(filepath, folder_path_str)
+        try:
+            source_stat = os.stat(filepath)
+        except OSError as e:
+            current_progress += 1
+            errors_this_run.append(f"Error al convertir {os.path.basename(filepath)}: {e}")
+            update_queue.put(('progress_update', current_progress))
+            continue
+
+        output_path = os.path.splitext(filepath)[0] + f".{target_format_str.lower()}"
+        if _already_converted(manifest.get(manifest_key), source_stat, target_format_str, output_path):
+            # Same source already converted: keep the existing output, finish like a conversion would
+            current_progress += 1
+            files_skipped_count += 1
+            try:
+                os.remove(filepath)
+            except OSError:
+                pass
+            update_queue.put(('log', f"Omitido (sin cambios desde la última conversión): {os.path.basename(filepath)}"))
+            update_queue.put(('progress_update', current_progress))
+            continue
+
+        pending[filepath] = (manifest_key, source_stat)
+
+    if pending:
+        workers = min(MAX_WORKERS, len(pending))
+        update_queue.put(('log', f"Convirtiendo {len(pending)} imágenes con {workers} procesos."))
         try:
-            convert_single_image_file(filepath, target_format_str)
-            files_converted_count += 1
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(convert_single_image_file, filepath, target_format_str): filepath
+                           for filepath in pending}
+                for future in as_completed(futures):
+                    filepath = futures[future]
+                    original_filename = os.path.basename(filepath)
+                    current_progress += 1
+                    update_queue.put(('status', f"Convirtiendo: {original_filename} ({current_progress}/{total_files})"))
+                    try:
+                        new_filepath = future.result()
+                        files_converted_count += 1
+                        manifest_key, source_stat = pending[filepath]
+                        manifest[manifest_key] = {
+                            "size": source_stat.st_size,
+                            "mtime_ns": source_stat.st_mtime_ns,
+                            "format": target_format_str.lower(),
+                            "output_size": os.path.getsize(new_filepath),
+                        }
+                    except Exception as e:
+                        err_msg = f"Error al convertir {original_filename}: {e}"
+                        errors_this_run.append(err_msg)
+                        update_queue.put(('log', err_msg))
+                    update_queue.put(('progress_update', current_progress))
         except Exception as e:
-            err_msg = f"Error al convertir {original_filename}: {e}"
+            err_msg = f"Error en el pool de conversión: {e}"
             errors_this_run.append(err_msg)
             update_queue.put(('log', err_msg))
-        update_queue.put(('progress_update', current_progress))
+        finally:
+            _save_manifest(folder_path_str, manifest)
 
     report_file_path = None
     if errors_this_run:
@@ -225,6 +306,7 @@ def conversion_worker_thread(folder_path_str, target_format_str, update_queue):
         'total_files': total_files,
         'converted_count': files_converted_count,
         'extension_added_count': files_extension_added_count,
+        'skipped_count': files_skipped_count,
         'errors_count': len(errors_this_run)
     }))
 
@@ -354,9 +436,10 @@ class ImageFormatConverterApp(ttk.Window):
         total_files = results_data['total_files']
         converted_count = results_data['converted_count']
         extension_added_count = results_data.get('extension_added_count', 0)
+        skipped_count = results_data.get('skipped_count', 0)
         errors_count = results_data['errors_count']
         
-        final_status_msg = f"Procesamiento finalizado. Total: {total_files}, Extensiones agregadas: {extension_added_count}, Convertidos: {converted_count}, Errores: {errors_count}."
+        final_status_msg = f"Procesamiento finalizado. Total: {total_files}, Extensiones agregadas: {extension_added_count}, Convertidos: {converted_count}, Sin cambios: {skipped_count}, Errores: {errors_count}."
         self.status_var.set(final_status_msg)
 
         if has_errors:
@@ -374,7 +457,9 @@ class ImageFormatConverterApp(ttk.Window):
                 if extension_added_count > 0:
                     success_msg += f"• {extension_added_count} archivo(s) con extensión agregada\n"
                 if converted_count > 0:
-                    success_msg += f"• {converted_count} imagen(es) convertida(s)"
+                    success_msg += f"• {converted_count} imagen(es) convertida(s)\n"
+                if skipped_count > 0:
+                    success_msg += f"• {skipped_count} imagen(es) sin cambios desde la última conversión"
                 messagebox.showinfo("Procesamiento Completado", success_msg, parent=self)
             else:
                 messagebox.showinfo("Información", "No se procesaron imágenes (0 encontradas o elegibles).", parent=self)
@@ -392,5 +477,6 @@ class ImageFormatConverterApp(ttk.Window):
             self.destroy()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     app = ImageFormatConverterApp()
     app.mainloop()
\ No newline at end of file
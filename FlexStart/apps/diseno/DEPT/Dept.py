@@ -1,5 +1,5 @@
 import os
-import shutil
+import sys
 import pandas as pd
 import tkinter as tk
 from tkinter import filedialog, messagebox
@@ -8,6 +8,152 @@ from ttkbootstrap.constants import (
     NORMAL, DISABLED, END, NSEW, EW, W, LEFT, E
 )
 from ttkbootstrap.scrolled import ScrolledText
+
+# Módulos compartidos de las apps de diseño (apps/diseno)
+_diseno_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _diseno_dir not in sys.path:
+    sys.path.insert(0, _diseno_dir)
+
+from motor_transferencia import MotorTransferencia, ItemTransferencia, MODO_MOVER, CONFLICTO_OMITIR
+from planillas import leer_planilla, ColumnasFaltantes
+
+
+def departamentalizar(excel_file, input_dir, output_dir, child_col, depto_col, include_count,
+                      al_log=lambda lineas: None, al_estado=lambda mensaje: None,
+                      al_progreso=lambda hechos, total: None):
+    """
+    Núcleo sin ventana: mueve cada carpeta hija de `input_dir` a la carpeta de su
+    departamento en `output_dir` y, si `include_count`, agrega "(N SKU)" al nombre.
+    Retorna la cantidad de carpetas movidas.
+
+    Raises:
+        ColumnasFaltantes si la planilla no tiene alguna de las dos columnas;
+        OSError si no se puede crear la carpeta de salida.
+    """
+    def al_log_linea(mensaje):
+        al_log([mensaje])
+
+    # Solo las dos columnas usadas (caché por contenido en ~/.cache/planillas)
+    planilla = leer_planilla(excel_file, [child_col, depto_col])
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+        al_log_linea(f"Carpeta de salida creada: {output_dir}")
+
+    depto_paths = {}
+    deptos = planilla[depto_col]
+    for depto_raw in pd.unique(deptos[pd.notna(deptos)]):
+        key = str(depto_raw).strip()
+        if not key: continue
+        depto_path = os.path.join(output_dir, key)
+        if not os.path.exists(depto_path):
+            try:
+                os.makedirs(depto_path)
+                al_log_linea(f'Carpeta de departamento creada: {depto_path}')
+            except Exception as e:
+                al_log_linea(f'ERROR al crear carpeta de departamento {depto_path}: {e}')
+                continue
+        else:
+             al_log_linea(f'Carpeta de departamento existente: {depto_path}')
+        depto_paths[key] = depto_path
+
+    # Primero se arma el plan en memoria (sin refrescar la UI por fila) y luego se
+    # mueve todo con el motor compartido, que informa el avance por lotes.
+    mensajes = []
+    items = []
+    for index, (hijo_val, depto_val) in enumerate(zip(planilla[child_col], deptos)):
+
+        if pd.isna(hijo_val) or pd.isna(depto_val):
+            mensajes.append(f'Fila {index + 1}: Saltada por valor NaN en hijo o departamento.')
+            continue
+        
+        # Corregir conversión para números flotantes que terminan en .0
+        if isinstance(hijo_val, float) and hijo_val == int(hijo_val):
+            hijo = str(int(hijo_val)).strip()
+        else:
+            hijo = str(hijo_val).strip()
+        depto = str(depto_val).strip()
+
+        if not hijo:
+            mensajes.append(f'Fila {index + 1}: Saltada, nombre de hijo vacío.')
+            continue
+        if not depto:
+            mensajes.append(f'Fila {index + 1}: Saltada, nombre de departamento vacío para hijo "{hijo}".')
+            continue
+
+        hijo_path = os.path.join(input_dir, hijo)
+        depto_target_path_base = depto_paths.get(depto)
+
+        if depto_target_path_base and os.path.isdir(hijo_path):
+            items.append(ItemTransferencia(hijo_path, os.path.join(depto_target_path_base, hijo), etiqueta=hijo))
+        elif not depto_target_path_base:
+            mensajes.append(f'Error: Departamento "{depto}" no válido o no se pudo crear su carpeta para "{hijo}".')
+        elif not os.path.exists(hijo_path):
+            mensajes.append(f'Error: Carpeta de entrada no existe: {hijo_path}')
+        else:
+            mensajes.append(f'Error: Elemento de entrada no es una carpeta: {hijo_path}')
+
+    al_log(mensajes)
+    al_estado(f'Moviendo {len(items)} carpetas...')
+
+    processed_count = 0
+    motor = MotorTransferencia(MODO_MOVER, conflicto=CONFLICTO_OMITIR)
+
+    def al_lote(lote, hechos, total):
+        nonlocal processed_count
+        lineas = []
+        for item, estado, detalle in lote:
+            depto_dir = os.path.dirname(item.destino)
+            if estado == "ok":
+                lineas.append(f'OK: Carpeta {item.etiqueta} movida a {depto_dir}')
+                processed_count += 1
+            elif estado == "omitido":
+                lineas.append(f'Advertencia: Carpeta {item.etiqueta} ya existe en {depto_dir}. Se omite el movimiento.')
+            else:
+                lineas.append(f'ERROR al mover {item.origen} a {depto_dir}: {detalle}')
+        al_log(lineas)
+        al_progreso(hechos, total)
+
+    motor.ejecutar(items, al_progreso=al_lote)
+
+    al_estado('Renombrando carpetas de departamento...')
+    for depto_key, depto_path_original in list(depto_paths.items()):
+        if not os.path.exists(depto_path_original):
+            al_log_linea(f"Info: Carpeta {depto_path_original} no encontrada para renombrar.")
+            continue
+        try:
+            num_sub = len([
+                name for name in os.listdir(depto_path_original)
+                if os.path.isdir(os.path.join(depto_path_original, name))
+            ])
+            
+            new_name_base = depto_key
+            if include_count:
+                new_name = f"{new_name_base} ({num_sub} SKU)"
+            else:
+                new_name = new_name_base
+            
+            current_basename = os.path.basename(depto_path_original)
+
+            if new_name != current_basename:
+                new_final_path = os.path.join(output_dir, new_name)
+                
+                if os.path.exists(new_final_path) and new_final_path.lower() != depto_path_original.lower():
+                     al_log_linea(f'Conflicto: {new_final_path} ya existe. No se renombró {current_basename}.')
+                elif new_final_path.lower() == depto_path_original.lower() and new_final_path != depto_path_original:
+                    os.rename(depto_path_original, new_final_path)
+                    depto_paths[depto_key] = new_final_path
+                    al_log_linea(f'Renombrada (ajuste mayús/minús): {current_basename} → {new_name}')
+                elif new_final_path.lower() != depto_path_original.lower():
+                    os.rename(depto_path_original, new_final_path)
+                    depto_paths[depto_key] = new_final_path 
+                    al_log_linea(f'Renombrada: {current_basename} → {new_name}')
+
+        except Exception as e:
+            al_log_linea(f'ERROR al renombrar/contar en {depto_path_original}: {e}')
+
+    return processed_count
+
+
 # Función de tema compatible multiplataforma
 def setup_theme(window=None):
     import ttkbootstrap as ttk
@@ -58,6 +204,15 @@ class DepartamentalizarApp:
         self.log_text.see(END) # .see() debería estar bien delegado
         self.master.update_idletasks()
 
+    def _add_lines_to_log(self, messages):
+        """Inserta varias líneas de una vez (un solo refresco de la UI)."""
+        if not messages:
+            return
+        self.log_text.text.config(state=NORMAL)
+        self.log_text.insert(END, '\n'.join(messages) + '\n')
+        self.log_text.text.config(state=DISABLED)
+        self.log_text.see(END)
+
     def _create_widgets(self):
         main_frame = ttk.Frame(self.master, padding="15 15 15 15")
         main_frame.grid(row=0, column=0, sticky=NSEW)
@@ -138,141 +293,33 @@ class DepartamentalizarApp:
             self.output_dir_var.set(path)
 
     def _organize_folders_logic(self, excel_file, input_dir, output_dir, child_col, depto_col, include_count):
-        try:
-            df = pd.read_excel(excel_file)
-        except Exception as e:
-            messagebox.showerror("Error al leer Excel", f"No se pudo leer el archivo Excel:\n{e}", parent=self.master)
-            self.status_label.config(text='Error al leer Excel.')
-            return
-
-        try:
-            if not os.path.exists(output_dir):
-                os.makedirs(output_dir)
-                self._add_to_log(f"Carpeta de salida creada: {output_dir}")
-        except Exception as e:
-            messagebox.showerror("Error de Directorio", f"No se pudo crear la carpeta de salida '{output_dir}':\n{e}", parent=self.master)
-            self.status_label.config(text='Error al crear directorio de salida.')
-            return
-
-        depto_paths = {}
-        if depto_col not in df.columns:
-            messagebox.showerror("Error de Columna", f"La columna de departamento '{depto_col}' no existe en el archivo Excel.", parent=self.master)
-            self.status_label.config(text=f"Columna '{depto_col}' no encontrada.")
-            return
-        
-        for depto_raw in df[depto_col].dropna().unique():
-            key = str(depto_raw).strip()
-            if not key: continue
-            depto_path = os.path.join(output_dir, key)
-            if not os.path.exists(depto_path):
-                try:
-                    os.makedirs(depto_path)
-                    self._add_to_log(f'Carpeta de departamento creada: {depto_path}')
-                except Exception as e:
-                    self._add_to_log(f'ERROR al crear carpeta de departamento {depto_path}: {e}')
-                    continue
-            else:
-                 self._add_to_log(f'Carpeta de departamento existente: {depto_path}')
-            depto_paths[key] = depto_path
-
-        if child_col not in df.columns:
-            messagebox.showerror("Error de Columna", f"La columna de nombres hijos '{child_col}' no existe en el archivo Excel.", parent=self.master)
-            self.status_label.config(text=f"Columna '{child_col}' no encontrada.")
-            return
-
-        total_rows = len(df)
-        processed_count = 0
-        for index, row in df.iterrows():
-            hijo_val = row.get(child_col)
-            depto_val = row.get(depto_col)
-
-            progress = ((index + 1) / total_rows) * 100
-            self.progress_var.set(progress)
+        def al_estado(mensaje):
+            self.status_label.config(text=mensaje)
             self.master.update_idletasks()
 
-            if pd.isna(hijo_val) or pd.isna(depto_val):
-                self._add_to_log(f'Fila {index + 1}: Saltada por valor NaN en hijo o departamento.')
-                continue
-            
-            # Corregir conversión para números flotantes que terminan en .0
-            if isinstance(hijo_val, float) and hijo_val == int(hijo_val):
-                hijo = str(int(hijo_val)).strip()
-            else:
-                hijo = str(hijo_val).strip()
-            depto = str(depto_val).strip()
-
-            if not hijo:
-                self._add_to_log(f'Fila {index + 1}: Saltada, nombre de hijo vacío.')
-                continue
-            if not depto:
-                self._add_to_log(f'Fila {index + 1}: Saltada, nombre de departamento vacío para hijo "{hijo}".')
-                continue
+        def al_progreso(hechos, total):
+            self.progress_var.set(hechos / total * 100)
+            al_estado(f'Procesando: {hechos}/{total}')
 
-            hijo_path = os.path.join(input_dir, hijo)
-            depto_target_path_base = depto_paths.get(depto)
-
-            self.status_label.config(text=f'Procesando: {hijo} → {depto}')
-            self._add_to_log(f'Intentando mover: {hijo_path}  ==>  {os.path.join(depto_target_path_base, hijo) if depto_target_path_base else "N/A"}')
-
-
-            if depto_target_path_base and os.path.exists(hijo_path) and os.path.isdir(hijo_path):
-                try:
-                    final_destination_for_hijo = os.path.join(depto_target_path_base, hijo)
-                    if os.path.exists(final_destination_for_hijo):
-                        self._add_to_log(f'Advertencia: Carpeta {hijo} ya existe en {depto_target_path_base}. Se omite el movimiento.')
-                    else:
-                        shutil.move(hijo_path, depto_target_path_base)
-                        self._add_to_log(f'OK: Carpeta {hijo} movida a {depto_target_path_base}')
-                        processed_count += 1
-                except Exception as e:
-                    self._add_to_log(f'ERROR al mover {hijo_path} a {depto_target_path_base}: {e}')
-            elif not depto_target_path_base:
-                self._add_to_log(f'Error: Departamento "{depto}" no válido o no se pudo crear su carpeta para "{hijo}".')
-            elif not os.path.exists(hijo_path):
-                self._add_to_log(f'Error: Carpeta de entrada no existe: {hijo_path}')
-            elif not os.path.isdir(hijo_path):
-                self._add_to_log(f'Error: Elemento de entrada no es una carpeta: {hijo_path}')
-            
+        def al_log(lineas):
+            self._add_lines_to_log(lineas)
             self.master.update_idletasks()
 
-
-        self.status_label.config(text='Renombrando carpetas de departamento...')
-        self.master.update_idletasks()
-        for depto_key, depto_path_original in list(depto_paths.items()):
-            if not os.path.exists(depto_path_original):
-                self._add_to_log(f"Info: Carpeta {depto_path_original} no encontrada para renombrar.")
-                continue
-            try:
-                num_sub = len([
-                    name for name in os.listdir(depto_path_original)
-                    if os.path.isdir(os.path.join(depto_path_original, name))
-                ])
-                
-                new_name_base = depto_key
-                if include_count:
-                    new_name = f"{new_name_base} ({num_sub} SKU)"
-                else:
-                    new_name = new_name_base
-                
-                current_basename = os.path.basename(depto_path_original)
-
-                if new_name != current_basename:
-                    new_final_path = os.path.join(output_dir, new_name)
-                    
-                    if os.path.exists(new_final_path) and new_final_path.lower() != depto_path_original.lower():
-                         self._add_to_log(f'Conflicto: {new_final_path} ya existe. No se renombró {current_basename}.')
-                    elif new_final_path.lower() == depto_path_original.lower() and new_final_path != depto_path_original:
-                        os.rename(depto_path_original, new_final_path)
-                        depto_paths[depto_key] = new_final_path
-                        self._add_to_log(f'Renombrada (ajuste mayús/minús): {current_basename} → {new_name}')
-                    elif new_final_path.lower() != depto_path_original.lower():
-                        os.rename(depto_path_original, new_final_path)
-                        depto_paths[depto_key] = new_final_path 
-                        self._add_to_log(f'Renombrada: {current_basename} → {new_name}')
-
-            except Exception as e:
-                self._add_to_log(f'ERROR al renombrar/contar en {depto_path_original}: {e}')
-            self.master.update_idletasks()
+        try:
+            processed_count = departamentalizar(excel_file, input_dir, output_dir, child_col, depto_col,
+                                                include_count, al_log, al_estado, al_progreso)
+        except ColumnasFaltantes as e:
+            if depto_col in e.faltantes:
+                messagebox.showerror("Error de Columna", f"La columna de departamento '{depto_col}' no existe en el archivo Excel.", parent=self.master)
+                self.status_label.config(text=f"Columna '{depto_col}' no encontrada.")
+            else:
+                messagebox.showerror("Error de Columna", f"La columna de nombres hijos '{child_col}' no existe en el archivo Excel.", parent=self.master)
+                self.status_label.config(text=f"Columna '{child_col}' no encontrada.")
+            return
+        except OSError as e:
+            messagebox.showerror("Error de Directorio", f"No se pudo crear la carpeta de salida '{output_dir}':\n{e}", parent=self.master)
+            self.status_label.config(text='Error al crear directorio de salida.')
+            return
 
         self.progress_var.set(100)
         self.status_label.config(text=f'Completado. {processed_count} carpetas procesadas.')
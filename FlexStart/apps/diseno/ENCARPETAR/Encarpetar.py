@@ -5,8 +5,143 @@ import os
 import shutil
 import threading
 import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+# Hilos para mover archivos y líneas de log por refresco de la interfaz
+MAX_WORKERS = 8
+LOTE_LOG = 200
+
+# Extensiones de imagen soportadas
+EXTENSIONES_IMAGEN = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif', '.gif', '.webp', '.svg'}
+
+
+def extraer_nombre_base(nombre_archivo):
+    # Obtener solo el nombre sin extensión
+    nombre_sin_ext = os.path.splitext(nombre_archivo)[0]
+    
+    # Buscar el último _ o - y tomar todo lo que está antes
+    match = re.search(r'^(.+?)[-_]', nombre_sin_ext)
+    if match:
+        return match.group(1)
+    else:
+        # Si no hay sufijo, usar el nombre completo sin extensión
+        return nombre_sin_ext
+
+
+def es_imagen(archivo):
+    return Path(archivo).suffix.lower() in EXTENSIONES_IMAGEN
+
+
+def planificar_movimientos(origen, destino, imagenes):
+    """
+    Agrupa las imágenes por nombre base y resuelve en memoria el destino final de cada una.
+    Crea de una vez las carpetas que faltan y lee cada carpeta existente una sola vez.
+    Devuelve (movimientos, carpetas_creadas, errores).
+
+    Grupos, carpetas y colisiones se comparan con casefold(): en discos que no
+    distinguen mayúsculas (macOS, Windows) "ABC.jpg" y "abc.jpg" van a la misma
+    carpeta y no pueden quedar con el mismo nombre.
+    """
+    grupos = {}  # nombre base en casefold -> (nombre base de la primera imagen, imágenes)
+    for imagen in imagenes:
+        nombre_base = extraer_nombre_base(imagen)
+        grupos.setdefault(nombre_base.casefold(), (nombre_base, []))[1].append(imagen)
+    
+    with os.scandir(destino) as entradas:
+        carpetas_existentes = {e.name.casefold(): e.name for e in entradas if e.is_dir()}
+    
+    movimientos = []
+    carpetas_creadas = set()
+    errores = []
+    for clave, (nombre_base, archivos) in grupos.items():
+        # Si la carpeta ya existe se usa su nombre real
+        nombre_base = carpetas_existentes.get(clave, nombre_base)
+        carpeta_destino_final = os.path.join(destino, nombre_base)
+        try:
+            if clave in carpetas_existentes:
+                with os.scandir(carpeta_destino_final) as entradas:
+                    ocupados = {e.name.casefold() for e in entradas}
+            else:
+                os.makedirs(carpeta_destino_final, exist_ok=True)
+                carpetas_creadas.add(nombre_base)
+                ocupados = set()
+        except OSError as e:
+            errores.extend((imagen, str(e)) for imagen in archivos)
+            continue
+        
+        for imagen in archivos:
+            # Si el archivo ya existe en destino, generar un nombre único
+            nombre_final = imagen
+            if nombre_final.casefold() in ocupados:
+                nombre_sin_ext, ext = os.path.splitext(imagen)
+                contador = 1
+                while nombre_final.casefold() in ocupados:
+                    nombre_final = f"{nombre_sin_ext}_{contador}{ext}"
+                    contador += 1
+            ocupados.add(nombre_final.casefold())
+            movimientos.append((imagen, os.path.join(origen, imagen),
+                                os.path.join(carpeta_destino_final, nombre_final), nombre_base))
+    return movimientos, carpetas_creadas, errores
+
+
+def mover_sin_sobrescribir(origen_archivo, destino_archivo):
+    """shutil.move que falla si el destino apareció después de planificar (nunca sobrescribe)."""
+    if os.path.lexists(destino_archivo):
+        raise FileExistsError(f"Ya existe '{destino_archivo}'")
+    shutil.move(origen_archivo, destino_archivo)
+
+
+def mover_archivos(movimientos, al_log):
+    """Mueve los archivos planificados en paralelo; entrega el log en lotes a `al_log(lineas)`."""
+    procesadas = 0
+    errores = 0
+    mensajes = []
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        futuros = {pool.submit(mover_sin_sobrescribir, origen_archivo, destino_archivo): (imagen, nombre_base)
+                   for imagen, origen_archivo, destino_archivo, nombre_base in movimientos}
+        for futuro in as_completed(futuros):
+            imagen, nombre_base = futuros[futuro]
+            try:
+                futuro.result()
+                mensajes.append(f"Movido: {imagen} -> {nombre_base}/")
+                procesadas += 1
+            except Exception as e:
+                mensajes.append(f"Error procesando {imagen}: {str(e)}")
+                errores += 1
+            if len(mensajes) >= LOTE_LOG:
+                al_log(mensajes)
+                mensajes = []
+    al_log(mensajes)
+    return procesadas, errores
+
+
+def organizar(origen, destino, al_log=lambda lineas: None):
+    """
+    Núcleo sin ventana: mueve cada imagen de `origen` a la carpeta de su nombre base en
+    `destino`. Retorna {"imagenes", "procesadas", "errores", "carpetas_creadas"}.
+    """
+    # Una sola lectura de la carpeta origen
+    with os.scandir(origen) as entradas:
+        imagenes = sorted(e.name for e in entradas if e.is_file() and es_imagen(e.name))
+    if not imagenes:
+        return {"imagenes": 0, "procesadas": 0, "errores": 0, "carpetas_creadas": 0}
+    al_log([f"Se encontraron {len(imagenes)} imágenes para procesar"])
+    
+    # Planificar todo en memoria: carpetas por nombre base y nombres finales sin colisiones
+    movimientos, carpetas_creadas, errores_plan = planificar_movimientos(origen, destino, imagenes)
+    mensajes = [f"Carpeta creada: {nombre_base}" for nombre_base in sorted(carpetas_creadas)]
+    mensajes += [f"Error procesando {imagen}: {error}" for imagen, error in errores_plan]
+    for imagen, _, destino_archivo, _ in movimientos:
+        if os.path.basename(destino_archivo) != imagen:
+            mensajes.append(f"Archivo renombrado por duplicado: {imagen} -> {os.path.basename(destino_archivo)}")
+    al_log(mensajes)
+    
+    # Mover los archivos con un pool de hilos
+    procesadas, errores = mover_archivos(movimientos, al_log)
+    return {"imagenes": len(imagenes), "procesadas": procesadas,
+            "errores": errores + len(errores_plan), "carpetas_creadas": len(carpetas_creadas)}
+
 class OrganizadorImagenes:
     def __init__(self):
         self.root = tk.Tk()
@@ -19,9 +154,6 @@ class OrganizadorImagenes:
         self.carpeta_destino = tk.StringVar()
         self.procesando = False
         
-        # Extensiones de imagen soportadas
-        self.extensiones_imagen = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif', '.gif', '.webp', '.svg'}
-        
         self.crear_interfaz()
         
     def crear_interfaz(self):
@@ -102,20 +234,10 @@ Extensiones soportadas: JPG, JPEG, PNG, BMP, TIFF, TIF, GIF, WEBP, SVG
         self.texto_log.config(state=tk.DISABLED)
         self.root.update_idletasks()
         
-    def extraer_nombre_base(self, nombre_archivo):
-        # Obtener solo el nombre sin extensión
-        nombre_sin_ext = os.path.splitext(nombre_archivo)[0]
-        
-        # Buscar el último _ o - y tomar todo lo que está antes
-        match = re.search(r'^(.+?)[-_]', nombre_sin_ext)
-        if match:
-            return match.group(1)
-        else:
-            # Si no hay sufijo, usar el nombre completo sin extensión
-            return nombre_sin_ext
-            
-    def es_imagen(self, archivo):
-        return Path(archivo).suffix.lower() in self.extensiones_imagen
+    def log_lineas(self, mensajes):
+        """Agrega varias líneas al log con un solo refresco de la interfaz."""
+        if mensajes:
+            self.log_mensaje("\n".join(mensajes))
         
     def procesar_imagenes(self):
         try:
@@ -138,67 +260,22 @@ Extensiones soportadas: JPG, JPEG, PNG, BMP, TIFF, TIF, GIF, WEBP, SVG
             self.log_mensaje(f"Origen: {origen}")
             self.log_mensaje(f"Destino: {destino}")
             
-            # Obtener todas las imágenes en la carpeta origen
-            imagenes = []
-            for archivo in os.listdir(origen):
-                ruta_completa = os.path.join(origen, archivo)
-                if os.path.isfile(ruta_completa) and self.es_imagen(archivo):
-                    imagenes.append(archivo)
-                    
-            if not imagenes:
+            resultado = organizar(origen, destino, self.log_lineas)
+            if not resultado["imagenes"]:
                 self.log_mensaje("No se encontraron imágenes en la carpeta origen")
                 messagebox.showinfo("Información", "No se encontraron imágenes en la carpeta origen")
                 return
-                
-            self.log_mensaje(f"Se encontraron {len(imagenes)} imágenes para procesar")
-            
-            # Procesar cada imagen
-            procesadas = 0
-            errores = 0
-            carpetas_creadas = set()
-            
-            for imagen in imagenes:
-                try:
-                    nombre_base = self.extraer_nombre_base(imagen)
-                    carpeta_destino_final = os.path.join(destino, nombre_base)
-                    
-                    # Crear carpeta si no existe
-                    if not os.path.exists(carpeta_destino_final):
-                        os.makedirs(carpeta_destino_final)
-                        if nombre_base not in carpetas_creadas:
-                            self.log_mensaje(f"Carpeta creada: {nombre_base}")
-                            carpetas_creadas.add(nombre_base)
-                    
-                    # Mover archivo
-                    origen_archivo = os.path.join(origen, imagen)
-                    destino_archivo = os.path.join(carpeta_destino_final, imagen)
-                    
-                    # Si el archivo ya existe en destino, generar un nombre único
-                    if os.path.exists(destino_archivo):
-                        nombre_sin_ext, ext = os.path.splitext(imagen)
-                        contador = 1
-                        while os.path.exists(destino_archivo):
-                            nuevo_nombre = f"{nombre_sin_ext}_{contador}{ext}"
-                            destino_archivo = os.path.join(carpeta_destino_final, nuevo_nombre)
-                            contador += 1
-                        self.log_mensaje(f"Archivo renombrado por duplicado: {imagen} -> {os.path.basename(destino_archivo)}")
-                    
-                    shutil.move(origen_archivo, destino_archivo)
-                    self.log_mensaje(f"Movido: {imagen} -> {nombre_base}/")
-                    procesadas += 1
-                    
-                except Exception as e:
-                    self.log_mensaje(f"Error procesando {imagen}: {str(e)}")
-                    errores += 1
+            procesadas, errores = resultado["procesadas"], resultado["errores"]
+            carpetas_creadas = resultado["carpetas_creadas"]
                     
             # Resumen final
             self.log_mensaje("=== PROCESAMIENTO COMPLETADO ===")
             self.log_mensaje(f"Imágenes procesadas: {procesadas}")
             self.log_mensaje(f"Errores: {errores}")
-            self.log_mensaje(f"Carpetas creadas: {len(carpetas_creadas)}")
+            self.log_mensaje(f"Carpetas creadas: {carpetas_creadas}")
             
             if errores == 0:
-                messagebox.showinfo("Éxito", f"Proceso completado exitosamente!\n{procesadas} imágenes organizadas en {len(carpetas_creadas)} carpetas")
+                messagebox.showinfo("Éxito", f"Proceso completado exitosamente!\n{procesadas} imágenes organizadas en {carpetas_creadas} carpetas")
             else:
                 messagebox.showwarning("Completado con errores", f"Proceso completado con {errores} errores.\n{procesadas} imágenes procesadas correctamente")
                 
@@ -1,12 +1,218 @@
+import os
+import json
 import shutil
 import threading
 import re
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import customtkinter as ctk
 from PIL import Image
 
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif', '.webp'}
+SUFFIX_PATTERN = re.compile(r'[_-]\d+$')
+# Lectura de carpetas/encabezados es I/O (discos de red): más hilos que núcleos
+SCAN_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+UI_BATCH_SIZE = 200
+DIMENSION_CACHE_PATH = Path.home() / ".cache" / "image_validator" / "dimensiones.json"
+
+
+class DimensionCache:
+    """Caché persistente de dimensiones: {ruta: [mtime_ns, tamaño, ancho, alto]}."""
+
+    def __init__(self, path=DIMENSION_CACHE_PATH):
+        self.path = Path(path)
+        self.entries = {}
+        self.dirty = False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def get(self, key, stat):
+        entry = self.entries.get(key)
+        if entry and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+            return entry[2], entry[3]
+        return None
+
+    def put(self, key, stat, size):
+        self.entries[key] = [stat.st_mtime_ns, stat.st_size, size[0], size[1]]
+        self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except OSError:
+            pass
+
+
+def _list_directory(directory):
+    """Lista una carpeta: (subcarpetas, imágenes) con una sola llamada a scandir."""
+    subdirs, images = [], []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS:
+                    images.append(Path(entry.path))
+    except OSError:
+        pass
+    return subdirs, images
+
+
+def scan_images(base_path, executor):
+    """Recorre el árbol en una sola pasada, listando carpetas en paralelo."""
+    images = []
+    pending = {executor.submit(_list_directory, str(base_path))}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            subdirs, found = future.result()
+            images.extend(found)
+            pending.update(executor.submit(_list_directory, subdir) for subdir in subdirs)
+    return sorted(images)
+
+
+def read_dimensions(image_path, cache):
+    """
+    Dimensiones (ancho, alto) leyendo solo el encabezado: Image.open es perezoso y
+    no decodifica píxeles para obtener img.size. Usa la caché si ruta+mtime+tamaño coinciden.
+    """
+    stat = os.stat(image_path)
+    key = str(image_path)
+    size = cache.get(key, stat)
+    if size is None:
+        with Image.open(image_path) as img:
+            size = img.size
+        cache.put(key, stat, size)
+    return size
+
+
+def _safe_read_dimensions(image_path, cache):
+    try:
+        return read_dimensions(image_path, cache), None
+    except Exception as e:
+        return None, str(e)
+
+
+def move_non_compliant_images(non_compliant_images, edit_folder, base_path, log_lines):
+    """Mueve las imágenes a EDITAR/ conservando su carpeta relativa a `base_path`."""
+    edit_folder.mkdir(exist_ok=True)
+    
+    folder_structure = {}
+    
+    for image_path in non_compliant_images:
+        relative_path = image_path.relative_to(base_path)
+        folder_path = relative_path.parent
+        
+        if folder_path not in folder_structure:
+            folder_structure[folder_path] = []
+        folder_structure[folder_path].append(image_path)
+    
+    lines = []
+    moved = 0
+    for folder_path, images in folder_structure.items():
+        target_folder = edit_folder / folder_path
+        target_folder.mkdir(parents=True, exist_ok=True)
+        
+        for image_path in images:
+            target_file = target_folder / image_path.name
+            try:
+                shutil.move(str(image_path), str(target_file))
+                lines.append(f"Movida: {image_path.name} -> EDITAR/{folder_path}/{image_path.name}")
+                moved += 1
+            except Exception as e:
+                lines.append(f"Error moviendo {image_path.name}: {str(e)}")
+            if len(lines) >= UI_BATCH_SIZE:
+                log_lines(lines)
+                lines = []
+    log_lines(lines)
+    return moved
+
+
+def validate_images(base_path, target_width, target_height, log_lines=lambda lines: None,
+                    progress=lambda processed, total: None):
+    """
+    Núcleo sin ventana: revisa las imágenes con sufijo (_2, -1...) bajo `base_path` y mueve
+    a EDITAR/ las que no miden target_width x target_height. El log se entrega por lotes
+    a `log_lines(lineas)`. Retorna {"imagenes", "no_conformes", "errores", "movidas"}.
+    """
+    base_path = Path(base_path)
+    # Los mensajes se acumulan y se envían por lotes
+    pending_lines = []
+
+    def flush(processed=None, total=None):
+        if pending_lines:
+            log_lines(list(pending_lines))
+            pending_lines.clear()
+        if processed is not None:
+            progress(processed, total)
+
+    with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as executor:
+        all_images = scan_images(base_path, executor)
+
+        # Filter images with suffixes (_2, -1, -2, etc.)
+        filtered_images = []
+        for image_path in all_images:
+            if SUFFIX_PATTERN.search(image_path.stem):
+                filtered_images.append(image_path)
+            else:
+                pending_lines.append(f"Omitida (sin sufijo): {image_path.name}")
+
+        all_images = filtered_images
+
+        total_images = len(all_images)
+        pending_lines.append(f"Encontradas {total_images} imágenes para procesar")
+        flush()
+
+        result = {"imagenes": total_images, "no_conformes": 0, "errores": 0, "movidas": 0}
+        if total_images == 0:
+            log_lines(["No se encontraron imágenes en el directorio especificado"])
+            return result
+        progress(0, total_images)
+
+        non_compliant_images = []
+        processed_count = 0
+        cache = DimensionCache()
+
+        # map conserva el orden de las imágenes en el registro
+        results = executor.map(lambda path: _safe_read_dimensions(path, cache), all_images)
+        for image_path, (size, error) in zip(all_images, results):
+            if error:
+                pending_lines.append(f"Error procesando {image_path.name}: {error}")
+                result["errores"] += 1
+            else:
+                width, height = size
+                if width != target_width or height != target_height:
+                    non_compliant_images.append(image_path)
+                    pending_lines.append(f"Imagen no conforme: {image_path.name} ({width}x{height})")
+
+            processed_count += 1
+            if processed_count % UI_BATCH_SIZE == 0 or processed_count == total_images:
+                flush(processed_count, total_images)
+
+        cache.save()
+
+    result["no_conformes"] = len(non_compliant_images)
+    log_lines([f"Imágenes no conformes encontradas: {len(non_compliant_images)}"])
+    
+    if non_compliant_images:
+        log_lines(["Creando estructura de carpetas y moviendo imágenes..."])
+        result["movidas"] = move_non_compliant_images(non_compliant_images, base_path / "EDITAR",
+                                                      base_path, log_lines)
+    return result
+
+
 class ImageValidatorApp:
     def __init__(self):
         ctk.set_appearance_mode("dark")
@@ -178,94 +384,32 @@ class ImageValidatorApp:
             self.log_event(f"Iniciando validación con criterio: {criteria}")
             self.log_event(f"Buscando imágenes en: {base_path}")
             
-            image_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif', '.webp'}
-            all_images = []
-            
-            for ext in image_extensions:
-                all_images.extend(base_path.rglob(f"*{ext}"))
-                all_images.extend(base_path.rglob(f"*{ext.upper()}"))
-            
-            # Filter images with suffixes (_2, -1, -2, etc.)
-            filtered_images = []
-            suffix_pattern = re.compile(r'[_-]\d+$')
-            
-            for image_path in all_images:
-                filename_without_ext = image_path.stem
-                if suffix_pattern.search(filename_without_ext):
-                    filtered_images.append(image_path)
-                else:
-                    self.log_event(f"Omitida (sin sufijo): {image_path.name}")
-            
-            all_images = filtered_images
-            
-            total_images = len(all_images)
-            self.log_event(f"Encontradas {total_images} imágenes para procesar")
-            
-            if total_images == 0:
-                self.log_event("No se encontraron imágenes en el directorio especificado")
-                self.finish_processing()
-                return
+            validate_images(
+                base_path, target_width, target_height,
+                log_lines=self._append_lines,
+                progress=lambda processed, total: self.root.after(0, self._update_progress, processed, total))
             
-            edit_folder = base_path / "EDITAR"
-            non_compliant_images = []
-            processed_count = 0
-            
-            for image_path in all_images:
-                try:
-                    with Image.open(image_path) as img:
-                        width, height = img.size
-                        
-                    if width != target_width or height != target_height:
-                        non_compliant_images.append(image_path)
-                        self.log_event(f"Imagen no conforme: {image_path.name} ({width}x{height})")
-                    
-                except Exception as e:
-                    self.log_event(f"Error procesando {image_path.name}: {str(e)}")
-                
-                processed_count += 1
-                progress = processed_count / total_images
-                self.root.after(0, lambda p=progress: self.progress_bar.set(p))
-                self.root.after(0, lambda: self.status_label.configure(text=f"Procesadas: {processed_count}/{total_images}"))
-            
-            self.log_event(f"Imágenes no conformes encontradas: {len(non_compliant_images)}")
-            
-            if non_compliant_images:
-                self.log_event("Creando estructura de carpetas y moviendo imágenes...")
-                self.move_non_compliant_images(non_compliant_images, edit_folder, base_path)
-            
-            self.log_event("Proceso completado exitosamente")
+            self.root.after(0, self._append_events, "Proceso completado exitosamente\n")
             
         except Exception as e:
-            self.log_event(f"Error durante el proceso: {str(e)}")
+            self.root.after(0, self._append_events, f"Error durante el proceso: {str(e)}\n")
         
         finally:
             self.finish_processing()
     
-    def move_non_compliant_images(self, non_compliant_images, edit_folder, base_path):
-        edit_folder.mkdir(exist_ok=True)
-        
-        folder_structure = {}
-        
-        for image_path in non_compliant_images:
-            relative_path = image_path.relative_to(base_path)
-            folder_path = relative_path.parent
-            
-            if folder_path not in folder_structure:
-                folder_structure[folder_path] = []
-            folder_structure[folder_path].append(image_path)
-        
-        for folder_path, images in folder_structure.items():
-            target_folder = edit_folder / folder_path
-            target_folder.mkdir(parents=True, exist_ok=True)
-            
-            for image_path in images:
-                target_file = target_folder / image_path.name
-                try:
-                    shutil.move(str(image_path), str(target_file))
-                    self.log_event(f"Movida: {image_path.name} -> EDITAR/{folder_path}/{image_path.name}")
-                except Exception as e:
-                    self.log_event(f"Error moviendo {image_path.name}: {str(e)}")
-    
+    def _append_lines(self, lines):
+        # Llamado desde el hilo de trabajo: la interfaz se actualiza en el hilo principal
+        if lines:
+            self.root.after(0, self._append_events, "\n".join(lines) + "\n")
+
+    def _append_events(self, text):
+        self.events_text.insert("end", text)
+        self.events_text.see("end")
+
+    def _update_progress(self, processed, total):
+        self.progress_bar.set(processed / total)
+        self.status_label.configure(text=f"Procesadas: {processed}/{total}")
+
     def finish_processing(self):
         self.is_processing = False
         self.root.after(0, lambda: self.start_button.configure(state="normal", text="Iniciar Proceso"))
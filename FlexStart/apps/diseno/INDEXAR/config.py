@@ -18,7 +18,10 @@ EXCEL_CONFIG = {
     "default_filename": "carpetas_listadas.xlsx",
     "sheet_name": "Carpetas",
     "sku_column_name": "SKU",
-    "number_format": "0"  # Formato de número entero
+    "number_format": "0",  # Formato de número entero
+    "details_sheet_name": "Detalle",
+    "changes_sheet_name": "Cambios",
+    "date_format": "yyyy-mm-dd hh:mm"
 }
 
 # Configuración de procesamiento
@@ -29,6 +32,16 @@ PROCESSING_CONFIG = {
     "case_sensitive": False  # No distinguir mayúsculas/minúsculas
 }
 
+# Configuración del inventario (recorrido en paralelo y comparación con el anterior)
+INVENTORY_CONFIG = {
+    "scan_workers": 16,  # Hilos de scandir (en red conviene más que núcleos)
+    "recursive": False,  # Incluir subcarpetas de todos los niveles
+    "include_details": False,  # Archivos, subcarpetas, tamaño y fecha por carpeta
+    "only_changes": False,  # Emitir solo los cambios respecto del inventario anterior
+    "compare_previous": False,  # Agregar la hoja de cambios respecto del inventario anterior
+    "progress_every": 5000  # Informar avance cada N carpetas
+}
+
 # Mensajes de la interfaz
 MESSAGES = {
     "select_directory": "Seleccionar directorio para listar carpetas",
@@ -41,5 +54,6 @@ MESSAGES = {
     "success_title": "Éxito",
     "success_message": "Archivo Excel generado exitosamente!",
     "error_title": "Error",
-    "warning_title": "Advertencia"
+    "warning_title": "Advertencia",
+    "no_changes_found": "No hay cambios respecto del inventario anterior"
 } 
\ No newline at end of file
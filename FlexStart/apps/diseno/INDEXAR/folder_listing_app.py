@@ -3,7 +3,121 @@ import pandas as pd
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
 from pathlib import Path
-from config import UI_CONFIG, EXCEL_CONFIG, PROCESSING_CONFIG, MESSAGES
+from config import UI_CONFIG, EXCEL_CONFIG, PROCESSING_CONFIG, INVENTORY_CONFIG, MESSAGES
+from inventory import walk_folders, open_sink, format_mtime, InventorySnapshot
+
+
+def iter_folders(directory, recursive=False, details=False):
+    """Recorrer las carpetas del directorio en paralelo, una a una"""
+    try:
+        yield from walk_folders(
+            directory,
+            recursive=recursive,
+            details=details,
+            workers=INVENTORY_CONFIG["scan_workers"],
+            sort=PROCESSING_CONFIG["sort_folders"]
+        )
+    except PermissionError:
+        raise Exception(MESSAGES["permission_error"])
+    except OSError as e:
+        raise Exception(f"{MESSAGES['read_error']}: {str(e)}")
+
+
+def sku_for_folder(folder, i):
+    """Número SKU de una carpeta (i es su posición en el listado, desde 1)"""
+    if PROCESSING_CONFIG["extract_numbers_from_names"]:
+        # Intentar extraer números del nombre de la carpeta
+        numbers = ''.join(filter(str.isdigit, folder))
+        if numbers:
+            return int(numbers)
+        elif PROCESSING_CONFIG["use_sequential_numbers"]:
+            # Si no hay números, usar un número secuencial
+            return i
+        else:
+            return 0  # Valor por defecto
+    return i
+
+
+def output_path_for(directory, filename, allow_csv=False):
+    """Ruta del archivo de salida (.xlsx, o .csv si se pidió y está permitido)"""
+    if not filename.endswith('.xlsx') and not (allow_csv and filename.lower().endswith('.csv')):
+        filename += '.xlsx'
+    return os.path.join(directory, filename)
+
+
+def write_inventory(directory, output_path, recursive=INVENTORY_CONFIG["recursive"],
+                    details=INVENTORY_CONFIG["include_details"],
+                    only_changes=INVENTORY_CONFIG["only_changes"],
+                    compare_previous=INVENTORY_CONFIG["compare_previous"],
+                    log=lambda message: None):
+    """
+    Recorrer el directorio y escribir el inventario fila a fila (memoria constante).
+    
+    Hojas: SKU (como siempre), Detalle (con subcarpetas o detalles) y Cambios
+    (si se pidió comparar con un inventario anterior de la misma raíz, o solo cambios).
+    Con las opciones por defecto el archivo tiene solo la hoja SKU.
+    Retorna (ruta, total_carpetas, cambios) o (None, 0, None) si no hay carpetas.
+    """
+    main_sheet = EXCEL_CONFIG["sheet_name"]
+    details_sheet = EXCEL_CONFIG["details_sheet_name"]
+    changes_sheet = EXCEL_CONFIG["changes_sheet_name"]
+    with_details_sheet = (recursive or details) and not only_changes
+    
+    snapshot = InventorySnapshot(directory, recursive)
+    sink = open_sink(output_path)
+    total = 0
+    changes = None
+    try:
+        if not only_changes:
+            sink.add_sheet(main_sheet, [EXCEL_CONFIG["sku_column_name"]], {0: EXCEL_CONFIG["number_format"]})
+        if with_details_sheet:
+            sink.add_sheet(
+                details_sheet,
+                ["Carpeta", "Nombre", EXCEL_CONFIG["sku_column_name"], "Nivel",
+                 "Archivos", "Subcarpetas", "Bytes", "Modificada", "Error"],
+                {2: EXCEL_CONFIG["number_format"], 7: EXCEL_CONFIG["date_format"]}
+            )
+            
+        for total, folder in enumerate(iter_folders(directory, recursive, details), start=1):
+            snapshot.add(folder)
+            if not only_changes:
+                sku = sku_for_folder(folder.name, total)
+                sink.write(main_sheet, [sku])
+                if with_details_sheet:
+                    sink.write(details_sheet, [
+                        folder.path, folder.name, sku, folder.level, folder.files,
+                        folder.subfolders, folder.bytes, format_mtime(folder.mtime_ns), folder.error
+                    ])
+            if total % INVENTORY_CONFIG["progress_every"] == 0:
+                log(f"Carpetas listadas: {total}...")
+                
+        if total == 0:
+            return None, 0, None
+            
+        if only_changes or (compare_previous and snapshot.has_previous):
+            changes = 0
+            sink.add_sheet(changes_sheet, [
+                "Cambio", "Carpeta", "Archivos antes", "Archivos ahora",
+                "Bytes antes", "Bytes ahora", "Modificada antes", "Modificada ahora"
+            ], {6: EXCEL_CONFIG["date_format"], 7: EXCEL_CONFIG["date_format"]})
+            for kind, path, before, after in snapshot.changes():
+                before = before or (None, None, None, None)
+                after = after or (None, None, None, None)
+                sink.write(changes_sheet, [
+                    kind, path, before[0], after[0], before[2], after[2],
+                    format_mtime(before[3]), format_mtime(after[3])
+                ])
+                changes += 1
+            if changes == 0:
+                log(MESSAGES["no_changes_found"])
+        snapshot.commit()
+    finally:
+        sink.close()
+        snapshot.close()
+        if total == 0:
+            sink.discard()
+    return output_path, total, changes
+
 
 class FolderListingApp:
     def __init__(self):
@@ -20,6 +134,10 @@ class FolderListingApp:
         # Variables
         self.selected_directory = ctk.StringVar()
         self.output_filename = ctk.StringVar(value=EXCEL_CONFIG["default_filename"])
+        self.recursive = ctk.BooleanVar(value=INVENTORY_CONFIG["recursive"])
+        self.include_details = ctk.BooleanVar(value=INVENTORY_CONFIG["include_details"])
+        self.only_changes = ctk.BooleanVar(value=INVENTORY_CONFIG["only_changes"])
+        self.compare_previous = ctk.BooleanVar(value=INVENTORY_CONFIG["compare_previous"])
         
         self.setup_ui()
         
@@ -80,6 +198,18 @@ class FolderListingApp:
         )
         self.filename_entry.pack(fill="x", padx=10, pady=(0, 10))
         
+        # Opciones del inventario
+        options_frame = ctk.CTkFrame(main_frame)
+        options_frame.pack(fill="x", padx=20, pady=10)
+        
+        for text, variable in (
+            ("Incluir subcarpetas (todos los niveles)", self.recursive),
+            ("Incluir archivos, tamaño y fecha por carpeta", self.include_details),
+            ("Agregar hoja de cambios respecto del inventario anterior", self.compare_previous),
+            ("Solo cambios desde el inventario anterior", self.only_changes),
+        ):
+            ctk.CTkCheckBox(options_frame, text=text, variable=variable).pack(anchor="w", padx=10, pady=5)
+        
         # Botón de procesamiento
         process_btn = ctk.CTkButton(
             main_frame,
@@ -135,26 +265,22 @@ class FolderListingApp:
             return
             
         try:
-            # Obtener lista de carpetas
-            folders = self.get_folders_from_directory(directory)
+            # Recorrer y escribir el inventario en streaming
+            output_path, total, changes = self.write_inventory(directory)
             
-            if not folders:
+            if output_path is None:
                 messagebox.showwarning(MESSAGES["warning_title"], MESSAGES["no_folders_found"])
                 return
                 
-            # Crear DataFrame
-            df = self.create_dataframe(folders)
-            
-            # Generar archivo Excel
-            output_path = self.save_excel_file(directory, df)
-            
             self.update_info(f"Proceso completado exitosamente!")
             self.update_info(f"Archivo guardado en: {output_path}")
-            self.update_info(f"Total de carpetas listadas: {len(folders)}")
+            self.update_info(f"Total de carpetas listadas: {total}")
+            if changes is not None:
+                self.update_info(f"Cambios respecto del inventario anterior: {changes}")
             
             messagebox.showinfo(
                 MESSAGES["success_title"], 
-                f"{MESSAGES['success_message']}\nUbicación: {output_path}\nTotal de carpetas: {len(folders)}"
+                f"{MESSAGES['success_message']}\nUbicación: {output_path}\nTotal de carpetas: {total}"
             )
             
         except Exception as e:
@@ -162,42 +288,22 @@ class FolderListingApp:
             self.update_info(error_msg)
             messagebox.showerror(MESSAGES["error_title"], error_msg)
             
+    def iter_folders(self, directory, recursive=False, details=False):
+        """Recorrer las carpetas del directorio en paralelo, una a una"""
+        return iter_folders(directory, recursive, details)
+            
     def get_folders_from_directory(self, directory):
         """Obtener lista de carpetas del directorio"""
-        folders = []
+        return [folder.name for folder in self.iter_folders(directory)]
         
-        try:
-            for item in os.listdir(directory):
-                item_path = os.path.join(directory, item)
-                if os.path.isdir(item_path):
-                    folders.append(item)
-                    
-        except PermissionError:
-            raise Exception(MESSAGES["permission_error"])
-        except Exception as e:
-            raise Exception(f"{MESSAGES['read_error']}: {str(e)}")
-            
-        if PROCESSING_CONFIG["sort_folders"]:
-            return sorted(folders)
-        return folders
+    def sku_for_folder(self, folder, i):
+        """Número SKU de una carpeta (i es su posición en el listado, desde 1)"""
+        return sku_for_folder(folder, i)
         
     def create_dataframe(self, folders):
         """Crear DataFrame con las carpetas"""
         # Crear lista de números SKU (simulando números de producto)
-        sku_numbers = []
-        for i, folder in enumerate(folders, start=1):
-            if PROCESSING_CONFIG["extract_numbers_from_names"]:
-                # Intentar extraer números del nombre de la carpeta
-                numbers = ''.join(filter(str.isdigit, folder))
-                if numbers:
-                    sku_numbers.append(int(numbers))
-                elif PROCESSING_CONFIG["use_sequential_numbers"]:
-                    # Si no hay números, usar un número secuencial
-                    sku_numbers.append(i)
-                else:
-                    sku_numbers.append(0)  # Valor por defecto
-            else:
-                sku_numbers.append(i)
+        sku_numbers = [self.sku_for_folder(folder, i) for i, folder in enumerate(folders, start=1)]
                 
         # Crear DataFrame solo con la columna SKU
         df = pd.DataFrame({
@@ -206,13 +312,32 @@ class FolderListingApp:
         
         return df
         
+    def get_output_path(self, directory, allow_csv=False):
+        """Ruta del archivo de salida (.xlsx, o .csv si se pidió y está permitido)"""
+        return output_path_for(directory, self.output_filename.get(), allow_csv)
+        
+    def write_inventory(self, directory):
+        """
+        Recorrer el directorio y escribir el inventario con las opciones de la ventana.
+        Retorna (ruta, total_carpetas, cambios) o (None, 0, None) si no hay carpetas.
+        """
+        def log(message):
+            self.update_info(message)
+            self.root.update_idletasks()
+            
+        return write_inventory(
+            directory,
+            self.get_output_path(directory, allow_csv=True),
+            recursive=self.recursive.get(),
+            details=self.include_details.get(),
+            only_changes=self.only_changes.get(),
+            compare_previous=self.compare_previous.get(),
+            log=log
+        )
+        
     def save_excel_file(self, directory, df):
         """Guardar DataFrame como archivo Excel"""
-        filename = self.output_filename.get()
-        if not filename.endswith('.xlsx'):
-            filename += '.xlsx'
-            
-        output_path = os.path.join(directory, filename)
+        output_path = self.get_output_path(directory)
         
         # Crear writer de Excel
         with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
@@ -0,0 +1,269 @@
+"""
+Inventario de carpetas en streaming para el Listador de Carpetas.
+
+- walk_folders() recorre el directorio con scandir en paralelo (la latencia de un
+  share de red se solapa entre hilos) y entrega las carpetas una a una, en orden
+  alfabético dentro de cada nivel, sin armar la lista completa en memoria.
+- ExcelSink/CsvSink escriben las filas a medida que llegan: xlsxwriter en modo
+  constant_memory (u openpyxl write_only si no está instalado) o CSV.
+- InventorySnapshot guarda en SQLite (~/.cache/indexar/) el inventario anterior
+  de cada raíz para emitir solo los cambios: carpetas nuevas, eliminadas y
+  modificadas (archivos, subcarpetas, tamaño o fecha).
+"""
+
+import csv
+import hashlib
+import os
+import sqlite3
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+try:
+    import xlsxwriter
+    XLSXWRITER_AVAILABLE = True
+except ImportError:
+    XLSXWRITER_AVAILABLE = False
+
+SNAPSHOT_DIR = os.path.join(os.path.expanduser("~"), ".cache", "indexar")
+# Listar carpetas en red es latencia, no CPU: más hilos que núcleos
+SCAN_WORKERS = 16
+BATCH_SIZE = 1000
+
+Folder = namedtuple("Folder", "path name level files subfolders bytes mtime_ns error")
+
+
+def _list_directory(path, details):
+    """(subcarpetas, archivos, bytes, mtime_ns, error) de una carpeta."""
+    subfolders, files, total_bytes = [], 0, 0
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns if details else None
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subfolders.append(entry.name)
+                elif details:
+                    files += 1
+                    try:
+                        total_bytes += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        pass
+        return subfolders, files, total_bytes, mtime_ns, None
+    except OSError as e:
+        return subfolders, None, None, None, e
+
+
+def walk_folders(root, recursive=False, details=False, workers=SCAN_WORKERS, sort=True):
+    """
+    Genera las carpetas bajo `root` como Folder (ruta relativa, nombre, nivel y,
+    si `details`, archivos, subcarpetas, bytes y mtime de cada carpeta).
+
+    Las carpetas se listan en paralelo con una ventana acotada y se entregan en
+    el mismo orden en que se pidieron: por nivel y alfabético dentro de cada padre.
+    Lanza el OSError original si no se puede leer la raíz.
+    """
+    def order(names):
+        return sorted(names) if sort else names
+
+    window = workers * 4
+    pending = deque([(root, "", 0)])
+    in_flight = deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while pending or in_flight:
+            while pending and len(in_flight) < window:
+                path, rel, level = pending.popleft()
+                in_flight.append((executor.submit(_list_directory, path, details), path, rel, level))
+            future, path, rel, level = in_flight.popleft()
+            subfolders, files, total_bytes, mtime_ns, error = future.result()
+
+            if not rel:
+                if error is not None:
+                    raise error
+            else:
+                yield Folder(rel, os.path.basename(rel), level,
+                             files if details else None,
+                             len(subfolders) if details and error is None else None,
+                             total_bytes if details else None,
+                             mtime_ns if details else None,
+                             str(error) if error is not None else None)
+                if not recursive:
+                    continue
+
+            for name in order(subfolders):
+                child_rel = os.path.join(rel, name) if rel else name
+                if recursive or details:
+                    pending.append((os.path.join(path, name), child_rel, level + 1))
+                else:
+                    yield Folder(child_rel, name, level + 1, None, None, None, None, None)
+
+
+class ExcelSink:
+    """Libro Excel escrito fila a fila (memoria constante) con varias hojas."""
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = {}
+        if XLSXWRITER_AVAILABLE:
+            self.workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+            self.header_format = self.workbook.add_format({"bold": True})
+        else:
+            from openpyxl import Workbook
+            self.workbook = Workbook(write_only=True)
+        self.sheets = {}
+
+    def add_sheet(self, name, headers, column_formats=None):
+        """Crea una hoja con encabezados; column_formats: {índice: formato numérico}."""
+        if XLSXWRITER_AVAILABLE:
+            sheet = self.workbook.add_worksheet(name)
+            for col, number_format in (column_formats or {}).items():
+                sheet.set_column(col, col, None, self.workbook.add_format({"num_format": number_format}))
+            sheet.write_row(0, 0, headers, self.header_format)
+        else:
+            sheet = self.workbook.create_sheet(name)
+            sheet.append(headers)
+        self.sheets[name] = (sheet, column_formats or {})
+        self.rows[name] = 1
+
+    def write(self, name, values):
+        sheet, column_formats = self.sheets[name]
+        if XLSXWRITER_AVAILABLE:
+            sheet.write_row(self.rows[name], 0, values)
+        else:
+            if column_formats:
+                from openpyxl.cell import WriteOnlyCell
+                values = list(values)
+                for col, number_format in column_formats.items():
+                    if col < len(values):
+                        cell = WriteOnlyCell(sheet, value=values[col])
+                        cell.number_format = number_format
+                        values[col] = cell
+            sheet.append(values)
+        self.rows[name] += 1
+
+    def close(self):
+        if XLSXWRITER_AVAILABLE:
+            self.workbook.close()
+        else:
+            self.workbook.save(self.path)
+        return self.path
+
+    def discard(self):
+        """Elimina el archivo ya cerrado (p. ej. si no hubo filas que escribir)."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class CsvSink:
+    """Misma interfaz que ExcelSink: la primera hoja va en `path` y las demás en `path_<hoja>.csv`."""
+
+    def __init__(self, path):
+        self.path = path
+        self.files = {}
+        self.writers = {}
+        self.paths = []
+
+    def add_sheet(self, name, headers, column_formats=None):
+        if self.files:
+            base, ext = os.path.splitext(self.path)
+            path = f"{base}_{name.lower()}{ext}"
+        else:
+            path = self.path
+        handle = open(path, "w", newline="", encoding="utf-8-sig")
+        self.paths.append(path)
+        self.files[name] = handle
+        self.writers[name] = csv.writer(handle)
+        self.writers[name].writerow(headers)
+
+    def write(self, name, values):
+        self.writers[name].writerow(values)
+
+    def close(self):
+        for handle in self.files.values():
+            handle.close()
+        return self.path
+
+    def discard(self):
+        for path in self.paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def open_sink(path):
+    """Sink según la extensión del archivo de salida (.csv o .xlsx)."""
+    return CsvSink(path) if path.lower().endswith(".csv") else ExcelSink(path)
+
+
+def format_mtime(mtime_ns):
+    return datetime.fromtimestamp(mtime_ns / 1e9).replace(microsecond=0) if mtime_ns else None
+
+
+class InventorySnapshot:
+    """
+    Inventario anterior de una raíz para calcular diferencias sin cargarlo en memoria.
+
+    Las carpetas de la ejecución actual se insertan en una tabla nueva; al final
+    changes() compara ambas tablas en SQLite y commit() reemplaza la anterior.
+    """
+
+    def __init__(self, root, recursive, snapshot_dir=SNAPSHOT_DIR):
+        os.makedirs(snapshot_dir, exist_ok=True)
+        key = f"{os.path.abspath(root)}|{'r' if recursive else 'n'}"
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+        self.db_path = os.path.join(snapshot_dir, f"inventario_{digest}.sqlite")
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS carpetas (
+                ruta TEXT PRIMARY KEY, archivos INTEGER, subcarpetas INTEGER, bytes INTEGER, mtime_ns INTEGER
+            );
+            DROP TABLE IF EXISTS nueva;
+            CREATE TABLE nueva (
+                ruta TEXT PRIMARY KEY, archivos INTEGER, subcarpetas INTEGER, bytes INTEGER, mtime_ns INTEGER
+            );
+        """)
+        self.has_previous = self.conn.execute("SELECT EXISTS (SELECT 1 FROM carpetas)").fetchone()[0] == 1
+        self._batch = []
+
+    def add(self, folder):
+        self._batch.append((folder.path, folder.files, folder.subfolders, folder.bytes, folder.mtime_ns))
+        if len(self._batch) >= BATCH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO nueva VALUES (?, ?, ?, ?, ?)", self._batch)
+        self._batch = []
+
+    def changes(self):
+        """
+        Genera (cambio, ruta, anterior, actual) con cambio 'nueva', 'eliminada' o
+        'modificada'; anterior/actual son tuplas (archivos, subcarpetas, bytes, mtime_ns).
+        Solo se comparan los detalles presentes en ambas ejecuciones.
+        """
+        self._flush()
+        for (ruta, *actual) in self.conn.execute(
+                "SELECT n.* FROM nueva n LEFT JOIN carpetas c ON c.ruta = n.ruta "
+                "WHERE c.ruta IS NULL ORDER BY n.ruta"):
+            yield "nueva", ruta, None, tuple(actual)
+        for (ruta, *anterior) in self.conn.execute(
+                "SELECT c.* FROM carpetas c LEFT JOIN nueva n ON n.ruta = c.ruta "
+                "WHERE n.ruta IS NULL ORDER BY c.ruta"):
+            yield "eliminada", ruta, tuple(anterior), None
+        columnas = ("archivos", "subcarpetas", "bytes", "mtime_ns")
+        distinto = " OR ".join(
+            f"(c.{col} IS NOT NULL AND n.{col} IS NOT NULL AND c.{col} != n.{col})" for col in columnas)
+        for fila in self.conn.execute(
+                f"SELECT n.ruta, c.archivos, c.subcarpetas, c.bytes, c.mtime_ns, "
+                f"n.archivos, n.subcarpetas, n.bytes, n.mtime_ns "
+                f"FROM nueva n JOIN carpetas c ON c.ruta = n.ruta WHERE {distinto} ORDER BY n.ruta"):
+            yield "modificada", fila[0], tuple(fila[1:5]), tuple(fila[5:9])
+
+    def commit(self):
+        """Convierte la ejecución actual en el inventario de referencia."""
+        self._flush()
+        with self.conn:
+            self.conn.execute("DROP TABLE carpetas")
+            self.conn.execute("ALTER TABLE nueva RENAME TO carpetas")
+
+    def close(self):
+        self.conn.close()
@@ -101,6 +101,50 @@ def test_folder_listing():
         except:
             pass
 
+class _Var:
+    """Reemplazo de las variables de CustomTkinter para usar la app sin ventana"""
+
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+def _headless_app(filename, **options):
+    app = FolderListingApp.__new__(FolderListingApp)
+    app.output_filename = _Var(filename)
+    for name in ("recursive", "include_details", "only_changes", "compare_previous"):
+        setattr(app, name, _Var(options.get(name, False)))
+    app.update_info = lambda message: None
+    return app
+
+
+def test_inventario_por_defecto_solo_hoja_sku(tmp_path, monkeypatch):
+    """Con las opciones por defecto, repetir el listado no agrega la hoja de cambios"""
+    import functools
+    import folder_listing_app
+    from config import EXCEL_CONFIG
+
+    monkeypatch.setattr(folder_listing_app, "InventorySnapshot",
+                        functools.partial(folder_listing_app.InventorySnapshot, snapshot_dir=str(tmp_path / "snap")))
+    root = tmp_path / "raiz"
+    for folder in ("Producto001", "Producto002"):
+        (root / folder).mkdir(parents=True)
+
+    app = _headless_app("inventario.xlsx")
+    for _ in range(2):
+        output_path, total, changes = app.write_inventory(str(root))
+        assert total == 2 and changes is None
+        assert list(pd.read_excel(output_path, sheet_name=None)) == [EXCEL_CONFIG["sheet_name"]]
+
+    (root / "Producto003").mkdir()
+    app = _headless_app("inventario.xlsx", compare_previous=True)
+    output_path, total, changes = app.write_inventory(str(root))
+    assert changes == 1
+    assert list(pd.read_excel(output_path, sheet_name=None)) == [EXCEL_CONFIG["sheet_name"],
+                                                                  EXCEL_CONFIG["changes_sheet_name"]]
+
 def test_dependencies():
     """Probar que todas las dependencias están disponibles"""
     print("🔍 Verificando dependencias...")
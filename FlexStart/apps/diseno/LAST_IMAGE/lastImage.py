@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 import os
+import sys
 import re
 import logging
 import threading
@@ -11,6 +12,14 @@ from ttkbootstrap.scrolled import ScrolledText # ttkbootstrap ScrolledText
 from tkinter import filedialog, messagebox # Standard dialogs
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
+
+# Módulos compartidos de las apps de diseño (apps/diseno)
+_diseno_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _diseno_dir not in sys.path:
+    sys.path.insert(0, _diseno_dir)
+
+from vigilancia import AgrupadorEventos, ruta_evento
+
 # Función de tema compatible multiplataforma
 def setup_theme(window=None):
     import ttkbootstrap as ttk
@@ -37,90 +46,111 @@ def setup_theme(window=None):
     return style
 
 # --- Lógica de renombrado (revertida a la funcionalidad original) ---
-class SuffixHandler(FileSystemEventHandler):
-    def on_created(self, event):
-        if not event.is_directory:
-            # Ensure path exists, event might fire early
-            if os.path.exists(event.src_path):
-                self._process(event.src_path)
-            else:
-                logging.debug(f"SuffixHandler.on_created: src_path {event.src_path} no existe, omitiendo.")
-
-
-    def on_moved(self, event):
-        if not event.is_directory:
-            # Ensure path exists, event might fire early
-            if os.path.exists(event.dest_path):
-                self._process(event.dest_path)
-            else:
-                logging.debug(f"SuffixHandler.on_moved: dest_path {event.dest_path} no existe, omitiendo.")
-
-    def _process(self, path_str): # path_str is a string from watchdog
-        # Original logic starts here
-        ext = os.path.splitext(path_str)[1].lower()
-        if ext not in ('.jpg', '.jpeg', '.png', '.webp'):
-            return
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
 
-        folder = os.path.dirname(path_str)
-        filename = os.path.basename(path_str)
-        name, _ = os.path.splitext(filename) # 'name' is stem of the processed file
-        
-        # 'base' is the name of the parent folder, used to construct new filenames
-        base = os.path.basename(folder) 
 
+def next_suffix(has_p2, negatives):
+    """Sufijo para la siguiente imagen de la carpeta: _2, luego -1, -2, ..."""
+    if not has_p2 and not negatives: # If neither base_2 nor base-N exist
+        return '_2'
+    elif not negatives: # If base_2 exists (or doesn't) but no base-N exist
+        return '-1'
+    else: # If base-N files exist
+        return f"-{max(negatives) + 1}"
+
+
+def rename_folder_batch(folder, paths):
+    """
+    Renombra, en orden de llegada, las imágenes nuevas de una misma carpeta.
+
+    La carpeta se lista una sola vez; los sufijos asignados se van sumando al
+    estado en memoria, con el mismo resultado que procesarlas de a una.
+    """
+    # 'base' is the name of the parent folder, used to construct new filenames
+    base = os.path.basename(folder)
+    done_pattern = re.compile(rf"^{re.escape(base)}(_2|-\d+)$")
+    negative_pattern = re.compile(rf"^{re.escape(base)}-(\d+)$")
+
+    candidates = []
+    for path_str in paths:
+        filename = os.path.basename(path_str)
+        name, ext = os.path.splitext(filename) # 'name' is stem of the processed file
+        if ext.lower() not in IMAGE_EXTENSIONS:
+            continue
         # Check 1: Ignore temporary files or files already matching the target pattern
         # The pattern means: base_2.ext or base-NUMBER.ext
-        if name.startswith('~$') or re.match(rf"^{re.escape(base)}(_2|-\d+)$", name):
+        if name.startswith('~$') or done_pattern.match(name):
             logging.debug(f"Archivo '{filename}' ignorado (temporal o ya renombrado según patrón).")
-            return
+            continue
+        candidates.append((path_str, filename, ext.lower()))
+    if not candidates:
+        return
 
-        # Original logic proceeds to rename ANY other image file using the 'base' (folder name)
-        # to construct the new name. There's no check if 'name == base'.
+    has_p2 = False
+    negatives = []
+    # Iterate over all items in the directory to check for existing suffixes
+    try:
+        names_in_dir = os.listdir(folder)
+    except OSError as e:
+        logging.error(f"Error leyendo la carpeta {folder}: {e}")
+        return
+    for f_in_dir in names_in_dir:
+        # Get stem of each item in directory, no extension filtering for this check
+        b_stem_in_dir, _ = os.path.splitext(f_in_dir)
+        if b_stem_in_dir == f"{base}_2": # Checks if 'base_2' (any ext) exists
+            has_p2 = True
+        # Checks if 'base-NUMBER' (any ext) exists
+        m = negative_pattern.match(b_stem_in_dir)
+        if m:
+            negatives.append(int(m.group(1)))
 
-        has_p2 = False
-        negatives = []
-        # Iterate over all items in the directory to check for existing suffixes
-        for f_in_dir in os.listdir(folder):
-            # Get stem of each item in directory, no extension filtering for this check
-            b_stem_in_dir, _ = os.path.splitext(f_in_dir) 
-            
-            if b_stem_in_dir == f"{base}_2": # Checks if 'base_2' (any ext) exists
-                has_p2 = True
-            
-            # Checks if 'base-NUMBER' (any ext) exists
-            m = re.match(rf"^{re.escape(base)}-(\d+)$", b_stem_in_dir) 
-            if m:
-                negatives.append(int(m.group(1)))
-        
-        # Determine the new suffix based on existing files
-        if not has_p2 and not negatives: # If neither base_2 nor base-N exist
-            suffix = '_2'
-        elif not negatives: # If base_2 exists (or doesn't) but no base-N exist
-            suffix = '-1'
-        else: # If base-N files exist
-            suffix = f"-{max(negatives) + 1}"
-        
-        new_name_stem = f"{base}{suffix}"
-        new_name_with_ext = f"{new_name_stem}{ext}" # Use original file's extension
+    for path_str, filename, ext in candidates:
+        if not os.path.exists(path_str):
+            logging.debug(f"{path_str} ya no existe, omitiendo.")
+            continue
+        suffix = next_suffix(has_p2, negatives)
+        new_name_with_ext = f"{base}{suffix}{ext}" # Use original file's extension
         new_full_path = os.path.join(folder, new_name_with_ext)
-        
+        if path_str == new_full_path:
+            logging.debug(f"Intento de renombrar '{filename}' a sí mismo. Omitiendo.")
+            continue
         try:
-            # Original code directly calls os.rename.
-            # It doesn't pre-check for new_full_path existence.
-            # os.rename behavior (overwrite or error on existing file) is platform-dependent.
-            # Windows: raises FileExistsError if new_full_path exists.
-            # Unix-like: often overwrites if new_full_path is a file.
-            # Sticking to original's direct os.rename call.
-            if path_str == new_full_path:
-                 logging.debug(f"Intento de renombrar '{filename}' a sí mismo. Omitiendo.")
-                 return
-
+            # Direct os.rename as in the original: overwrite behaviour is platform-dependent
             os.rename(path_str, new_full_path)
-            # Original logging format:
             logging.info(f"Renombrado: {filename} → {new_name_with_ext}")
         except Exception as e:
-            # Original logging format:
             logging.error(f"Error renombrando {path_str}: {e}")
+            continue
+        if suffix == '_2':
+            has_p2 = True
+        else:
+            negatives.append(int(suffix[1:]))
+
+
+class SuffixHandler(FileSystemEventHandler):
+    """
+    Recibe los eventos de watchdog sin procesarlos en su hilo: AgrupadorEventos
+    espera a que cada archivo termine de copiarse y entrega lotes por carpeta
+    (nunca dos lotes de la misma carpeta a la vez, los sufijos dependen de su contenido).
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.events = AgrupadorEventos(self._process_batch, agrupar=os.path.dirname)
+
+    def on_created(self, event):
+        path_str = ruta_evento(event)
+        if path_str and os.path.splitext(path_str)[1].lower() in IMAGE_EXTENSIONS:
+            self.events.agregar(path_str)
+
+    on_moved = on_created
+
+    def _process_batch(self, paths):
+        rename_folder_batch(os.path.dirname(paths[0]), paths)
+
+    def stop(self):
+        """Procesa lo que quedaba pendiente y detiene el agrupador."""
+        self.events.detener(procesar_pendientes=True)
 
 
 # --- Logging hacia widget de texto (ttkbootstrap compatible) ---
@@ -150,7 +180,7 @@ class MonitorApp(ttk.Window):
         self.geometry('750x500')
         
         self.observer = None
-        self.watchdog_handler = SuffixHandler()
+        self.watchdog_handler = None # Se crea al iniciar cada monitoreo
         self.current_monitored_dir = os.getcwd() # Store only the path
         self.dir_display_var = tk.StringVar(value=f'Directorio: {self.current_monitored_dir}')
 
@@ -220,6 +250,7 @@ class MonitorApp(ttk.Window):
             messagebox.showerror("Error de Directorio", f"El directorio '{self.current_monitored_dir}' no existe o no es accesible.")
             return
 
+        self.watchdog_handler = SuffixHandler()
         self.observer = Observer()
         self.observer.schedule(self.watchdog_handler, path=self.current_monitored_dir, recursive=True)
         
@@ -232,6 +263,7 @@ class MonitorApp(ttk.Window):
             logging.error(f"No se pudo iniciar el monitoreo: {e}")
             messagebox.showerror("Error al Iniciar", f"No se pudo iniciar el monitoreo en '{self.current_monitored_dir}'.\nError: {e}")
             self.observer = None
+            self.watchdog_handler.stop()
 
     def _stop_monitoring(self):
         if not self.observer or not self.observer.is_alive():
@@ -244,6 +276,8 @@ class MonitorApp(ttk.Window):
         try:
             self.observer.stop()
             self.observer.join()
+            if self.watchdog_handler:
+                self.watchdog_handler.stop()
             logging.info('Monitoreo detenido exitosamente.')
         except Exception as e:
             logging.error(f"Error al detener el monitoreo: {e}")
@@ -1,8 +1,11 @@
 import os
+import sys
 import re
+import json
 import time # Kept for watchdog, though the GUI won't use time.sleep in main thread
 import threading
 import queue
+from concurrent.futures import ThreadPoolExecutor
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import ttkbootstrap as ttk
@@ -11,6 +14,14 @@ from ttkbootstrap.scrolled import ScrolledText # For the log area
 from PIL import Image
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
+
+# Módulos compartidos de las apps de diseño (apps/diseno)
+_diseno_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _diseno_dir not in sys.path:
+    sys.path.insert(0, _diseno_dir)
+
+from vigilancia import AgrupadorEventos, ruta_evento
+
 # Función de tema compatible multiplataforma
 def setup_theme(window=None):
     import ttkbootstrap as ttk
@@ -40,6 +51,10 @@ def setup_theme(window=None):
 TARGET_WIDTH = 125
 TARGET_HEIGHT = 93
 IDLE_TIMEOUT = 5  # Segundos para considerar que no hay más miniaturas por crear
+BATCH_QUIET_SECONDS = 0.5  # Espera sin eventos nuevos de un archivo antes de procesarlo (archivo terminado de copiar)
+MAX_WORKERS = min(8, os.cpu_count() or 1)  # Pillow libera el GIL al decodificar/redimensionar
+BATCH_WORKERS = 2  # Lotes de eventos en paralelo (cada lote usa el pool de MAX_WORKERS)
+MANIFEST_FILENAME = ".miniaturas_manifest.json"
 
 # Configuración del filtro de remuestreo para Pillow
 try:
@@ -92,15 +107,178 @@ def transform_by_height(im: Image.Image) -> Image.Image:
     return background
 
 
+def open_for_thumbnail(file_path_str: str, option: str) -> Image.Image:
+    """
+    Abre la imagen decodificando a la menor escala suficiente para la miniatura.
+
+    Se conserva al menos el doble del tamaño final para que el LANCZOS posterior
+    mantenga la calidad: JPEG usa draft() (el decodificador escala en el dominio DCT
+    1/2, 1/4 o 1/8) y el resto de formatos usa reduce() con un factor entero.
+    """
+    img = Image.open(file_path_str)
+    if option == "height":
+        scale = img.height / (TARGET_HEIGHT * 2)
+    else:
+        scale = img.width / (TARGET_WIDTH * 2)
+
+    if scale >= 2:
+        requested = (max(1, int(img.width / scale)), max(1, int(img.height / scale)))
+        if img.format == "JPEG":
+            img.draft(img.mode, requested)
+            img.load()
+        else:
+            img.load()
+            # reduce() promedia valores de píxel: paletas y modos especiales pasan antes a RGBA
+            source = img if img.mode in ("RGB", "RGBA", "L", "LA") else img.convert("RGBA")
+            reduced = source.reduce(int(scale))
+            img.close()
+            img = reduced
+    else:
+        img.load()
+    return img
+
+
+class ThumbnailEngine:
+    """
+    Motor de miniaturas por lotes.
+
+    Los eventos de watchdog se agrupan por archivo en vigilancia.AgrupadorEventos
+    (un archivo copiado genera varios created/modified): tras BATCH_QUIET_SECONDS sin
+    eventos nuevos y con el tamaño estable, los archivos llegan en lotes que se
+    procesan en un pool acotado de hilos. Un manifiesto persistente en la carpeta
+    monitoreada guarda el mtime/tamaño de cada origen ya procesado.
+    """
+
+    def __init__(self, root_folder, transformation_option_getter, log_callback, on_batch_done=None):
+        self.root_folder = root_folder
+        self.transformation_option_getter = transformation_option_getter
+        self.log_callback = log_callback
+        self.on_batch_done = on_batch_done
+        self.filename_pattern = re.compile(r"^(.*)_2(\.(jpg|png|webp))$", re.IGNORECASE)
+        self.executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+
+        self._manifest_path = os.path.join(root_folder, MANIFEST_FILENAME)
+        self._manifest_lock = threading.Lock()
+        self._manifest_save_lock = threading.Lock()
+        self._manifest = self._load_manifest()
+
+        self.events = AgrupadorEventos(self.process_batch, espera=BATCH_QUIET_SECONDS, max_workers=BATCH_WORKERS,
+                                       al_error=lambda paths, e: self.log_callback(f"Error procesando lote: {e}"))
+
+    # --- Manifiesto ---
+    def _load_manifest(self):
+        try:
+            with open(self._manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self):
+        with self._manifest_save_lock: # Varios lotes pueden terminar a la vez
+            with self._manifest_lock:
+                data = dict(self._manifest)
+            try:
+                with open(self._manifest_path + ".tmp", "w", encoding="utf-8") as f:
+                    json.dump(data, f)
+                os.replace(self._manifest_path + ".tmp", self._manifest_path)
+            except OSError:
+                pass
+
+    def output_path_for(self, file_path_str):
+        """Ruta de la miniatura (sin el sufijo _2), o None si el archivo no coincide con el patrón."""
+        match = self.filename_pattern.match(os.path.basename(file_path_str))
+        if not match:
+            return None
+        return os.path.join(os.path.dirname(file_path_str), f"{match.group(1)}{match.group(2)}")
+
+    def needs_processing(self, file_path_str, output_path, stat):
+        """
+        True si falta la miniatura o si el origen cambió desde que se generó.
+        Miniaturas existentes sin registro en el manifiesto se adoptan como procesadas.
+        """
+        key = os.path.relpath(file_path_str, self.root_folder)
+        signature = [stat.st_mtime_ns, stat.st_size]
+        with self._manifest_lock:
+            entry = self._manifest.get(key)
+            if not os.path.exists(output_path):
+                return True
+            if entry is None:
+                self._manifest[key] = signature
+                return False
+            return entry != signature
+
+    # --- Entrada de eventos ---
+    def submit(self, file_path_str):
+        if self.output_path_for(file_path_str) is None:
+            return
+        self.events.agregar(file_path_str)
+
+    # --- Procesamiento ---
+    def process_batch(self, paths):
+        """Procesa un lote en el pool y espera a que termine. Retorna cuántas miniaturas se crearon."""
+        option = self.transformation_option_getter()
+        if not option: # Should not happen if UI validates
+            self.log_callback("Error: Opción de transformación no establecida.")
+            return 0
+
+        created = sum(1 for ok in self.executor.map(lambda p: self._process_one(p, option), paths) if ok)
+        if created:
+            self._save_manifest()
+            if self.on_batch_done:
+                self.on_batch_done(created)
+        return created
+
+    def _process_one(self, file_path_str, option):
+        base_name = os.path.basename(file_path_str)
+        output_path = self.output_path_for(file_path_str)
+        try:
+            stat = os.stat(file_path_str)
+        except OSError: # Original _2 file might be gone if it's a temp file from save
+            return False
+        if not self.needs_processing(file_path_str, output_path, stat):
+            return False
+
+        try:
+            img = open_for_thumbnail(file_path_str, option)
+            try:
+                if option == "width":
+                    transformed_img = transform_by_width(img)
+                elif option == "height":
+                    transformed_img = transform_by_height(img)
+                else: # Fallback or error
+                    self.log_callback(f"Error: Opción de transformación desconocida '{option}'.")
+                    return False
+            finally:
+                img.close()
+
+            transformed_img.save(output_path) # Pillow infers format from extension
+            with self._manifest_lock:
+                self._manifest[os.path.relpath(file_path_str, self.root_folder)] = [stat.st_mtime_ns, stat.st_size]
+            self.log_callback(f"Miniatura creada: {os.path.basename(output_path)} (de {base_name})")
+            return True
+
+        except FileNotFoundError:
+            self.log_callback(f"Archivo '{base_name}' no encontrado durante el procesamiento (¿temporal?).")
+        except Exception as e:
+            self.log_callback(f"Error procesando '{base_name}': {e}")
+        return False
+
+    def shutdown(self):
+        """Procesa los eventos pendientes y espera los lotes en curso antes de cerrar el pool."""
+        # Primero el agrupador: sus lotes usan el pool y el manifiesto
+        self.events.detener(procesar_pendientes=True)
+        self.executor.shutdown(wait=True)
+
+
 # --- Manejador de Eventos de Watchdog ---
 class ImageFileEventHandler(FileSystemEventHandler):
-    def __init__(self, transformation_option_getter, gui_queue):
+    def __init__(self, transformation_option_getter, gui_queue, root_folder):
         super().__init__()
-        self.transformation_option_getter = transformation_option_getter # Func to get current option
         self.gui_queue = gui_queue
-        self.filename_pattern = re.compile(r"^(.*)_2(\.(jpg|png|webp))$", re.IGNORECASE)
         self.idle_timer = None
         self.last_processed_time = 0
+        self.engine = ThumbnailEngine(root_folder, transformation_option_getter,
+                                      self._log_to_gui, on_batch_done=self._on_batch_done)
 
     def _log_to_gui(self, message):
         self.gui_queue.put(("log", message))
@@ -120,72 +298,24 @@ class ImageFileEventHandler(FileSystemEventHandler):
         if current_time - self.last_processed_time >= IDLE_TIMEOUT:
             self._log_to_gui("no hay mas miniaturas por crear")
 
-    def _process_image_file(self, file_path_str):
-        if not os.path.isfile(file_path_str): # Ensure it's a file and still exists
-            return
-
-        base_name = os.path.basename(file_path_str)
-        match = self.filename_pattern.match(base_name)
-
-        if not match:
-            # self._log_to_gui(f"Ignorado (no coincide patrón _2): {base_name}")
-            return 
-
-        output_filename_stem = match.group(1)
-        output_extension = match.group(2) # Includes the dot, e.g., ".jpg"
-        output_filename = f"{output_filename_stem}{output_extension}"
-        output_path = os.path.join(os.path.dirname(file_path_str), output_filename)
-
-        if os.path.exists(output_path):
-            # self._log_to_gui(f"Ignorado (ya existe miniatura): {output_filename} para {base_name}")
-            return
-
-        current_transformation_option = self.transformation_option_getter()
-        if not current_transformation_option: # Should not happen if UI validates
-            self._log_to_gui("Error: Opción de transformación no establecida.")
-            return
-
-        try:
-            with Image.open(file_path_str) as img:
-                img.load() # Cargar datos de la imagen antes de que el archivo se cierre
-                
-                if current_transformation_option == "width":
-                    transformed_img = transform_by_width(img)
-                elif current_transformation_option == "height":
-                    transformed_img = transform_by_height(img)
-                else: # Fallback or error
-                    self._log_to_gui(f"Error: Opción de transformación desconocida '{current_transformation_option}'.")
-                    return
-
-            transformed_img.save(output_path) # Pillow infers format from extension
-            self._log_to_gui(f"Miniatura creada: {output_filename} (de {base_name})")
-            
-            # Actualizar tiempo de último procesamiento y reiniciar temporizador
-            self.last_processed_time = time.time()
-            self._reset_idle_timer()
-
-        except FileNotFoundError: # Original _2 file might be gone if it's a temp file from save
-            self._log_to_gui(f"Archivo '{base_name}' no encontrado durante el procesamiento (¿temporal?).")
-        except Exception as e:
-            self._log_to_gui(f"Error procesando '{base_name}': {e}")
+    def _on_batch_done(self, created_count):
+        # Actualizar tiempo de último procesamiento y reiniciar temporizador
+        self.last_processed_time = time.time()
+        self._reset_idle_timer()
 
     def on_created(self, event):
         if not event.is_directory:
-            # Delay slightly to ensure file is fully written
-            time.sleep(0) 
-            self._process_image_file(event.src_path)
-    
-    def on_modified(self, event):
-        if not event.is_directory:
-            # Delay slightly
-            time.sleep(0.1) 
-            self._process_image_file(event.src_path)
+            self.engine.submit(ruta_evento(event))
+
+    on_modified = on_created
+    on_moved = on_created
 
     def cleanup(self):
-        """Limpia el temporizador al detener la monitorización"""
+        """Limpia el temporizador y el motor al detener la monitorización"""
         if self.idle_timer:
             self.idle_timer.cancel()
             self.idle_timer = None
+        self.engine.shutdown()
 
 
 # --- Aplicación GUI (ttkbootstrap) ---
@@ -268,27 +398,18 @@ class ThumbnailerApp(ttk.Window):
     def _process_existing_files(self, folder):
         """Procesa archivos existentes en la carpeta antes de iniciar la monitorización"""
         self._add_log_message("Buscando archivos existentes en la carpeta...")
-        processed_count = 0
+        handler = self.watchdog_event_handler
+        if not handler:
+            return
 
         # Buscar recursivamente todos los archivos que coincidan con el patrón
+        candidates = []
         for root, _, files in os.walk(folder):
             for filename in files:
                 if self.filename_pattern.match(filename):
-                    file_path = os.path.join(root, filename)
-
-                    # Verificar si ya existe la miniatura
-                    match = self.filename_pattern.match(filename)
-                    if match:
-                        output_filename_stem = match.group(1)
-                        output_extension = match.group(2)
-                        output_filename = f"{output_filename_stem}{output_extension}"
-                        output_path = os.path.join(root, output_filename)
-
-                        if not os.path.exists(output_path):
-                            # Procesar el archivo
-                            if self.watchdog_event_handler:
-                                self.watchdog_event_handler._process_image_file(file_path)
-                                processed_count += 1
+                    candidates.append(os.path.join(root, filename))
+
+        processed_count = handler.engine.process_batch(candidates) if candidates else 0
 
         if processed_count > 0:
             self._add_log_message(f"✓ Se procesaron {processed_count} archivo(s) existente(s)")
@@ -310,7 +431,7 @@ class ThumbnailerApp(ttk.Window):
             messagebox.showwarning("Advertencia", "La monitorización ya está activa.", parent=self)
             return
 
-        self.watchdog_event_handler = ImageFileEventHandler(self._get_current_transformation_option, self.update_queue)
+        self.watchdog_event_handler = ImageFileEventHandler(self._get_current_transformation_option, self.update_queue, folder)
         self.watchdog_observer = Observer()
         self.watchdog_observer.schedule(self.watchdog_event_handler, folder, recursive=True)
 
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Tests del motor de miniaturas (Miniaturas.py).
+
+Verifica que:
+1. Al detener el motor se procesan los eventos que seguían agrupándose
+2. shutdown() espera el lote en curso: la miniatura y el manifiesto quedan escritos
+
+Uso:
+    python3 -m pytest test_miniaturas.py
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+pytest.importorskip("ttkbootstrap")
+pytest.importorskip("watchdog")
+Image = pytest.importorskip("PIL.Image")
+
+import Miniaturas
+
+
+def test_shutdown_procesa_pendientes(tmp_path):
+    origen = tmp_path / "123_2.jpg"
+    Image.new("RGB", (400, 300), (200, 30, 60)).save(origen)
+    mensajes = []
+    motor = Miniaturas.ThumbnailEngine(str(tmp_path), lambda: "width", mensajes.append)
+
+    # El evento espera BATCH_QUIET_SECONDS en el agrupador; se detiene antes
+    motor.submit(str(origen))
+    motor.shutdown()
+
+    with Image.open(tmp_path / "123.jpg") as miniatura:
+        assert miniatura.size == (Miniaturas.TARGET_WIDTH, Miniaturas.TARGET_HEIGHT)
+    with open(tmp_path / Miniaturas.MANIFEST_FILENAME, encoding="utf-8") as f:
+        assert "123_2.jpg" in json.load(f)
+    assert any("Miniatura creada" in m for m in mensajes)
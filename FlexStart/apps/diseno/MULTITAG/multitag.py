@@ -1,11 +1,215 @@
 import os
 import sys
-import pandas as pd
+import re
+import json
+import hashlib
+from functools import lru_cache
 from PIL import Image
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, font as tkfont
 import threading
 import queue
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Módulos compartidos de las apps de diseño (apps/diseno)
+_diseno_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _diseno_dir not in sys.path:
+    sys.path.insert(0, _diseno_dir)
+
+from planillas import leer_planilla, encabezados
+
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+INDEX_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "multitag")
+INDEX_CACHE_VERSION = 1
+MAX_WORKERS = os.cpu_count() or 1
+
+# Logos decodificados que guarda cada proceso (LRU, se cargan al primer uso)
+LOGO_CACHE_SIZE = 8
+
+
+class ImageIndex:
+    """Índice de imágenes "*_2" de una carpeta para ubicar la imagen de un UPC en O(1).
+
+    Se construye con un solo recorrido del árbol y se guarda en disco
+    (~/.cache/multitag) junto con el mtime de cada directorio; en la siguiente
+    ejecución se reutiliza si ningún directorio cambió (agregar/quitar archivos o
+    subcarpetas modifica el mtime del directorio que los contiene).
+    """
+
+    def __init__(self, images_folder):
+        self.images_folder = os.path.abspath(images_folder)
+        self.entries = []      # [(nombre_sin_extension, ruta_relativa)] en orden de recorrido
+        self.dir_mtimes = {}   # {ruta_relativa_directorio: mtime_ns}
+        self._by_core = {}     # código normalizado ("UPC" de "UPC_2") -> ruta
+        self._by_token = {}    # cada segmento alfanumérico normalizado del nombre -> ruta
+
+    @classmethod
+    def load_or_build(cls, images_folder):
+        index = cls(images_folder)
+        if not index._load_cache():
+            index._scan()
+            index._save_cache()
+        index._build_lookups()
+        return index
+
+    def _cache_path(self):
+        digest = hashlib.sha1(self.images_folder.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(INDEX_CACHE_DIR, f"index_{digest}.json")
+
+    def _scan(self):
+        self.entries = []
+        self.dir_mtimes = {}
+        for root_dir, _, files in os.walk(self.images_folder):
+            rel_dir = os.path.relpath(root_dir, self.images_folder)
+            try:
+                self.dir_mtimes[rel_dir] = os.stat(root_dir).st_mtime_ns
+            except OSError:
+                continue
+            for file in files:
+                nombre, ext = os.path.splitext(file)
+                if ext.lower() in IMAGE_EXTENSIONS and nombre.endswith("_2"):
+                    self.entries.append((nombre, os.path.join(rel_dir, file)))
+
+    def _load_cache(self):
+        try:
+            with open(self._cache_path(), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        if data.get("version") != INDEX_CACHE_VERSION or data.get("root") != self.images_folder:
+            return False
+
+        # Validar solo con stat de directorios (sin volver a listar archivos)
+        for rel_dir, mtime_ns in data.get("dirs", {}).items():
+            try:
+                if os.stat(os.path.join(self.images_folder, rel_dir)).st_mtime_ns != mtime_ns:
+                    return False
+            except OSError:
+                return False
+
+        self.dir_mtimes = data["dirs"]
+        self.entries = [tuple(entry) for entry in data.get("entries", [])]
+        return True
+
+    def _save_cache(self):
+        try:
+            os.makedirs(INDEX_CACHE_DIR, exist_ok=True)
+            tmp_path = self._cache_path() + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "version": INDEX_CACHE_VERSION,
+                    "root": self.images_folder,
+                    "dirs": self.dir_mtimes,
+                    "entries": self.entries,
+                }, f)
+            os.replace(tmp_path, self._cache_path())
+        except OSError as e:
+            print(f"No se pudo guardar el índice de imágenes: {e}")
+
+    @staticmethod
+    def _normalizar(codigo):
+        return str(codigo).strip().casefold()
+
+    def _build_lookups(self):
+        for nombre, rel_path in self.entries:
+            core = self._normalizar(nombre[:-2])
+            self._by_core.setdefault(core, rel_path)
+            for token in re.split(r"[^0-9a-z]+", core):
+                if token:
+                    self._by_token.setdefault(token, rel_path)
+
+    def find(self, upc):
+        """
+        Devuelve la ruta de la imagen "*_2" cuyo código (o un segmento completo del
+        nombre, p. ej. "FOTO-UPC_2") es exactamente el UPC, o None.
+        """
+        codigo = self._normalizar(upc)
+        rel_path = self._by_core.get(codigo) or self._by_token.get(codigo)
+        return os.path.join(self.images_folder, rel_path) if rel_path else None
+
+    def __len__(self):
+        return len(self.entries)
+
+
+@lru_cache(maxsize=LOGO_CACHE_SIZE)
+def _get_logo(logo_path):
+    """Devuelve el logo en RGBA desde la caché del proceso (lo decodifica la primera vez)."""
+    with Image.open(logo_path) as src:
+        return src.convert("RGBA")
+
+
+def _compose_row(task):
+    """
+    Aplica los logos de una fila sobre su imagen y guarda el WebP.
+
+    Se ejecuta en los procesos del pool, por lo que recibe y devuelve solo datos
+    simples: task = {row_number, image_file, output_file_path, logos: [(etiqueta, ruta, descripción)]}.
+    Retorna (errores, logos_aplicados).
+    """
+    row_number = task["row_number"]
+    image_file = task["image_file"]
+    errors = []
+    logos_aplicados = []
+
+    try:
+        with Image.open(image_file) as im:
+            # Preservar perfil de color original
+            icc_profile = im.info.get("icc_profile")
+
+            # Convertir a RGBA solo si es necesario para aplicar logos
+            if im.mode != "RGBA":
+                im = im.convert("RGBA")
+
+            for etiqueta, logo_path, descripcion in task["logos"]:
+                try:
+                    logo = _get_logo(logo_path)
+                    # Los logos tienen el mismo tamaño que las imágenes, solo superponer
+                    im.paste(logo, (0, 0), logo)
+                    logos_aplicados.append(f"{etiqueta}: {os.path.basename(logo_path)}")
+                except Exception as e:
+                    errors.append(f"Fila {row_number}: Error al aplicar {descripcion}: {e}")
+
+            if not logos_aplicados:
+                errors.append(f"Fila {row_number}: No se encontraron logos para aplicar")
+
+            # Guardar en formato WebP preservando calidad y transparencia
+            im.save(task["output_file_path"], format="WEBP", quality=100, icc_profile=icc_profile)
+
+    except Exception as e:
+        errors.append(f"Fila {row_number}: Error al procesar la imagen {os.path.basename(image_file)}: {e}")
+
+    return errors, logos_aplicados
+
+
+# Variaciones de nombre del logo de compromiso, en orden de preferencia
+POSIBLES_COMPROMISO = [
+    "compromiso.png",
+    "compromiso_r.png",
+    "COMPROMISO.png",
+    "COMPROMISO_R.png",
+    "Compromiso.png"
+]
+
+
+def posibles_logos_talla(talla_value):
+    """Nombres de logo candidatos para una talla, en orden de preferencia."""
+    return [
+        f"{talla_value}.png",  # S.png, M.png, L.png, 28.png, 30.png, etc.
+        f"{talla_value.upper()}.png",  # S.png, M.png, L.png, etc.
+        f"{talla_value.lower()}.png",  # s.png, m.png, l.png, etc.
+        f"talla-{talla_value}.png",  # talla-S.png, talla-M.png, etc.
+        f"talla-{talla_value.upper()}.png",
+        f"talla-{talla_value.lower()}.png",
+        # Casos especiales para combinaciones
+        f"{talla_value}-{talla_value}.png",  # S-S.png, M-M.png, etc.
+        f"XS-{talla_value}.png",  # XS-S.png, XS-M.png, etc.
+        f"S-{talla_value}.png",   # S-M.png, S-L.png, etc.
+        # Para logos de altura (si el valor coincide con un logo de altura)
+        f"altura-{talla_value}.png",  # altura-1,67.png, altura-1,69.png, etc.
+    ]
 
 
 class ImageProcessorThread(threading.Thread):
@@ -27,9 +231,16 @@ class ImageProcessorThread(threading.Thread):
         self.result_queue = result_queue
 
     def run(self):
+        # Mapeo de columnas personalizado (en minúsculas, igual que los encabezados normalizados)
+        talla_col = self.column_mapping.get('talla', 'talla').lower().strip()
+        upc_col = self.column_mapping.get('upc_ripley', 'upc_ripley').lower().strip()
+        compromiso_col = self.column_mapping.get('compromiso_r', 'compromiso_r').lower().strip()
+        print(f"Buscando columnas - UPC: '{upc_col}', Talla: '{talla_col}', Compromiso: '{compromiso_col}'")
+
         try:
-            df = pd.read_excel(self.excel_file)
-            df.columns = df.columns.str.strip().str.lower()
+            # Solo las tres columnas mapeadas; las que no estén quedan vacías (filas con "UPC vacío")
+            columnas = [upc_col, talla_col, compromiso_col]
+            planilla = leer_planilla(self.excel_file, columnas, normalizar_nombres=True, opcionales=columnas)
         except Exception as e:
             self.result_queue.put(('finished', {
                 'errors': [f"No se pudo leer la planilla Excel: {e}"],
@@ -37,168 +248,101 @@ class ImageProcessorThread(threading.Thread):
             }))
             return
 
-        total = len(df)
+        total = len(planilla)
         self.result_queue.put(('total', total))
         error_report = []
 
-        for index, row in df.iterrows():
-            try:
-                # Usar mapeo de columnas personalizado (convertir a minúsculas para coincidir con df.columns)
-                talla_col = self.column_mapping.get('talla', 'talla').lower().strip()
-                upc_col = self.column_mapping.get('upc_ripley', 'upc_ripley').lower().strip()
-                compromiso_col = self.column_mapping.get('compromiso_r', 'compromiso_r').lower().strip()
-
-                print(f"Fila {index+2}: Buscando columnas - UPC: '{upc_col}', Talla: '{talla_col}', Compromiso: '{compromiso_col}'")
-
-                talla_value = str(row.get(talla_col, "")).strip()
-                if talla_value.lower() == "nan":
-                    talla_value = ""
-                upc_ripley = str(row.get(upc_col, "")).strip()
-                if upc_ripley.lower() == "nan":
-                    upc_ripley = ""
-                compromiso_r = str(row.get(compromiso_col, "")).strip()
-                if compromiso_r.lower() == "nan":
-                    compromiso_r = ""
-
-                if upc_ripley == "":
-                    error_report.append(f"Fila {index+2}: UPC vacío.")
-                    continue
-
-                image_file = None
-                for root_dir, _, files in os.walk(self.images_folder):
-                    for file in files:
-                        nombre, ext = os.path.splitext(file)
-                        if ext.lower() in [".jpg", ".jpeg", ".png", ".webp"]:
-                            if upc_ripley in nombre and nombre.endswith("_2"):
-                                image_file = os.path.join(root_dir, file)
-                                break
-                    if image_file:
-                        break
-
-                if not image_file:
-                    error_report.append(f"Fila {index+2}: No se encontró imagen para UPC: {upc_ripley}")
-                    continue
-
-                # Procesar imagen con PIL
-                with Image.open(image_file) as im:
-                    # Preservar información original de la imagen
-                    icc_profile = im.info.get("icc_profile")
-                    original_mode = im.mode
-                    original_size = im.size
-
-                    # Convertir a RGBA solo si es necesario para aplicar logos
-                    if im.mode != "RGBA":
-                        im = im.convert("RGBA")
-
-                    # Lista para almacenar logos aplicados (para debugging)
-                    logos_aplicados = []
-
-                    # 1. Aplicar logo según el valor de la columna "talla"
-                    if talla_value:
-                        # Buscar logo con diferentes variaciones según los archivos reales
-                        posibles_logos = [
-                            f"{talla_value}.png",  # S.png, M.png, L.png, 28.png, 30.png, etc.
-                            f"{talla_value.upper()}.png",  # S.png, M.png, L.png, etc.
-                            f"{talla_value.lower()}.png",  # s.png, m.png, l.png, etc.
-                            f"talla-{talla_value}.png",  # talla-S.png, talla-M.png, etc.
-                            f"talla-{talla_value.upper()}.png",
-                            f"talla-{talla_value.lower()}.png",
-                            # Casos especiales para combinaciones
-                            f"{talla_value}-{talla_value}.png",  # S-S.png, M-M.png, etc.
-                            f"XS-{talla_value}.png",  # XS-S.png, XS-M.png, etc.
-                            f"S-{talla_value}.png",   # S-M.png, S-L.png, etc.
-                            # Para logos de altura (si el valor coincide con un logo de altura)
-                            f"altura-{talla_value}.png",  # altura-1,67.png, altura-1,69.png, etc.
-                        ]
-
-                        logo_encontrado = False
-                        for posible_logo in posibles_logos:
-                            logo_path = os.path.join(self.logos_folder, posible_logo)
-                            if os.path.exists(logo_path):
-                                try:
-                                    with Image.open(logo_path) as logo:
-                                        logo = logo.convert("RGBA")
-                                        # Los logos tienen el mismo tamaño que las imágenes, solo superponer
-                                        im.paste(logo, (0, 0), logo)
-                                        logos_aplicados.append(f"Talla: {posible_logo}")
-                                        logo_encontrado = True
-                                        break
-                                except Exception as e:
-                                    error_report.append(f"Fila {index+2}: Error al aplicar logo {posible_logo}: {e}")
-
-                        if not logo_encontrado:
-                            error_report.append(f"Fila {index+2}: No se encontró logo para talla '{talla_value}'. Buscó: {', '.join(posibles_logos)}")
-
-                    # 2. Aplicar logo de compromiso si existe valor en compromiso_r
-                    print(f"Fila {index+2}: Valor compromiso_r = '{compromiso_r}' (tipo: {type(compromiso_r)})")
-
-                    # Verificar diferentes variaciones del archivo de compromiso
-                    posibles_compromiso = [
-                        "compromiso.png",
-                        "compromiso_r.png",
-                        "COMPROMISO.png",
-                        "COMPROMISO_R.png",
-                        "Compromiso.png"
-                    ]
-
-                    if compromiso_r and str(compromiso_r).strip() and str(compromiso_r).strip().lower() not in ["nan", "none", ""]:
-                        compromiso_encontrado = False
-
-                        for compromiso_file in posibles_compromiso:
-                            compromiso_logo_path = os.path.join(self.logos_folder, compromiso_file)
-                            print(f"Fila {index+2}: Buscando compromiso en: {compromiso_logo_path}")
-
-                            if os.path.exists(compromiso_logo_path):
-                                print(f"Fila {index+2}: Encontrado archivo compromiso: {compromiso_file}")
-                                try:
-                                    with Image.open(compromiso_logo_path) as compromiso_logo:
-                                        compromiso_logo = compromiso_logo.convert("RGBA")
-                                        # Los logos tienen el mismo tamaño que las imágenes, solo superponer
-                                        im.paste(compromiso_logo, (0, 0), compromiso_logo)
-                                        logos_aplicados.append(f"Compromiso: {compromiso_file}")
-                                        compromiso_encontrado = True
-                                        break
-                                except Exception as e:
-                                    error_report.append(f"Fila {index+2}: Error al aplicar logo de compromiso {compromiso_file}: {e}")
-
-                        if not compromiso_encontrado:
-                            error_report.append(f"Fila {index+2}: No se encontró ningún archivo de compromiso. Buscó: {', '.join(posibles_compromiso)}")
-                    else:
-                        print(f"Fila {index+2}: Columna compromiso_r vacía o inválida ('{compromiso_r}'), no se aplica logo de compromiso")
-
-                    # 3. Aplicar logo de altura manual (si está seleccionado)
-                    if self.altura_logo and os.path.exists(self.altura_logo):
-                        try:
-                            with Image.open(self.altura_logo) as altura_logo:
-                                altura_logo = altura_logo.convert("RGBA")
-                                # Los logos tienen el mismo tamaño que las imágenes, solo superponer
-                                im.paste(altura_logo, (0, 0), altura_logo)
-                                logos_aplicados.append(f"Altura Manual: {os.path.basename(self.altura_logo)}")
-                        except Exception as e:
-                            error_report.append(f"Fila {index+2}: Error al aplicar logo de altura manual: {e}")
-                    elif self.altura_logo:
-                        error_report.append(f"Fila {index+2}: No se encontró el archivo de altura: {self.altura_logo}")
-
-                    # Debug: agregar información sobre logos aplicados
+        # Índice de imágenes: un solo recorrido (o caché en disco) para todas las filas
+        image_index = ImageIndex.load_or_build(self.images_folder)
+        print(f"Índice de imágenes listo: {len(image_index)} imágenes '_2' en {self.images_folder}")
+
+        # Logos disponibles: un solo listado de la carpeta en lugar de os.path.exists por candidato.
+        # Indexados sin distinguir mayúsculas ("Talla_M.PNG" sirve para "talla_m.png")
+        try:
+            logo_files = {f.casefold(): f for f in os.listdir(self.logos_folder)
+                          if os.path.isfile(os.path.join(self.logos_folder, f))}
+        except OSError:
+            logo_files = {}
+        compromiso_file = next((logo_files[f.casefold()] for f in POSIBLES_COMPROMISO
+                                if f.casefold() in logo_files), None)
+        altura_disponible = bool(self.altura_logo) and os.path.exists(self.altura_logo)
+        talla_logos = {}
+
+        # 1. Preparar las tareas (cálculo liviano, en este hilo)
+        rows = []   # por fila en orden: (errores_previos, índice de tarea o None)
+        tasks = []
+        for row_number, valores in planilla.filas(talla_col, upc_col, compromiso_col):
+            row_errors = []
+
+            talla_value, upc_ripley, compromiso_r = (self._clean_value(v) for v in valores)
+
+            if upc_ripley == "":
+                rows.append(([f"Fila {row_number}: UPC vacío."], None))
+                continue
+
+            image_file = image_index.find(upc_ripley)
+            if not image_file:
+                rows.append(([f"Fila {row_number}: No se encontró imagen para UPC: {upc_ripley}"], None))
+                continue
+
+            logos = []
+
+            # Logo según el valor de la columna "talla"
+            if talla_value:
+                if talla_value not in talla_logos:
+                    talla_logos[talla_value] = next(
+                        (logo_files[f.casefold()] for f in posibles_logos_talla(talla_value)
+                         if f.casefold() in logo_files), None
+                    )
+                talla_file = talla_logos[talla_value]
+                if talla_file:
+                    logos.append(("Talla", os.path.join(self.logos_folder, talla_file), f"logo {talla_file}"))
+                else:
+                    row_errors.append(f"Fila {row_number}: No se encontró logo para talla '{talla_value}'. "
+                                      f"Buscó: {', '.join(posibles_logos_talla(talla_value))}")
+
+            # Logo de compromiso si existe valor en compromiso_r
+            if compromiso_r and compromiso_r.lower() not in ["nan", "none"]:
+                if compromiso_file:
+                    logos.append(("Compromiso", os.path.join(self.logos_folder, compromiso_file),
+                                  f"logo de compromiso {compromiso_file}"))
+                else:
+                    row_errors.append(f"Fila {row_number}: No se encontró ningún archivo de compromiso. "
+                                      f"Buscó: {', '.join(POSIBLES_COMPROMISO)}")
+
+            # Logo de altura manual (si está seleccionado)
+            if altura_disponible:
+                logos.append(("Altura Manual", self.altura_logo, "logo de altura manual"))
+            elif self.altura_logo:
+                row_errors.append(f"Fila {row_number}: No se encontró el archivo de altura: {self.altura_logo}")
+
+            base_name = os.path.splitext(os.path.basename(image_file))[0]
+            output_dir = self.output_folder if not self.overwrite_originals else os.path.dirname(image_file)
+
+            rows.append((row_errors, len(tasks)))
+            tasks.append({
+                "row_number": row_number,
+                "image_file": image_file,
+                "output_file_path": os.path.join(output_dir, f"{base_name}.webp"),
+                "logos": logos,
+            })
+
+        # 2. Componer en paralelo; los resultados llegan en el orden de las filas
+        try:
+            results = self._iter_results(tasks)
+            for position, (row_errors, task_index) in enumerate(rows):
+                error_report.extend(row_errors)
+                if task_index is not None:
+                    task_errors, logos_aplicados = next(results)
+                    error_report.extend(task_errors)
+                    image_name = os.path.basename(tasks[task_index]["image_file"])
                     if logos_aplicados:
-                        print(f"Logos aplicados a {os.path.basename(image_file)}: {', '.join(logos_aplicados)}")
+                        print(f"Logos aplicados a {image_name}: {', '.join(logos_aplicados)}")
                     else:
-                        print(f"No se aplicaron logos a {os.path.basename(image_file)}")
-                        error_report.append(f"Fila {index+2}: No se encontraron logos para aplicar")
-
-                    # Guardar imagen procesada en formato WebP
-                    base_name = os.path.splitext(os.path.basename(image_file))[0]
-                    output_dir = self.output_folder if not self.overwrite_originals else os.path.dirname(image_file)
-                    output_file_path = os.path.join(output_dir, f"{base_name}.webp")
-
-                    # Guardar en formato WebP preservando calidad y transparencia
-                    im.save(output_file_path, format="WEBP", quality=100, icc_profile=icc_profile)
-
-            except Exception as e:
-                error_report.append(f"Fila {index+2}: Error al procesar la imagen {os.path.basename(image_file if image_file else 'desconocida')}: {e}")
-
-            finally:
-                self.result_queue.put(('progress', index + 1))
+                        print(f"No se aplicaron logos a {image_name}")
+                self.result_queue.put(('progress', position + 1))
+        except Exception as e:
+            error_report.append(f"CRÍTICO: Error durante el procesamiento de imágenes: {e}")
 
         # Generar reporte de errores
         reporte_path_final = None
@@ -217,6 +361,26 @@ class ImageProcessorThread(threading.Thread):
             'report_path': reporte_path_final
         }))
 
+    @staticmethod
+    def _clean_value(value):
+        if value is None:
+            return ""
+        value = str(value).strip()
+        return "" if value.lower() == "nan" else value
+
+    @staticmethod
+    def _iter_results(tasks):
+        """Genera (errores, logos_aplicados) por tarea, en orden, usando un pool de procesos."""
+        workers = min(MAX_WORKERS, len(tasks))
+        if workers <= 1:
+            yield from map(_compose_row, tasks)
+            return
+
+        print(f"Procesando {len(tasks)} imágenes con {workers} procesos")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunksize = max(1, len(tasks) // (workers * 8))
+            yield from executor.map(_compose_row, tasks, chunksize=chunksize)
+
 
 class ImageLogoApplier(tk.Tk):
     def __init__(self):
@@ -451,8 +615,7 @@ class ImageLogoApplier(tk.Tk):
 
         try:
             # Leer solo la primera fila para obtener los nombres de columnas
-            df_sample = pd.read_excel(self.excel_file, nrows=1)
-            self.excel_columns = list(df_sample.columns)
+            self.excel_columns = encabezados(self.excel_file)
 
             print(f"Columnas detectadas: {self.excel_columns}")  # Debug
 
@@ -718,4 +881,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Necesario para el pool de procesos en ejecutables congelados (Windows)
+    multiprocessing.freeze_support()
     main()
@@ -1,11 +1,85 @@
 import os
-import shutil
-import pandas as pd
+import sys
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from ttkbootstrap.scrolled import ScrolledText # Para un área de log mejorada
+
+# Módulos compartidos de las apps de diseño (apps/diseno)
+_diseno_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _diseno_dir not in sys.path:
+    sys.path.insert(0, _diseno_dir)
+
+from motor_transferencia import MotorTransferencia, ItemTransferencia, MODO_MOVER, CONFLICTO_OMITIR
+from planillas import leer_planilla, ColumnasFaltantes
+
+
+def seleccionar_produccion(planilla_path, base_folder, al_log=lambda mensaje: None):
+    """
+    Núcleo sin ventana: mueve a `base_folder/PRODUCCION` las subcarpetas cuyo nombre
+    está en la columna 'EAN_HIJO' de la planilla.
+    Retorna {"planilla", "movidas", "omitidas", "errores"}; si la planilla no trae
+    nombres válidos no se mueve nada y "planilla" es 0.
+
+    Raises:
+        ColumnasFaltantes si la planilla no tiene la columna 'EAN_HIJO';
+        OSError si no se puede crear la carpeta PRODUCCION.
+    """
+    # Cargar solo la columna 'EAN_HIJO' como texto (Excel o CSV, caché por contenido)
+    planilla = leer_planilla(planilla_path, ["EAN_HIJO"], como_texto=True)
+
+    # Nombres únicos permitidos, sin espacios extra y sin valores nulos o vacíos
+    allowed_folders = set(planilla.valores("EAN_HIJO"))
+    resumen = {"planilla": len(allowed_folders), "movidas": 0, "omitidas": 0, "errores": 0}
+    if not allowed_folders:
+        return resumen
+
+    # Crear la carpeta PRODUCCION dentro de la carpeta base
+    produccion_path = os.path.join(base_folder, "PRODUCCION")
+    if not os.path.exists(produccion_path):
+        os.makedirs(produccion_path)
+        al_log(f"Carpeta creada: {produccion_path}")
+
+    # Se recorre la carpeta base agrupando por profundidad las carpetas que coinciden.
+    # Se mueven por niveles, del más profundo al más superficial, igual que el recorrido
+    # topdown=False original; dentro de un nivel las carpetas son independientes y el
+    # motor compartido las mueve en paralelo (rename directo si están en el mismo disco).
+    abs_produccion_path = os.path.abspath(produccion_path)
+    por_nivel = {}
+    for current_root, dirs, files in os.walk(base_folder):
+        abs_current_root = os.path.abspath(current_root)
+        # Evitar procesar la carpeta PRODUCCION o sus contenidos
+        dirs[:] = [d for d in dirs if os.path.join(abs_current_root, d) != abs_produccion_path]
+        nivel = abs_current_root.count(os.sep)
+        for folder_name in dirs:
+            if folder_name in allowed_folders:
+                por_nivel.setdefault(nivel, []).append(ItemTransferencia(
+                    os.path.join(current_root, folder_name),
+                    os.path.join(produccion_path, folder_name)
+                ))
+
+    motor = MotorTransferencia(MODO_MOVER, conflicto=CONFLICTO_OMITIR)
+
+    def al_progreso(lote, hechos, total):
+        lineas = []
+        for item, estado, detalle in lote:
+            if estado == "ok":
+                lineas.append(f"MOVIDA: '{item.origen}' a PRODUCCION.")
+                resumen["movidas"] += 1
+            elif estado == "omitido":
+                lineas.append(f"OMITIDO: La carpeta '{item.etiqueta}' ya existe en PRODUCCION.")
+                resumen["omitidas"] += 1
+            else:
+                lineas.append(f"ERROR moviendo '{item.origen}': {detalle}")
+                resumen["errores"] += 1
+        al_log("\n".join(lineas))
+
+    for nivel in sorted(por_nivel, reverse=True):
+        motor.ejecutar(por_nivel[nivel], al_progreso=al_progreso)
+    return resumen
+
+
 # Función de tema compatible multiplataforma
 def setup_theme(window=None):
     import ttkbootstrap as ttk
@@ -132,89 +206,30 @@ class FolderProcessorApp:
         
         self._add_to_log("Iniciando procesamiento...")
 
-        # Cargar la planilla con pandas
         try:
-            if planilla_path.lower().endswith(".csv"):
-                df = pd.read_csv(planilla_path, dtype=str) # Leer todo como string para EAN_HIJO
-            else:
-                df = pd.read_excel(planilla_path, dtype=str) # Leer todo como string
+            resumen = seleccionar_produccion(planilla_path, base_folder, self._add_to_log)
+        except ColumnasFaltantes:
+            self._add_to_log("ERROR: La columna 'EAN_HIJO' no se encuentra en la planilla.")
+            messagebox.showerror("Error de Columna", "La columna 'EAN_HIJO' no se encuentra en la planilla.")
+            return
+        except OSError as e:
+            self._add_to_log(f"ERROR al crear la carpeta PRODUCCION: {e}")
+            messagebox.showerror("Error de Creación", f"No se pudo crear la carpeta PRODUCCION en '{base_folder}':\n{e}")
+            return
         except Exception as e:
             self._add_to_log(f"ERROR al leer la planilla: {e}")
             messagebox.showerror("Error de Lectura", f"Error al leer la planilla: {e}")
             return
 
-        # Verificar que exista la columna 'EAN_HIJO'
-        if "EAN_HIJO" not in df.columns:
-            self._add_to_log("ERROR: La columna 'EAN_HIJO' no se encuentra en la planilla.")
-            messagebox.showerror("Error de Columna", "La columna 'EAN_HIJO' no se encuentra en la planilla.")
-            return
-
-        # Obtener los nombres únicos permitidos (se convierte a cadena y se quitan espacios extra)
-        # Filtrar valores nulos o vacíos antes de crear el set
-        allowed_folders = set(df["EAN_HIJO"].dropna().astype(str).str.strip().tolist())
-        allowed_folders = {name for name in allowed_folders if name} # Eliminar strings vacíos
-        
-        if not allowed_folders:
+        if not resumen["planilla"]:
             self._add_to_log("ADVERTENCIA: No se encontraron nombres de carpetas válidos ('EAN_HIJO') en la planilla.")
             messagebox.showwarning("Sin Datos", "No se encontraron nombres de carpetas válidos ('EAN_HIJO') en la planilla para procesar.")
             return
 
-        # Crear la carpeta PRODUCCION dentro de la carpeta base
-        produccion_path = os.path.join(base_folder, "PRODUCCION")
-        try:
-            if not os.path.exists(produccion_path):
-                os.makedirs(produccion_path)
-                self._add_to_log(f"Carpeta creada: {produccion_path}")
-        except Exception as e:
-            self._add_to_log(f"ERROR al crear la carpeta PRODUCCION: {e}")
-            messagebox.showerror("Error de Creación", f"No se pudo crear la carpeta PRODUCCION en '{base_folder}':\n{e}")
-            return
-        
-        moved_count = 0
-        skipped_count = 0
-        processed_folders = 0
-
-        # Recorrer la carpeta base (topdown=False para procesar subcarpetas más profundas primero)
-        for current_root, dirs, files in os.walk(base_folder, topdown=False):
-            # Convertir a rutas absolutas para comparación fiable
-            abs_current_root = os.path.abspath(current_root)
-            abs_produccion_path = os.path.abspath(produccion_path)
-
-            # Evitar procesar la carpeta PRODUCCION o sus contenidos
-            if abs_current_root.startswith(abs_produccion_path):
-                dirs[:] = [] 
-                continue
-
-            for d in list(dirs): 
-                folder_name = d 
-                folder_full_path = os.path.join(current_root, folder_name)
-                abs_folder_full_path = os.path.abspath(folder_full_path)
-
-                if abs_folder_full_path == abs_produccion_path:
-                    if d in dirs: dirs.remove(d) 
-                    continue
-                
-                processed_folders += 1
-
-                if folder_name in allowed_folders:
-                    try:
-                        target_path = os.path.join(produccion_path, folder_name)
-                        if os.path.exists(target_path):
-                            self._add_to_log(f"OMITIDO: La carpeta '{folder_name}' ya existe en PRODUCCION.")
-                            skipped_count +=1
-                        else:
-                            self._add_to_log(f"Moviendo: '{folder_full_path}' -> '{target_path}'")
-                            shutil.move(folder_full_path, target_path)
-                            self._add_to_log(f"MOVIDA: '{folder_name}' a PRODUCCION.")
-                            moved_count += 1
-                            if d in dirs: dirs.remove(d) 
-                    except Exception as e:
-                        self._add_to_log(f"ERROR moviendo '{folder_full_path}': {e}")
-
         final_message = (f"Procesamiento finalizado.\n"
-                         f"Carpetas movidas exitosamente: {moved_count}\n"
-                         f"Carpetas omitidas (ya en PRODUCCION): {skipped_count}\n"
-                         f"Total de carpetas encontradas en planilla: {len(allowed_folders)}")
+                         f"Carpetas movidas exitosamente: {resumen['movidas']}\n"
+                         f"Carpetas omitidas (ya en PRODUCCION): {resumen['omitidas']}\n"
+                         f"Total de carpetas encontradas en planilla: {resumen['planilla']}")
         self._add_to_log(final_message)
         messagebox.showinfo("Proceso Completado", final_message)
 
@@ -5,6 +5,13 @@ import tkinter as tk
 from tkinter import filedialog, messagebox # Standard Tkinter dialogs
 import sys
 
+# Módulos compartidos de las apps de diseño (apps/diseno)
+_diseno_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _diseno_dir not in sys.path:
+    sys.path.insert(0, _diseno_dir)
+
+from planificador_renombres import PlanRenombrado, escanear
+
 # Verificar dependencias antes de importar
 try:
     import ttkbootstrap as ttk
@@ -55,80 +62,69 @@ def renombrar_imagenes_en_hilo(directorio_raiz: str, update_queue: queue.Queue):
 
     try:
         update_queue.put(("status", "Iniciando renombrado..."))
-        formatos_imagen = ['.jpg', '.png', '.webp', '.jpeg'] # Agregado .jpeg por si acaso
+        formatos_imagen = {'.jpg', '.png', '.webp', '.jpeg'} # Agregado .jpeg por si acaso
 
         # Verificar que el directorio existe
         if not os.path.exists(directorio_raiz):
             update_queue.put(("show_message", "error", "Error", f"El directorio no existe: {directorio_raiz}"))
             return
 
-        try:
-            subdirectorios = os.listdir(directorio_raiz)
-        except PermissionError:
-            update_queue.put(("show_message", "error", "Error de Permisos", f"Sin permisos para acceder a: {directorio_raiz}"))
-            return
-        except OSError as e:
-            update_queue.put(("show_message", "error", "Error de Sistema", f"Error accediendo al directorio: {e}"))
-            return
+        # Una sola pasada de scandir: la raíz y sus subcarpetas (un nivel)
+        listado, errores_listado = escanear(directorio_raiz, profundidad=1)
+        for carpeta, error in errores_listado:
+            if carpeta == directorio_raiz:
+                if isinstance(error, PermissionError):
+                    update_queue.put(("show_message", "error", "Error de Permisos", f"Sin permisos para acceder a: {directorio_raiz}"))
+                else:
+                    update_queue.put(("show_message", "error", "Error de Sistema", f"Error accediendo al directorio: {error}"))
+                return
+            update_queue.put(("log", f"Error listando archivos en '{os.path.basename(carpeta)}': {error}"))
+            errores_count += 1
 
-        for nombre_subcarpeta in subdirectorios:
-            ruta_subcarpeta = os.path.join(directorio_raiz, nombre_subcarpeta)
-            if os.path.isdir(ruta_subcarpeta):
-                nuevo_nombre_base_para_archivos = nombre_subcarpeta # Nombre de la subcarpeta
+        # Plan completo en memoria: colisiones y ciclos se resuelven antes de tocar el disco
+        plan = PlanRenombrado()
+        for ruta_subcarpeta, archivos_en_subcarpeta in listado:
+            if ruta_subcarpeta == directorio_raiz:
+                continue
+            nuevo_nombre_base_para_archivos = os.path.basename(ruta_subcarpeta) # Nombre de la subcarpeta
+            archivos_procesados += len(archivos_en_subcarpeta)
 
-                try:
-                    archivos_en_subcarpeta = os.listdir(ruta_subcarpeta)
-                except (PermissionError, OSError) as e:
-                    update_queue.put(("log", f"Error listando archivos en '{nombre_subcarpeta}': {e}"))
-                    errores_count += 1
+            for nombre_archivo_original in archivos_en_subcarpeta:
+                if os.path.splitext(nombre_archivo_original)[1].lower() not in formatos_imagen:
                     continue
+                extension_original = os.path.splitext(nombre_archivo_original)[1]
+
+                # Lógica original para determinar el nuevo nombre:
+                if "_" in nombre_archivo_original:
+                    # Captura todo después del primer guion bajo
+                    parte_sufijo = nombre_archivo_original.split('_', 1)[1]
+                    nombre_final_construido = f"{nuevo_nombre_base_para_archivos}_{parte_sufijo}"
+                elif "-" in nombre_archivo_original: # Se ejecuta solo si no hay guion bajo
+                    # Captura todo después del primer guion
+                    parte_sufijo = nombre_archivo_original.split('-', 1)[1]
+                    nombre_final_construido = f"{nuevo_nombre_base_para_archivos}-{parte_sufijo}"
+                else:
+                    # No tiene sufijos _ ni -
+                    nombre_final_construido = f"{nuevo_nombre_base_para_archivos}{extension_original}"
+
+                plan.agregar(os.path.join(ruta_subcarpeta, nombre_archivo_original),
+                             os.path.join(ruta_subcarpeta, nombre_final_construido))
+
+        plan.validar()
+        update_queue.put(("status", f"Renombrando {len(plan.pendientes())} imágenes..."))
+        resultado = plan.aplicar(
+            progreso=lambda hechos, total: update_queue.put(("status", f"Renombrando... {int(hechos / total * 100)}%"))
+        )
+        archivos_renombrados = resultado["ok"]
+        for renombrado in plan.renombrados:
+            if renombrado.estado in ("conflicto", "error"):
+                update_queue.put(("log", f"{'Conflicto' if renombrado.estado == 'conflicto' else 'Error'}: "
+                                         f"'{renombrado.nombre_origen}' -> '{renombrado.nombre_destino}': {renombrado.motivo}"))
+                errores_count += 1
 
-                for nombre_archivo_original in archivos_en_subcarpeta:
-                    ruta_archivo_original = os.path.join(ruta_subcarpeta, nombre_archivo_original)
-                    archivos_procesados += 1
-                    update_queue.put(("status", f"Procesando: {nombre_archivo_original} en {nombre_subcarpeta}"))
-
-                    if os.path.isfile(ruta_archivo_original) and \
-                       any(nombre_archivo_original.lower().endswith(ext) for ext in formatos_imagen):
-                        
-                        nombre_final_construido = None
-                        extension_original = os.path.splitext(nombre_archivo_original)[1]
-
-                        # Lógica original para determinar el nuevo nombre:
-                        if "_" in nombre_archivo_original:
-                            # Captura todo después del primer guion bajo
-                            parte_sufijo = nombre_archivo_original.split('_', 1)[1]
-                            nombre_final_construido = f"{nuevo_nombre_base_para_archivos}_{parte_sufijo}"
-                        elif "-" in nombre_archivo_original: # Se ejecuta solo si no hay guion bajo
-                            # Captura todo después del primer guion
-                            parte_sufijo = nombre_archivo_original.split('-', 1)[1]
-                            nombre_final_construido = f"{nuevo_nombre_base_para_archivos}-{parte_sufijo}"
-                        else:
-                            # No tiene sufijos _ ni -
-                            nombre_final_construido = f"{nuevo_nombre_base_para_archivos}{extension_original}"
-                        
-                        ruta_archivo_nuevo = os.path.join(ruta_subcarpeta, nombre_final_construido)
-
-                        if ruta_archivo_original != ruta_archivo_nuevo:
-                            if os.path.exists(ruta_archivo_nuevo):
-                                update_queue.put(("log", f"Conflicto: '{ruta_archivo_nuevo}' ya existe. Se omitió '{nombre_archivo_original}'."))
-                                errores_count += 1 # Contando como un tipo de error/conflicto
-                            else:
-                                try:
-                                    os.rename(ruta_archivo_original, ruta_archivo_nuevo)
-                                    archivos_renombrados += 1
-                                except PermissionError:
-                                    update_queue.put(("log", f"Sin permisos para renombrar '{nombre_archivo_original}'"))
-                                    errores_count += 1
-                                except OSError as e_rename:
-                                    update_queue.put(("log", f"Error del sistema renombrando '{nombre_archivo_original}': {e_rename}"))
-                                    errores_count += 1
-                                except Exception as e_rename:
-                                    update_queue.put(("log", f"Error inesperado renombrando '{nombre_archivo_original}': {e_rename}"))
-                                    errores_count += 1
-                        # else: El nombre ya es correcto, no se hace nada.
-        
         summary = f"Imágenes renombradas: {archivos_renombrados}.\nArchivos procesados: {archivos_procesados}.\nConflictos/Errores: {errores_count}."
+        if plan.journal:
+            summary += f"\n\nPara deshacer: python planificador_renombres.py --deshacer \"{plan.journal}\""
         update_queue.put(("show_message", "info", "Proceso completado", summary))
 
     except Exception as e_global:
@@ -9,6 +9,13 @@ from PySide6.QtWidgets import (
 from PySide6.QtGui import QFont, QPalette, QColor
 from PySide6.QtCore import Qt, QThread, Signal
 
+# Módulos compartidos de las apps de diseño (apps/diseno)
+_diseno_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _diseno_dir not in sys.path:
+    sys.path.insert(0, _diseno_dir)
+
+from planificador_renombres import PlanRenombrado, escanear
+
 
 class RenameWorker(QThread):
     progress = Signal(int)
@@ -40,36 +47,47 @@ class RenameWorker(QThread):
         df = df_all[[self.col_codsku, self.col_upc, self.col_color, self.col_muestra]].fillna("")
         # Filtrar filas de muestra
         df_sample = df[df[self.col_muestra].str.strip().astype(bool)]
-        total_groups = df_sample.shape[0]
-        done_groups = 0
-        for _, sample_row in df_sample.iterrows():
-            cod = sample_row[self.col_codsku]
-            color = sample_row[self.col_color]
-            target_upc = sample_row[self.col_upc]
-            # Encontrar filas originales en mismo grupo
-            originals = df[
-                (df[self.col_codsku] == cod) &
-                (df[self.col_color] == color) &
-                (df[self.col_upc] != target_upc)
-            ]
-            for _, orig in originals.iterrows():
-                old_upc = orig[self.col_upc]
-                src = os.path.join(self.folder_path, old_upc)
-                dst = os.path.join(self.folder_path, target_upc)
-                if os.path.isdir(src):
-                    if not os.path.exists(dst):
-                        try:
-                            os.rename(src, dst)
-                            self.log.emit(f"Renombrado: {old_upc} → {target_upc}")
-                        except Exception as e:
-                            self.log.emit(f"Error renombrando {old_upc}: {e}")
-                    else:
-                        self.log.emit(f"Destino ya existe, saltando: {target_upc}")
+        # UPCs de cada grupo (codsku, color) en orden de la planilla, en una sola pasada
+        grupos = {}
+        for cod, color, upc in zip(df[self.col_codsku], df[self.col_color], df[self.col_upc]):
+            grupos.setdefault((cod, color), []).append(upc)
+
+        # Un solo scandir de la carpeta en vez de comprobar cada UPC por separado
+        listado, _ = escanear(self.folder_path, profundidad=0, solo_directorios=True)
+        carpetas_existentes = set(listado[0][1]) if listado else set()
+
+        plan = PlanRenombrado()
+        mensajes = []
+        for cod, color, target_upc in zip(df_sample[self.col_codsku], df_sample[self.col_color], df_sample[self.col_upc]):
+            # Filas originales en el mismo grupo
+            for old_upc in grupos[(cod, color)]:
+                if old_upc == target_upc:
+                    continue
+                if old_upc in carpetas_existentes:
+                    plan.agregar(os.path.join(self.folder_path, old_upc), os.path.join(self.folder_path, target_upc))
                 else:
-                    self.log.emit(f"Carpeta no encontrada: {old_upc}")
-            done_groups += 1
-            pct = int(done_groups / total_groups * 100)
-            self.progress.emit(pct)
+                    mensajes.append(f"Carpeta no encontrada: {old_upc}")
+        if mensajes:
+            self.log.emit("\n".join(mensajes))
+
+        # Destinos repetidos u ocupados se detectan antes de renombrar; luego se aplica en dos fases
+        plan.validar()
+        plan.aplicar(progreso=lambda hechos, total: self.progress.emit(int(hechos / total * 100)))
+
+        mensajes = []
+        for renombrado in plan.renombrados:
+            old_upc, target_upc = renombrado.nombre_origen, renombrado.nombre_destino
+            if renombrado.estado == "ok":
+                mensajes.append(f"Renombrado: {old_upc} → {target_upc}")
+            elif renombrado.estado == "conflicto":
+                mensajes.append(f"Destino ya existe, saltando: {target_upc}")
+            elif renombrado.estado in ("error", "no_existe"):
+                mensajes.append(f"Error renombrando {old_upc}: {renombrado.motivo}")
+        if plan.journal:
+            mensajes.append(f"Para deshacer: python planificador_renombres.py --deshacer \"{plan.journal}\"")
+        if mensajes:
+            self.log.emit("\n".join(mensajes))
+        self.progress.emit(100)
         self.finished.emit()
 
 
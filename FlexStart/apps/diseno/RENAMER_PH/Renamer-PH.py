@@ -1,11 +1,90 @@
 import sys
 import os
-import pandas as pd
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from ttkbootstrap.scrolled import ScrolledText
+
+# Módulos compartidos de las apps de diseño (apps/diseno)
+_diseno_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _diseno_dir not in sys.path:
+    sys.path.insert(0, _diseno_dir)
+
+from planificador_renombres import PlanRenombrado, escanear
+from planillas import leer_planilla, ColumnasFaltantes
+
+
+def renombrar_carpetas(excel_file, base_folder, old_col_name, new_col_name,
+                       al_log=lambda lineas: None, al_estado=lambda mensaje: None,
+                       al_progreso=lambda hechos, total: None):
+    """
+    Núcleo sin ventana: renombra las subcarpetas de `base_folder` según el mapeo
+    `old_col_name` → `new_col_name` de la planilla.
+    Retorna {"evaluadas", "renombradas", "journal"}; si no hay mapeos válidos no se
+    renombra nada y "evaluadas" es 0.
+
+    Raises:
+        ColumnasFaltantes si la planilla no tiene alguna de las dos columnas.
+    """
+    # Solo las dos columnas del mapeo, como texto (caché por contenido en ~/.cache/planillas)
+    planilla = leer_planilla(excel_file, [old_col_name, new_col_name], como_texto=True)
+
+    mapping_list = []
+    advertencias = []
+    for fila, (old_name_val, new_name_val) in planilla.filas(old_col_name, new_col_name):
+        if old_name_val is None or str(old_name_val).lower() == 'nan' or not str(old_name_val).strip():
+            continue
+        if new_name_val is None or str(new_name_val).lower() == 'nan' or not str(new_name_val).strip():
+            advertencias.append(f"ADVERTENCIA: Nombre nuevo inválido/vacío para carpeta antigua '{old_name_val}' en fila {fila}. Se omite.")
+            continue
+
+        mapping_list.append((str(old_name_val).strip(), str(new_name_val).strip()))
+    al_log(advertencias)
+
+    if not mapping_list:
+        return {"evaluadas": 0, "renombradas": 0, "journal": None}
+
+    total_to_process = len(mapping_list)
+    al_estado(f"Analizando {total_to_process} carpetas...")
+
+    # Un solo scandir de la carpeta base en lugar de comprobar cada carpeta por separado
+    listado, _ = escanear(base_folder, profundidad=0, solo_directorios=True)
+    carpetas_existentes = set(listado[0][1]) if listado else set()
+
+    plan = PlanRenombrado()
+    mensajes = []
+    for old_folder_name, new_folder_name in mapping_list:
+        if old_folder_name not in carpetas_existentes:
+            mensajes.append(f"INFO: No se encontró la carpeta de origen '{old_folder_name}' en '{base_folder}'.")
+        elif old_folder_name == new_folder_name:
+            mensajes.append(f"INFO: Nombre antiguo y nuevo son idénticos para '{old_folder_name}'. No se requiere renombrar.")
+        else:
+            plan.agregar(os.path.join(base_folder, old_folder_name), os.path.join(base_folder, new_folder_name))
+    al_log(mensajes)
+
+    # Colisiones y cadenas/ciclos de nombres se resuelven en el plan antes de renombrar
+    conteo = plan.validar()
+    if conteo['ciclos']:
+        al_log([f"INFO: {conteo['ciclos']} intercambio(s) de nombres se resolverán con nombres temporales."])
+
+    resultado = plan.aplicar(progreso=al_progreso)
+
+    mensajes = []
+    for renombrado in plan.renombrados:
+        if renombrado.estado == "ok":
+            mensajes.append(f"ÉXITO: '{renombrado.nombre_origen}' renombrado a '{renombrado.nombre_destino}'")
+        elif renombrado.estado == "conflicto":
+            mensajes.append(f"ADVERTENCIA: No se renombró '{renombrado.nombre_origen}' a '{renombrado.nombre_destino}': {renombrado.motivo}.")
+        elif renombrado.estado in ("error", "no_existe"):
+            mensajes.append(f"ERROR al renombrar '{renombrado.nombre_origen}' a '{renombrado.nombre_destino}': {renombrado.motivo}")
+    if plan.journal:
+        mensajes.append(f"Para deshacer: python planificador_renombres.py --deshacer \"{plan.journal}\"")
+    al_log(mensajes)
+
+    return {"evaluadas": total_to_process, "renombradas": resultado['ok'], "journal": plan.journal}
+
+
 # Función de tema compatible multiplataforma
 def setup_theme(window=None):
     import ttkbootstrap as ttk
@@ -124,6 +203,11 @@ class RenameFoldersApp:
         self.log_text.text.config(state=DISABLED)
         self.master.update_idletasks()
 
+    def _log_lines(self, messages):
+        """Agrega varias líneas al log con un solo refresco de la UI."""
+        if messages:
+            self._log_message("\n".join(messages))
+
     def run_rename(self):
         excel_file = self.excel_path_var.get().strip()
         base_folder = self.folder_path_var.get().strip()
@@ -137,75 +221,45 @@ class RenameFoldersApp:
             messagebox.showerror("Error", "Seleccione una carpeta válida para analizar.")
             return
         
-        try:
-            df = pd.read_excel(excel_file, dtype=str) 
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo leer el archivo Excel:\n{e}")
-            return
-
-        if old_col_name not in df.columns or new_col_name not in df.columns:
-            messagebox.showerror(
-                "Error",
-                f"El archivo Excel debe contener las columnas especificadas:\n'{old_col_name}' y '{new_col_name}'.\nColumnas encontradas: {', '.join(df.columns)}"
-            )
-            return
-
         # ✅ CORRECCIÓN: Se accede al widget .text para cambiar el estado
         self.log_text.text.config(state=NORMAL)
         self.log_text.delete('1.0', END)
         # ✅ CORRECCIÓN: Se accede al widget .text para cambiar el estado
         self.log_text.text.config(state=DISABLED)
 
-        mapping_list = []
-        for index, row in df.iterrows():
-            old_name_val = row.get(old_col_name, '')
-            new_name_val = row.get(new_col_name, '')
-            if pd.isna(old_name_val) or str(old_name_val).lower() == 'nan' or not str(old_name_val).strip():
-                continue
-            if pd.isna(new_name_val) or str(new_name_val).lower() == 'nan' or not str(new_name_val).strip():
-                self._log_message(f"ADVERTENCIA: Nombre nuevo inválido/vacío para carpeta antigua '{old_name_val}' en fila {index+2}. Se omite.")
-                continue
-            
-            mapping_list.append((str(old_name_val).strip(), str(new_name_val).strip()))
+        def al_estado(mensaje):
+            self.status_text_var.set(mensaje)
+            self.master.update_idletasks()
+
+        def al_progreso(hechos, total):
+            self.progress_bar.config(maximum=total)
+            self.progress_value.set(hechos)
+            self.status_text_var.set(f"Renombrando... {int(hechos / total * 100)}%")
+            self.master.update_idletasks()
 
-        if not mapping_list:
+        try:
+            resultado = renombrar_carpetas(excel_file, base_folder, old_col_name, new_col_name,
+                                           al_log=self._log_lines, al_estado=al_estado,
+                                           al_progreso=al_progreso)
+        except ColumnasFaltantes as e:
+            messagebox.showerror(
+                "Error",
+                f"El archivo Excel debe contener las columnas especificadas:\n'{old_col_name}' y '{new_col_name}'.\nColumnas encontradas: {', '.join(map(str, e.disponibles))}"
+            )
+            return
+        except Exception as e:
+            messagebox.showerror("Error", f"No se pudo leer el archivo Excel:\n{e}")
+            return
+
+        if not resultado["evaluadas"]:
             messagebox.showinfo("Información", "No se encontraron mapeos válidos de nombres en el Excel (verifique valores vacíos o 'NaN').")
             self.status_text_var.set("No hay datos para procesar.")
             return
 
-        total_to_process = len(mapping_list)
-        self.progress_bar.config(maximum=total_to_process)
-        self.progress_value.set(0)
-        self.status_text_var.set(f"Procesando 0/{total_to_process}...")
-        self.master.update_idletasks()
-
-        renamed_count = 0
-        processed_count = 0
-        for old_folder_name, new_folder_name in mapping_list:
-            source_path = os.path.join(base_folder, old_folder_name)
-            destination_path = os.path.join(base_folder, new_folder_name)
-            
-            processed_count += 1
-            self.status_text_var.set(f"Procesando {processed_count}/{total_to_process}: {old_folder_name}...")
-
-            if os.path.isdir(source_path):
-                if source_path == destination_path:
-                    self._log_message(f"INFO: Nombre antiguo y nuevo son idénticos para '{old_folder_name}'. No se requiere renombrar.")
-                elif os.path.exists(destination_path):
-                    self._log_message(f"ADVERTENCIA: Ya existe un archivo/carpeta con el nuevo nombre '{new_folder_name}'. No se renombró '{old_folder_name}'.")
-                else:
-                    try:
-                        os.rename(source_path, destination_path)
-                        renamed_count += 1
-                        self._log_message(f"ÉXITO: '{old_folder_name}' renombrado a '{new_folder_name}'")
-                    except Exception as e:
-                        self._log_message(f"ERROR al renombrar '{old_folder_name}' a '{new_folder_name}': {e}")
-            else:
-                self._log_message(f"INFO: No se encontró la carpeta de origen '{old_folder_name}' en '{base_folder}'.")
-            
-            self.progress_value.set(processed_count)
-            self.master.update_idletasks()
-
+        renamed_count = resultado['renombradas']
+        processed_count = resultado['evaluadas']
+        self.progress_bar.config(maximum=processed_count)
+        self.progress_value.set(processed_count)
         self.status_text_var.set(f"Completado. Carpetas renombradas: {renamed_count} de {processed_count} evaluadas.")
         messagebox.showinfo(
             "Proceso Completado",
@@ -3,12 +3,21 @@
 
 import os
 import re
+import sys
 import threading
 import queue # For thread-safe GUI updates
 import tkinter as tk
 from tkinter import filedialog, messagebox # Keep standard dialogs
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import * # ttkbootstrap constants
+
+# Módulos compartidos de las apps de diseño (apps/diseno)
+_diseno_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _diseno_dir not in sys.path:
+    sys.path.insert(0, _diseno_dir)
+
+from planificador_renombres import PlanRenombrado, escanear
+
 # Función de tema compatible multiplataforma
 def setup_theme(window=None):
     import ttkbootstrap as ttk
@@ -66,9 +75,11 @@ def procesar_renombrado_en_hilo(ruta_raiz: str, update_queue: queue.Queue):
     total_archivos_a_inspeccionar, procesados, renombrados, omitidos, conflictos = 0, 0, 0, 0, 0
 
     try:
-        # Primera pasada: contar cuántos archivos vamos a inspeccionar
-        for _, _, files_list in os.walk(ruta_raiz):
-            total_archivos_a_inspeccionar += len(files_list)
+        # Una sola pasada de scandir para listar todo el árbol (antes se recorría dos veces)
+        listado, errores_listado = escanear(ruta_raiz)
+        for carpeta, error in errores_listado:
+            update_queue.put(("log", f"No se pudo listar '{carpeta}': {error}"))
+        total_archivos_a_inspeccionar = sum(len(nombres) for _, nombres in listado)
 
         if total_archivos_a_inspeccionar == 0:
             update_queue.put(("status", "No se encontraron archivos para procesar."))
@@ -79,47 +90,43 @@ def procesar_renombrado_en_hilo(ruta_raiz: str, update_queue: queue.Queue):
 
         update_queue.put(("progress_max", total_archivos_a_inspeccionar)) # Para configurar el máximo de la barra
 
-        for dir_actual, _, files_en_dir_actual in os.walk(ruta_raiz):
+        # Plan completo en memoria; colisiones y ciclos se detectan antes de renombrar
+        plan = PlanRenombrado()
+        for dir_actual, files_en_dir_actual in listado:
             nombre_carpeta_actual_base = os.path.basename(dir_actual)
             for nombre_archivo_actual in files_en_dir_actual:
                 procesados += 1
-                
-                # Llamar a la función de lógica de nombres
                 nuevo_nombre_final = nuevo_nombre_archivo(nombre_carpeta_actual_base, nombre_archivo_actual)
-
                 if nuevo_nombre_final is None:
                     omitidos += 1
                 else:
-                    ruta_origen = os.path.join(dir_actual, nombre_archivo_actual)
-                    ruta_destino = os.path.join(dir_actual, nuevo_nombre_final)
-                    
-                    if ruta_origen == ruta_destino : # Evitar renombrar a sí mismo
-                        omitidos +=1 
-                    elif os.path.exists(ruta_destino):
-                        conflictos += 1
-                    else:
-                        try:
-                            os.rename(ruta_origen, ruta_destino)
-                            renombrados += 1
-                        except Exception as e:
-                            # Si hay un error en el renombrado, se cuenta como omitido o conflicto si aplica
-                            update_queue.put(("log", f"Error renombrando '{nombre_archivo_actual}' a '{nuevo_nombre_final}': {e}"))
-                            omitidos +=1 # O manejar como un nuevo tipo de error
-
-                # Actualizar barra y texto de estado vía cola
-                # Enviar el número de archivos procesados para la barra de progreso
-                update_queue.put(("progress_value", procesados))
-                status_text = (f"Procesados: {procesados}/{total_archivos_a_inspeccionar}  |  "
-                               f"Renombrados: {renombrados}  |  Omitidos: {omitidos}  |  Conflictos: {conflictos}")
-                update_queue.put(("status", status_text))
-        
+                    plan.agregar(os.path.join(dir_actual, nombre_archivo_actual),
+                                 os.path.join(dir_actual, nuevo_nombre_final))
+
+        conteo = plan.validar()
+        update_queue.put(("status", f"Renombrando {conteo['pendiente']} archivos..."))
+
+        def al_progreso(hechos, total):
+            # Las dos fases del renombrado avanzan la barra sobre el total inspeccionado
+            update_queue.put(("progress_value", int(hechos / total * total_archivos_a_inspeccionar)))
+
+        resultado = plan.aplicar(progreso=al_progreso)
+        for renombrado in plan.renombrados:
+            if renombrado.estado == "error":
+                update_queue.put(("log", f"Error renombrando '{renombrado.nombre_origen}' a '{renombrado.nombre_destino}': {renombrado.motivo}"))
+        renombrados = resultado['ok']
+        conflictos = resultado['conflicto']
+        # Sin cambios (ya tenía el nombre) y errores de renombrado se cuentan como omitidos
+        omitidos += resultado['sin_cambios'] + resultado['no_existe'] + resultado['error']
+
         # Enviar resultados finales
         results = {
             'procesados': procesados,
             'renombrados': renombrados,
             'omitidos': omitidos,
             'conflictos': conflictos,
-            'total_inspeccionados': total_archivos_a_inspeccionar
+            'total_inspeccionados': total_archivos_a_inspeccionar,
+            'journal': plan.journal
         }
         update_queue.put(("finished", results))
 
@@ -245,6 +252,8 @@ class AppRenombrador(ttk.Window):
                 f"Omitidos (sin regla o sin cambios): {results.get('omitidos',0)}\n"
                 f"Conflictos (archivo destino ya existía): {results.get('conflictos',0)}"
             )
+            if results.get('journal'):
+                summary_message += f"\n\nPara deshacer: python planificador_renombres.py --deshacer \"{results['journal']}\""
             messagebox.showinfo("Renombrado Terminado", summary_message, parent=self)
         self.worker_thread = None # Limpiar referencia al hilo
 
@@ -1,11 +1,17 @@
 import os
+import shutil
+import subprocess
+import tempfile
 import threading
 import queue
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import * # For ttkbootstrap constants
 from PIL import Image
+from PIL import JpegImagePlugin
 # Función de tema compatible multiplataforma
 def setup_theme(window=None):
     import ttkbootstrap as ttk
@@ -31,10 +37,135 @@ def setup_theme(window=None):
     
     return style
 
+# --- Rotation engine ---
+MAX_WORKERS = os.cpu_count() or 1
+# jpegtran (libjpeg-turbo) is optional: when present, JPEGs are rotated losslessly in the DCT domain
+JPEGTRAN_PATH = shutil.which("jpegtran")
+
+try:
+    _TRANSPOSE = Image.Transpose
+except AttributeError: # Pillow < 9.1
+    _TRANSPOSE = Image
+
+# PIL's rotate(angle) is counter-clockwise: map each angle to its exact transpose
+# and to the equivalent clockwise rotation used by jpegtran.
+FAST_TRANSPOSES = {
+    90: (_TRANSPOSE.ROTATE_90, 270),
+    -90: (_TRANSPOSE.ROTATE_270, 90),
+    270: (_TRANSPOSE.ROTATE_270, 90),
+    180: (_TRANSPOSE.ROTATE_180, 180),
+    -180: (_TRANSPOSE.ROTATE_180, 180),
+}
+
+
+def _atomic_temp_path(img_path: str) -> str:
+    """Temp file next to the target (same filesystem) so os.replace is atomic."""
+    directory, file_name = os.path.split(img_path)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{file_name}.", suffix=".tmp", dir=directory)
+    os.close(fd)
+    return tmp_path
+
+
+def _rotate_jpeg_lossless(img_path: str, clockwise_degrees: int, tmp_path: str) -> bool:
+    """
+    Lossless rotation with jpegtran. '-perfect' refuses images whose size is not a
+    multiple of the MCU block (instead of trimming edge pixels); returns False then.
+    """
+    if not JPEGTRAN_PATH:
+        return False
+    result = subprocess.run(
+        [JPEGTRAN_PATH, "-rotate", str(clockwise_degrees), "-perfect", "-copy", "all",
+         "-outfile", tmp_path, img_path],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    return result.returncode == 0 and os.path.getsize(tmp_path) > 0
+
+
+def _reset_jpeg_orientation(jpeg_path: str) -> None:
+    """
+    Sets the EXIF Orientation tag (0x0112) of a JPEG to 1 in place, without re-encoding.
+    jpegtran -copy all keeps the source tag, which would make viewers rotate the
+    already-rotated pixels again.
+    """
+    with open(jpeg_path, "r+b") as f:
+        if f.read(2) != b"\xff\xd8":
+            return
+        while True:
+            header = f.read(4)
+            if len(header) < 4 or header[0] != 0xFF or header[1] == 0xDA: # End of headers (SOS)
+                return
+            start, length = f.tell(), int.from_bytes(header[2:4], "big")
+            if header[1] == 0xE1:
+                data = f.read(length - 2)
+                if data[:6] == b"Exif\x00\x00":
+                    tiff = data[6:]
+                    order = "big" if tiff[:2] == b"MM" else "little"
+                    ifd0 = int.from_bytes(tiff[4:8], order)
+                    for i in range(int.from_bytes(tiff[ifd0:ifd0 + 2], order)):
+                        entry = ifd0 + 2 + 12 * i
+                        if entry + 10 > len(tiff):
+                            return
+                        if int.from_bytes(tiff[entry:entry + 2], order) == 0x0112:
+                            f.seek(start + 6 + entry + 8) # SHORT value, left-justified in the entry
+                            f.write((1).to_bytes(2, order))
+                            return
+                    return
+            f.seek(start + length - 2)
+
+
+def rotate_image_file(img_path: str, angle_to_rotate: int) -> str:
+    """
+    Rotates one image in place (atomic replace). Returns the method used.
+
+    - JPEG + multiple of 90° + jpegtran available: lossless DCT rotation.
+    - Multiples of 90°: transpose() (pixel copy, no resampling).
+    - Other angles: rotate(expand=True), as before.
+    JPEG re-encodes reuse the source quantization tables and subsampling to minimise
+    generation loss.
+    """
+    tmp_path = _atomic_temp_path(img_path)
+    try:
+        fast = FAST_TRANSPOSES.get(angle_to_rotate)
+        with Image.open(img_path) as img:
+            img_format = img.format
+
+            if fast and img_format == "JPEG" and _rotate_jpeg_lossless(img_path, fast[1], tmp_path):
+                _reset_jpeg_orientation(tmp_path)
+                method = "sin pérdida (jpegtran)"
+            else:
+                img.load()
+                if fast:
+                    rotated_img = img.transpose(fast[0])
+                    method = "transpose"
+                else:
+                    rotated_img = img.rotate(angle_to_rotate, expand=True)
+                    method = "rotate"
+
+                save_params = {}
+                if img.info.get("icc_profile"):
+                    save_params["icc_profile"] = img.info["icc_profile"]
+                if img_format == "JPEG":
+                    save_params["qtables"] = img.quantization
+                    save_params["subsampling"] = JpegImagePlugin.get_sampling(img)
+                    if img.info.get("exif"):
+                        # The pixels are already rotated: the orientation tag must not rotate them again
+                        exif = img.getexif()
+                        if 0x0112 in exif:
+                            exif[0x0112] = 1
+                        save_params["exif"] = exif.tobytes()
+                rotated_img.save(tmp_path, format=img_format, **save_params)
+
+        os.replace(tmp_path, img_path)
+        return method
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
 # --- Worker function for image rotation (runs in a separate thread) ---
 def rotation_worker(directory_path: str, angle_to_rotate: int, update_queue: queue.Queue):
     """
-    Scans for images and rotates them, sending updates via the queue.
+    Scans for images and rotates them in a process pool, sending updates via the queue.
     """
     image_paths = []
     errors_list = []
@@ -54,27 +185,29 @@ def rotation_worker(directory_path: str, angle_to_rotate: int, update_queue: que
 
     update_queue.put(("progress_max", total_images))
     update_queue.put(("log", f"Se encontraron {total_images} imágenes para rotar."))
+    if not JPEGTRAN_PATH:
+        update_queue.put(("log", "jpegtran no encontrado: los JPEG se re-codificarán con sus tablas de cuantización originales."))
     
     processed_count = 0
-    for idx, img_path in enumerate(image_paths, start=1):
-        update_queue.put(("status", f"Procesando: {os.path.basename(img_path)} ({idx}/{total_images})"))
-        try:
-            with Image.open(img_path) as img:
-                # Ensure image is loaded before closing file, especially for formats that load lazily
-                img.load() 
-                # Rotate the image. expand=True ensures the entire rotated image is visible.
-                rotated_img = img.rotate(angle_to_rotate, expand=True)
-                # Overwrite the original file with the rotated image
-                # Make sure to save with original format if possible, or handle format-specific options
-                # For simplicity, Pillow's save usually infers format from extension or uses original if not specified.
-                rotated_img.save(img_path) # This will try to save in the original format
-            processed_count += 1
-        except Exception as e:
-            error_msg = f"Error procesando '{img_path}': {e}"
-            errors_list.append(error_msg)
-            update_queue.put(("log", error_msg)) # Log individual errors
-        
-        update_queue.put(("progress_value", idx))
+    try:
+        with ProcessPoolExecutor(max_workers=min(MAX_WORKERS, total_images)) as executor:
+            futures = {executor.submit(rotate_image_file, img_path, angle_to_rotate): img_path
+                       for img_path in image_paths}
+            for idx, future in enumerate(as_completed(futures), start=1):
+                img_path = futures[future]
+                update_queue.put(("status", f"Procesado: {os.path.basename(img_path)} ({idx}/{total_images})"))
+                try:
+                    future.result()
+                    processed_count += 1
+                except Exception as e:
+                    error_msg = f"Error procesando '{img_path}': {e}"
+                    errors_list.append(error_msg)
+                    update_queue.put(("log", error_msg)) # Log individual errors
+                update_queue.put(("progress_value", idx))
+    except Exception as e:
+        error_msg = f"Error en el pool de rotación: {e}"
+        errors_list.append(error_msg)
+        update_queue.put(("log", error_msg))
 
     update_queue.put(("finished", {
         'total': total_images, 
@@ -297,5 +430,6 @@ class ImageRotatorBatchApp(ttk.Window):
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     app = ImageRotatorBatchApp()
     app.mainloop()
\ No newline at end of file
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests de la rotación de imágenes (RotateImg.py).
+
+Verifica que:
+1. Un JPEG con Orientation=6 rotado 90° queda con los píxeles girados y Orientation=1
+2. La ruta sin pérdida (jpegtran -copy all) también deja Orientation=1
+3. La corrección de la etiqueta sobre el JPEG no toca los píxeles
+
+Uso:
+    python3 -m pytest test_rotateimg.py
+"""
+
+import os
+import shutil
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+pytest.importorskip("ttkbootstrap")
+Image = pytest.importorskip("PIL.Image")
+
+import RotateImg
+
+ORIENTATION = 0x0112
+
+
+def _jpeg_con_orientacion(ruta, orientacion=6, tamano=(64, 32)):
+    exif = Image.Exif()
+    exif[ORIENTATION] = orientacion
+    exif[0x010F] = "Camara"  # Make: otra etiqueta que se debe conservar
+    Image.linear_gradient("L").resize(tamano).convert("RGB").save(ruta, quality=90, exif=exif.tobytes())
+
+
+@pytest.mark.parametrize("con_jpegtran", [False, True], ids=["recodificado", "jpegtran"])
+def test_rotar_90_normaliza_orientacion(tmp_path, monkeypatch, con_jpegtran):
+    if con_jpegtran and not shutil.which("jpegtran"):
+        pytest.skip("jpegtran no instalado")
+    if not con_jpegtran:
+        monkeypatch.setattr(RotateImg, "JPEGTRAN_PATH", None)
+    ruta = tmp_path / "foto.jpg"
+    _jpeg_con_orientacion(ruta)
+
+    RotateImg.rotate_image_file(str(ruta), 90)
+
+    with Image.open(ruta) as img:
+        assert img.size == (32, 64)
+        exif = img.getexif()
+        assert exif.get(ORIENTATION) == 1
+        assert exif.get(0x010F) == "Camara"
+
+
+def test_ruta_sin_perdida_normaliza_orientacion(tmp_path, monkeypatch):
+    def jpegtran_simulado(img_path, clockwise_degrees, tmp_path):
+        # Como jpegtran -copy all: píxeles rotados y la etiqueta de origen intacta
+        with Image.open(img_path) as img:
+            img.transpose(Image.Transpose.ROTATE_270).save(tmp_path, format="JPEG", exif=img.info["exif"])
+        return True
+
+    monkeypatch.setattr(RotateImg, "_rotate_jpeg_lossless", jpegtran_simulado)
+    ruta = tmp_path / "foto.jpg"
+    _jpeg_con_orientacion(ruta)
+
+    assert RotateImg.rotate_image_file(str(ruta), 90) == "sin pérdida (jpegtran)"
+
+    with Image.open(ruta) as img:
+        assert img.size == (32, 64)
+        assert img.getexif().get(ORIENTATION) == 1
+
+
+@pytest.mark.parametrize("orden", ["little", "big"])
+def test_reset_orientacion_sin_recodificar(tmp_path, orden):
+    ruta = tmp_path / "foto.jpg"
+    _jpeg_con_orientacion(ruta)
+    if orden == "big":
+        # Pillow escribe EXIF little-endian: se reescribe con un TIFF big-endian equivalente
+        with Image.open(ruta) as img:
+            pixeles = img.copy()
+        exif = b"Exif\x00\x00MM\x00\x2a\x00\x00\x00\x08\x00\x01\x01\x12\x00\x03\x00\x00\x00\x01\x00\x06\x00\x00\x00\x00\x00\x00"
+        pixeles.save(ruta, quality=90, exif=exif)
+    antes = ruta.read_bytes()
+
+    RotateImg._reset_jpeg_orientation(str(ruta))
+
+    despues = ruta.read_bytes()
+    assert len(despues) == len(antes)
+    assert sum(a != b for a, b in zip(antes, despues)) == 1  # Solo el valor de la etiqueta
+    with Image.open(ruta) as img:
+        assert img.getexif().get(ORIENTATION) == 1
@@ -4,12 +4,7 @@ import tkinter as tk
 from tkinter import messagebox, filedialog, scrolledtext # Importar scrolledtext
 import threading
 import queue # Importar queue para comunicación entre hilos
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin
-import time
-import random
-from PIL import Image
-import io
+from descargador import DescargadorImagenes
 
 # Deshabilitar advertencias de SSL
 import urllib3
@@ -25,41 +20,6 @@ log_queue = queue.Queue()
 # Variable global para almacenar la ruta de la carpeta seleccionada
 carpeta_seleccionada = ""
 
-# Lista de User-Agents para rotar y evitar detección
-user_agents = [
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/92.0.4515.107 Safari/537.36',
-    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:89.0) Gecko/20100101 Firefox/89.0'
-]
-
-def hacer_request_con_reintentos(url, headers, max_intentos=3):
-    """Realiza requests con reintentos y backoff exponencial"""
-    for intento in range(max_intentos):
-        try:
-            response = requests.get(url, headers=headers, verify=False, timeout=15)
-            if response.status_code == 429:  # Too Many Requests
-                delay = (2 ** intento) + random.uniform(0, 1)  # Backoff exponencial
-                time.sleep(delay)
-                continue
-            response.raise_for_status()
-            return response
-        except requests.exceptions.RequestException as e:
-            if intento == max_intentos - 1:  # Último intento
-                raise e
-            time.sleep(2 ** intento)  # Delay antes del siguiente intento
-    return None
-
-def validar_imagen(contenido_imagen):
-    """Valida que la imagen descargada no esté corrupta"""
-    try:
-        imagen = Image.open(io.BytesIO(contenido_imagen))
-        imagen.verify()  # Verifica la integridad
-        return True
-    except Exception:
-        return False
-
 def seleccionar_carpeta():
     """Abre un diálogo para que el usuario seleccione una carpeta."""
     global carpeta_seleccionada
@@ -88,81 +48,21 @@ def descargar_imagenes(url, carpeta_destino, nombre_carpeta, q):
         q.put(f"📁 Carpeta creada: {carpeta_final}\n")
 
         q.put(f"ℹ️ Conectando a: {url}...\n")
-        headers = {
-            'User-Agent': random.choice(user_agents)
-        }
-        
-        # Usar función de reintentos para la página principal
-        respuesta = hacer_request_con_reintentos(url, headers)
-
-        soup = BeautifulSoup(respuesta.text, 'html.parser')
-        etiquetas_img = soup.find_all('img')
+        descargador = DescargadorImagenes(carpeta_final, log=q.put)
+        try:
+            stats = descargador.descargar(url)
+        finally:
+            descargador.cerrar()
 
-        if not etiquetas_img:
+        if stats['encontradas'] == 0:
             q.put("ℹ️ No se encontraron imágenes para descargar.\n")
             return
 
-        q.put(f"✅ Se encontraron {len(etiquetas_img)} imágenes. Iniciando descarga con protección anti-rate-limit...\n")
-        
-        exitos = 0
-        for i, img in enumerate(etiquetas_img):
-            src = img.get('src')
-            if src:
-                url_imagen = urljoin(url, src)
-                try:
-                    q.put(f"   ({i+1}/{len(etiquetas_img)}) Descargando {os.path.basename(url_imagen)}...\n")
-                    
-                    # Delay entre descargas para evitar rate limiting
-                    if i > 0:  # No hacer delay en la primera imagen
-                        delay = random.uniform(1, 3)  # Delay aleatorio entre 1-3 segundos
-                        time.sleep(delay)
-                    
-                    # Rotar User-Agent para cada imagen
-                    headers['User-Agent'] = random.choice(user_agents)
-                    
-                    # Usar función de reintentos para descargar imagen
-                    respuesta_imagen = hacer_request_con_reintentos(url_imagen, headers, max_intentos=2)
-                    if respuesta_imagen is None:
-                        q.put(f"   ❌ Error: No se pudo descargar {os.path.basename(url_imagen)} después de varios intentos\n")
-                        continue
-                    
-                    contenido_imagen = respuesta_imagen.content
-                    
-                    # Validar que la imagen no esté corrupta
-                    if not validar_imagen(contenido_imagen):
-                        q.put(f"   ⚠️ Imagen corrupta detectada: {os.path.basename(url_imagen)}, omitiendo...\n")
-                        continue
-                    
-                    nombre_base = os.path.basename(url_imagen).split('?')[0]
-                    if not nombre_base or len(nombre_base) > 100:
-                        extension = os.path.splitext(url_imagen)[1].split('?')[0]
-                        nombre_base = f"imagen_{i+1}{extension or '.jpg'}"
-                    
-                    nombre_imagen = os.path.join(carpeta_final, nombre_base)
-                    
-                    with open(nombre_imagen, 'wb') as f:
-                        f.write(contenido_imagen)
-                    
-                    # Verificar que el archivo se guardó correctamente
-                    if os.path.exists(nombre_imagen) and os.path.getsize(nombre_imagen) > 0:
-                        exitos += 1
-                        q.put(f"   ✅ Guardado: {os.path.basename(nombre_imagen)}\n")
-                    else:
-                        q.put(f"   ❌ Error al guardar {os.path.basename(nombre_imagen)}\n")
-                        
-                except requests.exceptions.Timeout:
-                    q.put(f"   ⏱️ Timeout al descargar {os.path.basename(url_imagen)}\n")
-                except requests.exceptions.RequestException as e:
-                    if "429" in str(e):
-                        q.put(f"   🚫 Rate limit detectado para {os.path.basename(url_imagen)}, esperando...\n")
-                        time.sleep(5)  # Espera adicional para rate limiting
-                    else:
-                        q.put(f"   ❌ Error de conexión: {os.path.basename(url_imagen)}: {e}\n")
-                except Exception as e:
-                    q.put(f"   ❌ Error inesperado: {os.path.basename(url_imagen)}: {e}\n")
-        
+        exitos = stats['ok']
         if exitos > 0:
-            q.put(f"\n🎉 ¡Descarga Finalizada! Se guardaron {exitos} de {len(etiquetas_img)} imágenes exitosamente.\n")
+            q.put(f"\n🎉 ¡Descarga Finalizada! Se guardaron {exitos} de {stats['encontradas']} imágenes exitosamente.\n")
+            if stats['duplicada']:
+                q.put(f"♻️ {stats['duplicada']} imágenes duplicadas omitidas.\n")
         else:
             q.put(f"\n⚠️ Descarga terminada pero no se pudo guardar ninguna imagen. Verifica la conexión y la URL.\n")
 
@@ -0,0 +1,289 @@
+"""
+Motor de descarga de imágenes para el Scrapper.
+
+- Extrae URLs de <img>/<source> incluyendo srcset (se elige la mayor resolución)
+  y atributos de carga diferida (data-src, data-lazy-src, data-original, ...).
+- Descarga en paralelo con una sesión HTTP compartida (keep-alive y pool de
+  conexiones), un límite de descargas simultáneas por host y un token bucket
+  por host en lugar de pausas fijas entre imágenes.
+- Cada imagen se escribe a disco por streaming; se valida leyendo solo el
+  encabezado con PIL y se descartan duplicados por URL y por hash de contenido.
+"""
+
+import hashlib
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse
+
+import requests
+from bs4 import BeautifulSoup
+from PIL import Image
+from requests.adapters import HTTPAdapter
+
+# Atributos donde los sitios suelen poner la URL real con lazy-loading
+LAZY_SRC_ATTRS = ("data-src", "data-lazy-src", "data-original", "data-url", "data-lazy", "data-hi-res-src")
+LAZY_SRCSET_ATTRS = ("srcset", "data-srcset", "data-lazy-srcset")
+
+MAX_WORKERS = 8
+MAX_POR_HOST = 4            # Descargas simultáneas por host
+TASA_POR_HOST = 2.0         # Peticiones por segundo sostenidas por host
+RAFAGA_POR_HOST = 4         # Peticiones permitidas en ráfaga
+CHUNK_SIZE = 64 * 1024
+MAX_INTENTOS = 3
+
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/92.0.4515.107 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:89.0) Gecko/20100101 Firefox/89.0'
+]
+
+
+class TokenBucket:
+    """Limitador de tasa: `tasa` tokens por segundo con capacidad de ráfaga `capacidad`."""
+
+    def __init__(self, tasa, capacidad):
+        self.tasa = tasa
+        self.capacidad = capacidad
+        self.tokens = capacidad
+        self.ultimo = time.monotonic()
+        self.lock = threading.Lock()
+
+    def penalizar(self, segundos):
+        """Vacía el bucket por `segundos` (p. ej. ante un 429 con Retry-After)."""
+        with self.lock:
+            self.tokens = -segundos * self.tasa
+            # Sin esto, el próximo adquirir() acreditaría el tiempo previo a la penalización
+            self.ultimo = time.monotonic()
+
+    def adquirir(self):
+        while True:
+            with self.lock:
+                ahora = time.monotonic()
+                self.tokens = min(self.capacidad, self.tokens + (ahora - self.ultimo) * self.tasa)
+                self.ultimo = ahora
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                espera = (1 - self.tokens) / self.tasa
+            time.sleep(espera)
+
+
+def _mejor_candidato_srcset(srcset):
+    """Devuelve la URL de mayor resolución de un srcset ('a.jpg 480w, b.jpg 1080w' o '1x/2x')."""
+    mejor_url, mejor_peso = None, -1.0
+    for candidato in srcset.split(","):
+        partes = candidato.strip().split()
+        if not partes:
+            continue
+        peso = 1.0
+        if len(partes) > 1:
+            descriptor = partes[1].lower()
+            try:
+                peso = float(descriptor[:-1]) if descriptor[-1] in "wx" else 1.0
+            except (ValueError, IndexError):
+                peso = 1.0
+        if peso > mejor_peso:
+            mejor_url, mejor_peso = partes[0], peso
+    return mejor_url
+
+
+def extraer_urls_imagenes(html, url_base):
+    """URLs absolutas de imágenes de la página, sin duplicados y en orden de aparición."""
+    soup = BeautifulSoup(html, 'html.parser')
+    urls = []
+    vistas = set()
+
+    def agregar(valor):
+        if not valor:
+            return
+        valor = valor.strip()
+        if not valor or valor.startswith("data:"):
+            return
+        absoluta = urljoin(url_base, valor)
+        if absoluta not in vistas:
+            vistas.add(absoluta)
+            urls.append(absoluta)
+
+    for etiqueta in soup.find_all(['img', 'source']):
+        candidato = None
+        for atributo in LAZY_SRCSET_ATTRS:
+            if etiqueta.get(atributo):
+                candidato = _mejor_candidato_srcset(etiqueta[atributo])
+                break
+        if not candidato:
+            candidato = next((etiqueta.get(a) for a in LAZY_SRC_ATTRS if etiqueta.get(a)), None)
+        if not candidato and etiqueta.name == 'img':
+            candidato = etiqueta.get('src')
+        agregar(candidato)
+    return urls
+
+
+def _nombre_archivo(url_imagen, indice):
+    nombre_base = os.path.basename(urlparse(url_imagen).path)
+    if not nombre_base or len(nombre_base) > 100:
+        extension = os.path.splitext(urlparse(url_imagen).path)[1]
+        nombre_base = f"imagen_{indice}{extension or '.jpg'}"
+    return nombre_base
+
+
+class DescargadorImagenes:
+    """Descarga concurrente y respetuosa de las imágenes de una página."""
+
+    def __init__(self, carpeta_final, log=print, max_workers=MAX_WORKERS, max_por_host=MAX_POR_HOST,
+                 tasa_por_host=TASA_POR_HOST, rafaga_por_host=RAFAGA_POR_HOST, verify=False):
+        self.carpeta_final = carpeta_final
+        self.log = log
+        self.max_workers = max_workers
+        self.max_por_host = max_por_host
+        self.tasa_por_host = tasa_por_host
+        self.rafaga_por_host = rafaga_por_host
+        self.verify = verify
+
+        # Sesión compartida: keep-alive y pool de conexiones por host
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-Agent'] = random.choice(USER_AGENTS)
+
+        self._hosts = {}
+        self._hosts_lock = threading.Lock()
+        self._hashes = set()
+        self._nombres = set()
+        self._archivo_lock = threading.Lock()
+
+    def _limites_host(self, url):
+        host = urlparse(url).netloc
+        with self._hosts_lock:
+            if host not in self._hosts:
+                self._hosts[host] = (
+                    threading.BoundedSemaphore(self.max_por_host),
+                    TokenBucket(self.tasa_por_host, self.rafaga_por_host)
+                )
+            return self._hosts[host]
+
+    def _get(self, url, stream=False):
+        """GET con token bucket por host y reintentos (429 respeta Retry-After, 5xx con backoff)."""
+        _, bucket = self._limites_host(url)
+        for intento in range(MAX_INTENTOS):
+            bucket.adquirir()
+            try:
+                respuesta = self.session.get(url, verify=self.verify, timeout=15, stream=stream)
+            except requests.exceptions.RequestException:
+                if intento == MAX_INTENTOS - 1:
+                    raise
+                time.sleep(2 ** intento)
+                continue
+
+            if respuesta.status_code == 429 or respuesta.status_code >= 500:
+                respuesta.close()
+                if intento == MAX_INTENTOS - 1:
+                    respuesta.raise_for_status()
+                retry_after = respuesta.headers.get('Retry-After', '')
+                espera = float(retry_after) if retry_after.isdigit() else (2 ** intento) + random.uniform(0, 1)
+                bucket.penalizar(espera)
+                continue
+
+            respuesta.raise_for_status()
+            return respuesta
+        return None
+
+    def descargar_pagina(self, url):
+        respuesta = self._get(url)
+        return extraer_urls_imagenes(respuesta.text, respuesta.url or url)
+
+    def _ruta_unica(self, nombre):
+        """Evita sobrescribir imágenes distintas con el mismo nombre (sufijo _1, _2...)."""
+        base, extension = os.path.splitext(nombre)
+        candidato, contador = nombre, 1
+        while candidato in self._nombres or os.path.exists(os.path.join(self.carpeta_final, candidato)):
+            candidato = f"{base}_{contador}{extension}"
+            contador += 1
+        self._nombres.add(candidato)
+        return os.path.join(self.carpeta_final, candidato)
+
+    def descargar_imagen(self, url_imagen, indice):
+        """
+        Descarga una imagen por streaming. Retorna 'ok', 'duplicada' o 'corrupta'.
+        Lanza requests.exceptions.RequestException ante errores de red.
+        """
+        semaforo, _ = self._limites_host(url_imagen)
+        ruta_temporal = os.path.join(self.carpeta_final, f".descarga_{indice}_{threading.get_ident()}.part")
+        with semaforo:
+            respuesta = self._get(url_imagen, stream=True)
+            digest = hashlib.sha256()
+            try:
+                with open(ruta_temporal, 'wb') as f:
+                    for bloque in respuesta.iter_content(CHUNK_SIZE):
+                        digest.update(bloque)
+                        f.write(bloque)
+            finally:
+                respuesta.close()
+
+        try:
+            # Validación solo de encabezado: Image.open no decodifica los píxeles
+            try:
+                with Image.open(ruta_temporal) as imagen:
+                    imagen.size
+            except Exception:
+                return 'corrupta'
+
+            with self._archivo_lock:
+                hash_contenido = digest.hexdigest()
+                if hash_contenido in self._hashes:
+                    return 'duplicada'
+                self._hashes.add(hash_contenido)
+                ruta_final = self._ruta_unica(_nombre_archivo(url_imagen, indice))
+                os.replace(ruta_temporal, ruta_final)
+            return 'ok'
+        finally:
+            if os.path.exists(ruta_temporal):
+                os.remove(ruta_temporal)
+
+    def descargar(self, url):
+        """Descarga todas las imágenes de la página. Retorna estadísticas de la ejecución."""
+        os.makedirs(self.carpeta_final, exist_ok=True)
+        urls = self.descargar_pagina(url)
+        stats = {'encontradas': len(urls), 'ok': 0, 'duplicada': 0, 'corrupta': 0, 'error': 0}
+        if not urls:
+            return stats
+
+        self.log(f"✅ Se encontraron {len(urls)} imágenes únicas. Descargando con hasta "
+                 f"{self.max_por_host} conexiones por host...\n")
+        lock_stats = threading.Lock()
+
+        def tarea(args):
+            indice, url_imagen = args
+            nombre = os.path.basename(urlparse(url_imagen).path) or url_imagen
+            try:
+                resultado = self.descargar_imagen(url_imagen, indice)
+            except requests.exceptions.Timeout:
+                resultado = 'error'
+                self.log(f"   ⏱️ Timeout al descargar {nombre}\n")
+            except requests.exceptions.RequestException as e:
+                resultado = 'error'
+                self.log(f"   ❌ Error de conexión: {nombre}: {e}\n")
+            except Exception as e:
+                resultado = 'error'
+                self.log(f"   ❌ Error inesperado: {nombre}: {e}\n")
+            else:
+                if resultado == 'ok':
+                    self.log(f"   ✅ Guardado: {nombre}\n")
+                elif resultado == 'duplicada':
+                    self.log(f"   ♻️ Duplicada (mismo contenido): {nombre}, omitiendo...\n")
+                else:
+                    self.log(f"   ⚠️ Imagen corrupta detectada: {nombre}, omitiendo...\n")
+            with lock_stats:
+                stats[resultado] += 1
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            list(executor.map(tarea, enumerate(urls, start=1)))
+        return stats
+
+    def cerrar(self):
+        self.session.close()
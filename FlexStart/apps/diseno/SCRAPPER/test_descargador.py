@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Tests del motor de descarga del Scrapper (descargador.py) contra un servidor HTTP local.
+
+Verifica que:
+1. Se extraen URLs de src, srcset (mayor resolución) y atributos lazy-load
+2. Las imágenes se guardan en disco y se omiten duplicados por contenido
+3. Las respuestas que no son imágenes se descartan como corruptas
+4. El limitador de tasa respeta la tasa y la penalización completa (Retry-After)
+
+Uso:
+    python3 -m pytest test_descargador.py
+"""
+
+import io
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+pytest.importorskip("requests")
+pytest.importorskip("bs4")
+Image = pytest.importorskip("PIL.Image")
+
+import descargador
+
+
+def _png(color):
+    buffer = io.BytesIO()
+    Image.new("RGB", (4, 4), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+ROJO = _png((255, 0, 0))
+AZUL = _png((0, 0, 255))
+
+PAGINA = b"""
+<html><body>
+  <img src="/img/rojo.png">
+  <img src="data:image/gif;base64,R0lGOD" data-src="/img/azul.png">
+  <img srcset="/img/chica.png 320w, /img/copia_rojo.png 1080w">
+  <img src="/img/rojo.png">
+  <img src="/img/rota.png">
+</body></html>
+"""
+
+RECURSOS = {
+    "/": (b"text/html", PAGINA),
+    "/img/rojo.png": (b"image/png", ROJO),
+    "/img/azul.png": (b"image/png", AZUL),
+    "/img/copia_rojo.png": (b"image/png", ROJO),
+    "/img/rota.png": (b"image/png", b"esto no es una imagen"),
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self):
+        if self.path not in RECURSOS:
+            self.send_error(404)
+            return
+        content_type, body = RECURSOS[self.path]
+        self.send_response(200)
+        self.send_header("Content-Type", content_type.decode())
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def servidor():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_extrae_src_srcset_y_lazy():
+    urls = descargador.extraer_urls_imagenes(PAGINA.decode(), "http://sitio/")
+    assert urls == [
+        "http://sitio/img/rojo.png",
+        "http://sitio/img/azul.png",
+        "http://sitio/img/copia_rojo.png",
+        "http://sitio/img/rota.png",
+    ]
+
+
+def test_descarga_con_dedupe_y_validacion(servidor, tmp_path):
+    mensajes = []
+    motor = descargador.DescargadorImagenes(str(tmp_path), log=mensajes.append, tasa_por_host=100, rafaga_por_host=10)
+    try:
+        stats = motor.descargar(servidor + "/")
+    finally:
+        motor.cerrar()
+
+    assert stats == {'encontradas': 4, 'ok': 2, 'duplicada': 1, 'corrupta': 1, 'error': 0}
+    guardadas = sorted(os.listdir(tmp_path))
+    assert len(guardadas) == 2
+    assert "azul.png" in guardadas
+    assert not any(nombre.endswith(".part") for nombre in guardadas)
+
+
+def test_token_bucket_limita_la_tasa():
+    bucket = descargador.TokenBucket(tasa=50, capacidad=1)
+    inicio = time.monotonic()
+    for _ in range(6):
+        bucket.adquirir()
+    # 1 token inicial + 5 a 50/s => al menos ~0.1 s
+    assert time.monotonic() - inicio >= 0.09
+
+
+def test_token_bucket_penalizacion_completa():
+    bucket = descargador.TokenBucket(tasa=2, capacidad=1)
+    bucket.adquirir()
+    # Tiempo transcurrido antes de la penalización: no debe descontarse de ella
+    time.sleep(0.3)
+    bucket.penalizar(0.5)
+    inicio = time.monotonic()
+    bucket.adquirir()
+    # -1 token a 2/s => 0.5 s para volver a 0 más 0.5 s para tener 1 token
+    assert time.monotonic() - inicio >= 0.95
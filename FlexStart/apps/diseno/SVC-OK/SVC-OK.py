@@ -1,7 +1,5 @@
 import sys
 import os
-import shutil
-import pandas as pd
 import threading
 import queue # Para comunicación entre hilos
 
@@ -10,6 +8,15 @@ from tkinter import filedialog, messagebox
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from ttkbootstrap.scrolled import ScrolledText
+
+# Módulos compartidos de las apps de diseño (apps/diseno)
+_diseno_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _diseno_dir not in sys.path:
+    sys.path.insert(0, _diseno_dir)
+
+from motor_transferencia import MotorTransferencia, ItemTransferencia, MODO_MOVER, CONFLICTO_OMITIR
+from planillas import leer_planilla
+
 # Función de tema compatible multiplataforma
 def setup_theme(window=None):
     import ttkbootstrap as ttk
@@ -50,9 +57,9 @@ class FolderMoverThread(threading.Thread):
     def run(self):
         try:
             self.ui_queue.put(("log", 'Leyendo planilla...'))
-            # Leer solo la columna necesaria y convertir a string para asegurar compatibilidad
-            df = pd.read_excel(self.planilla_path, usecols=['Composición Producto'], dtype={'Composición Producto': str})
-            valid_items_from_excel = set(df['Composición Producto'].dropna().str.strip())
+            # Leer solo la columna necesaria como texto (caché por contenido en ~/.cache/planillas)
+            planilla = leer_planilla(self.planilla_path, ['Composición Producto'], como_texto=True)
+            valid_items_from_excel = set(planilla.valores('Composición Producto'))
 
             self.ui_queue.put(("log", f'Planilla leída. {len(valid_items_from_excel)} elementos válidos encontrados.'))
 
@@ -66,36 +73,46 @@ class FolderMoverThread(threading.Thread):
             total_folders_to_check = len(items_in_src_dir)
             self.ui_queue.put(("log", f'Se analizarán {total_folders_to_check} carpetas en {self.src_dir}'))
 
-            moved_count = 0
-            processed_count = 0
-
-            for i, folder_name in enumerate(items_in_src_dir, 1):
-                if self._stop_event.is_set():
-                    self.ui_queue.put(("log", "Proceso cancelado por el usuario."))
-                    self.ui_queue.put(("finished", False, "Proceso cancelado.")) # Indicar que no terminó ok
-                    return
-
-                processed_count = i
-                current_folder_path = os.path.join(self.src_dir, folder_name)
-
+            items = []
+            omitidos_lista = []
+            for folder_name in items_in_src_dir:
                 if folder_name not in valid_items_from_excel:
-                    msg = f'Moviendo {folder_name}...'
-                    self.ui_queue.put(("log", msg))
-                    destination_folder_path = os.path.join(self.dst_dir, folder_name)
-                    try:
-                        if os.path.exists(destination_folder_path):
-                            self.ui_queue.put(("log", f'ADVERTENCIA: La carpeta "{folder_name}" ya existe en el destino. Omitiendo movimiento.'))
-                        else:
-                            shutil.move(current_folder_path, destination_folder_path)
-                            moved_count += 1
-                            self.ui_queue.put(("log", f'ÉXITO: "{folder_name}" movida a "{self.dst_dir}".'))
-                    except Exception as e:
-                        self.ui_queue.put(("log", f'ERROR moviendo "{folder_name}": {e}'))
+                    items.append(ItemTransferencia(os.path.join(self.src_dir, folder_name),
+                                                   os.path.join(self.dst_dir, folder_name)))
                 else:
-                    self.ui_queue.put(("log", f'Omitido "{folder_name}" (en lista de "Composición Producto").'))
+                    omitidos_lista.append(f'Omitido "{folder_name}" (en lista de "Composición Producto").')
+            if omitidos_lista:
+                self.ui_queue.put(("log", "\n".join(omitidos_lista)))
 
+            moved_count = 0
+            processed_count = len(omitidos_lista)
+
+            def al_progreso(lote, hechos, total):
+                nonlocal moved_count, processed_count
+                lineas = []
+                for item, estado, detalle in lote:
+                    if estado == "ok":
+                        moved_count += 1
+                        lineas.append(f'ÉXITO: "{item.etiqueta}" movida a "{self.dst_dir}".')
+                    elif estado == "omitido":
+                        lineas.append(f'ADVERTENCIA: La carpeta "{item.etiqueta}" ya existe en el destino. Omitiendo movimiento.')
+                    elif estado == "error":
+                        lineas.append(f'ERROR moviendo "{item.etiqueta}": {detalle}')
+                processed_count += len(lote)
+                if lineas:
+                    self.ui_queue.put(("log", "\n".join(lineas)))
                 self.ui_queue.put(("progress", processed_count, total_folders_to_check))
 
+            # Motor compartido: rename directo si origen y destino están en el mismo disco
+            motor = MotorTransferencia(MODO_MOVER, conflicto=CONFLICTO_OMITIR, cancelado=self._stop_event.is_set)
+            self.ui_queue.put(("log", f'Moviendo {len(items)} carpetas...'))
+            motor.ejecutar(items, al_progreso=al_progreso)
+
+            if self._stop_event.is_set():
+                self.ui_queue.put(("log", "Proceso cancelado por el usuario."))
+                self.ui_queue.put(("finished", False, "Proceso cancelado.")) # Indicar que no terminó ok
+                return
+
             final_message = f'Proceso completado. Carpetas movidas: {moved_count} de {processed_count} analizadas (que no estaban en la lista).'
             self.ui_queue.put(("finished", True, final_message))
 
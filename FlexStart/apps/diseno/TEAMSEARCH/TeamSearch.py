@@ -2,11 +2,26 @@ import sys
 from pathlib import Path
 import tkinter as tk
 from tkinter import filedialog, messagebox
-import pandas as pd
 
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import (LEFT, RIGHT, X, Y, BOTH, VERTICAL, HORIZONTAL,
                                     DISABLED, NORMAL, END)
+
+from cache_bases import BaseReferencia, ColumnaFaltante, filtrar_planilla, guardar_tabla
+
+# Bases de referencia por país (carpeta docs junto al script o al ejecutable)
+if getattr(sys, 'frozen', False): # If running as a PyInstaller bundle
+    BASE_SCRIPT_DIR = Path(sys.executable).parent
+else: # If running as a normal script
+    BASE_SCRIPT_DIR = Path(__file__).parent
+DOCS_DIR = BASE_SCRIPT_DIR / "docs"
+BASE_FILES = {
+    "CHILE": DOCS_DIR / "CHILE.xlsx",
+    "PERU":  DOCS_DIR / "PERU.xlsx",
+    #"ESTUDIO PERU":  DOCS_DIR / "ESTUDIO_PERU.xlsx"
+}
+DEST_COL = "DEPTOS"
+
 # Función de tema compatible multiplataforma
 def setup_theme(window=None):
     import ttkbootstrap as ttk
@@ -38,21 +53,11 @@ class FiltradorApp:
         self.master.title("Identificador de diseñadores / redactores (TTKBootstrap)")
         self.master.geometry("550x250") # Adjusted geometry for the new widget
 
-        # Determine base directory (docs folder next to the script)
-        if getattr(sys, 'frozen', False): # If running as a PyInstaller bundle
-            self.base_script_dir = Path(sys.executable).parent
-        else: # If running as a normal script
-            self.base_script_dir = Path(__file__).parent
-        
-        self.docs_dir = self.base_script_dir / "docs"
-        
-        self.base_files = {
-            "CHILE": self.docs_dir / "CHILE.xlsx",
-            "PERU":  self.docs_dir / "PERU.xlsx",
-            #"ESTUDIO PERU":  self.docs_dir / "ESTUDIO_PERU.xlsx"
-        }
-        # Definimos aquí los nombres de columna:
-        self.dest_col   = "DEPTOS"
+        self.base_script_dir = BASE_SCRIPT_DIR
+        self.docs_dir = DOCS_DIR
+        self.base_files = BASE_FILES
+        self.dest_col = DEST_COL
+        self._bases = {}
 
         # Tkinter control variables
         self.filepath_var = tk.StringVar()
@@ -114,19 +119,11 @@ class FiltradorApp:
         if fname:
             self.filepath_var.set(fname)
 
-    def _read_df(self, path: Path):
-        ext = path.suffix.lower()
-        try:
-            if ext in (".xlsx", ".xls"):
-                return pd.read_excel(path)
-            elif ext == ".csv":
-                return pd.read_csv(path)
-            else:
-                # This case should ideally not be reached if file dialog filters are used,
-                # but good for robustness if path is set otherwise.
-                raise ValueError(f"Formato no soportado: {ext}")
-        except Exception as e:
-            raise ValueError(f"Error al leer el archivo {path.name}: {e}")
+    def _base(self, base_path: Path):
+        # Reference bases are converted once to a columnar cache and reused across clicks
+        if base_path not in self._bases:
+            self._bases[base_path] = BaseReferencia(base_path, self.dest_col)
+        return self._bases[base_path]
 
 
     def _generate(self):
@@ -170,32 +167,12 @@ class FiltradorApp:
             return
 
         try:
-            df_source = self._read_df(designer_path)
-            df_base   = self._read_df(base_path)
-
-            # Comprobamos existencia de columnas
-            if source_col_name not in df_source.columns:
-                messagebox.showerror(
-                    "Error de Columna",
-                    f"La columna requerida '{source_col_name}' no existe en tu planilla '{designer_path.name}'.",
-                    parent=self.master
-                )
-                return
-            if self.dest_col not in df_base.columns:
-                messagebox.showerror(
-                    "Error de Columna",
-                    f"La columna requerida '{self.dest_col}' no existe en el archivo base '{base_path.name}'.",
-                    parent=self.master
-                )
+            try:
+                out_df = filtrar_planilla(designer_path, source_col_name, self._base(base_path))
+            except ColumnaFaltante as e:
+                messagebox.showerror("Error de Columna", str(e), parent=self.master)
                 return
 
-            # Filtrado: valores de source_col (coddepto) contra dest_col (DEPTOS)
-            # Convert both columns to string before comparison to handle mixed types or numeric codes gracefully
-            valores_source = df_source[source_col_name].astype(str).dropna().unique()
-            df_base[self.dest_col] = df_base[self.dest_col].astype(str)
-            
-            out_df = df_base[df_base[self.dest_col].isin(valores_source)]
-
             if out_df.empty:
                 messagebox.showinfo("Resultado", "No se encontraron coincidencias para generar el reporte.", parent=self.master)
                 return
@@ -211,11 +188,11 @@ class FiltradorApp:
                 initialdir=initial_save_dir,
                 initialfile=default_save_name,
                 defaultextension=".xlsx",
-                filetypes=[("Excel", "*.xlsx"), ("Todos los archivos", "*.*")]
+                filetypes=[("Excel", "*.xlsx"), ("CSV", "*.csv"), ("Todos los archivos", "*.*")]
             )
             
             if save_fname:
-                out_df.to_excel(save_fname, index=False)
+                guardar_tabla(out_df, save_fname)
                 messagebox.showinfo(
                     "Listo",
                     f"Filtrado guardado exitosamente en:\n{save_fname}",
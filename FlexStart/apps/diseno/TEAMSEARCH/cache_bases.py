@@ -0,0 +1,193 @@
+"""
+Caché columnar de las bases de referencia de TeamSearch.
+
+Leer CHILE.xlsx / PERU.xlsx con pandas en cada clic es lo más lento del
+reporte. La primera vez que se usa una base se convierte a un archivo Parquet
+en ~/.cache/teamsearch/ cuyo nombre incluye el mtime y tamaño del Excel, así
+cualquier cambio en la base genera una copia nueva y las viejas se eliminan.
+
+El Parquet guarda, además de las columnas originales, la clave de búsqueda como
+texto (__clave) y la posición original de cada fila (__fila), ordenado por la
+clave y en grupos de filas pequeños: el filtrado lee solo la columna de claves
+para saber si hay coincidencias y luego solo los grupos de filas que las
+contienen (filtros de pyarrow), devolviendo las filas en el orden original.
+
+Sin pyarrow se usa un pickle de pandas y el filtrado se hace en memoria con un
+índice clave -> filas que se conserva mientras la app esté abierta.
+"""
+
+import hashlib
+import importlib.util
+import os
+from pathlib import Path
+
+import pandas as pd
+
+CACHE_DIR = Path(os.path.expanduser("~")) / ".cache" / "teamsearch"
+PARQUET_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+ROW_GROUP_SIZE = 5000
+COL_CLAVE = "__clave"
+COL_FILA = "__fila"
+
+# Claves e índices ya cargados en esta sesión: {ruta_sidecar: datos}
+_memoria = {}
+
+
+class ColumnaFaltante(ValueError):
+    """La columna clave no existe en la base de referencia o en la planilla a analizar."""
+
+
+def leer_tabla(path: Path, columnas=None):
+    """Lee un Excel o CSV; si se indican `columnas`, solo carga esas."""
+    ext = path.suffix.lower()
+    usecols = (lambda c: c in columnas) if columnas else None
+    if ext in (".xlsx", ".xls"):
+        return pd.read_excel(path, usecols=usecols)
+    elif ext == ".csv":
+        return pd.read_csv(path, usecols=usecols)
+    raise ValueError(f"Formato no soportado: {ext}")
+
+
+class BaseReferencia:
+    """Base de referencia (Excel/CSV) con caché columnar y búsqueda por clave."""
+
+    def __init__(self, origen: Path, columna_clave: str, cache_dir: Path = CACHE_DIR):
+        self.origen = Path(origen)
+        self.columna_clave = columna_clave
+        self.cache_dir = Path(cache_dir)
+
+    def _prefijo(self):
+        digest = hashlib.sha1(str(self.origen.resolve()).encode("utf-8")).hexdigest()[:8]
+        return f"{self.origen.stem}-{digest}-"
+
+    def _sidecar(self):
+        """Ruta del archivo en caché para la versión actual de la base; lo crea si falta."""
+        stat = self.origen.stat()
+        base = f"{self._prefijo()}{stat.st_mtime_ns}-{stat.st_size}"
+        for candidato in (self.cache_dir / f"{base}.parquet", self.cache_dir / f"{base}.pkl"):
+            if candidato.exists():
+                return candidato
+        return self._convertir(base)
+
+    def _convertir(self, base: str):
+        df = leer_tabla(self.origen)
+        if self.columna_clave not in df.columns:
+            raise ColumnaFaltante(
+                f"La columna requerida '{self.columna_clave}' no existe en el archivo base '{self.origen.name}'."
+            )
+        df[COL_FILA] = range(len(df))
+        df[COL_CLAVE] = df[self.columna_clave].astype(str)
+        df = df.sort_values(COL_CLAVE, kind="stable")
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        destino = None
+        if PARQUET_AVAILABLE:
+            destino = self.cache_dir / f"{base}.parquet"
+            temporal = destino.with_name(destino.name + ".tmp")
+            try:
+                df.to_parquet(temporal, index=False, row_group_size=ROW_GROUP_SIZE)
+            except Exception:
+                # Columnas con tipos mezclados que pyarrow no puede representar
+                temporal.unlink(missing_ok=True)
+                destino = None
+        if destino is None:
+            destino = self.cache_dir / f"{base}.pkl"
+            temporal = destino.with_name(destino.name + ".tmp")
+            df.to_pickle(temporal)
+        os.replace(temporal, destino)
+
+        # Versiones anteriores de la misma base
+        for viejo in self.cache_dir.glob(f"{self._prefijo()}*"):
+            if viejo != destino:
+                viejo.unlink(missing_ok=True)
+                _memoria.pop(str(viejo), None)
+        return destino
+
+    def _cargar(self, sidecar: Path):
+        """Claves (y en pickle, tabla e índice) del sidecar, con caché en memoria."""
+        clave = str(sidecar)
+        if clave not in _memoria:
+            if sidecar.suffix == ".parquet":
+                claves = pd.read_parquet(sidecar, columns=[COL_CLAVE])[COL_CLAVE]
+                _memoria[clave] = {"claves": set(claves.unique())}
+            else:
+                df = pd.read_pickle(sidecar)
+                _memoria[clave] = {"claves": set(df[COL_CLAVE].unique()), "df": df,
+                                   "indice": df.groupby(COL_CLAVE, sort=False).indices}
+        return _memoria[clave]
+
+    def filtrar(self, valores):
+        """Filas de la base cuya clave (como texto) está en `valores`, en el orden original."""
+        sidecar = self._sidecar()
+        datos = self._cargar(sidecar)
+        buscados = sorted(datos["claves"].intersection(str(v) for v in valores))
+        if not buscados:
+            return pd.DataFrame()
+
+        if "df" in datos:
+            posiciones = sorted(p for valor in buscados for p in datos["indice"][valor])
+            resultado = datos["df"].iloc[posiciones]
+        else:
+            resultado = pd.read_parquet(sidecar, filters=[(COL_CLAVE, "in", buscados)])
+        resultado = resultado.sort_values(COL_FILA)
+        # Igual que antes, la columna clave sale como texto
+        resultado[self.columna_clave] = resultado[COL_CLAVE]
+        return resultado.drop(columns=[COL_CLAVE, COL_FILA]).reset_index(drop=True)
+
+
+def filtrar_planilla(planilla: Path, columna: str, base: BaseReferencia):
+    """
+    Filas de `base` cuya clave está entre los valores de `columna` en `planilla`.
+
+    Raises:
+        ValueError si la planilla no se puede leer; ColumnaFaltante si le falta la columna.
+    """
+    planilla = Path(planilla)
+    # Only the requested column is parsed
+    try:
+        df_source = leer_tabla(planilla, [columna])
+    except Exception as e:
+        raise ValueError(f"Error al leer el archivo {planilla.name}: {e}")
+    if columna not in df_source.columns:
+        raise ColumnaFaltante(f"La columna requerida '{columna}' no existe en tu planilla '{planilla.name}'.")
+    # Both sides are compared as strings; the base lookup goes through its key index
+    return base.filtrar(df_source[columna].astype(str).dropna().unique())
+
+
+def guardar_tabla(df, path):
+    """Escribe el resultado: CSV, o Excel en streaming con xlsxwriter si está disponible."""
+    if str(path).lower().endswith(".csv"):
+        df.to_csv(path, index=False, encoding="utf-8-sig")
+    elif importlib.util.find_spec("xlsxwriter") is not None:
+        _guardar_xlsx_streaming(df, path)
+    else:
+        df.to_excel(path, index=False)
+
+
+def _guardar_xlsx_streaming(df, path, bloque=ROW_GROUP_SIZE):
+    """
+    Excel con xlsxwriter en modo constant_memory, escribiendo fila por fila.
+
+    constant_memory descarta cada fila al pasar a la siguiente, por eso no se usa
+    df.to_excel (pandas escribe columna por columna y se perderían datos).
+    """
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(str(path), {
+        "constant_memory": True,
+        "default_date_format": "yyyy-mm-dd hh:mm:ss",
+    })
+    try:
+        worksheet = workbook.add_worksheet("Sheet1")
+        # Mismo formato de encabezado que pandas
+        encabezado = workbook.add_format({"bold": True, "border": 1, "align": "center", "valign": "top"})
+        worksheet.write_row(0, 0, [str(c) for c in df.columns], encabezado)
+        fila = 1
+        for inicio in range(0, len(df), bloque):
+            parte = df.iloc[inicio:inicio + bloque]
+            # Faltantes como celda vacía y tipos numpy como tipos de Python
+            for valores in parte.astype(object).where(parte.notna(), None).itertuples(index=False):
+                worksheet.write_row(fila, 0, valores)
+                fila += 1
+    finally:
+        workbook.close()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tests de la caché de bases de TeamSearch (cache_bases.py).
+
+Verifica que:
+1. El Excel de resultados escrito en streaming se lee igual que el DataFrame original
+2. El filtrado por clave devuelve las filas en el orden original con la clave como texto
+
+Uso:
+    python3 -m pytest test_cache_bases.py
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("openpyxl")
+
+import cache_bases
+
+
+def test_guardar_tabla_xlsx_ida_y_vuelta(tmp_path):
+    pytest.importorskip("xlsxwriter")
+    df = pd.DataFrame({
+        "SKU": ["001", "002", "003"],
+        "NOMBRE": ["Polera", None, "Short"],
+        "STOCK": [5, 0, 12],
+    })
+    destino = tmp_path / "resultado.xlsx"
+
+    # Más filas que el bloque para cubrir el corte entre bloques
+    cache_bases._guardar_xlsx_streaming(df, destino, bloque=2)
+
+    leido = pd.read_excel(destino, dtype={"SKU": str})
+    assert list(leido.columns) == ["SKU", "NOMBRE", "STOCK"]
+    assert leido["SKU"].tolist() == ["001", "002", "003"]
+    assert leido["NOMBRE"].tolist()[0::2] == ["Polera", "Short"]
+    assert pd.isna(leido["NOMBRE"][1])
+    assert leido["STOCK"].tolist() == [5, 0, 12]
+
+
+def test_guardar_tabla_csv(tmp_path):
+    df = pd.DataFrame({"SKU": ["001"], "NOMBRE": ["Polera"]})
+    destino = tmp_path / "resultado.csv"
+    cache_bases.guardar_tabla(df, destino)
+    assert pd.read_csv(destino, dtype=str, encoding="utf-8-sig").equals(df)
+
+
+def test_filtrar_por_clave(tmp_path):
+    base = tmp_path / "CHILE.xlsx"
+    pd.DataFrame({"SKU": [30, 10, 20, 10], "NOMBRE": ["c", "a", "b", "a2"]}).to_excel(base, index=False)
+
+    resultado = cache_bases.BaseReferencia(base, "SKU", cache_dir=tmp_path / "cache").filtrar(["10", "30", "99"])
+
+    assert resultado["NOMBRE"].tolist() == ["c", "a", "a2"]
+    assert resultado["SKU"].tolist() == ["30", "10", "10"]
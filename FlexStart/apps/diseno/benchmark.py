@@ -0,0 +1,470 @@
+"""
+Benchmark de las herramientas de imágenes de diseño.
+
+- `generar`: crea un árbol sintético de productos: una carpeta por código con
+  imágenes base, _2, -1, -2..., en varios formatos, con una fracción fuera de
+  medida. También crea los logos de tallas y las planillas Excel que usan las
+  herramientas.
+- `medir`: ejecuta sin ventana el núcleo de cada herramienta sobre una copia
+  nueva del árbol, en un proceso aparte por repetición. Reporta imágenes por
+  segundo, RSS pico y tiempos por etapa como JSON, para comparar antes y
+  después de un cambio.
+
+Uso:
+    python benchmark.py generar /tmp/bench --productos 200 --imagenes 4
+    python benchmark.py medir /tmp/bench --repeticiones 3 --salida antes.json
+    python benchmark.py medir /tmp/bench --comparar antes.json
+
+Por defecto cada ejecución usa un HOME temporal, así las cachés de ~/.cache
+(calidades del compresor, dimensiones del validador, índice de MULTITAG...) no
+influyen. Con --con-cache se mide con las cachés del usuario.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+
+DISENO_DIR = os.path.dirname(os.path.abspath(__file__))
+if DISENO_DIR not in sys.path:
+    sys.path.insert(0, DISENO_DIR)
+
+import trabajos
+
+DATASET_VERSION = 1
+TALLAS = ("S", "M", "L", "XL")
+LOGO_COMPROMISO = "compromiso.png"
+CALIDAD = {"jpg": {"quality": 90}, "webp": {"quality": 90}, "png": {}}
+
+
+# --- Dataset sintético ---
+def nombre_imagen(codigo, posicion):
+    """Convención de las carpetas de producto: base, base_2, base-1, base-2..."""
+    if posicion == 0:
+        return codigo
+    if posicion == 1:
+        return f"{codigo}_2"
+    return f"{codigo}-{posicion - 1}"
+
+
+def _codigo(rng, nombres):
+    if nombres == "upc":
+        return "".join(rng.choice("0123456789") for _ in range(13))
+    return str(rng.randrange(10 ** 7, 10 ** 8))
+
+
+def _imagen_sintetica(tamano, semilla):
+    """Foto de producto sintética: degradado con ruido (no se comprime trivialmente) y figuras."""
+    from PIL import Image, ImageDraw
+    rng = random.Random(semilla)
+    gradiente = Image.linear_gradient("L")
+    imagen = Image.merge("RGB", (
+        gradiente.resize(tamano),
+        Image.effect_noise(tamano, rng.uniform(10, 40)),
+        gradiente.rotate(90).resize(tamano),
+    ))
+    dibujo = ImageDraw.Draw(imagen)
+    ancho, alto = tamano
+    for _ in range(rng.randint(2, 6)):
+        x0, y0 = rng.randrange(ancho // 2), rng.randrange(alto // 2)
+        caja = (x0, y0, x0 + rng.randrange(ancho // 8, ancho // 2), y0 + rng.randrange(alto // 8, alto // 2))
+        color = tuple(rng.randrange(256) for _ in range(3))
+        (dibujo.ellipse if rng.random() < 0.5 else dibujo.rectangle)(caja, fill=color)
+    return imagen
+
+
+def _guardar_imagen(ruta, tamano, semilla):
+    formato = os.path.splitext(ruta)[1][1:].lower()
+    _imagen_sintetica(tamano, semilla).save(ruta, **CALIDAD[formato])
+
+
+def _guardar_logo(ruta, tamano, texto_semilla):
+    """Logo RGBA transparente del mismo tamaño que las imágenes (como los de MULTITAG)."""
+    from PIL import Image, ImageDraw
+    rng = random.Random(texto_semilla)
+    logo = Image.new("RGBA", tamano, (0, 0, 0, 0))
+    ancho, alto = tamano
+    x0, y0 = rng.randrange(ancho // 2), rng.randrange(alto // 2)
+    ImageDraw.Draw(logo).rounded_rectangle(
+        (x0, y0, x0 + ancho // 5, y0 + alto // 10), radius=8,
+        fill=tuple(rng.randrange(256) for _ in range(3)) + (220,))
+    logo.save(ruta)
+
+
+def _escribir_planilla(ruta, columnas, filas):
+    """Excel si pandas está disponible; si no, CSV con el mismo nombre. Retorna el nombre usado."""
+    try:
+        import pandas as pd
+        pd.DataFrame(filas, columns=columnas).to_excel(ruta, index=False)
+        return os.path.basename(ruta)
+    except ImportError:
+        import csv
+        ruta = os.path.splitext(ruta)[0] + ".csv"
+        with open(ruta, "w", newline="", encoding="utf-8-sig") as f:
+            escritor = csv.writer(f)
+            escritor.writerow(columnas)
+            escritor.writerows(filas)
+        return os.path.basename(ruta)
+
+
+def generar_dataset(destino, productos=100, imagenes_por_producto=4, formatos=("jpg", "png", "webp"),
+                    tamano=(1000, 1000), nombres="sku", fuera_de_medida=0.1, semilla=1, workers=None):
+    """
+    Crea el dataset en `destino` (que debe no existir o estar vacío) y retorna sus metadatos,
+    que también se guardan en destino/dataset.json.
+    """
+    if os.path.isdir(destino) and os.listdir(destino):
+        raise FileExistsError(f"La carpeta de destino no está vacía: {destino}")
+    for formato in formatos:
+        if formato not in CALIDAD:
+            raise ValueError(f"Formato no soportado: {formato} (use {', '.join(CALIDAD)})")
+
+    rng = random.Random(semilla)
+    raiz_imagenes = os.path.join(destino, "imagenes")
+    carpeta_logos = os.path.join(destino, "logos")
+    os.makedirs(raiz_imagenes)
+    os.makedirs(carpeta_logos)
+    otro_tamano = (tamano[0] * 3 // 4, tamano[1])
+
+    tareas = []
+    filas_productos, filas_multitag = [], []
+    por_formato = {formato: 0 for formato in formatos}
+    fuera = 0
+    codigos = set()
+    for _ in range(productos):
+        codigo = _codigo(rng, nombres)
+        while codigo in codigos:
+            codigo = _codigo(rng, nombres)
+        codigos.add(codigo)
+        carpeta = os.path.join(raiz_imagenes, codigo)
+        os.makedirs(carpeta)
+        formato = rng.choice(formatos)
+        for posicion in range(imagenes_por_producto):
+            medida = otro_tamano if rng.random() < fuera_de_medida else tamano
+            fuera += medida != tamano
+            por_formato[formato] += 1
+            ruta = os.path.join(carpeta, f"{nombre_imagen(codigo, posicion)}.{formato}")
+            tareas.append((ruta, medida, rng.getrandbits(32)))
+        filas_productos.append((codigo, codigo, imagenes_por_producto, formato))
+        filas_multitag.append((codigo, rng.choice(TALLAS), "SI" if rng.random() < 0.5 else ""))
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        list(executor.map(lambda tarea: _guardar_imagen(*tarea), tareas))
+    for talla in TALLAS:
+        _guardar_logo(os.path.join(carpeta_logos, f"{talla}.png"), tamano, talla)
+    _guardar_logo(os.path.join(carpeta_logos, LOGO_COMPROMISO), tamano, LOGO_COMPROMISO)
+
+    meta = {
+        "version": DATASET_VERSION,
+        "parametros": {"productos": productos, "imagenes_por_producto": imagenes_por_producto,
+                       "formatos": list(formatos), "nombres": nombres,
+                       "fuera_de_medida": fuera_de_medida, "semilla": semilla},
+        "tamano": list(tamano),
+        "imagenes": len(tareas),
+        "por_formato": por_formato,
+        "fuera_de_medida": fuera,
+        "planillas": {
+            "productos": _escribir_planilla(os.path.join(destino, "productos.xlsx"),
+                                            ["codigo", "carpeta", "imagenes", "formato"], filas_productos),
+            "multitag": _escribir_planilla(os.path.join(destino, "planilla_multitag.xlsx"),
+                                           ["upc_ripley", "talla", "compromiso_r"], filas_multitag),
+        },
+    }
+    with open(os.path.join(destino, "dataset.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    return meta
+
+
+# --- Mediciones (se ejecutan en el proceso hijo) ---
+MEDICIONES = {}
+
+
+def medicion(script_id):
+    """Registra la medición de una herramienta: función(dataset, meta, etapas) -> dict con 'imagenes'."""
+    def registrar(funcion):
+        MEDICIONES[script_id] = funcion
+        return funcion
+    return registrar
+
+
+class Etapas:
+    """Acumula tiempos por etapa: `with etapas("escaneo"): ...`"""
+
+    def __init__(self):
+        self.tiempos = {}
+
+    @contextmanager
+    def __call__(self, nombre):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.marcar(nombre, time.perf_counter() - inicio)
+
+    def marcar(self, nombre, segundos):
+        self.tiempos[nombre] = round(self.tiempos.get(nombre, 0) + segundos, 4)
+
+
+def _medir_trabajo(script_id, parametros, etapas):
+    """
+    Ejecuta una herramienta registrada en trabajos.py. El primer evento de progreso
+    (con el total ya conocido) separa el escaneo del procesamiento.
+    """
+    inicio = time.perf_counter()
+    marcas = {}
+
+    def progreso(evento):
+        if evento["evento"] == "progreso":
+            marcas.setdefault("escaneo", time.perf_counter())
+            marcas["total"] = evento.get("total") or marcas.get("total")
+
+    resultado = trabajos.ejecutar({"herramienta": script_id, "parametros": parametros}, progreso) or {}
+    fin = time.perf_counter()
+    fin_escaneo = marcas.get("escaneo", fin)
+    etapas.marcar("escaneo", fin_escaneo - inicio)
+    etapas.marcar("procesamiento", fin - fin_escaneo)
+    imagenes = resultado.get("imagenes", resultado.get("total", resultado.get("total_files", marcas.get("total") or 0)))
+    return {"imagenes": imagenes, "resultado": {k: v for k, v in resultado.items() if not isinstance(v, list)}}
+
+
+@medicion("Compresor")
+def _compresor(dataset, meta, etapas):
+    return _medir_trabajo("Compresor", {"carpeta": os.path.join(dataset, "imagenes"), "umbral_kb": 100}, etapas)
+
+
+@medicion("Convertidor")
+def _convertidor(dataset, meta, etapas):
+    return _medir_trabajo("Convertidor", {"carpeta": os.path.join(dataset, "imagenes"), "formato": "webp"}, etapas)
+
+
+@medicion("RotateImg")
+def _rotar(dataset, meta, etapas):
+    return _medir_trabajo("RotateImg", {"carpeta": os.path.join(dataset, "imagenes"), "angulo": 90}, etapas)
+
+
+@medicion("miniaturas_diseno")
+def _miniaturas(dataset, meta, etapas):
+    raiz = os.path.join(dataset, "imagenes")
+    # La miniatura de base_2 es la imagen base, que el dataset ya trae: se borra
+    # en la copia de trabajo para que la herramienta realmente las genere
+    with etapas("preparacion"):
+        for carpeta, _, archivos in os.walk(raiz):
+            for archivo in archivos:
+                base, extension = os.path.splitext(archivo)
+                salida = os.path.join(carpeta, base[:-2] + extension)
+                if base.endswith("_2") and os.path.exists(salida):
+                    os.remove(salida)
+    datos = _medir_trabajo("miniaturas_diseno", {"carpeta": raiz}, etapas)
+    creadas = datos["resultado"]["creadas"]
+    if not creadas:
+        raise RuntimeError(f"No se creó ninguna miniatura de {datos['resultado']['candidatos']} candidatos")
+    return dict(datos, imagenes=creadas)
+
+
+@medicion("Multi-Tags-moda-producto")
+def _multitag(dataset, meta, etapas):
+    salida = os.path.join(dataset, "salida_multitag")
+    datos = _medir_trabajo("Multi-Tags-moda-producto", {
+        "planilla": os.path.join(dataset, meta["planillas"]["multitag"]),
+        "imagenes": os.path.join(dataset, "imagenes"), "logos": os.path.join(dataset, "logos"),
+        "salida": salida, "reporte": False}, etapas)
+    return dict(datos, imagenes=len(os.listdir(salida)))
+
+
+@medicion("Validador_tamano")
+def _validador(dataset, meta, etapas):
+    ancho, alto = meta["tamano"]
+    return _medir_trabajo("Validador_tamano", {"carpeta": os.path.join(dataset, "imagenes"),
+                                               "ancho": ancho, "alto": alto}, etapas)
+
+
+def _rss_pico_mb():
+    """(RSS pico del proceso, RSS pico del mayor subproceso) en MB; None si no se puede medir."""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+            return round(psutil.Process().memory_info().peak_wset / 2 ** 20, 1), None
+        except (ImportError, AttributeError):
+            return None, None
+    escala = 1 if sys.platform == "darwin" else 1024  # ru_maxrss: bytes en macOS, KB en Linux
+    propio = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * escala
+    hijos = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * escala
+    return round(propio / 2 ** 20, 1), round(hijos / 2 ** 20, 1)
+
+
+def ejecutar_medicion(script_id, dataset):
+    """Mide una herramienta sobre `dataset` en este proceso."""
+    with open(os.path.join(dataset, "dataset.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    etapas = Etapas()
+    inicio = time.perf_counter()
+    datos = MEDICIONES[script_id](dataset, meta, etapas)
+    segundos = time.perf_counter() - inicio
+    rss, rss_hijos = _rss_pico_mb()
+    datos.update({
+        "segundos": round(segundos, 4),
+        "imagenes_por_segundo": round(datos["imagenes"] / segundos, 2) if segundos > 0 else None,
+        "etapas": etapas.tiempos,
+        "rss_pico_mb": rss,
+        "rss_pico_subprocesos_mb": rss_hijos,
+    })
+    return datos
+
+
+# --- Orquestación (proceso padre) ---
+def medir(dataset, herramientas=None, repeticiones=3, con_cache=False, al_progreso=None):
+    """
+    Mide cada herramienta `repeticiones` veces, cada una en un proceso nuevo sobre
+    una copia fresca del dataset. Retorna el informe completo (serializable a JSON).
+    """
+    with open(os.path.join(dataset, "dataset.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    herramientas = herramientas or list(MEDICIONES)
+    informe = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "con_cache": con_cache,
+        "dataset": meta,
+        "herramientas": {},
+    }
+
+    for script_id in herramientas:
+        corridas = []
+        for repeticion in range(repeticiones):
+            if al_progreso:
+                al_progreso(f"{script_id}: repetición {repeticion + 1}/{repeticiones}")
+            with tempfile.TemporaryDirectory(prefix="benchmark_diseno_") as trabajo:
+                copia = os.path.join(trabajo, "dataset")
+                shutil.copytree(dataset, copia)
+                entorno = os.environ.copy()
+                entorno["PYTHONIOENCODING"] = "utf-8"
+                if not con_cache:
+                    home = os.path.join(trabajo, "home")
+                    os.makedirs(home)
+                    entorno["HOME"] = entorno["USERPROFILE"] = home
+                archivo_resultado = os.path.join(trabajo, "resultado.json")
+                proceso = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "_medicion", script_id, copia, archivo_resultado],
+                    cwd=DISENO_DIR, env=entorno, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                    text=True, encoding="utf-8", errors="replace")
+                if proceso.returncode != 0:
+                    corridas.append({"error": proceso.stderr.strip().splitlines()[-1] if proceso.stderr.strip()
+                                     else f"Código de salida {proceso.returncode}"})
+                    break
+                with open(archivo_resultado, encoding="utf-8") as f:
+                    corridas.append(json.load(f))
+
+        validas = [c for c in corridas if "error" not in c]
+        resumen = {"corridas": corridas}
+        if validas:
+            resumen.update({
+                "imagenes": validas[0]["imagenes"],
+                "mediana_segundos": round(statistics.median(c["segundos"] for c in validas), 4),
+                "mediana_imagenes_por_segundo": round(statistics.median(
+                    c["imagenes_por_segundo"] or 0 for c in validas), 2),
+                "rss_pico_mb": max((c["rss_pico_mb"] or 0 for c in validas), default=None),
+            })
+        informe["herramientas"][script_id] = resumen
+    return informe
+
+
+def comparar(anterior, actual):
+    """Líneas con el cambio de imágenes/segundo por herramienta entre dos informes."""
+    lineas = []
+    for script_id, datos in actual["herramientas"].items():
+        previo = anterior.get("herramientas", {}).get(script_id, {})
+        antes, ahora = previo.get("mediana_imagenes_por_segundo"), datos.get("mediana_imagenes_por_segundo")
+        if not antes or ahora is None:
+            lineas.append(f"{script_id:26s} sin datos para comparar")
+            continue
+        lineas.append(f"{script_id:26s} {antes:9.2f} -> {ahora:9.2f} img/s ({ahora / antes - 1:+.1%})")
+    return lineas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de las herramientas de imágenes de diseño")
+    sub = parser.add_subparsers(dest="comando")
+
+    p_generar = sub.add_parser("generar", help="crea un dataset sintético")
+    p_generar.add_argument("destino")
+    p_generar.add_argument("--productos", type=int, default=100)
+    p_generar.add_argument("--imagenes", type=int, default=4, help="imágenes por producto")
+    p_generar.add_argument("--formatos", default="jpg,png,webp")
+    p_generar.add_argument("--tamano", default="1000x1000", help="ANCHOxALTO")
+    p_generar.add_argument("--nombres", choices=("sku", "upc"), default="sku")
+    p_generar.add_argument("--fuera-de-medida", type=float, default=0.1,
+                           help="fracción de imágenes con otro tamaño (para el validador)")
+    p_generar.add_argument("--semilla", type=int, default=1)
+
+    p_medir = sub.add_parser("medir", help="mide las herramientas sobre un dataset")
+    p_medir.add_argument("dataset")
+    p_medir.add_argument("--herramientas", help=f"separadas por coma (por defecto: {','.join(MEDICIONES)})")
+    p_medir.add_argument("--repeticiones", type=int, default=3)
+    p_medir.add_argument("--con-cache", action="store_true", help="usar las cachés de ~/.cache del usuario")
+    p_medir.add_argument("--salida", help="archivo JSON del informe (por defecto, stdout)")
+    p_medir.add_argument("--comparar", metavar="INFORME", help="informe anterior para comparar")
+
+    p_interno = sub.add_parser("_medicion")
+    p_interno.add_argument("herramienta")
+    p_interno.add_argument("dataset")
+    p_interno.add_argument("resultado")
+
+    args = parser.parse_args()
+
+    if args.comando == "generar":
+        ancho, alto = (int(v) for v in args.tamano.lower().split("x"))
+        inicio = time.perf_counter()
+        meta = generar_dataset(args.destino, args.productos, args.imagenes,
+                               tuple(f.strip().lower() for f in args.formatos.split(",")),
+                               (ancho, alto), args.nombres, args.fuera_de_medida, args.semilla)
+        print(f"Dataset creado en {args.destino}: {meta['imagenes']} imágenes de {args.productos} productos "
+              f"({time.perf_counter() - inicio:.1f} s)")
+        return 0
+
+    if args.comando == "medir":
+        herramientas = [h.strip() for h in args.herramientas.split(",")] if args.herramientas else None
+        desconocidas = set(herramientas or []) - set(MEDICIONES)
+        if desconocidas:
+            print(f"Herramientas sin medición: {', '.join(sorted(desconocidas))}", file=sys.stderr)
+            return 2
+        informe = medir(args.dataset, herramientas, args.repeticiones, args.con_cache,
+                        al_progreso=lambda mensaje: print(mensaje, file=sys.stderr))
+        texto = json.dumps(informe, ensure_ascii=False, indent=2)
+        if args.salida:
+            with open(args.salida, "w", encoding="utf-8") as f:
+                f.write(texto)
+        else:
+            print(texto)
+        if args.comparar:
+            with open(args.comparar, encoding="utf-8") as f:
+                anterior = json.load(f)
+            print("\n".join(comparar(anterior, informe)), file=sys.stdout if args.salida else sys.stderr)
+        fallidas = [s for s, d in informe["herramientas"].items() if "mediana_segundos" not in d]
+        return 1 if fallidas else 0
+
+    if args.comando == "_medicion":
+        datos = ejecutar_medicion(args.herramienta, args.dataset)
+        with open(args.resultado, "w", encoding="utf-8") as f:
+            json.dump(datos, f)
+        return 0
+
+    parser.print_help()
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,373 @@
+"""
+Índice persistente de huellas de imágenes compartido por las apps de diseño.
+
+Cada imagen se identifica por dos huellas:
+
+- sha256 del contenido: duplicado exacto (mismo archivo copiado o renombrado).
+- dHash de 64 bits: huella perceptual que se mantiene ante recompresión, cambio
+  de formato o de tamaño, y sirve para encontrar casi-duplicados por distancia
+  de Hamming.
+
+Las huellas se calculan en un pool de procesos y se guardan en SQLite
+(~/.cache/huellas/huellas.sqlite) junto al tamaño y mtime del archivo, así una
+imagen que no cambió no se vuelve a leer. Las búsquedas de casi-duplicados usan
+hashing multi-índice: el dHash se parte en 4 bloques de 16 bits indexados; dos
+huellas a distancia <= 3 comparten al menos un bloque exacto, y para radios
+mayores se prueban las variantes de cada bloque con pocos bits cambiados. Así
+la consulta no recorre todo el índice aunque tenga millones de imágenes.
+
+Desde consola:
+    python huellas_imagenes.py indexar CARPETA
+    python huellas_imagenes.py buscar IMAGEN [--distancia N]
+    python huellas_imagenes.py grupos [CARPETA] [--distancia N]
+"""
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import combinations
+
+from PIL import Image
+
+INDEX_DIR = os.path.join(os.path.expanduser("~"), ".cache", "huellas")
+EXTENSIONES = {'.jpg', '.jpeg', '.png', '.webp', '.bmp', '.gif', '.tif', '.tiff'}
+MAX_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+BLOQUES = 4
+BITS_BLOQUE = 64 // BLOQUES
+DISTANCIA_DEFECTO = 4
+TAMANO_LOTE = 500
+BUFFER_SIZE = 1024 * 1024
+
+
+def _con_signo(valor):
+    """SQLite guarda enteros de 64 bits con signo."""
+    return valor - (1 << 64) if valor >= (1 << 63) else valor
+
+
+def _sin_signo(valor):
+    return valor + (1 << 64) if valor < 0 else valor
+
+
+def _bloques(dhash):
+    mascara = (1 << BITS_BLOQUE) - 1
+    return [(dhash >> (i * BITS_BLOQUE)) & mascara for i in range(BLOQUES)]
+
+
+def distancia(a, b):
+    """Distancia de Hamming entre dos dHash."""
+    return bin(a ^ b).count("1")
+
+
+def dhash(imagen):
+    """dHash de 64 bits: compara cada píxel con su vecino en una miniatura de 9x8 en grises."""
+    imagen.draft("L", (64, 64))  # JPEG: decodifica a escala reducida
+    pixeles = list(imagen.convert("L").resize((9, 8), Image.LANCZOS).getdata())
+    valor = 0
+    for fila in range(8):
+        for col in range(8):
+            izquierda = pixeles[fila * 9 + col]
+            derecha = pixeles[fila * 9 + col + 1]
+            valor = (valor << 1) | (izquierda > derecha)
+    return valor
+
+
+def huella_archivo(ruta):
+    """
+    Calcula las huellas de una imagen (se ejecuta en el pool de procesos).
+
+    Returns:
+        dict con ruta, tamano, mtime_ns, sha256, dhash, ancho y alto; o con 'error'
+    """
+    try:
+        stat = os.stat(ruta)
+        sha = hashlib.sha256()
+        with open(ruta, "rb") as f:
+            for bloque in iter(lambda: f.read(BUFFER_SIZE), b""):
+                sha.update(bloque)
+        with Image.open(ruta) as imagen:
+            ancho, alto = imagen.size
+            valor = dhash(imagen)
+        return {"ruta": ruta, "tamano": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                "sha256": sha.hexdigest(), "dhash": valor, "ancho": ancho, "alto": alto}
+    except Exception as e:
+        return {"ruta": ruta, "error": str(e)}
+
+
+def listar_imagenes(carpeta, extensiones=EXTENSIONES):
+    """Rutas absolutas de las imágenes bajo `carpeta` (recursivo, con scandir)."""
+    rutas = []
+    pendientes = [os.path.abspath(carpeta)]
+    while pendientes:
+        actual = pendientes.pop()
+        try:
+            with os.scandir(actual) as entradas:
+                for entrada in entradas:
+                    if entrada.is_dir(follow_symlinks=False):
+                        pendientes.append(entrada.path)
+                    elif os.path.splitext(entrada.name)[1].lower() in extensiones:
+                        rutas.append(entrada.path)
+        except OSError:
+            continue
+    return rutas
+
+
+class IndiceHuellas:
+    """Índice de huellas: ¿ya se procesó esta imagen? ¿de qué imagen es duplicado?"""
+
+    def __init__(self, db_path=None, workers=MAX_WORKERS):
+        if db_path is None:
+            os.makedirs(INDEX_DIR, exist_ok=True)
+            db_path = os.path.join(INDEX_DIR, "huellas.sqlite")
+        self.db_path = db_path
+        self.workers = workers
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS imagenes (
+                ruta TEXT PRIMARY KEY,
+                tamano INTEGER,
+                mtime_ns INTEGER,
+                sha256 TEXT NOT NULL,
+                dhash INTEGER NOT NULL,
+                b0 INTEGER, b1 INTEGER, b2 INTEGER, b3 INTEGER,
+                ancho INTEGER,
+                alto INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS idx_imagenes_sha ON imagenes(sha256);
+            CREATE INDEX IF NOT EXISTS idx_imagenes_b0 ON imagenes(b0);
+            CREATE INDEX IF NOT EXISTS idx_imagenes_b1 ON imagenes(b1);
+            CREATE INDEX IF NOT EXISTS idx_imagenes_b2 ON imagenes(b2);
+            CREATE INDEX IF NOT EXISTS idx_imagenes_b3 ON imagenes(b3);
+        """)
+
+    def cerrar(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    # --- Indexación ---
+    def _guardar(self, huellas):
+        filas = [(h["ruta"], h["tamano"], h["mtime_ns"], h["sha256"], _con_signo(h["dhash"]),
+                  *_bloques(h["dhash"]), h["ancho"], h["alto"]) for h in huellas]
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO imagenes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", filas)
+
+    def pendientes(self, rutas):
+        """Rutas que no están en el índice o cuyo tamaño/mtime cambió."""
+        rutas = [os.path.abspath(r) for r in rutas]
+        conocidas = {}
+        for inicio in range(0, len(rutas), TAMANO_LOTE):
+            lote = rutas[inicio:inicio + TAMANO_LOTE]
+            marcadores = ",".join("?" * len(lote))
+            with self._lock:
+                conocidas.update((ruta, (tamano, mtime_ns)) for ruta, tamano, mtime_ns in self.conn.execute(
+                    f"SELECT ruta, tamano, mtime_ns FROM imagenes WHERE ruta IN ({marcadores})", lote))
+        resultado = []
+        for ruta in rutas:
+            try:
+                stat = os.stat(ruta)
+            except OSError:
+                continue
+            if conocidas.get(ruta) != (stat.st_size, stat.st_mtime_ns):
+                resultado.append(ruta)
+        return resultado
+
+    def actualizar(self, rutas, progreso=None, cancelado=None):
+        """
+        Calcula en paralelo las huellas de las imágenes nuevas o modificadas.
+
+        Args:
+            rutas: rutas de imágenes, o una carpeta (se recorre completa)
+            progreso: callable(hechos, total) opcional
+            cancelado: callable que devuelve True para detener el trabajo
+        Returns:
+            (indexadas, errores) con errores como lista de (ruta, mensaje)
+        """
+        if isinstance(rutas, str):
+            rutas = listar_imagenes(rutas)
+        rutas = self.pendientes(rutas)
+        total = len(rutas)
+        indexadas, errores, lote = 0, [], []
+        if not rutas:
+            return 0, errores
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futuros = [executor.submit(huella_archivo, ruta) for ruta in rutas]
+            for hechos, futuro in enumerate(as_completed(futuros), 1):
+                if cancelado and cancelado():
+                    for f in futuros:
+                        f.cancel()
+                    break
+                huella = futuro.result()
+                if "error" in huella:
+                    errores.append((huella["ruta"], huella["error"]))
+                else:
+                    lote.append(huella)
+                if len(lote) >= TAMANO_LOTE:
+                    self._guardar(lote)
+                    indexadas += len(lote)
+                    lote = []
+                if progreso:
+                    progreso(hechos, total)
+        self._guardar(lote)
+        indexadas += len(lote)
+        return indexadas, errores
+
+    def olvidar_inexistentes(self):
+        """Elimina del índice las rutas que ya no existen. Retorna cuántas se eliminaron."""
+        with self._lock:
+            rutas = [r for (r,) in self.conn.execute("SELECT ruta FROM imagenes")]
+        faltantes = [(r,) for r in rutas if not os.path.exists(r)]
+        with self._lock, self.conn:
+            self.conn.executemany("DELETE FROM imagenes WHERE ruta = ?", faltantes)
+        return len(faltantes)
+
+    # --- Consultas ---
+    def ya_procesado(self, ruta):
+        """True si la imagen está indexada y no cambió desde entonces."""
+        return not self.pendientes([ruta])
+
+    def huella(self, ruta):
+        """Huellas guardadas de una ruta, o None si no está indexada."""
+        with self._lock:
+            fila = self.conn.execute(
+                "SELECT sha256, dhash FROM imagenes WHERE ruta = ?", (os.path.abspath(ruta),)).fetchone()
+        if fila is None:
+            return None
+        return {"sha256": fila[0], "dhash": _sin_signo(fila[1])}
+
+    def _candidatos(self, valor, radio):
+        """Filas que comparten al menos un bloque (o una variante cercana) con `valor`."""
+        bits_por_bloque = radio // BLOQUES
+        condiciones, parametros = [], []
+        for i, bloque in enumerate(_bloques(valor)):
+            variantes = {bloque}
+            for n in range(1, bits_por_bloque + 1):
+                for bits in combinations(range(BITS_BLOQUE), n):
+                    variante = bloque
+                    for bit in bits:
+                        variante ^= 1 << bit
+                    variantes.add(variante)
+            for inicio in range(0, len(variantes), TAMANO_LOTE):
+                lote = list(variantes)[inicio:inicio + TAMANO_LOTE]
+                condiciones.append(f"b{i} IN ({','.join('?' * len(lote))})")
+                parametros.extend(lote)
+        with self._lock:
+            return self.conn.execute(
+                f"SELECT ruta, sha256, dhash FROM imagenes WHERE {' OR '.join(condiciones)}",
+                parametros).fetchall()
+
+    def buscar(self, sha256=None, dhash_valor=None, radio=DISTANCIA_DEFECTO):
+        """
+        Imágenes indexadas iguales (mismo sha256) o parecidas (dHash a distancia <= radio).
+
+        Returns:
+            lista de (ruta, distancia) ordenada por distancia; distancia 0 con el
+            mismo sha256 es un duplicado exacto
+        """
+        resultado = {}
+        if sha256:
+            with self._lock:
+                for (ruta,) in self.conn.execute("SELECT ruta FROM imagenes WHERE sha256 = ?", (sha256,)):
+                    resultado[ruta] = 0
+        if dhash_valor is not None:
+            for ruta, _, valor in self._candidatos(dhash_valor, radio):
+                d = distancia(dhash_valor, _sin_signo(valor))
+                if d <= radio and d < resultado.get(ruta, radio + 1):
+                    resultado[ruta] = d
+        return sorted(resultado.items(), key=lambda par: (par[1], par[0]))
+
+    def duplicados_de(self, ruta, radio=DISTANCIA_DEFECTO):
+        """
+        Duplicados y casi-duplicados de una imagen (indexada o no), excluyéndola a ella.
+
+        Si la imagen no está indexada o cambió, se calcula su huella en el momento.
+        """
+        ruta = os.path.abspath(ruta)
+        if self.ya_procesado(ruta):
+            huella = self.huella(ruta)
+        else:
+            huella = huella_archivo(ruta)
+            if "error" in huella:
+                raise OSError(huella["error"])
+        return [(r, d) for r, d in self.buscar(huella["sha256"], huella["dhash"], radio) if r != ruta]
+
+    def grupos_duplicados(self, carpeta=None, radio=DISTANCIA_DEFECTO):
+        """
+        Agrupa las imágenes indexadas (opcionalmente solo bajo `carpeta`) en grupos
+        de duplicados o casi-duplicados. Retorna una lista de listas de rutas.
+        """
+        consulta, parametros = "SELECT ruta, dhash FROM imagenes", ()
+        if carpeta:
+            prefijo = os.path.abspath(carpeta).rstrip(os.sep) + os.sep
+            consulta += " WHERE ruta >= ? AND ruta < ?"
+            parametros = (prefijo, prefijo + "\U0010ffff")
+        with self._lock:
+            filas = self.conn.execute(consulta, parametros).fetchall()
+
+        # Unión de conjuntos sobre los pares cercanos encontrados con el índice
+        padre = {ruta: ruta for ruta, _ in filas}
+
+        def raiz(ruta):
+            while padre[ruta] != ruta:
+                padre[ruta] = padre[padre[ruta]]
+                ruta = padre[ruta]
+            return ruta
+
+        for ruta, valor in filas:
+            for otra, d in self.buscar(dhash_valor=_sin_signo(valor), radio=radio):
+                if otra in padre and otra != ruta:
+                    padre[raiz(otra)] = raiz(ruta)
+
+        grupos = {}
+        for ruta in padre:
+            grupos.setdefault(raiz(ruta), []).append(ruta)
+        return sorted((sorted(g) for g in grupos.values() if len(g) > 1), key=lambda g: g[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Huellas de imágenes: duplicados y casi-duplicados")
+    sub = parser.add_subparsers(dest="comando")
+    p_indexar = sub.add_parser("indexar", help="calcula las huellas de las imágenes de una carpeta")
+    p_indexar.add_argument("carpeta")
+    p_buscar = sub.add_parser("buscar", help="duplicados de una imagen en el índice")
+    p_buscar.add_argument("imagen")
+    p_buscar.add_argument("--distancia", type=int, default=DISTANCIA_DEFECTO)
+    p_grupos = sub.add_parser("grupos", help="grupos de duplicados del índice")
+    p_grupos.add_argument("carpeta", nargs="?")
+    p_grupos.add_argument("--distancia", type=int, default=DISTANCIA_DEFECTO)
+    args = parser.parse_args()
+
+    if args.comando is None:
+        parser.print_help()
+        return 1
+    with IndiceHuellas() as indice:
+        if args.comando == "indexar":
+            def progreso(hechos, total):
+                if hechos % 100 == 0 or hechos == total:
+                    print(f"\r{hechos}/{total}", end="", flush=True)
+            indexadas, errores = indice.actualizar(args.carpeta, progreso=progreso)
+            print(f"\nIndexadas: {indexadas}  Errores: {len(errores)}")
+            for ruta, error in errores:
+                print(f"  {ruta}: {error}")
+        elif args.comando == "buscar":
+            for ruta, d in indice.duplicados_de(args.imagen, args.distancia):
+                print(f"{d:3d}  {ruta}")
+        elif args.comando == "grupos":
+            for grupo in indice.grupos_duplicados(args.carpeta, args.distancia):
+                print("\n".join(grupo) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
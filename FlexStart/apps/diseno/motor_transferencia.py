@@ -0,0 +1,344 @@
+"""
+Motor de transferencia de carpetas compartido por las apps de diseño
+(BUSCADOR, DEPT, SVC-OK y PROD_SELECTOR).
+
+- Planificación previa (sirve como simulación / dry-run): resuelve el destino
+  final de cada carpeta, los conflictos y si se puede mover con un simple rename.
+- Mover dentro del mismo sistema de archivos es un os.rename (instantáneo);
+  entre unidades se copia y luego se borra el origen.
+- Las copias usan un pool de hilos acotado a nivel de archivo, copy_file_range
+  en Linux (copia en el kernel / del lado del servidor) y buffers grandes en el
+  resto, preservando fechas y permisos. Los archivos idénticos (mismo tamaño y
+  fecha de modificación) en el destino no se vuelven a copiar.
+- El progreso se entrega en lotes desde el hilo que llama a ejecutar(), así una
+  app Tk puede llamarlo desde su hilo principal y refrescar la UI una vez por lote.
+"""
+
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+MODO_COPIAR = "copiar"
+MODO_MOVER = "mover"
+
+CONFLICTO_OMITIR = "omitir"          # Si el destino existe no se toca
+CONFLICTO_RENOMBRAR = "renombrar"    # "Carpeta (2)", "Carpeta (3)"...
+CONFLICTO_FUSIONAR = "fusionar"      # Se copia dentro del destino existente
+
+MAX_WORKERS = 8
+BUFFER_SIZE = 8 * 1024 * 1024
+INTERVALO_LOTE = 0.2                 # Segundos entre lotes de progreso
+TOLERANCIA_MTIME = 2                 # FAT/SMB guardan fechas con 2 s de resolución
+
+
+class ItemTransferencia:
+    """Una carpeta (o archivo) a transferir y lo que el plan decidió hacer con ella."""
+
+    def __init__(self, origen, destino, etiqueta=None):
+        self.origen = origen
+        self.destino = destino
+        self.etiqueta = etiqueta or os.path.basename(origen)
+        self.destino_final = None
+        self.accion = None       # 'rename', 'copiar', 'omitir' o 'error'
+        self.motivo = ""
+
+    def __repr__(self):
+        return f"ItemTransferencia({self.etiqueta!r}, {self.accion}, {self.destino_final!r})"
+
+
+def _dispositivo(ruta):
+    """st_dev de la ruta o de su ancestro existente más cercano."""
+    while True:
+        try:
+            return os.stat(ruta).st_dev
+        except OSError:
+            padre = os.path.dirname(ruta)
+            if padre == ruta:
+                return None
+            ruta = padre
+
+
+def archivo_identico(origen, destino):
+    """True si `destino` existe con el mismo tamaño y fecha de modificación que `origen`."""
+    try:
+        st_origen = os.stat(origen)
+        st_destino = os.stat(destino)
+    except OSError:
+        return False
+    return (st_origen.st_size == st_destino.st_size
+            and abs(st_origen.st_mtime - st_destino.st_mtime) < TOLERANCIA_MTIME)
+
+
+def arbol_identico(origen, destino):
+    """True si todos los archivos de `origen` ya están idénticos dentro de `destino`."""
+    if os.path.isfile(origen):
+        return archivo_identico(origen, destino)
+    if not os.path.isdir(destino):
+        return False
+    for raiz, _, archivos in os.walk(origen):
+        destino_raiz = os.path.join(destino, os.path.relpath(raiz, origen))
+        for nombre in archivos:
+            if not archivo_identico(os.path.join(raiz, nombre), os.path.join(destino_raiz, nombre)):
+                return False
+    return True
+
+
+def _copy_file_range(fsrc, fdst, tamano):
+    copiado = 0
+    while copiado < tamano:
+        n = os.copy_file_range(fsrc.fileno(), fdst.fileno(), min(BUFFER_SIZE, tamano - copiado))
+        if n == 0:
+            break
+        copiado += n
+    return copiado
+
+
+def copiar_archivo(origen, destino):
+    """
+    Copia un archivo con metadatos. Retorna los bytes copiados (0 si ya era idéntico).
+    """
+    if archivo_identico(origen, destino):
+        return 0
+    tamano = os.path.getsize(origen)
+    copiado = False
+    if hasattr(os, "copy_file_range") and tamano > 0:
+        try:
+            with open(origen, "rb") as fsrc, open(destino, "wb") as fdst:
+                _copy_file_range(fsrc, fdst, tamano)
+            copiado = True
+        except OSError:
+            # Kernel antiguo o sistemas de archivos distintos sin soporte: copia normal
+            copiado = False
+    if not copiado:
+        if sys.platform == "win32":
+            with open(origen, "rb") as fsrc, open(destino, "wb") as fdst:
+                shutil.copyfileobj(fsrc, fdst, BUFFER_SIZE)
+        else:
+            # En Linux/macOS shutil ya usa sendfile / fcopyfile
+            shutil.copyfile(origen, destino)
+    shutil.copystat(origen, destino)
+    return tamano
+
+
+def _eliminar(ruta):
+    """Borra un archivo o árbol si existe, sin fallar (limpieza tras un error)."""
+    try:
+        if os.path.isdir(ruta) and not os.path.islink(ruta):
+            shutil.rmtree(ruta, ignore_errors=True)
+        elif os.path.lexists(ruta):
+            os.remove(ruta)
+    except OSError:
+        pass
+
+
+class MotorTransferencia:
+    """
+    Copia o mueve carpetas en paralelo con un pool de hilos acotado.
+
+    Uso:
+        motor = MotorTransferencia(MODO_MOVER, conflicto=CONFLICTO_OMITIR)
+        plan = motor.planificar(items)              # sin tocar el disco (dry-run)
+        print("\n".join(motor.describir_plan(plan)))
+        resumen = motor.ejecutar(plan, al_progreso=callback)
+    """
+
+    def __init__(self, modo=MODO_COPIAR, conflicto=CONFLICTO_OMITIR, max_workers=MAX_WORKERS,
+                 cancelado=None, intervalo_lote=INTERVALO_LOTE):
+        if modo not in (MODO_COPIAR, MODO_MOVER):
+            raise ValueError(f"Modo de transferencia no válido: {modo}")
+        if conflicto not in (CONFLICTO_OMITIR, CONFLICTO_RENOMBRAR, CONFLICTO_FUSIONAR):
+            raise ValueError(f"Política de conflicto no válida: {conflicto}")
+        self.modo = modo
+        self.conflicto = conflicto
+        self.max_workers = max_workers
+        self.cancelado = cancelado or (lambda: False)
+        self.intervalo_lote = intervalo_lote
+        self._pool_archivos = None
+
+    # --- Planificación ---
+    def _resolver_destino(self, item, reservados):
+        destino = item.destino
+        if destino not in reservados and not os.path.exists(destino):
+            return destino, ""
+        if self.conflicto == CONFLICTO_FUSIONAR and destino not in reservados:
+            return destino, "fusionar"
+        if self.conflicto == CONFLICTO_OMITIR:
+            return None, "ya existe en el destino"
+        # Renombrar: si una copia anterior ya es idéntica no se duplica
+        base = destino
+        contador = 2
+        while destino in reservados or os.path.exists(destino):
+            if destino not in reservados and arbol_identico(item.origen, destino):
+                return None, f"ya copiada en {os.path.basename(destino)}"
+            destino = f"{base} ({contador})"
+            contador += 1
+        return destino, ""
+
+    def planificar(self, items):
+        """
+        Decide qué hacer con cada item sin modificar nada en disco.
+
+        Cada item queda con `accion` ('rename', 'copiar', 'omitir' o 'error'),
+        `destino_final` y `motivo`. Se puede mostrar tal cual como simulación.
+        """
+        reservados = set()
+        for item in items:
+            item.destino_final = None
+            item.motivo = ""
+            if not os.path.exists(item.origen):
+                item.accion, item.motivo = "error", "el origen no existe"
+                continue
+            destino, motivo = self._resolver_destino(item, reservados)
+            if destino is None:
+                item.accion, item.motivo = "omitir", motivo
+                continue
+            reservados.add(destino)
+            item.destino_final = destino
+            item.motivo = motivo
+            if (self.modo == MODO_MOVER and motivo != "fusionar"
+                    and _dispositivo(item.origen) == _dispositivo(os.path.dirname(destino))):
+                item.accion = "rename"
+            else:
+                item.accion = "copiar"
+        return items
+
+    # --- Ejecución ---
+    def _copiar_arbol(self, origen, destino):
+        """Copia un árbol repartiendo los archivos en el pool. Retorna bytes copiados."""
+        if os.path.isfile(origen):
+            return copiar_archivo(origen, destino)
+
+        pares = []
+        directorios = []
+        for raiz, _, archivos in os.walk(origen, followlinks=True):
+            destino_raiz = os.path.normpath(os.path.join(destino, os.path.relpath(raiz, origen)))
+            os.makedirs(destino_raiz, exist_ok=True)
+            directorios.append((raiz, destino_raiz))
+            for nombre in archivos:
+                pares.append((os.path.join(raiz, nombre), os.path.join(destino_raiz, nombre)))
+
+        futuros = []
+        for o, d in pares:
+            if self.cancelado():
+                break
+            futuros.append(self._pool_archivos.submit(copiar_archivo, o, d))
+        wait(futuros)
+        if self.cancelado():
+            raise InterruptedError("Transferencia cancelada")
+        total = sum(f.result() for f in futuros)
+
+        # Fechas de las carpetas al final: copiar archivos dentro las modifica
+        for raiz, destino_raiz in reversed(directorios):
+            try:
+                shutil.copystat(raiz, destino_raiz)
+            except OSError:
+                pass
+        return total
+
+    def _transferir(self, item):
+        if self.cancelado():
+            raise InterruptedError("Transferencia cancelada")
+        os.makedirs(os.path.dirname(item.destino_final), exist_ok=True)
+        if item.accion == "rename":
+            try:
+                os.rename(item.origen, item.destino_final)
+                return 0
+            except OSError:
+                # Mismo dispositivo pero rename no permitido (p. ej. montajes bind): copiar
+                pass
+        try:
+            copiados = self._copiar_arbol(item.origen, item.destino_final)
+        except Exception:
+            # Una copia a medias (cancelada o con error) no puede quedar en el destino:
+            # con CONFLICTO_OMITIR la próxima ejecución la daría por "ya existe".
+            # Al fusionar el destino ya existía y no se borra.
+            if item.motivo != "fusionar":
+                _eliminar(item.destino_final)
+            raise
+        if self.modo == MODO_MOVER:
+            if os.path.isdir(item.origen):
+                shutil.rmtree(item.origen)
+            else:
+                os.remove(item.origen)
+        return copiados
+
+    def ejecutar(self, items, al_progreso=None):
+        """
+        Ejecuta el plan (lo calcula si hace falta) y retorna un resumen con conteos.
+
+        `al_progreso(lote, hechos, total)` se llama desde el hilo que invoca ejecutar(),
+        como máximo una vez cada `intervalo_lote` segundos. `lote` es una lista de
+        tuplas (item, estado, detalle) con estado 'ok', 'omitido', 'error' o 'cancelado'.
+        """
+        if any(item.accion is None for item in items):
+            self.planificar(items)
+
+        total = len(items)
+        resumen = {"ok": 0, "omitido": 0, "error": 0, "cancelado": 0, "bytes": 0}
+        lote = []
+        hechos = 0
+
+        def registrar(item, estado, detalle=""):
+            nonlocal hechos
+            resumen[estado] += 1
+            hechos += 1
+            lote.append((item, estado, detalle))
+
+        pendientes = []
+        for item in items:
+            if item.accion == "omitir":
+                registrar(item, "omitido", item.motivo)
+            elif item.accion == "error":
+                registrar(item, "error", item.motivo)
+            else:
+                pendientes.append(item)
+
+        ultimo_lote = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool_items, \
+                ThreadPoolExecutor(max_workers=self.max_workers) as pool_archivos:
+            self._pool_archivos = pool_archivos
+            futuros = {pool_items.submit(self._transferir, item): item for item in pendientes}
+            restantes = set(futuros)
+            while restantes:
+                listos, restantes = wait(restantes, timeout=self.intervalo_lote, return_when=FIRST_COMPLETED)
+                if self.cancelado():
+                    for futuro in restantes:
+                        futuro.cancel()
+                for futuro in listos:
+                    item = futuros[futuro]
+                    if futuro.cancelled():
+                        registrar(item, "cancelado")
+                        continue
+                    try:
+                        resumen["bytes"] += futuro.result()
+                        registrar(item, "ok")
+                    except InterruptedError:
+                        registrar(item, "cancelado")
+                    except Exception as e:
+                        registrar(item, "error", str(e))
+                ahora = time.monotonic()
+                if al_progreso and lote and (ahora - ultimo_lote >= self.intervalo_lote or not restantes):
+                    al_progreso(list(lote), hechos, total)
+                    lote.clear()
+                    ultimo_lote = ahora
+            self._pool_archivos = None
+
+        if al_progreso and lote:
+            al_progreso(list(lote), hechos, total)
+        return resumen
+
+    def describir_plan(self, items):
+        """Líneas legibles del plan, para mostrar una simulación antes de ejecutar."""
+        lineas = []
+        for item in items:
+            if item.accion == "rename":
+                lineas.append(f"MOVER (rename): {item.origen} -> {item.destino_final}")
+            elif item.accion == "copiar":
+                verbo = "MOVER (copia)" if self.modo == MODO_MOVER else "COPIAR"
+                extra = " (fusionando)" if item.motivo == "fusionar" else ""
+                lineas.append(f"{verbo}: {item.origen} -> {item.destino_final}{extra}")
+            else:
+                lineas.append(f"{item.accion.upper()}: {item.etiqueta} ({item.motivo})")
+        return lineas
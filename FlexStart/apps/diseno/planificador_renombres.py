@@ -0,0 +1,354 @@
+"""
+Planificador de renombrados compartido por las herramientas RENAMER_*.
+
+En vez de renombrar de a un archivo comprobando antes si el destino existe, cada
+herramienta arma un PlanRenombrado con todos los pares origen -> destino:
+
+- validar() detecta en memoria, antes de tocar el disco, orígenes inexistentes,
+  destinos repetidos y destinos ocupados. Un destino ocupado por otro archivo
+  que también se renombra en el mismo plan (cadenas A->B->C o ciclos A<->B) es
+  válido y se resuelve en dos fases.
+- aplicar() renombra en dos fases (origen -> nombre temporal -> destino) con un
+  pool de hilos, lo que acelera mucho en carpetas de red, y deja un journal en
+  ~/.cache/renamer/ con el que se puede deshacer la operación completa.
+
+Deshacer desde consola:
+    python planificador_renombres.py --deshacer            # último journal
+    python planificador_renombres.py --deshacer RUTA.jsonl
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+JOURNAL_DIR = os.path.join(os.path.expanduser("~"), ".cache", "renamer")
+MAX_JOURNALS = 20
+MAX_WORKERS = 8
+TAMANO_LOTE = 500
+
+
+def escanear(raiz, profundidad=None, solo_directorios=False, extensiones=None):
+    """
+    Lista `raiz` con una sola pasada de scandir.
+
+    Retorna (listado, errores): listado es [(carpeta, [nombres])] con los archivos
+    (o subcarpetas si solo_directorios) de cada carpeta, filtrados por `extensiones`
+    (en minúsculas, con punto). errores es [(carpeta, excepción)].
+    `profundidad` limita cuántos niveles bajo `raiz` se recorren (None = todos).
+    """
+    listado = []
+    errores = []
+    pendientes = [(raiz, 0)]
+    while pendientes:
+        carpeta, nivel = pendientes.pop()
+        nombres = []
+        try:
+            with os.scandir(carpeta) as entradas:
+                for entrada in entradas:
+                    try:
+                        es_dir = entrada.is_dir(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if es_dir and (profundidad is None or nivel < profundidad):
+                        pendientes.append((entrada.path, nivel + 1))
+                    if solo_directorios != es_dir:
+                        continue
+                    if extensiones and os.path.splitext(entrada.name)[1].lower() not in extensiones:
+                        continue
+                    nombres.append(entrada.name)
+        except OSError as e:
+            errores.append((carpeta, e))
+            continue
+        listado.append((carpeta, nombres))
+    return listado, errores
+
+
+def _clave(ruta):
+    return os.path.normcase(os.path.abspath(ruta))
+
+
+def _mismo_archivo(a, b):
+    """True si a y b son el mismo archivo (renombrado solo de mayúsculas en macOS/Windows)."""
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
+
+
+class Renombrado:
+    """Un par origen -> destino y su estado dentro del plan."""
+
+    __slots__ = ("origen", "destino", "estado", "motivo", "temporal")
+
+    def __init__(self, origen, destino):
+        self.origen = origen
+        self.destino = destino
+        self.estado = "pendiente"   # pendiente, sin_cambios, no_existe, conflicto, ok, error
+        self.motivo = ""
+        self.temporal = None
+
+    @property
+    def nombre_origen(self):
+        return os.path.basename(self.origen)
+
+    @property
+    def nombre_destino(self):
+        return os.path.basename(self.destino)
+
+
+class PlanRenombrado:
+    """Conjunto de renombrados que se valida en memoria y se aplica como una transacción."""
+
+    def __init__(self):
+        self.renombrados = []
+        self.ciclos = 0
+        self.journal = None
+        self._validado = False
+
+    def agregar(self, origen, destino):
+        renombrado = Renombrado(origen, destino)
+        self.renombrados.append(renombrado)
+        return renombrado
+
+    def pendientes(self):
+        return [r for r in self.renombrados if r.estado == "pendiente"]
+
+    def _marcar_conflicto(self, renombrado, motivo, por_destino):
+        """Marca un conflicto y lo propaga a quien esperaba ocupar el origen que ya no se libera."""
+        pila = [(renombrado, motivo)]
+        while pila:
+            actual, motivo_actual = pila.pop()
+            if actual.estado != "pendiente":
+                continue
+            actual.estado = "conflicto"
+            actual.motivo = motivo_actual
+            siguiente = por_destino.get(_clave(actual.origen))
+            if siguiente is not None and siguiente is not actual:
+                pila.append((siguiente, f"'{actual.nombre_origen}' no se renombra y sigue ocupando el nombre"))
+
+    def validar(self):
+        """Clasifica cada renombrado sin tocar el disco. Retorna el conteo por estado."""
+        por_origen = {}
+        por_destino = {}
+        for r in self.renombrados:
+            if r.estado != "pendiente":
+                continue
+            if r.origen == r.destino:
+                r.estado = "sin_cambios"
+                continue
+            if not os.path.lexists(r.origen):
+                r.estado, r.motivo = "no_existe", "el origen no existe"
+                continue
+            clave_origen = _clave(r.origen)
+            if clave_origen in por_origen:
+                r.estado, r.motivo = "conflicto", "el origen ya se renombra en otra fila"
+                continue
+            clave_destino = _clave(r.destino)
+            if clave_destino in por_destino:
+                r.estado = "conflicto"
+                r.motivo = f"'{por_destino[clave_destino].nombre_origen}' ya va a '{r.nombre_destino}'"
+                continue
+            por_origen[clave_origen] = r
+            por_destino[clave_destino] = r
+
+        # Un destino existente solo es válido si quien lo ocupa también se renombra
+        for r in list(por_destino.values()):
+            if r.estado != "pendiente" or not os.path.lexists(r.destino):
+                continue
+            if _mismo_archivo(r.origen, r.destino):
+                continue
+            ocupante = por_origen.get(_clave(r.destino))
+            if ocupante is None or ocupante.estado != "pendiente":
+                self._marcar_conflicto(r, f"'{r.nombre_destino}' ya existe", por_destino)
+
+        self.ciclos = self._contar_ciclos(por_origen)
+        self._validado = True
+        return self.resumen()
+
+    def _contar_ciclos(self, por_origen):
+        ciclos = 0
+        visitados = set()
+        for inicio in self.pendientes():
+            camino = set()
+            actual = inicio
+            while actual is not None and actual.estado == "pendiente" and id(actual) not in visitados:
+                visitados.add(id(actual))
+                camino.add(id(actual))
+                actual = por_origen.get(_clave(actual.destino))
+                if actual is not None and id(actual) in camino:
+                    ciclos += 1
+                    break
+        return ciclos
+
+    def resumen(self):
+        conteo = {"pendiente": 0, "sin_cambios": 0, "no_existe": 0, "conflicto": 0, "ok": 0, "error": 0}
+        for r in self.renombrados:
+            conteo[r.estado] += 1
+        conteo["ciclos"] = self.ciclos
+        return conteo
+
+    # --- Aplicación ---
+    def _escribir_journal(self, pendientes, journal_dir):
+        os.makedirs(journal_dir, exist_ok=True)
+        nombre = f"renombrado_{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}.jsonl"
+        ruta = os.path.join(journal_dir, nombre)
+        with open(ruta, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"version": 1, "creado": time.time(), "total": len(pendientes)}) + "\n")
+            for r in pendientes:
+                f.write(json.dumps({"o": r.origen, "t": r.temporal, "d": r.destino}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        journals = sorted(n for n in os.listdir(journal_dir) if n.startswith("renombrado_"))
+        for viejo in journals[:-MAX_JOURNALS]:
+            try:
+                os.remove(os.path.join(journal_dir, viejo))
+            except OSError:
+                pass
+        return ruta
+
+    def _en_lotes(self, pool, funcion, renombrados, hechos, total, progreso):
+        for inicio in range(0, len(renombrados), TAMANO_LOTE):
+            lote = renombrados[inicio:inicio + TAMANO_LOTE]
+            list(pool.map(funcion, lote))
+            hechos += len(lote)
+            if progreso:
+                progreso(hechos, total)
+        return hechos
+
+    def aplicar(self, progreso=None, journal_dir=JOURNAL_DIR, max_workers=MAX_WORKERS):
+        """
+        Aplica los renombrados válidos en dos fases. Retorna el conteo por estado.
+
+        `progreso(hechos, total)` se llama una vez por lote desde el hilo que llama
+        a aplicar(); total cuenta las dos fases.
+        """
+        if not self._validado:
+            self.validar()
+        pendientes = self.pendientes()
+        if not pendientes:
+            return self.resumen()
+
+        token = uuid.uuid4().hex[:8]
+        for i, r in enumerate(pendientes):
+            r.temporal = os.path.join(os.path.dirname(r.origen), f".renombrando_{token}_{i}")
+        self.journal = self._escribir_journal(pendientes, journal_dir)
+        total = len(pendientes) * 2
+
+        def fase_temporal(r):
+            try:
+                os.rename(r.origen, r.temporal)
+            except OSError as e:
+                r.estado, r.motivo = "error", str(e)
+
+        def fase_final(r):
+            if r.estado != "pendiente":
+                return
+            try:
+                if os.path.lexists(r.destino):
+                    raise FileExistsError(f"'{r.nombre_destino}' apareció durante el renombrado")
+                os.rename(r.temporal, r.destino)
+                r.estado = "ok"
+            except OSError as e:
+                r.estado, r.motivo = "error", str(e)
+                try:
+                    os.rename(r.temporal, r.origen)
+                except OSError:
+                    r.motivo += f" (el archivo quedó como {r.temporal})"
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            hechos = self._en_lotes(pool, fase_temporal, pendientes, 0, total, progreso)
+
+            # Si un origen no se pudo mover, quien iba a ocupar su nombre vuelve atrás.
+            # Un error al volver atrás queda en ese renombrado y se sigue con el resto.
+            por_destino = {_clave(r.destino): r for r in pendientes}
+            for r in pendientes:
+                if r.estado == "error":
+                    siguiente = por_destino.get(_clave(r.origen))
+                    while siguiente is not None and siguiente.estado == "pendiente":
+                        motivo = f"'{r.nombre_origen}' no se pudo renombrar"
+                        try:
+                            os.rename(siguiente.temporal, siguiente.origen)
+                            siguiente.estado, siguiente.motivo = "conflicto", motivo
+                        except OSError as e:
+                            siguiente.estado = "error"
+                            siguiente.motivo = f"{motivo}; al revertir: {e} (el archivo quedó como {siguiente.temporal})"
+                        siguiente = por_destino.get(_clave(siguiente.origen))
+
+            self._en_lotes(pool, fase_final, pendientes, hechos, total, progreso)
+
+        fallidos = [i for i, r in enumerate(pendientes) if r.estado != "ok"]
+        # Fallidos que quedaron con el nombre temporal: deshacer() los devuelve a su origen
+        sin_revertir = [{"i": i, "motivo": pendientes[i].motivo} for i in fallidos
+                        if os.path.lexists(pendientes[i].temporal)]
+        with open(self.journal, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"estado": "completado", "fin": time.time(), "fallidos": fallidos,
+                                "sin_revertir": sin_revertir}, ensure_ascii=False) + "\n")
+        return self.resumen()
+
+
+def ultimo_journal(journal_dir=JOURNAL_DIR):
+    try:
+        journals = sorted(n for n in os.listdir(journal_dir) if n.startswith("renombrado_"))
+    except OSError:
+        return None
+    return os.path.join(journal_dir, journals[-1]) if journals else None
+
+
+def deshacer(ruta_journal, progreso=None, journal_dir=JOURNAL_DIR):
+    """
+    Revierte los renombrados registrados en un journal (también si quedaron a medias).
+    El propio deshacer deja su journal, así que también se puede revertir.
+    """
+    registros = []
+    fallidos = set()
+    with open(ruta_journal, encoding="utf-8") as f:
+        for linea in f:
+            registro = json.loads(linea)
+            if "o" in registro:
+                registros.append(registro)
+            elif registro.get("estado") == "completado":
+                fallidos = set(registro.get("fallidos", []))
+                fallidos -= {error["i"] for error in registro.get("sin_revertir", [])}
+
+    plan = PlanRenombrado()
+    for i, registro in enumerate(registros):
+        if i in fallidos:
+            continue
+        if os.path.lexists(registro["t"]):
+            # Quedó a medias entre las dos fases
+            plan.agregar(registro["t"], registro["o"])
+        elif os.path.lexists(registro["d"]):
+            plan.agregar(registro["d"], registro["o"])
+    plan.validar()
+    plan.aplicar(progreso=progreso, journal_dir=journal_dir)
+    return plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deshacer un renombrado de las herramientas RENAMER_*")
+    parser.add_argument("--deshacer", nargs="?", const="", metavar="JOURNAL",
+                        help="journal a revertir (por defecto el último)")
+    args = parser.parse_args()
+    if args.deshacer is None:
+        parser.print_help()
+        return 1
+    ruta = args.deshacer or ultimo_journal()
+    if not ruta:
+        print("No hay journals de renombrado.")
+        return 1
+    plan = deshacer(ruta)
+    conteo = plan.resumen()
+    print(f"Revertidos: {conteo['ok']}  Conflictos: {conteo['conflicto']}  Errores: {conteo['error']}")
+    for r in plan.renombrados:
+        if r.estado in ("conflicto", "error"):
+            print(f"  {r.origen}: {r.motivo}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+"""
+Lectura de planillas (Excel/CSV) compartida por las apps de diseño
+(DEPT, SVC-OK, PROD_SELECTOR, RENAMER_PH y MULTITAG).
+
+- Solo se leen las columnas que la herramienta necesita, con el motor calamine
+  (python-calamine, pandas >= 2.2) si está instalado; si no, con openpyxl.
+- El resultado se guarda en ~/.cache/planillas/ como Parquet (o pickle si falta
+  pyarrow o los tipos de una columna no se pueden representar). El nombre del
+  archivo incluye el hash del contenido de la planilla y las opciones de
+  lectura, así que la misma planilla no se vuelve a parsear aunque se copie o
+  se renombre.
+- Las herramientas reciben columnas como arreglos (numpy) en lugar de filas
+  Series de iterrows: los valores faltantes son NaN en columnas numéricas y
+  None en las de texto.
+
+Uso:
+    planilla = leer_planilla(ruta, ["EAN_HIJO"], como_texto=True)
+    for ean in planilla["EAN_HIJO"]:
+        ...
+    for numero_fila, (hijo, depto) in planilla.filas("hijo", "depto"):
+        ...
+"""
+
+import hashlib
+import importlib.util
+import os
+from pathlib import Path
+
+import pandas as pd
+
+CACHE_DIR = Path(os.path.expanduser("~")) / ".cache" / "planillas"
+CACHE_VERSION = 1
+MAX_ARCHIVOS_CACHE = 64
+PARQUET_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+CALAMINE_AVAILABLE = importlib.util.find_spec("python_calamine") is not None
+TAMANO_BLOQUE = 1024 * 1024
+
+
+class ColumnasFaltantes(ValueError):
+    """La planilla no tiene alguna de las columnas requeridas."""
+
+    def __init__(self, faltantes, disponibles):
+        self.faltantes = list(faltantes)
+        self.disponibles = list(disponibles)
+        super().__init__(f"Faltan las columnas {', '.join(repr(c) for c in self.faltantes)}. "
+                         f"Columnas encontradas: {', '.join(str(c) for c in self.disponibles)}")
+
+
+def normalizar_nombre(columna):
+    """Nombre de columna sin espacios alrededor y en minúsculas (como compara MULTITAG)."""
+    return str(columna).strip().lower()
+
+
+def _hash_archivo(ruta):
+    digest = hashlib.sha1()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(TAMANO_BLOQUE), b""):
+            digest.update(bloque)
+    return digest.hexdigest()[:16]
+
+
+def _leer(ruta, usecols=None, dtype=None, nrows=None):
+    """pd.read_excel/read_csv con calamine si está disponible (y openpyxl si calamine falla)."""
+    if str(ruta).lower().endswith(".csv"):
+        return pd.read_csv(ruta, usecols=usecols, dtype=dtype, nrows=nrows)
+    if CALAMINE_AVAILABLE:
+        try:
+            return pd.read_excel(ruta, usecols=usecols, dtype=dtype, nrows=nrows, engine="calamine")
+        except ValueError:
+            # pandas sin soporte para engine="calamine"
+            pass
+    return pd.read_excel(ruta, usecols=usecols, dtype=dtype, nrows=nrows)
+
+
+def encabezados(ruta):
+    """Nombres de las columnas de la planilla (sin leer las filas)."""
+    return list(_leer(ruta, nrows=0).columns)
+
+
+class Planilla:
+    """Columnas leídas de una planilla: planilla["col"] es un arreglo con un valor por fila."""
+
+    def __init__(self, df):
+        self._df = df
+
+    def __len__(self):
+        return len(self._df)
+
+    def __contains__(self, columna):
+        return columna in self._df.columns
+
+    def __getitem__(self, columna):
+        return self._df[columna].to_numpy()
+
+    @property
+    def columnas(self):
+        return list(self._df.columns)
+
+    @property
+    def df(self):
+        return self._df
+
+    def filas(self, *columnas):
+        """Genera (número de fila en Excel, tupla de valores); la fila 1 es el encabezado."""
+        return enumerate(zip(*(self[c] for c in columnas)), start=2)
+
+    def valores(self, columna):
+        """Valores de texto no vacíos de una columna, sin espacios alrededor y en orden."""
+        resultado = []
+        for valor in self[columna]:
+            if valor is None or (isinstance(valor, float) and valor != valor):
+                continue
+            texto = str(valor).strip()
+            if texto:
+                resultado.append(texto)
+        return resultado
+
+
+def _normalizar_faltantes(df):
+    """
+    Columnas de texto con None como faltante (igual venga del Excel o del Parquet).
+    Incluye las de pd.StringDtype (lectura con pyarrow o pandas >= 3), que usan pd.NA o NaN.
+    """
+    for columna in df.columns:
+        if df[columna].dtype == object or isinstance(df[columna].dtype, pd.StringDtype):
+            df[columna] = df[columna].astype(object).where(df[columna].notna(), None)
+    return df
+
+
+def _podar_cache(cache_dir):
+    archivos = sorted(cache_dir.glob("*-*.*"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for viejo in archivos[MAX_ARCHIVOS_CACHE:]:
+        viejo.unlink(missing_ok=True)
+
+
+def leer_planilla(ruta, columnas, como_texto=False, normalizar_nombres=False, opcionales=(),
+                  cache_dir=CACHE_DIR):
+    """
+    Lee solo `columnas` (en ese orden) de una planilla Excel o CSV.
+
+    Args:
+        como_texto: lee todas las celdas como texto (dtype=str), sin inferir números
+        normalizar_nombres: compara los nombres con normalizar_nombre(); la Planilla
+            usa entonces los nombres normalizados
+        opcionales: columnas que pueden faltar; se entregan llenas de None
+    Raises:
+        ColumnasFaltantes si falta alguna columna requerida.
+    """
+    clave = normalizar_nombre if normalizar_nombres else (lambda c: c)
+    buscadas = list(dict.fromkeys(clave(c) for c in columnas))  # Sin repetidas
+    opcionales = {clave(c) for c in opcionales}
+
+    cache_dir = Path(cache_dir)
+    # Solo contenido y opciones de lectura: la misma planilla copiada o renombrada
+    # usa la misma caché. La extensión elige el lector (CSV o Excel)
+    opciones = (f"{CACHE_VERSION}|{Path(ruta).suffix.lower()}|{buscadas}|{sorted(opcionales)}|"
+                f"{como_texto}|{normalizar_nombres}")
+    digest_opciones = hashlib.sha1(opciones.encode("utf-8")).hexdigest()[:8]
+    base = f"{_hash_archivo(ruta)}-{digest_opciones}"
+    for candidato in (cache_dir / f"{base}.parquet", cache_dir / f"{base}.pkl"):
+        if candidato.exists():
+            df = pd.read_parquet(candidato) if candidato.suffix == ".parquet" else pd.read_pickle(candidato)
+            os.utime(candidato)  # Las más usadas sobreviven a la poda
+            return Planilla(_normalizar_faltantes(df))
+
+    df = _leer(ruta, usecols=lambda c: clave(c) in buscadas, dtype=str if como_texto else None)
+    if normalizar_nombres:
+        df.columns = [normalizar_nombre(c) for c in df.columns]
+    # Con nombres repetidos (o que coinciden al normalizar) se usa la primera columna
+    df = df.loc[:, ~df.columns.duplicated()]
+    faltantes = [c for c in buscadas if c not in df.columns and c not in opcionales]
+    if faltantes:
+        raise ColumnasFaltantes(faltantes, encabezados(ruta))
+    for columna in buscadas:
+        if columna not in df.columns:
+            df[columna] = None
+    df = _normalizar_faltantes(df[buscadas].reset_index(drop=True))
+
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        destino = None
+        if PARQUET_AVAILABLE:
+            destino = cache_dir / f"{base}.parquet"
+            temporal = destino.with_name(destino.name + ".tmp")
+            try:
+                df.to_parquet(temporal, index=False)
+            except Exception:
+                # Columnas con tipos mezclados (números y texto) que pyarrow no puede representar
+                temporal.unlink(missing_ok=True)
+                destino = None
+        if destino is None:
+            destino = cache_dir / f"{base}.pkl"
+            temporal = destino.with_name(destino.name + ".tmp")
+            df.to_pickle(temporal)
+        os.replace(temporal, destino)
+        _podar_cache(cache_dir)
+    except OSError:
+        # Sin caché la lectura igual funciona
+        pass
+    return Planilla(df)
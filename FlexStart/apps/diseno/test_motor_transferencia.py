@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests del motor de transferencia de carpetas (motor_transferencia.py).
+
+Verifica que:
+1. Una copia cancelada a medias no deja la carpeta de destino y la siguiente ejecución la copia
+2. Un error de E/S a mitad de la copia tampoco deja el destino parcial ni mueve el origen
+3. Al fusionar en una carpeta existente, un error no borra el destino previo
+
+Uso:
+    python3 -m pytest test_motor_transferencia.py
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import motor_transferencia as mt
+
+
+def _carpeta(raiz, nombre, archivos=3):
+    carpeta = raiz / nombre
+    carpeta.mkdir(parents=True)
+    for i in range(archivos):
+        (carpeta / f"{nombre}-{i}.jpg").write_bytes(b"x" * 1024)
+    return carpeta
+
+
+def _motor(modo, conflicto, **kwargs):
+    # max_workers=1: los archivos se copian en orden y el corte a mitad es determinista
+    return mt.MotorTransferencia(modo, conflicto=conflicto, max_workers=1, intervalo_lote=0, **kwargs)
+
+
+def test_cancelar_no_deja_destino_parcial(tmp_path, monkeypatch):
+    origen = _carpeta(tmp_path / "origen", "123")
+    destino = tmp_path / "destino" / "123"
+    copiados = []
+    copiar = mt.copiar_archivo
+
+    def copiar_contando(o, d):
+        copiados.append(o)
+        return copiar(o, d)
+
+    monkeypatch.setattr(mt, "copiar_archivo", copiar_contando)
+    motor = _motor(mt.MODO_COPIAR, mt.CONFLICTO_OMITIR, cancelado=lambda: len(copiados) >= 1)
+
+    resumen = motor.ejecutar([mt.ItemTransferencia(str(origen), str(destino))])
+
+    assert resumen["cancelado"] == 1
+    assert not destino.exists()
+
+    # La siguiente ejecución no la da por "ya existe": copia la carpeta completa
+    resumen = _motor(mt.MODO_COPIAR, mt.CONFLICTO_OMITIR).ejecutar(
+        [mt.ItemTransferencia(str(origen), str(destino))])
+    assert resumen["ok"] == 1
+    assert sorted(os.listdir(destino)) == sorted(os.listdir(origen))
+
+
+def test_error_de_copia_no_deja_destino_ni_mueve_origen(tmp_path, monkeypatch):
+    origen = _carpeta(tmp_path / "origen", "123")
+    destino = tmp_path / "destino" / "123"
+    copiar = mt.copiar_archivo
+
+    def copiar_con_error(o, d):
+        if o.endswith("-2.jpg"):
+            raise OSError("Disco lleno")
+        return copiar(o, d)
+
+    monkeypatch.setattr(mt, "copiar_archivo", copiar_con_error)
+    item = mt.ItemTransferencia(str(origen), str(destino))
+    motor = _motor(mt.MODO_MOVER, mt.CONFLICTO_OMITIR)
+    motor.planificar([item])
+    item.accion = "copiar"  # Como entre unidades distintas
+
+    resumen = motor.ejecutar([item])
+
+    assert resumen["error"] == 1
+    assert not destino.exists()
+    assert len(os.listdir(origen)) == 3
+
+
+def test_error_al_fusionar_conserva_destino_existente(tmp_path, monkeypatch):
+    origen = _carpeta(tmp_path / "origen", "123")
+    destino = _carpeta(tmp_path / "destino", "123", archivos=0)
+    (destino / "previo.jpg").write_bytes(b"previo")
+
+    def copiar_con_error(o, d):
+        raise OSError("Disco lleno")
+
+    monkeypatch.setattr(mt, "copiar_archivo", copiar_con_error)
+
+    resumen = _motor(mt.MODO_COPIAR, mt.CONFLICTO_FUSIONAR).ejecutar(
+        [mt.ItemTransferencia(str(origen), str(destino))])
+
+    assert resumen["error"] == 1
+    assert (destino / "previo.jpg").read_bytes() == b"previo"
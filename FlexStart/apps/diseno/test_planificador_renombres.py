@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Tests del planificador de renombrados (planificador_renombres.py).
+
+Verifica que:
+1. Intercambios (A<->B), ciclos de tres y cadenas se aplican sin pisar archivos
+2. Destinos ocupados o repetidos quedan como conflicto sin tocar el disco
+3. deshacer() revierte el plan completo a partir del journal
+4. Un error al revertir un ciclo queda registrado por renombrado, el resto continúa
+   y deshacer() devuelve el archivo que quedó con el nombre temporal
+
+Uso:
+    python3 -m pytest test_planificador_renombres.py
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import planificador_renombres as pr
+
+
+def _archivos(carpeta, nombres):
+    for nombre in nombres:
+        (carpeta / nombre).write_text(nombre, encoding="utf-8")
+
+
+def _contenido(carpeta):
+    """{nombre: contenido}: el contenido es el nombre original de cada archivo."""
+    return {nombre: (carpeta / nombre).read_text(encoding="utf-8")
+            for nombre in os.listdir(carpeta) if not nombre.startswith(".")}
+
+
+def _plan(carpeta, pares):
+    plan = pr.PlanRenombrado()
+    for origen, destino in pares:
+        plan.agregar(str(carpeta / origen), str(carpeta / destino))
+    return plan
+
+
+def _ultimo_registro(journal):
+    with open(journal, encoding="utf-8") as f:
+        return json.loads(f.readlines()[-1])
+
+
+@pytest.mark.parametrize("pares, esperado, ciclos", [
+    ([("A", "B"), ("B", "A")], {"A": "B", "B": "A"}, 1),
+    ([("A", "B"), ("B", "C"), ("C", "A")], {"A": "C", "B": "A", "C": "B"}, 1),
+    ([("B", "C"), ("A", "B")], {"B": "A", "C": "B"}, 0),
+], ids=["intercambio", "ciclo", "cadena"])
+def test_intercambios_y_cadenas(tmp_path, pares, esperado, ciclos):
+    carpeta = tmp_path / "carpeta"
+    carpeta.mkdir()
+    _archivos(carpeta, sorted({origen for origen, _ in pares}))
+    plan = _plan(carpeta, pares)
+
+    assert plan.validar()["ciclos"] == ciclos
+    conteo = plan.aplicar(journal_dir=str(tmp_path / "journals"))
+
+    assert conteo["ok"] == len(pares)
+    assert _contenido(carpeta) == esperado
+
+
+def test_conflictos_no_tocan_el_disco(tmp_path):
+    carpeta = tmp_path / "carpeta"
+    carpeta.mkdir()
+    _archivos(carpeta, ["A", "B", "C", "D"])
+    # D ya existe y no se renombra; C y B van al mismo destino; X no existe
+    plan = _plan(carpeta, [("A", "D"), ("C", "E"), ("B", "E"), ("X", "Y")])
+
+    conteo = plan.validar()
+    plan.aplicar(journal_dir=str(tmp_path / "journals"))
+
+    assert conteo["conflicto"] == 2 and conteo["no_existe"] == 1 and conteo["pendiente"] == 1
+    assert [r.estado for r in plan.renombrados] == ["conflicto", "ok", "conflicto", "no_existe"]
+    assert _contenido(carpeta) == {"A": "A", "B": "B", "D": "D", "E": "C"}
+
+
+def test_deshacer(tmp_path):
+    carpeta = tmp_path / "carpeta"
+    carpeta.mkdir()
+    _archivos(carpeta, ["A", "B", "C"])
+    journals = str(tmp_path / "journals")
+    plan = _plan(carpeta, [("A", "B"), ("B", "A"), ("C", "D")])
+    plan.aplicar(journal_dir=journals)
+
+    revertido = pr.deshacer(plan.journal, journal_dir=journals)
+
+    assert revertido.resumen()["ok"] == 3
+    assert _contenido(carpeta) == {"A": "A", "B": "B", "C": "C"}
+
+
+def test_error_al_revertir_ciclo(tmp_path, monkeypatch):
+    carpeta = tmp_path / "carpeta"
+    carpeta.mkdir()
+    _archivos(carpeta, ["A", "B", "C"])
+    journals = str(tmp_path / "journals")
+    renombrar = os.rename
+
+    def renombrar_con_errores(origen, destino):
+        # A no se puede mover y B, que iba al nombre de A, tampoco puede volver atrás
+        if origen == str(carpeta / "A") or destino == str(carpeta / "B"):
+            raise PermissionError("Acceso denegado")
+        renombrar(origen, destino)
+
+    monkeypatch.setattr(pr.os, "rename", renombrar_con_errores)
+    plan = _plan(carpeta, [("A", "B"), ("B", "A"), ("C", "D")])
+
+    conteo = plan.aplicar(journal_dir=journals)
+
+    a, b, c = plan.renombrados
+    assert conteo["ok"] == 1 and conteo["error"] == 2
+    assert a.estado == "error" and c.estado == "ok"
+    assert b.estado == "error" and b.temporal in b.motivo
+    assert os.path.exists(b.temporal)
+    registro = _ultimo_registro(plan.journal)
+    assert registro["fallidos"] == [0, 1]
+    assert [error["i"] for error in registro["sin_revertir"]] == [1]
+
+    monkeypatch.setattr(pr.os, "rename", renombrar)
+    revertido = pr.deshacer(plan.journal, journal_dir=journals)
+
+    assert revertido.resumen()["ok"] == 2
+    assert _contenido(carpeta) == {"A": "A", "B": "B", "C": "C"}
+    assert not os.path.exists(b.temporal)
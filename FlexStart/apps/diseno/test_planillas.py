@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tests de la lectura compartida de planillas (planillas.py).
+
+Verifica que:
+1. Los faltantes de columnas de texto son None, sean de dtype object o pd.StringDtype
+2. Las columnas numéricas conservan NaN como faltante
+3. La lectura desde la caché entrega los mismos valores que la primera lectura
+4. Una copia renombrada de la planilla usa la misma caché
+5. Las columnas opcionales son parte de la clave: sin ellas, una columna faltante sigue fallando
+
+Uso:
+    python3 -m pytest test_planillas.py
+"""
+
+import math
+import os
+import shutil
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+pd = pytest.importorskip("pandas")
+
+import planillas
+
+
+@pytest.mark.parametrize("dtype", [object, pd.StringDtype()], ids=["object", "string"])
+def test_normalizar_faltantes_texto(dtype):
+    df = pd.DataFrame({"SKU": pd.Series(["001", None, "003"], dtype=dtype)})
+
+    df = planillas._normalizar_faltantes(df)
+
+    assert df["SKU"].dtype == object
+    assert df["SKU"].tolist() == ["001", None, "003"]
+
+
+def test_normalizar_faltantes_numericas_sin_cambios():
+    df = pd.DataFrame({"STOCK": [1.0, None, 3.0]})
+
+    df = planillas._normalizar_faltantes(df)
+
+    valores = df["STOCK"].tolist()
+    assert valores[0] == 1.0 and math.isnan(valores[1]) and valores[2] == 3.0
+
+
+def test_leer_planilla_csv_faltantes_none(tmp_path):
+    ruta = tmp_path / "planilla.csv"
+    ruta.write_text("EAN_HIJO,DEPTO\n0001,D1\n,D2\n0003,\n", encoding="utf-8")
+    cache_dir = tmp_path / "cache"
+
+    for _ in range(2):  # Primera lectura y lectura desde la caché
+        planilla = planillas.leer_planilla(ruta, ["EAN_HIJO", "DEPTO"], como_texto=True, cache_dir=cache_dir)
+        assert planilla["EAN_HIJO"].tolist() == ["0001", None, "0003"]
+        assert planilla["DEPTO"].tolist() == ["D1", "D2", None]
+        assert planilla.valores("EAN_HIJO") == ["0001", "0003"]
+    assert any(cache_dir.iterdir())
+
+
+def test_copia_renombrada_usa_la_cache(tmp_path, monkeypatch):
+    ruta = tmp_path / "planilla.csv"
+    ruta.write_text("EAN_HIJO\n0001\n0002\n", encoding="utf-8")
+    cache_dir = tmp_path / "cache"
+    planillas.leer_planilla(ruta, ["EAN_HIJO"], como_texto=True, cache_dir=cache_dir)
+    copia = tmp_path / "otra" / "copia_de_planilla.csv"
+    copia.parent.mkdir()
+    shutil.copy(ruta, copia)
+
+    def sin_parsear(*args, **kwargs):
+        raise AssertionError("La copia se volvió a parsear")
+
+    monkeypatch.setattr(planillas, "_leer", sin_parsear)
+    planilla = planillas.leer_planilla(copia, ["EAN_HIJO"], como_texto=True, cache_dir=cache_dir)
+
+    assert planilla.valores("EAN_HIJO") == ["0001", "0002"]
+    assert len(list(cache_dir.iterdir())) == 1
+
+
+def test_opcionales_en_la_clave_de_cache(tmp_path):
+    ruta = tmp_path / "planilla.csv"
+    ruta.write_text("EAN_HIJO\n0001\n", encoding="utf-8")
+    cache_dir = tmp_path / "cache"
+
+    planilla = planillas.leer_planilla(ruta, ["EAN_HIJO", "TALLA"], opcionales=["TALLA"], cache_dir=cache_dir)
+    assert planilla["TALLA"].tolist() == [None]
+
+    with pytest.raises(planillas.ColumnasFaltantes):
+        planillas.leer_planilla(ruta, ["EAN_HIJO", "TALLA"], cache_dir=cache_dir)
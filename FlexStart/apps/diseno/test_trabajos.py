@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tests de la ejecución headless de las herramientas (trabajos.py).
+
+Verifica que:
+1. Todas las herramientas de diseño del backend tienen modo headless
+2. Los mensajes de cola de cada app (progreso con total, finished con texto o (ok, mensaje)) se traducen a eventos
+3. Encarpetar, Prod-Selector y SVC-OK corren sin ventana y entregan su resultado
+
+Uso:
+    python3 -m pytest test_trabajos.py
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import trabajos
+
+HERRAMIENTAS_DISENO = [
+    "Encarpetar", "Indexar", "TeamSearch", "buscador_diseno", "Multi-Tags-moda-producto",
+    "miniaturas_diseno", "Validador_tamano", "Scrapper", "Dept", "SVC-OK", "Prod-Selector", "Renamer-PH",
+]
+
+
+def _ejecutar(script_id, **parametros):
+    eventos = []
+    resultado = trabajos.ejecutar({"herramienta": script_id, "parametros": parametros}, eventos.append)
+    return resultado, eventos
+
+
+@pytest.mark.parametrize("script_id", HERRAMIENTAS_DISENO)
+def test_herramienta_registrada(script_id):
+    assert script_id in trabajos.HERRAMIENTAS
+
+
+@pytest.mark.parametrize("mensajes, resultado", [
+    ([("total", 4), ("progress", 2), ("finished", {"errors": []})], {"errors": []}),
+    ([("progress", 3, 5), ("finished", True, "Listo")], {"resumen": "Listo"}),
+    ([("progress_config", 2), ("finished", False, "Proceso cancelado.")], {"error": "Proceso cancelado."}),
+    ([("progress_mode", "indeterminate"), ("finished", "Completado.")], {"resumen": "Completado."}),
+    ([("error", "Error en escaneo: x")], {"error": "Error en escaneo: x"}),
+    ([("cancelled", None)], {"cancelado": True}),
+])
+def test_cola_eventos(mensajes, resultado):
+    eventos = []
+    cola = trabajos.ColaEventos(eventos.append)
+
+    for mensaje in mensajes:
+        cola.put(mensaje)
+
+    assert cola.resultado == resultado
+    for evento in eventos:
+        if evento["evento"] == "progreso":
+            assert evento["total"] is not None
+
+
+def test_encarpetar(tmp_path):
+    pytest.importorskip("tkinter")
+    origen = tmp_path / "origen"
+    origen.mkdir()
+    for nombre in ("123_2.jpg", "123-1.jpg", "456.png", "notas.txt"):
+        (origen / nombre).write_bytes(b"x")
+    destino = tmp_path / "destino"
+
+    resultado, eventos = _ejecutar("Encarpetar", origen=str(origen), destino=str(destino))
+
+    assert resultado["imagenes"] == 3 and resultado["procesadas"] == 3 and resultado["errores"] == 0
+    assert sorted(os.listdir(destino / "123")) == ["123-1.jpg", "123_2.jpg"]
+    assert os.listdir(destino / "456") == ["456.png"]
+    assert os.listdir(origen) == ["notas.txt"]
+    assert eventos[-1] == {"evento": "fin", "resultado": resultado}
+
+
+def test_prod_selector(tmp_path):
+    pytest.importorskip("ttkbootstrap")
+    pytest.importorskip("pandas")
+    base = tmp_path / "base"
+    (base / "lote" / "0001").mkdir(parents=True)
+    (base / "0002").mkdir()
+    (base / "0003").mkdir()
+    planilla = tmp_path / "planilla.csv"
+    planilla.write_text("EAN_HIJO\n0001\n0002\n", encoding="utf-8")
+
+    resultado, _ = _ejecutar("Prod-Selector", planilla=str(planilla), carpeta=str(base))
+
+    assert resultado == {"planilla": 2, "movidas": 2, "omitidas": 0, "errores": 0}
+    assert sorted(os.listdir(base / "PRODUCCION")) == ["0001", "0002"]
+    assert (base / "0003").is_dir()
+
+
+def test_svc_ok(tmp_path):
+    pytest.importorskip("ttkbootstrap")
+    pytest.importorskip("pandas")
+    origen = tmp_path / "origen"
+    for nombre in ("A", "B", "C"):
+        (origen / nombre).mkdir(parents=True)
+    planilla = tmp_path / "planilla.csv"
+    planilla.write_text("Composición Producto\nB\n", encoding="utf-8")
+
+    resultado, eventos = _ejecutar("SVC-OK", planilla=str(planilla), origen=str(origen),
+                                   destino=str(tmp_path / "destino"))
+
+    assert "resumen" in resultado and "error" not in resultado
+    assert sorted(os.listdir(tmp_path / "destino")) == ["A", "C"]
+    assert os.listdir(origen) == ["B"]
+    progreso = [e for e in eventos if e["evento"] == "progreso"]
+    assert progreso[-1]["hechos"] == progreso[-1]["total"] == 3
+
+
+def test_parametro_requerido():
+    with pytest.raises(trabajos.ErrorTrabajo):
+        trabajos.validar({"herramienta": "Dept", "parametros": {"planilla": "x.xlsx"}})
@@ -0,0 +1,555 @@
+"""
+Ejecución headless de las herramientas de diseño (sin ventana).
+
+Cada herramienta registrada expone su núcleo de procesamiento detrás de una
+misma interfaz:
+
+    ejecutar({"herramienta": "Compresor", "parametros": {"carpeta": "...", "umbral_kb": 300}},
+             progreso=lambda evento: print(evento))
+
+Los eventos son dicts con "evento" = 'estado' | 'log' | 'progreso' | 'fin' y
+sus datos (mensaje, hechos/total o resultado). Las herramientas que ya trabajan
+con una cola de mensajes para su GUI (compression_worker, rotation_worker...)
+se ejecutan tal cual con una cola que traduce esos mensajes a eventos.
+
+Los identificadores son los mismos script_id de /api/run-script. El backend usa
+lanzar_subproceso() para correr cada trabajo en su propio proceso y leer los
+eventos como líneas JSON.
+
+Desde consola:
+    python trabajos.py listar
+    python trabajos.py ejecutar Compresor carpeta=/ruta umbral_kb=300 [--json]
+    python trabajos.py lote trabajos.json [--paralelo 2] [--json]
+"""
+
+import argparse
+import importlib
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+DISENO_DIR = os.path.dirname(os.path.abspath(__file__))
+REQUERIDO = object()
+
+HERRAMIENTAS = {}
+
+
+class ErrorTrabajo(ValueError):
+    """Especificación de trabajo inválida (herramienta o parámetros)."""
+
+
+def herramienta(script_id, descripcion, **parametros):
+    """
+    Registra el núcleo headless de una herramienta.
+
+    `parametros`: nombre=(tipo, valor por defecto o REQUERIDO). La función
+    registrada recibe (parametros, progreso) y retorna un dict de resultado.
+    """
+    def registrar(funcion):
+        HERRAMIENTAS[script_id] = {"funcion": funcion, "descripcion": descripcion, "parametros": parametros}
+        return funcion
+    return registrar
+
+
+def cargar_modulo(carpeta, archivo):
+    """Importa el script de una herramienta sin abrir su ventana (solo corre su __main__ al lanzarlo)."""
+    directorio = os.path.join(DISENO_DIR, carpeta)
+    nombre = os.path.splitext(archivo)[0]
+    if directorio not in sys.path:
+        sys.path.insert(0, directorio)
+    if nombre.isidentifier():
+        # Importable por nombre: los pools de procesos de la herramienta pueden reimportarlo
+        return importlib.import_module(nombre)
+    nombre_modulo = nombre.replace("-", "_")
+    if nombre_modulo not in sys.modules:
+        spec = importlib.util.spec_from_file_location(nombre_modulo, os.path.join(directorio, archivo))
+        modulo = importlib.util.module_from_spec(spec)
+        sys.modules[nombre_modulo] = modulo
+        spec.loader.exec_module(modulo)
+    return sys.modules[nombre_modulo]
+
+
+class ColaEventos:
+    """
+    Reemplaza la queue.Queue de las apps: cada put((tipo, datos...)) se convierte
+    en un evento. El mensaje 'finished' queda como resultado del trabajo: un dict,
+    un texto de resumen o (ok, mensaje). Los mensajes solo visuales (progress_mode,
+    progress_start...) se ignoran.
+    """
+
+    def __init__(self, progreso):
+        self.progreso = progreso
+        self.total = None
+        self.resultado = None
+
+    def put(self, mensaje, block=True, timeout=None):
+        tipo, *datos = mensaje
+        if tipo in ("progress_max", "progress_config", "total"):
+            self.total = datos[0]
+            self.progreso({"evento": "progreso", "hechos": 0, "total": self.total})
+        elif tipo in ("progress_value", "progress_update", "progress"):
+            if len(datos) > 1:  # ("progress", hechos, total)
+                self.total = datos[1]
+            self.progreso({"evento": "progreso", "hechos": datos[0], "total": self.total})
+        elif tipo == "status":
+            self.progreso({"evento": "estado", "mensaje": datos[0]})
+        elif tipo == "log":
+            self.progreso({"evento": "log", "mensaje": datos[0]})
+        elif tipo == "show_message":
+            severidad, titulo, texto = datos
+            self.progreso({"evento": "log", "mensaje": f"{titulo}: {texto}"})
+            if severidad == "error":
+                self.resultado = {"error": texto}
+            elif self.resultado is None:
+                self.resultado = {"resumen": texto}
+        elif tipo == "error":
+            self.progreso({"evento": "log", "mensaje": datos[0]})
+            self.resultado = {"error": datos[0]}
+        elif tipo == "cancelled":
+            self.resultado = {"cancelado": True}
+        elif tipo == "finished":
+            if len(datos) > 1:  # ("finished", ok, mensaje)
+                ok, texto = datos
+                self.resultado = {"resumen": texto} if ok else {"error": texto}
+            elif isinstance(datos[0], str):
+                self.resultado = {"resumen": datos[0]}
+            elif datos[0] is not None:
+                self.resultado = datos[0]
+
+    put_nowait = put
+
+
+def _al_log(progreso):
+    """Callback al_log(lineas) de los núcleos: cada lote de líneas es un solo evento."""
+    def al_log(lineas):
+        if lineas:
+            progreso({"evento": "log", "mensaje": "\n".join(lineas)})
+    return al_log
+
+
+def _al_progreso(progreso):
+    """Callback al_progreso(hechos, total) de los núcleos."""
+    return lambda hechos, total: progreso({"evento": "progreso", "hechos": hechos, "total": total})
+
+
+# --- Herramientas con worker de cola (sin cambios en su lógica) ---
+@herramienta("Compresor", "Comprime WEBP por debajo de un umbral de tamaño",
+             carpeta=(str, REQUERIDO), umbral_kb=(int, REQUERIDO))
+def _compresor(p, progreso):
+    cola = ColaEventos(progreso)
+    cargar_modulo("COMPRESOR", "Compresor.py").compression_worker(p["carpeta"], p["umbral_kb"], cola)
+    return cola.resultado
+
+
+@herramienta("Convertidor", "Convierte imágenes a jpg, png o webp",
+             carpeta=(str, REQUERIDO), formato=(str, REQUERIDO))
+def _convertidor(p, progreso):
+    modulo = cargar_modulo("CONVERTIDOR", "Convertidor.py")
+    if p["formato"].lower() not in modulo.ENCODER_SETTINGS:
+        raise ErrorTrabajo(f"Formato no soportado: {p['formato']} (use {', '.join(modulo.ENCODER_SETTINGS)})")
+    cola = ColaEventos(progreso)
+    modulo.conversion_worker_thread(p["carpeta"], p["formato"].lower(), cola)
+    return cola.resultado
+
+
+@herramienta("RotateImg", "Rota todas las imágenes de una carpeta",
+             carpeta=(str, REQUERIDO), angulo=(int, REQUERIDO))
+def _rotar(p, progreso):
+    cola = ColaEventos(progreso)
+    cargar_modulo("ROTATE_IMAGE", "RotateImg.py").rotation_worker(p["carpeta"], p["angulo"], cola)
+    return cola.resultado
+
+
+@herramienta("Renamer-Rimage", "Renombra full_image/imageN según la carpeta",
+             carpeta=(str, REQUERIDO))
+def _renamer_rimage(p, progreso):
+    cola = ColaEventos(progreso)
+    cargar_modulo("RENAMER_RIMAGE", "Renamer-Rimage.py").procesar_renombrado_en_hilo(p["carpeta"], cola)
+    return cola.resultado
+
+
+@herramienta("Renamer-ImgFile", "Renombra las imágenes de cada subcarpeta con su nombre",
+             carpeta=(str, REQUERIDO))
+def _renamer_img(p, progreso):
+    cola = ColaEventos(progreso)
+    cargar_modulo("RENAMER_IMG", "Renamer-ImgFile-Mejorado.py").renombrar_imagenes_en_hilo(p["carpeta"], cola)
+    return cola.resultado
+
+
+@herramienta("Multi-Tags-moda-producto", "Aplica logos de talla/compromiso a las imágenes _2 de la planilla",
+             planilla=(str, REQUERIDO), imagenes=(str, REQUERIDO), logos=(str, REQUERIDO), salida=(str, ""),
+             reemplazar=(bool, False), reporte=(bool, True), altura=(str, ""),
+             columnas=(dict, {}))
+def _multitag(p, progreso):
+    if not p["reemplazar"] and not p["salida"]:
+        raise ErrorTrabajo("Indique 'salida' o use reemplazar=true")
+    if p["salida"]:
+        os.makedirs(p["salida"], exist_ok=True)
+    cola = ColaEventos(progreso)
+    # run() en este hilo: el hilo de la herramienta solo existe para no bloquear su GUI
+    cargar_modulo("MULTITAG", "multitag.py").ImageProcessorThread(
+        p["planilla"], p["imagenes"], p["logos"], p["salida"], "webp", p["reemplazar"],
+        p["reporte"], p["altura"] or None, p["columnas"], cola).run()
+    return cola.resultado
+
+
+@herramienta("SVC-OK", "Mueve las carpetas que no están en 'Composición Producto'",
+             planilla=(str, REQUERIDO), origen=(str, REQUERIDO), destino=(str, REQUERIDO))
+def _svc_ok(p, progreso):
+    cola = ColaEventos(progreso)
+    cargar_modulo("SVC-OK", "SVC-OK.py").FolderMoverThread(p["planilla"], p["origen"], p["destino"], cola).run()
+    return cola.resultado
+
+
+@herramienta("buscador_diseno", "Busca carpetas de la planilla y las copia al destino",
+             planilla=(str, REQUERIDO), carpeta=(str, REQUERIDO), destino=(str, REQUERIDO),
+             columna=(str, ""), depto=(str, "TODOS"))
+def _buscador(p, progreso):
+    modulo = cargar_modulo("BUSCADOR", "Buscador.py")
+    try:
+        nombres, deptos = modulo.leer_nombres_carpetas(p["planilla"], p["columna"] or None)
+    except ValueError as e:
+        raise ErrorTrabajo(str(e))
+    if p["depto"] != "TODOS":
+        nombres = [n for n, d in zip(nombres, deptos) if d == p["depto"]]
+    if not nombres:
+        return {"resumen": "No hay nombres de carpeta para buscar."}
+    cola = ColaEventos(progreso)
+    modulo.buscar_y_copiar(nombres, p["carpeta"], p["destino"], cola)
+    return cola.resultado
+
+
+# --- Herramientas con núcleo como función ---
+@herramienta("Insert", "Inserta imágenes con sufijo _n/-n desplazando las existentes",
+             carpeta_raiz=(str, REQUERIDO), imagenes=(list, REQUERIDO))
+def _insertar(p, progreso):
+    from pathlib import Path
+    modulo = cargar_modulo("INSERTAR", "Insert.py")
+    progreso({"evento": "estado", "mensaje": f"Insertando {len(p['imagenes'])} imágenes..."})
+    insertadas, errores = modulo.insert_images(Path(p["carpeta_raiz"]), [Path(i) for i in p["imagenes"]])
+    for error in errores:
+        progreso({"evento": "log", "mensaje": error})
+    return {"insertadas": insertadas, "errores": errores}
+
+
+@herramienta("Huellas", "Indexa huellas (sha256 + dHash) de las imágenes de una carpeta",
+             carpeta=(str, REQUERIDO))
+def _huellas(p, progreso):
+    from huellas_imagenes import IndiceHuellas
+    with IndiceHuellas() as indice:
+        indexadas, errores = indice.actualizar(
+            p["carpeta"], progreso=lambda hechos, total: progreso({"evento": "progreso", "hechos": hechos, "total": total}))
+    return {"indexadas": indexadas, "errores": [f"{ruta}: {error}" for ruta, error in errores]}
+
+
+@herramienta("Transferir", "Copia o mueve carpetas en paralelo",
+             items=(list, REQUERIDO), modo=(str, "copiar"), conflicto=(str, "omitir"), simular=(bool, False))
+def _transferir(p, progreso):
+    from motor_transferencia import MotorTransferencia, ItemTransferencia
+    motor = MotorTransferencia(p["modo"], conflicto=p["conflicto"])
+    items = [ItemTransferencia(i["origen"], i["destino"]) for i in p["items"]]
+    plan = motor.planificar(items)
+    if p["simular"]:
+        return {"plan": motor.describir_plan(plan)}
+
+    def al_progreso(lote, hechos, total):
+        for item, estado, detalle in lote:
+            if estado == "error":
+                progreso({"evento": "log", "mensaje": f"Error: {item.etiqueta}: {detalle}"})
+        progreso({"evento": "progreso", "hechos": hechos, "total": total})
+
+    return motor.ejecutar(plan, al_progreso=al_progreso)
+
+
+@herramienta("Deshacer-Renombrado", "Revierte un renombrado de las herramientas RENAMER_*/Insert",
+             journal=(str, ""))
+def _deshacer_renombrado(p, progreso):
+    from planificador_renombres import deshacer, ultimo_journal
+    ruta = p["journal"] or ultimo_journal()
+    if not ruta:
+        raise ErrorTrabajo("No hay journals de renombrado.")
+    plan = deshacer(ruta, progreso=lambda hechos, total: progreso(
+        {"evento": "progreso", "hechos": hechos, "total": total}))
+    return plan.resumen()
+
+
+@herramienta("Encarpetar", "Mueve cada imagen a la carpeta de su nombre base",
+             origen=(str, REQUERIDO), destino=(str, REQUERIDO))
+def _encarpetar(p, progreso):
+    os.makedirs(p["destino"], exist_ok=True)
+    return cargar_modulo("ENCARPETAR", "Encarpetar.py").organizar(p["origen"], p["destino"], _al_log(progreso))
+
+
+@herramienta("Indexar", "Lista las carpetas de un directorio en un Excel/CSV de SKU",
+             carpeta=(str, REQUERIDO), archivo=(str, ""), recursivo=(bool, False), detalles=(bool, False),
+             solo_cambios=(bool, False), comparar=(bool, False))
+def _indexar(p, progreso):
+    modulo = cargar_modulo("INDEXAR", "folder_listing_app.py")
+    salida = modulo.output_path_for(p["carpeta"], p["archivo"] or modulo.EXCEL_CONFIG["default_filename"],
+                                    allow_csv=True)
+    ruta, total, cambios = modulo.write_inventory(
+        p["carpeta"], salida, recursive=p["recursivo"], details=p["detalles"],
+        only_changes=p["solo_cambios"], compare_previous=p["comparar"],
+        log=lambda mensaje: progreso({"evento": "log", "mensaje": mensaje}))
+    return {"archivo": ruta, "carpetas": total, "cambios": cambios}
+
+
+@herramienta("TeamSearch", "Filtra la base de departamentos del país con los valores de la planilla",
+             planilla=(str, REQUERIDO), salida=(str, REQUERIDO), pais=(str, "CHILE"), columna=(str, "coddepto"))
+def _teamsearch(p, progreso):
+    modulo = cargar_modulo("TEAMSEARCH", "TeamSearch.py")
+    base = modulo.BASE_FILES.get(p["pais"].upper())
+    if base is None:
+        raise ErrorTrabajo(f"País sin base: {p['pais']} (use {', '.join(modulo.BASE_FILES)})")
+    if not base.exists():
+        raise ErrorTrabajo(f"No se encontró el archivo base: {base}")
+    try:
+        filtrado = modulo.filtrar_planilla(p["planilla"], p["columna"],
+                                           modulo.BaseReferencia(base, modulo.DEST_COL))
+    except ValueError as e:  # Incluye ColumnaFaltante
+        raise ErrorTrabajo(str(e))
+    if filtrado.empty:
+        return {"filas": 0, "archivo": None}
+    progreso({"evento": "estado", "mensaje": f"Guardando {len(filtrado)} filas..."})
+    modulo.guardar_tabla(filtrado, p["salida"])
+    return {"filas": len(filtrado), "archivo": p["salida"]}
+
+
+@herramienta("miniaturas_diseno", "Crea las miniaturas de las imágenes _2 de una carpeta (sin monitorear)",
+             carpeta=(str, REQUERIDO), opcion=(str, "width"))
+def _miniaturas(p, progreso):
+    if p["opcion"] not in ("width", "height"):
+        raise ErrorTrabajo(f"Opción no soportada: {p['opcion']} (use width o height)")
+    modulo = cargar_modulo("MINIATURAS", "Miniaturas.py")
+    motor = modulo.ThumbnailEngine(p["carpeta"], lambda: p["opcion"],
+                                   lambda mensaje: progreso({"evento": "log", "mensaje": mensaje}))
+    try:
+        candidatos = [os.path.join(carpeta, archivo)
+                      for carpeta, _, archivos in os.walk(p["carpeta"]) for archivo in archivos
+                      if motor.output_path_for(archivo)]
+        progreso({"evento": "progreso", "hechos": 0, "total": len(candidatos)})
+        creadas = motor.process_batch(candidatos) if candidatos else 0
+    finally:
+        motor.shutdown()
+    return {"candidatos": len(candidatos), "creadas": creadas}
+
+
+@herramienta("Validador_tamano", "Mueve a EDITAR las imágenes con sufijo que no miden ancho x alto",
+             carpeta=(str, REQUERIDO), ancho=(int, 1200), alto=(int, 1600))
+def _validador(p, progreso):
+    return cargar_modulo("IMAGE_VALIDATOR", "image_validator.py").validate_images(
+        p["carpeta"], p["ancho"], p["alto"], log_lines=_al_log(progreso), progress=_al_progreso(progreso))
+
+
+@herramienta("Dept", "Mueve las carpetas hijas a la carpeta de su departamento",
+             planilla=(str, REQUERIDO), entrada=(str, REQUERIDO), salida=(str, REQUERIDO),
+             columna_hijo=(str, "upc_ripley"), columna_depto=(str, "coddepto"), contar=(bool, True))
+def _dept(p, progreso):
+    from planillas import ColumnasFaltantes
+    modulo = cargar_modulo("DEPT", "Dept.py")
+    try:
+        movidas = modulo.departamentalizar(
+            p["planilla"], p["entrada"], p["salida"], p["columna_hijo"], p["columna_depto"], p["contar"],
+            al_log=_al_log(progreso), al_estado=lambda mensaje: progreso({"evento": "estado", "mensaje": mensaje}),
+            al_progreso=_al_progreso(progreso))
+    except ColumnasFaltantes as e:
+        raise ErrorTrabajo(str(e))
+    return {"movidas": movidas}
+
+
+@herramienta("Prod-Selector", "Mueve a PRODUCCION las carpetas de la columna EAN_HIJO",
+             planilla=(str, REQUERIDO), carpeta=(str, REQUERIDO))
+def _prod_selector(p, progreso):
+    from planillas import ColumnasFaltantes
+    try:
+        return cargar_modulo("PROD_SELECTOR", "Prod-Selector.py").seleccionar_produccion(
+            p["planilla"], p["carpeta"], lambda mensaje: progreso({"evento": "log", "mensaje": mensaje}))
+    except ColumnasFaltantes as e:
+        raise ErrorTrabajo(str(e))
+
+
+@herramienta("Renamer-PH", "Renombra carpetas según el mapeo de dos columnas de la planilla",
+             planilla=(str, REQUERIDO), carpeta=(str, REQUERIDO),
+             columna_antigua=(str, "codskupadrelargo"), columna_nueva=(str, "upc_ripley"))
+def _renamer_ph(p, progreso):
+    from planillas import ColumnasFaltantes
+    try:
+        return cargar_modulo("RENAMER_PH", "Renamer-PH.py").renombrar_carpetas(
+            p["planilla"], p["carpeta"], p["columna_antigua"], p["columna_nueva"],
+            al_log=_al_log(progreso), al_estado=lambda mensaje: progreso({"evento": "estado", "mensaje": mensaje}),
+            al_progreso=_al_progreso(progreso))
+    except ColumnasFaltantes as e:
+        raise ErrorTrabajo(str(e))
+
+
+@herramienta("Scrapper", "Descarga las imágenes de una página web",
+             url=(str, REQUERIDO), carpeta=(str, REQUERIDO), nombre=(str, REQUERIDO))
+def _scrapper(p, progreso):
+    if not p["url"].startswith(("http://", "https://")):
+        raise ErrorTrabajo(f"URL inválida: {p['url']}")
+    # descargador.py y no Scrapper.py: el script arma su ventana al importarse
+    modulo = cargar_modulo("SCRAPPER", "descargador.py")
+    descargador = modulo.DescargadorImagenes(
+        os.path.join(p["carpeta"], p["nombre"]),
+        log=lambda mensaje: progreso({"evento": "log", "mensaje": mensaje.strip()}))
+    try:
+        return descargador.descargar(p["url"])
+    finally:
+        descargador.cerrar()
+
+
+# --- Interfaz común ---
+def _convertir(nombre, valor, tipo):
+    if isinstance(valor, str) and tipo is not str:
+        try:
+            valor = json.loads(valor)
+        except ValueError:
+            raise ErrorTrabajo(f"Valor inválido para '{nombre}': {valor!r}")
+    if tipo is int and isinstance(valor, bool) or not isinstance(valor, tipo):
+        raise ErrorTrabajo(f"'{nombre}' debe ser de tipo {tipo.__name__}")
+    return valor
+
+
+def validar(spec):
+    """Normaliza un spec {"herramienta", "parametros"} y retorna (definición, parámetros)."""
+    if not isinstance(spec, dict):
+        raise ErrorTrabajo("El trabajo debe ser un objeto JSON")
+    script_id = spec.get("herramienta") or spec.get("script_id")
+    definicion = HERRAMIENTAS.get(script_id)
+    if definicion is None:
+        raise ErrorTrabajo(f"Herramienta sin modo headless: {script_id}")
+    recibidos = dict(spec.get("parametros") or spec.get("params") or {})
+    desconocidos = set(recibidos) - set(definicion["parametros"])
+    if desconocidos:
+        raise ErrorTrabajo(f"Parámetros desconocidos para {script_id}: {', '.join(sorted(desconocidos))}")
+    parametros = {}
+    for nombre, (tipo, defecto) in definicion["parametros"].items():
+        if nombre in recibidos:
+            parametros[nombre] = _convertir(nombre, recibidos[nombre], tipo)
+        elif defecto is REQUERIDO:
+            raise ErrorTrabajo(f"Falta el parámetro '{nombre}' para {script_id}")
+        else:
+            parametros[nombre] = defecto
+    return definicion, parametros
+
+
+def ejecutar(spec, progreso=None):
+    """Ejecuta un trabajo en este proceso. Retorna el resultado de la herramienta."""
+    definicion, parametros = validar(spec)
+    progreso = progreso or (lambda evento: None)
+    resultado = definicion["funcion"](parametros, progreso)
+    progreso({"evento": "fin", "resultado": resultado})
+    return resultado
+
+
+def lanzar_subproceso(spec):
+    """Lanza `trabajos.py ejecutar --json` para un spec; los eventos salen por stdout como JSON."""
+    validar(spec)
+    entorno = os.environ.copy()
+    entorno["PYTHONPATH"] = DISENO_DIR + (os.pathsep + entorno["PYTHONPATH"] if entorno.get("PYTHONPATH") else "")
+    entorno["PYTHONIOENCODING"] = "utf-8"
+    return subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "ejecutar", "--json", "--spec", json.dumps(spec)],
+        cwd=DISENO_DIR, env=entorno, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        text=True, encoding="utf-8", errors="replace"
+    )
+
+
+def leer_eventos(proceso, al_evento):
+    """Reenvía los eventos JSON de un subproceso hasta que termina. Retorna el código de salida."""
+    errores = []
+    lector = threading.Thread(target=lambda: errores.extend(proceso.stderr), daemon=True)
+    lector.start()
+    for linea in proceso.stdout:
+        linea = linea.strip()
+        if not linea:
+            continue
+        try:
+            al_evento(json.loads(linea))
+        except ValueError:
+            al_evento({"evento": "log", "mensaje": linea})
+    codigo = proceso.wait()
+    lector.join(timeout=1)
+    if codigo != 0:
+        al_evento({"evento": "error", "mensaje": "".join(errores[-20:]).strip() or f"Código de salida {codigo}"})
+    return codigo
+
+
+def _imprimir(evento, como_json, prefijo=""):
+    if como_json:
+        print(json.dumps(evento, ensure_ascii=False, default=str), flush=True)
+    elif evento["evento"] == "progreso":
+        print(f"\r{prefijo}{evento['hechos']}/{evento.get('total') or '?'}", end="", flush=True)
+    elif evento["evento"] == "fin":
+        print(f"\n{prefijo}Resultado: {json.dumps(evento['resultado'], ensure_ascii=False, default=str)}")
+    else:
+        print(f"\n{prefijo}{evento.get('mensaje', '')}", end="", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ejecuta herramientas de diseño sin ventana")
+    sub = parser.add_subparsers(dest="comando")
+    sub.add_parser("listar", help="herramientas disponibles y sus parámetros")
+    p_ejecutar = sub.add_parser("ejecutar", help="ejecuta un trabajo")
+    p_ejecutar.add_argument("herramienta", nargs="?")
+    p_ejecutar.add_argument("parametros", nargs="*", metavar="clave=valor")
+    p_ejecutar.add_argument("--spec", help="trabajo completo como JSON")
+    p_ejecutar.add_argument("--json", action="store_true", help="eventos como líneas JSON")
+    p_lote = sub.add_parser("lote", help="ejecuta en paralelo una lista de trabajos (archivo JSON)")
+    p_lote.add_argument("archivo")
+    p_lote.add_argument("--paralelo", type=int, default=2)
+    p_lote.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    if args.comando == "listar":
+        for script_id, definicion in HERRAMIENTAS.items():
+            parametros = ", ".join(
+                f"{nombre}:{tipo.__name__}" + ("" if defecto is REQUERIDO else f"={defecto!r}")
+                for nombre, (tipo, defecto) in definicion["parametros"].items())
+            print(f"{script_id:22s} {definicion['descripcion']}\n{'':22s} ({parametros})")
+        return 0
+
+    try:
+        if args.comando == "ejecutar":
+            if args.spec:
+                spec = json.loads(args.spec)
+            else:
+                pares = (p.split("=", 1) for p in args.parametros if "=" in p)
+                spec = {"herramienta": args.herramienta, "parametros": dict(pares)}
+            ejecutar(spec, lambda evento: _imprimir(evento, args.json))
+            return 0
+
+        if args.comando == "lote":
+            with open(args.archivo, encoding="utf-8") as f:
+                specs = json.load(f)
+            for spec in specs:
+                validar(spec)
+            salida = threading.Lock()
+
+            def correr(indice, spec):
+                def al_evento(evento):
+                    with salida:
+                        _imprimir(dict(evento, trabajo=indice) if args.json else evento, args.json, f"[{indice}] ")
+                return leer_eventos(lanzar_subproceso(spec), al_evento)
+
+            with ThreadPoolExecutor(max_workers=max(1, args.paralelo)) as pool:
+                futuros = [pool.submit(correr, i, spec) for i, spec in enumerate(specs)]
+                codigos = [f.result() for f in as_completed(futuros)]
+            return 0 if all(c == 0 for c in codigos) else 1
+    except ErrorTrabajo as e:
+        if getattr(args, "json", False):
+            _imprimir({"evento": "error", "mensaje": str(e)}, True)
+        else:
+            print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    parser.print_help()
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""
+Capa común para los vigilantes de carpetas (watchdog) de las apps de diseño
+(LAST_IMAGE y MINIATURAS).
+
+Un cliente de sincronización que deja miles de archivos genera varios eventos
+created/modified/moved por archivo. AgrupadorEventos los recibe en el hilo de
+watchdog sin procesar nada ahí, solo anota la ruta. Su propio hilo espera a que
+cada ruta pase `espera` segundos sin eventos nuevos y a que su tamaño y fecha
+dejen de cambiar (archivo terminado de copiar). Luego entrega los archivos
+listos en lotes a un pool de hilos acotado.
+
+Contrapresión: como máximo hay `max_workers * 2` lotes en vuelo y el resto
+queda pendiente (una entrada por ruta). Si las rutas pendientes superan
+`max_pendientes`, agregar() detiene al hilo de watchdog hasta que haya espacio.
+
+Con `agrupar` (p. ej. os.path.dirname) cada lote contiene rutas de una sola
+clave y nunca se procesan dos lotes de la misma clave a la vez. Sirve para la
+lógica que depende del contenido de la carpeta, como los sufijos de LAST_IMAGE.
+"""
+
+import itertools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ESPERA = 0.5               # Segundos sin eventos (y sin cambios de tamaño) antes de procesar
+MAX_WORKERS = 4
+MAX_LOTE = 200
+MAX_PENDIENTES = 50000
+
+
+def ruta_evento(event):
+    """Ruta del archivo afectado por un evento de watchdog (destino si es un movimiento), o None si es carpeta."""
+    if event.is_directory:
+        return None
+    return getattr(event, "dest_path", None) or event.src_path
+
+
+def _firma(ruta):
+    try:
+        stat = os.stat(ruta)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class AgrupadorEventos:
+    """
+    Junta los eventos por ruta y entrega lotes de archivos estables a `procesar_lote(rutas)`.
+
+    Las rutas de cada lote van en el orden en que llegó su primer evento.
+    `al_error(rutas, excepcion)` recibe los errores de procesar_lote (por defecto se registran con logging).
+    """
+
+    def __init__(self, procesar_lote, espera=ESPERA, max_workers=MAX_WORKERS, max_lote=MAX_LOTE,
+                 agrupar=None, max_pendientes=MAX_PENDIENTES, al_error=None):
+        self.procesar_lote = procesar_lote
+        self.espera = espera
+        self.max_lote = max_lote
+        self.agrupar = agrupar
+        self.max_pendientes = max_pendientes
+        self.max_en_vuelo = max_workers * 2
+        self.al_error = al_error
+
+        self._pendientes = {}  # ruta -> [orden, último evento (monotonic), firma (tamaño, mtime_ns) o None]
+        self._contador = itertools.count()
+        self._cond = threading.Condition()
+        self._lotes_en_vuelo = 0
+        self._claves_en_vuelo = set()
+        self._detenido = False
+        self._vaciar = False
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._hilo = threading.Thread(target=self._bucle, daemon=True)
+        self._hilo.start()
+
+    @property
+    def pendientes(self):
+        return len(self._pendientes)
+
+    # --- Entrada (hilo de watchdog) ---
+    def agregar(self, ruta):
+        with self._cond:
+            while (len(self._pendientes) >= self.max_pendientes and ruta not in self._pendientes
+                   and not self._detenido):
+                self._cond.wait(self.espera)
+            if self._detenido:
+                return
+            entrada = self._pendientes.get(ruta)
+            if entrada is None:
+                self._pendientes[ruta] = [next(self._contador), time.monotonic(), None]
+            else:
+                entrada[1] = time.monotonic()
+
+    # --- Agrupación ---
+    def _bucle(self):
+        while True:
+            with self._cond:
+                if not self._detenido:
+                    self._cond.wait(self.espera / 2)
+                if self._detenido:
+                    candidatos = list(self._pendientes) if self._vaciar else []
+                    break
+                ahora = time.monotonic()
+                candidatos = [ruta for ruta, (_, ultimo, _) in self._pendientes.items()
+                              if ahora - ultimo >= self.espera]
+            if not candidatos:
+                continue
+
+            # Los stat se hacen fuera del lock para no frenar a agregar()
+            firmas = [(ruta, _firma(ruta)) for ruta in candidatos]
+            listos = []
+            with self._cond:
+                ahora = time.monotonic()
+                for ruta, firma in firmas:
+                    entrada = self._pendientes.get(ruta)
+                    if entrada is None or ahora - entrada[1] < self.espera:
+                        continue  # Llegó un evento nuevo mientras tanto
+                    if firma is None:
+                        del self._pendientes[ruta]  # El archivo ya no existe (temporal, movido)
+                    elif firma == entrada[2]:
+                        listos.append(ruta)
+                    else:
+                        # Primera medición o sigue creciendo: se vuelve a medir tras otra espera
+                        entrada[1], entrada[2] = ahora, firma
+                self._cond.notify_all()
+            if listos:
+                self._despachar(listos, bloquear=False)
+
+        if candidatos:
+            self._despachar(candidatos, bloquear=True)
+
+    def _despachar(self, rutas, bloquear):
+        """Arma los lotes y los envía al pool. Sin `bloquear`, lo que no cabe queda pendiente."""
+        with self._cond:
+            rutas = sorted((r for r in rutas if r in self._pendientes), key=lambda r: self._pendientes[r][0])
+        grupos = {}
+        for ruta in rutas:
+            grupos.setdefault(self.agrupar(ruta) if self.agrupar else None, []).append(ruta)
+
+        for clave, rutas_grupo in grupos.items():
+            for inicio in range(0, len(rutas_grupo), self.max_lote):
+                lote = rutas_grupo[inicio:inicio + self.max_lote]
+                with self._cond:
+                    while not self._hay_lugar(clave):
+                        if not bloquear:
+                            break
+                        self._cond.wait()
+                    if not self._hay_lugar(clave):
+                        break
+                    for ruta in lote:
+                        self._pendientes.pop(ruta, None)
+                    self._lotes_en_vuelo += 1
+                    if clave is not None:
+                        self._claves_en_vuelo.add(clave)
+                    self._cond.notify_all()
+                self._executor.submit(self._ejecutar, clave, lote)
+
+    def _hay_lugar(self, clave):
+        return self._lotes_en_vuelo < self.max_en_vuelo and clave not in self._claves_en_vuelo
+
+    def _ejecutar(self, clave, lote):
+        try:
+            self.procesar_lote(lote)
+        except Exception as e:
+            if self.al_error:
+                self.al_error(lote, e)
+            else:
+                logging.exception(f"Error procesando un lote de {len(lote)} archivos")
+        finally:
+            with self._cond:
+                self._lotes_en_vuelo -= 1
+                self._claves_en_vuelo.discard(clave)
+                self._cond.notify_all()
+
+    def detener(self, procesar_pendientes=False):
+        """
+        Deja de aceptar eventos. Con `procesar_pendientes` entrega lo que quedaba
+        (sin esperar estabilidad) y espera a que terminen todos los lotes.
+        """
+        with self._cond:
+            self._detenido = True
+            self._vaciar = procesar_pendientes
+            self._cond.notify_all()
+        if procesar_pendientes:
+            self._hilo.join()
+        self._executor.shutdown(wait=procesar_pendientes)
@@ -14,18 +14,18 @@ logger = logging.getLogger(__name__)
 
 # Ahora sí podemos importar y usar logging
 import sys
+import asyncio
 import configparser
 import os
-import tempfile
 import base64
 import requests
+from contextlib import asynccontextmanager
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Any
 import pandas as pd
 import io
 import boto3
-from botocore.exceptions import ClientError
 import keyring
 
 from fastapi import FastAPI, HTTPException, Request, Depends
@@ -39,6 +39,7 @@ sys.path.insert(0, str(current_dir))
 
 # Importar servicio de autenticación local
 from auth_service import init_auth_service, get_auth_service
+import pending_design_log
 
 # Añadir el directorio shared al path para importar servicios compartidos
 shared_services_dir = Path(__file__).parent.parent.parent.parent / "shared" / "services"
@@ -51,7 +52,22 @@ except ImportError as e:
     logger.error("Error importando sharepoint_auth desde shared/services: %s", e)
     sharepoint_auth = None
 
-app = FastAPI(title="Producción PERÚ API", version="1.0.0")
+# Escritura append-only en Excel de SharePoint (Graph Excel API)
+try:
+    from sharepoint_excel_append import append_rows_to_sharepoint_excel
+except ImportError as e:
+    logger.error("Error importando sharepoint_excel_append desde shared/services: %s", e)
+    append_rows_to_sharepoint_excel = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Solo corre con la API sola: montada en el gateway, este llama a
+    # start_background_tasks/stop_background_tasks en sus eventos
+    start_background_tasks()
+    yield
+    stop_background_tasks()
+
+app = FastAPI(title="Producción PERÚ API", version="1.0.0", lifespan=lifespan)
 
 # Directorio base de la aplicación
 BASE_DIR = Path(__file__).parent.parent
@@ -66,9 +82,6 @@ if CONFIG_PATH.exists():
 else:
     logging.error(f"Archivo de configuración no encontrado: {CONFIG_PATH}")
 
-# Autenticador SharePoint global
-sharepoint_authenticator = None
-
 # Nombre del servicio en macOS Keychain para credenciales S3
 S3_KEYRING_SERVICE = "ProdPeruS3"
 
@@ -77,8 +90,14 @@ s3_client = None
 S3_BUCKET = None
 S3_REGION = None
 
-# Inicializar servicio de autenticación
-auth_service = init_auth_service(config_parser)
+# Intervalo (segundos) de compactación de segmentos de diseño pendiente. 0 desactiva.
+PENDING_DESIGN_COMPACTION_INTERVAL = int(os.getenv('PENDING_DESIGN_COMPACTION_INTERVAL', '600'))
+
+# Inicializar servicio de autenticación (comparte el broker de tokens SharePoint)
+auth_service = init_auth_service(
+    config_parser,
+    token_broker=sharepoint_auth.get_sharepoint_authenticator() if sharepoint_auth else None
+)
 
 # Lista de usuarios válidos (reemplaza USER_PASSWORDS)
 # Estos son los usuarios que tienen acceso al sistema
@@ -206,11 +225,10 @@ def get_current_user_from_token(request: Request) -> str:
     return username
 
 def get_sharepoint_authenticator():
-    """Obtener autenticador SharePoint"""
-    global sharepoint_authenticator
-    if sharepoint_authenticator is None and sharepoint_auth is not None:
-        sharepoint_authenticator = sharepoint_auth.SharePointAuth()
-    return sharepoint_authenticator
+    """Obtener el broker de tokens SharePoint compartido (singleton del proceso)"""
+    if sharepoint_auth is None:
+        return None
+    return sharepoint_auth.get_sharepoint_authenticator()
 
 def get_s3_client():
     """
@@ -271,59 +289,6 @@ def get_s3_client():
 
     return s3_client
 
-def _read_file_from_s3(s3_key: str) -> pd.DataFrame:
-    """Leer archivo Excel desde S3"""
-    s3 = get_s3_client()
-    if not s3:
-        logger.error(f"❌ Cliente S3 no disponible. No se puede leer {s3_key}")
-        logger.error("Verifique que las credenciales AWS estén configuradas correctamente")
-        raise ValueError("Cliente S3 no disponible. Verifique configuración de credenciales AWS.")
-
-    try:
-        logger.info(f"Leyendo archivo desde S3: {S3_BUCKET}/{s3_key}")
-
-        response = s3.get_object(Bucket=S3_BUCKET, Key=s3_key)
-        file_content = response['Body'].read()
-
-        return pd.read_excel(io.BytesIO(file_content))
-
-    except ClientError as e:
-        if e.response['Error']['Code'] == 'NoSuchKey':
-            logger.warning(f"Archivo no existe en S3: {s3_key}. Retornando DataFrame vacío.")
-            return pd.DataFrame()
-        else:
-            logger.error(f"Error de S3 al leer archivo {s3_key}: {e}")
-            raise
-
-    except Exception as e:
-        logger.error(f"Error leyendo archivo desde S3: {e}")
-        raise
-
-def _upload_file_to_s3(s3_key: str, file_path: str) -> bool:
-    """Subir archivo a S3"""
-    s3 = get_s3_client()
-    if not s3:
-        logger.error(f"❌ Cliente S3 no disponible. No se puede subir {s3_key}")
-        logger.error("Verifique que las credenciales AWS estén configuradas correctamente")
-        raise ValueError("Cliente S3 no disponible. Verifique configuración de credenciales AWS.")
-
-    try:
-        logger.info(f"Subiendo archivo a S3: {S3_BUCKET}/{s3_key}")
-
-        s3.upload_file(
-            file_path,
-            S3_BUCKET,
-            s3_key,
-            ExtraArgs={'ContentType': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'}
-        )
-
-        logger.info(f"✅ Archivo subido exitosamente a S3")
-        return True
-
-    except Exception as e:
-        logger.error(f"❌ Error subiendo archivo a S3: {e}")
-        raise
-
 def get_team_members() -> List[Dict[str, str]]:
     """Obtener lista de integrantes del equipo desde la configuración local"""
     if not config_parser.has_section('TeamMembers'):
@@ -666,68 +631,27 @@ def load_declaration_to_sharepoint(team_member: str, declaration_text: str) -> D
 
         # Autenticar con SharePoint
         auth = get_sharepoint_authenticator()
-        if not auth:
+        if not auth or append_rows_to_sharepoint_excel is None:
             raise ValueError("Autenticador SharePoint no disponible")
 
-        access_token = auth.get_token()
-
-        # Leer el archivo Excel actual desde SharePoint
-        logging.info(f"Leyendo archivo SharePoint para {team_member}: {excel_url}")
-        df = _read_file_from_sharepoint(excel_url)
-        logging.info(f"Archivo leído. Filas: {len(df)}, Columnas: {list(df.columns) if not df.empty else 'vacío'}")
-
         # Preparar la nueva declaración
         declaration_lines = [line.strip() for line in declaration_text.split('\n') if line.strip()]
         current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         current_user = team_member.replace('_', ' ').title()
 
-        # Crear DataFrame con la nueva declaración
-        declaration_data = {
-            'EAN_HIJO': declaration_lines,
-            'Fecha': [current_time] * len(declaration_lines),
-            'Usuario': [current_user] * len(declaration_lines)
-        }
-
-        new_declaration_df = pd.DataFrame(declaration_data)
-
-        # Si el archivo está vacío o no tiene la estructura esperada, crear uno nuevo
-        if df.empty or 'EAN_HIJO' not in df.columns:
-            df = new_declaration_df
-        else:
-            df = pd.concat([df, new_declaration_df], ignore_index=True)
-
-        # Guardar archivo temporal
-        temp_dir = tempfile.gettempdir()
-        temp_file = os.path.join(temp_dir, f"declaration_{team_member}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx")
-        df.to_excel(temp_file, index=False)
-
-        # Subir a SharePoint
-        sharepoint_url_bytes = excel_url.encode('utf-8')
-        encoded_url = base64.urlsafe_b64encode(sharepoint_url_bytes).decode('utf-8').rstrip('=')
+        # Agregar solo las filas nuevas (sin descargar ni re-subir el archivo completo)
+        append_rows_to_sharepoint_excel(
+            excel_url,
+            columns=['EAN_HIJO', 'Fecha', 'Usuario'],
+            rows=[[line, current_time, current_user] for line in declaration_lines],
+            auth=auth
+        )
 
-        graph_url = f"https://graph.microsoft.com/v1.0/shares/u!{encoded_url}/root/content"
-        headers = {
-            'Authorization': f'Bearer {access_token}',
-            'Content-Type': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        return {
+            "success": True,
+            "message": f"Declaración cargada exitosamente para {team_member}"
         }
 
-        with open(temp_file, 'rb') as file:
-            response = requests.put(graph_url, headers=headers, data=file, verify=False)
-
-        # Limpiar archivo temporal
-        os.remove(temp_file)
-
-        if response.status_code in [200, 201]:
-            return {
-                "success": True,
-                "message": f"Declaración cargada exitosamente para {team_member}"
-            }
-        else:
-            return {
-                "success": False,
-                "message": f"Error al subir archivo: {response.status_code} - {response.text}"
-            }
-
     except Exception as e:
         logging.error(f"Error cargando declaración: {e}")
         return {
@@ -750,68 +674,27 @@ def load_rejection_to_sharepoint(team_member: str, rejection_text: str, rejectio
 
         # Autenticar con SharePoint
         auth = get_sharepoint_authenticator()
-        if not auth:
+        if not auth or append_rows_to_sharepoint_excel is None:
             raise ValueError("Autenticador SharePoint no disponible")
 
-        access_token = auth.get_token()
-
-        # Leer el archivo Excel actual desde SharePoint
-        logging.info(f"Leyendo archivo SharePoint para rechazo {team_member}: {excel_url}")
-        df = _read_file_from_sharepoint(excel_url)
-
         # Preparar el nuevo rechazo
         rejection_lines = [line.strip() for line in rejection_text.split('\n') if line.strip()]
         current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         current_user = team_member.replace('_', ' ').title()
 
-        # Crear DataFrame con el nuevo rechazo
-        rejection_data = {
-            'EAN_HIJO': rejection_lines,
-            'Observacion': [rejection_obs] * len(rejection_lines),
-            'Fecha': [current_time] * len(rejection_lines),
-            'Usuario': [current_user] * len(rejection_lines)
-        }
-
-        new_rejection_df = pd.DataFrame(rejection_data)
-
-        # Si el archivo está vacío o no tiene la estructura esperada, crear uno nuevo
-        if df.empty or 'EAN_HIJO' not in df.columns:
-            df = new_rejection_df
-        else:
-            df = pd.concat([df, new_rejection_df], ignore_index=True)
-
-        # Guardar archivo temporal
-        temp_dir = tempfile.gettempdir()
-        temp_file = os.path.join(temp_dir, f"rejection_{team_member}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx")
-        df.to_excel(temp_file, index=False)
-
-        # Subir a SharePoint
-        sharepoint_url_bytes = excel_url.encode('utf-8')
-        encoded_url = base64.urlsafe_b64encode(sharepoint_url_bytes).decode('utf-8').rstrip('=')
+        # Agregar solo las filas nuevas (sin descargar ni re-subir el archivo completo)
+        append_rows_to_sharepoint_excel(
+            excel_url,
+            columns=['EAN_HIJO', 'Observacion', 'Fecha', 'Usuario'],
+            rows=[[line, rejection_obs, current_time, current_user] for line in rejection_lines],
+            auth=auth
+        )
 
-        graph_url = f"https://graph.microsoft.com/v1.0/shares/u!{encoded_url}/root/content"
-        headers = {
-            'Authorization': f'Bearer {access_token}',
-            'Content-Type': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        return {
+            "success": True,
+            "message": f"Rechazo cargado exitosamente para {team_member}"
         }
 
-        with open(temp_file, 'rb') as file:
-            response = requests.put(graph_url, headers=headers, data=file, verify=False)
-
-        # Limpiar archivo temporal
-        os.remove(temp_file)
-
-        if response.status_code in [200, 201]:
-            return {
-                "success": True,
-                "message": f"Rechazo cargado exitosamente para {team_member}"
-            }
-        else:
-            return {
-                "success": False,
-                "message": f"Error al subir archivo: {response.status_code} - {response.text}"
-            }
-
     except Exception as e:
         logging.error(f"Error cargando rechazo: {e}")
         return {
@@ -819,6 +702,40 @@ def load_rejection_to_sharepoint(team_member: str, rejection_text: str, rejectio
             "message": f"Error interno: {str(e)}"
         }
 
+def _get_pending_design_keys() -> List[str]:
+    """Keys S3 de todos los archivos de diseño pendiente configurados (Chile y Perú)"""
+    keys = []
+    for section in ('TeamMembersPendingDesign', 'TeamMembersPendingDesignPeru'):
+        if config_parser.has_section(section):
+            keys.extend(value for _, value in config_parser.items(section))
+    return list(dict.fromkeys(keys))
+
+def _ensure_pending_design_compaction(compact_first: bool = False):
+    """Arranca la compactación periódica de segmentos (idempotente)"""
+    def _client_and_bucket():
+        return get_s3_client(), S3_BUCKET
+
+    pending_design_log.start_compaction_scheduler(
+        _client_and_bucket,
+        _get_pending_design_keys,
+        PENDING_DESIGN_COMPACTION_INTERVAL,
+        compact_first=compact_first
+    )
+
+def start_background_tasks():
+    """Tareas de arranque: compacta los segmentos de diseño pendiente que quedaron de
+    la ejecución anterior (sin esperar al próximo envío) y programa la compactación periódica"""
+    _ensure_pending_design_compaction(compact_first=True)
+
+def stop_background_tasks():
+    """Detiene la compactación periódica de diseño pendiente"""
+    pending_design_log.stop_compaction_scheduler()
+
+def compact_pending_design(s3_keys: List[str] = None) -> Dict[str, Any]:
+    """Compactar bajo demanda los segmentos de diseño pendiente en sus Excel entregables"""
+    s3 = get_s3_client()
+    return pending_design_log.compact_all(s3, S3_BUCKET, s3_keys or _get_pending_design_keys())
+
 def load_pending_design_to_sharepoint(team_member: str, pending_design_text: str, country: str = 'chile') -> Dict[str, Any]:
     """Cargar un diseño pendiente usando S3 como backend de almacenamiento
 
@@ -842,50 +759,28 @@ def load_pending_design_to_sharepoint(team_member: str, pending_design_text: str
         s3_key = config_parser.get(config_section, team_member)
         logging.info(f"S3 key configurada para diseño pendiente {country.upper()} {team_member}: {s3_key}")
 
-        # Leer el archivo Excel actual desde S3
-        logging.info(f"Leyendo archivo desde S3 para diseño pendiente {team_member}: {s3_key}")
-        df = _read_file_from_s3(s3_key)
+        s3 = get_s3_client()
 
-        # Obtener EANs existentes para verificar duplicados
-        existing_eans = set()
-        if not df.empty and 'EAN_HIJO' in df.columns:
-            existing_eans = set(df['EAN_HIJO'].astype(str).tolist())
+        # Preparar el nuevo diseño pendiente (duplicados dentro del envío se descartan;
+        # los ya presentes en el Excel se descartan al compactar)
+        pending_design_lines = list(dict.fromkeys(
+            line.strip() for line in pending_design_text.split('\n') if line.strip()
+        ))
 
-        # Preparar el nuevo diseño pendiente, filtrando duplicados
-        pending_design_lines = [line.strip() for line in pending_design_text.split('\n') if line.strip()]
-        # Filtrar solo los valores que NO existen en el archivo actual
-        unique_pending_lines = [line for line in pending_design_lines if line not in existing_eans]
-
-        # Solo procesar si hay valores únicos para agregar
-        if unique_pending_lines:
+        if pending_design_lines:
             current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             current_user = team_member.replace('_', ' ').title()
 
-            # Crear DataFrame con el nuevo diseño pendiente (solo valores únicos)
-            pending_design_data = {
-                'EAN_HIJO': unique_pending_lines,
-                'Fecha': [current_time] * len(unique_pending_lines),
-                'Usuario': [current_user] * len(unique_pending_lines)
-            }
-
-            new_pending_design_df = pd.DataFrame(pending_design_data)
-
-            # Si el archivo está vacío o no tiene la estructura esperada, crear uno nuevo
-            if df.empty or 'EAN_HIJO' not in df.columns:
-                df = new_pending_design_df
-            else:
-                df = pd.concat([df, new_pending_design_df], ignore_index=True)
-
-            # Guardar archivo temporal
-            temp_dir = tempfile.gettempdir()
-            temp_file = os.path.join(temp_dir, f"pending_design_{team_member}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx")
-            df.to_excel(temp_file, index=False)
+            pending_design_df = pd.DataFrame({
+                'EAN_HIJO': pending_design_lines,
+                'Fecha': [current_time] * len(pending_design_lines),
+                'Usuario': [current_user] * len(pending_design_lines)
+            })
 
-            # Subir a S3
-            _upload_file_to_s3(s3_key, temp_file)
+            # Escribir un segmento inmutable (sin leer ni re-subir el Excel completo)
+            pending_design_log.write_segment(s3, S3_BUCKET, s3_key, pending_design_df)
 
-            # Limpiar archivo temporal
-            os.remove(temp_file)
+        _ensure_pending_design_compaction()
 
         return {
             "success": True,
@@ -1249,6 +1144,32 @@ async def load_pending_design_peru(pending_design_request: PendingDesignRequest,
         logger.error("Error cargando diseño pendiente Peru: %s", e)
         raise HTTPException(status_code=500, detail="Error al procesar el diseño pendiente") from e
 
+@app.post("/api/pending-design/compact")
+async def compact_pending_design_endpoint(request: Request):
+    """Compactar bajo demanda los segmentos de diseño pendiente del usuario autenticado"""
+    try:
+        authenticated_user = get_current_user_from_token(request)
+
+        if not has_pending_design_access(authenticated_user):
+            raise HTTPException(status_code=403, detail="Usuario no tiene acceso a diseño pendiente")
+
+        s3_keys = [
+            config_parser.get(section, authenticated_user)
+            for section in ('TeamMembersPendingDesign', 'TeamMembersPendingDesignPeru')
+            if config_parser.has_option(section, authenticated_user)
+        ]
+        if not s3_keys:
+            raise HTTPException(status_code=404, detail="Usuario sin archivos de diseño pendiente configurados")
+
+        results = await asyncio.to_thread(compact_pending_design, s3_keys)
+        return {"success": True, "results": results}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error compactando diseño pendiente: %s", e)
+        raise HTTPException(status_code=500, detail="Error al compactar el diseño pendiente") from e
+
 # Manejadores de errores
 
 @app.exception_handler(404)
@@ -3,7 +3,9 @@ Servicio de autenticación para Prod Peru usando Microsoft Azure AD.
 Implementa autenticación interactiva con MSAL y validación de correo corporativo.
 
 Uses in-memory token caching to avoid multiple authentication prompts during
-a session, while ensuring tokens are not persisted to disk.
+a session, while ensuring tokens are not persisted to disk. The MSAL app is
+created once per service; when a shared token broker (SharePointAuth) is
+provided, login and SharePoint calls share the same session and token.
 """
 
 import logging
@@ -29,20 +31,25 @@ SCOPES = ["https://graph.microsoft.com/.default"]
 class AuthService:
     """Servicio de autenticación con Microsoft Azure AD."""
 
-    def __init__(self, config_parser):
+    def __init__(self, config_parser, token_broker=None):
         """
         Inicializa el servicio de autenticación.
 
         Args:
             config_parser: ConfigParser con la configuración de la aplicación
+            token_broker: Broker de tokens compartido (SharePointAuth) opcional.
+                Si se entrega, el login reutiliza su app MSAL y su token en memoria.
         """
         self.config = config_parser
         self._load_auth_config()
         self._pending_auth: Dict[str, Dict[str, Any]] = {}
+        self._token_broker = token_broker
 
         # Configurar caché de tokens en memoria (no persistente)
         self._token_cache = msal.SerializableTokenCache()
         self._auth_lock = threading.Lock()  # Prevent concurrent interactive auth
+        # App MSAL única por servicio (antes se creaba una nueva en cada login)
+        self._msal_app: Optional[msal.PublicClientApplication] = None
 
     def _load_auth_config(self):
         """Carga la configuración de autenticación desde config.ini."""
@@ -61,6 +68,65 @@ class AuthService:
             verify=False
         )
 
+    def _get_msal_app(self) -> msal.PublicClientApplication:
+        """Devuelve la app MSAL del servicio, creándola la primera vez."""
+        if self._msal_app is None:
+            with self._auth_lock:
+                if self._msal_app is None:
+                    self._msal_app = self._create_msal_app()
+        return self._msal_app
+
+    def _acquire_access_token(self) -> Dict[str, Any]:
+        """
+        Obtiene un access token de Microsoft: silencioso primero, interactivo si no hay sesión.
+
+        Returns:
+            Resultado estilo MSAL (con 'access_token' o 'error')
+        """
+        if self._token_broker is not None:
+            try:
+                return {'access_token': self._token_broker.get_token()}
+            except Exception as e:
+                return {'error': 'broker_error', 'error_description': str(e)}
+
+        app = self._get_msal_app()
+
+        # Try to get token silently from any cached account
+        accounts = app.get_accounts()
+        result = None
+
+        if accounts:
+            # Try silent acquisition with the first account
+            result = app.acquire_token_silent(
+                scopes=SCOPES,
+                account=accounts[0]
+            )
+            if result and "access_token" in result:
+                logger.debug("Token obtenido silenciosamente desde caché")
+
+        # If no cached token, need interactive auth with lock
+        if not result or "access_token" not in result:
+            with self._auth_lock:
+                # Double-check after acquiring lock
+                accounts = app.get_accounts()
+                if accounts:
+                    result = app.acquire_token_silent(
+                        scopes=SCOPES,
+                        account=accounts[0]
+                    )
+                    if result and "access_token" in result:
+                        logger.debug("Token obtenido silenciosamente después de lock")
+
+                # Still no token, do interactive auth
+                if not result or "access_token" not in result:
+                    logger.info("Iniciando autenticación interactiva...")
+                    result = app.acquire_token_interactive(
+                        scopes=SCOPES,
+                        prompt="login"  # Forces full credential entry
+                    )
+
+        return result
+
     def authenticate(self) -> Dict[str, Any]:
         """
         Autentica un usuario usando MSAL interactivo sin requerir username previo.
@@ -71,41 +137,7 @@ class AuthService:
             Dict con 'success', 'token' (JWT), 'username', 'email' o 'error'
         """
         try:
-            app = self._create_msal_app()
-
-            # Try to get token silently from any cached account
-            accounts = app.get_accounts()
-            result = None
-
-            if accounts:
-                # Try silent acquisition with the first account
-                result = app.acquire_token_silent(
-                    scopes=SCOPES,
-                    account=accounts[0]
-                )
-                if result and "access_token" in result:
-                    logger.debug("Token obtenido silenciosamente desde caché")
-
-            # If no cached token, need interactive auth with lock
-            if not result or "access_token" not in result:
-                with self._auth_lock:
-                    # Double-check after acquiring lock
-                    accounts = app.get_accounts()
-                    if accounts:
-                        result = app.acquire_token_silent(
-                            scopes=SCOPES,
-                            account=accounts[0]
-                        )
-                        if result and "access_token" in result:
-                            logger.debug("Token obtenido silenciosamente después de lock")
-
-                    # Still no token, do interactive auth
-                    if not result or "access_token" not in result:
-                        logger.info("Iniciando autenticación interactiva...")
-                        result = app.acquire_token_interactive(
-                            scopes=SCOPES,
-                            prompt="login"  # Forces full credential entry
-                        )
+            result = self._acquire_access_token()
 
             if 'error' in result:
                 logger.error(f"Error en MSAL: {result.get('error_description', result.get('error'))}")
@@ -298,16 +330,17 @@ def get_auth_service() -> Optional[AuthService]:
     return _auth_service
 
 
-def init_auth_service(config_parser) -> AuthService:
+def init_auth_service(config_parser, token_broker=None) -> AuthService:
     """
     Inicializa el servicio de autenticación global.
 
     Args:
         config_parser: ConfigParser con la configuración
+        token_broker: Broker de tokens SharePoint compartido (opcional)
 
     Returns:
         Instancia del AuthService
     """
     global _auth_service
-    _auth_service = AuthService(config_parser)
+    _auth_service = AuthService(config_parser, token_broker=token_broker)
     return _auth_service
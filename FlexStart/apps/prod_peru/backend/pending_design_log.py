@@ -0,0 +1,211 @@
+"""
+Log incremental de diseño pendiente sobre S3 (segmentos inmutables + compactación).
+
+Cada envío escribe un segmento CSV pequeño e inmutable bajo un prefijo propio del
+archivo del integrante (`<s3_key>.segments/`), en lugar de leer el Excel completo,
+concatenar y volver a subirlo. Como cada segmento tiene una key única, los envíos
+concurrentes nunca se pisan y el costo de un envío es proporcional a sus filas.
+
+La compactación mezcla los segmentos pendientes en el Excel entregable (deduplicando
+por EAN_HIJO, conservando la primera aparición) y luego elimina solo los segmentos
+que incorporó; los que lleguen durante la compactación quedan para la siguiente.
+Se ejecuta bajo demanda o periódicamente desde un thread en segundo plano.
+"""
+
+import io
+import logging
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+SEGMENTS_SUFFIX = ".segments/"
+EXCEL_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+PENDING_DESIGN_COLUMNS = ['EAN_HIJO', 'Fecha', 'Usuario']
+
+# Una compactación a la vez por archivo dentro del proceso
+_compaction_locks: Dict[str, threading.Lock] = {}
+_compaction_locks_guard = threading.Lock()
+
+_scheduler_thread: Optional[threading.Thread] = None
+_scheduler_stop = threading.Event()
+
+
+def segment_prefix(s3_key: str) -> str:
+    """Prefijo S3 donde se guardan los segmentos del archivo entregable."""
+    return f"{s3_key}{SEGMENTS_SUFFIX}"
+
+
+def _compaction_lock(s3_key: str) -> threading.Lock:
+    with _compaction_locks_guard:
+        if s3_key not in _compaction_locks:
+            _compaction_locks[s3_key] = threading.Lock()
+        return _compaction_locks[s3_key]
+
+
+def write_segment(s3, bucket: str, s3_key: str, rows: pd.DataFrame) -> Optional[str]:
+    """
+    Escribe las filas de un envío como segmento CSV inmutable.
+
+    Args:
+        s3: Cliente boto3 S3
+        bucket: Bucket destino
+        s3_key: Key del Excel entregable (define el prefijo de segmentos)
+        rows: Filas nuevas (columnas PENDING_DESIGN_COLUMNS)
+
+    Returns:
+        Key del segmento escrito, o None si no había filas
+    """
+    if rows.empty:
+        return None
+
+    # Timestamp al inicio para que el orden lexicográfico sea el orden de llegada
+    timestamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+    segment_key = f"{segment_prefix(s3_key)}{timestamp}-{uuid.uuid4().hex[:8]}.csv"
+
+    s3.put_object(
+        Bucket=bucket,
+        Key=segment_key,
+        Body=rows.to_csv(index=False).encode('utf-8'),
+        ContentType='text/csv'
+    )
+    logger.info(f"📝 Segmento de diseño pendiente escrito: {segment_key} ({len(rows)} filas)")
+    return segment_key
+
+
+def list_segments(s3, bucket: str, s3_key: str) -> List[str]:
+    """Lista las keys de segmentos pendientes del archivo, en orden de llegada."""
+    keys = []
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=segment_prefix(s3_key)):
+        keys.extend(obj['Key'] for obj in page.get('Contents', []))
+    return sorted(keys)
+
+
+def _read_deliverable(s3, bucket: str, s3_key: str) -> pd.DataFrame:
+    """Lee el Excel entregable; DataFrame vacío si todavía no existe."""
+    try:
+        response = s3.get_object(Bucket=bucket, Key=s3_key)
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+            return pd.DataFrame(columns=PENDING_DESIGN_COLUMNS)
+        raise
+    return pd.read_excel(io.BytesIO(response['Body'].read()), dtype={'EAN_HIJO': str})
+
+
+def _read_segments(s3, bucket: str, segment_keys: Iterable[str]) -> List[pd.DataFrame]:
+    frames = []
+    for key in segment_keys:
+        body = s3.get_object(Bucket=bucket, Key=key)['Body'].read()
+        frames.append(pd.read_csv(io.BytesIO(body), dtype=str, keep_default_na=False))
+    return frames
+
+
+def _delete_keys(s3, bucket: str, keys: List[str]) -> None:
+    # delete_objects acepta hasta 1000 keys por llamada
+    for start in range(0, len(keys), 1000):
+        batch = keys[start:start + 1000]
+        s3.delete_objects(Bucket=bucket, Delete={'Objects': [{'Key': k} for k in batch], 'Quiet': True})
+
+
+def compact(s3, bucket: str, s3_key: str) -> Dict[str, Any]:
+    """
+    Mezcla los segmentos pendientes en el Excel entregable y elimina los incorporados.
+
+    Returns:
+        Dict con 'segments' compactados, 'rows_added' y 'total_rows' del entregable
+    """
+    with _compaction_lock(s3_key):
+        segment_keys = list_segments(s3, bucket, s3_key)
+        if not segment_keys:
+            return {'segments': 0, 'rows_added': 0, 'total_rows': None}
+
+        df = _read_deliverable(s3, bucket, s3_key)
+        rows_before = len(df)
+        if 'EAN_HIJO' in df.columns:
+            df['EAN_HIJO'] = df['EAN_HIJO'].astype(str)
+        else:
+            df = pd.DataFrame(columns=PENDING_DESIGN_COLUMNS)
+            rows_before = 0
+
+        merged = pd.concat([df] + _read_segments(s3, bucket, segment_keys), ignore_index=True)
+        # Mismo criterio que antes al escribir: un EAN ya declarado no se vuelve a agregar
+        merged = merged.drop_duplicates(subset=['EAN_HIJO'], keep='first')
+
+        buffer = io.BytesIO()
+        merged.to_excel(buffer, index=False)
+        s3.put_object(Bucket=bucket, Key=s3_key, Body=buffer.getvalue(), ContentType=EXCEL_CONTENT_TYPE)
+
+        # Solo se borran los segmentos leídos; los nuevos quedan para la próxima pasada
+        _delete_keys(s3, bucket, segment_keys)
+
+        result = {
+            'segments': len(segment_keys),
+            'rows_added': len(merged) - rows_before,
+            'total_rows': len(merged)
+        }
+        logger.info(f"🗜️ Compactación de {s3_key}: {result}")
+        return result
+
+
+def compact_all(s3, bucket: str, s3_keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """Compacta varios archivos; un error en uno no detiene al resto."""
+    results = {}
+    for s3_key in s3_keys:
+        try:
+            results[s3_key] = compact(s3, bucket, s3_key)
+        except Exception as e:
+            logger.error(f"❌ Error compactando {s3_key}: {e}")
+            results[s3_key] = {'error': str(e)}
+    return results
+
+
+def start_compaction_scheduler(
+    get_client: Callable[[], Tuple[object, str]],
+    get_keys: Callable[[], List[str]],
+    interval_seconds: int,
+    compact_first: bool = False
+) -> None:
+    """
+    Inicia (una sola vez) el thread que compacta periódicamente todos los archivos.
+
+    Args:
+        get_client: Devuelve (cliente S3, bucket) en cada ciclo
+        get_keys: Devuelve las keys de los entregables configurados
+        interval_seconds: Intervalo entre compactaciones (<= 0 desactiva el scheduler)
+        compact_first: Compactar al arrancar, sin esperar el primer intervalo
+            (segmentos que quedaron de una ejecución anterior)
+    """
+    global _scheduler_thread
+    if interval_seconds <= 0:
+        return
+    if _scheduler_thread is not None and _scheduler_thread.is_alive():
+        return
+
+    def _compact():
+        try:
+            s3, bucket = get_client()
+            compact_all(s3, bucket, get_keys())
+        except Exception as e:
+            logger.warning(f"⚠️ Compactación programada falló: {e}")
+
+    def _loop():
+        if compact_first:
+            _compact()
+        while not _scheduler_stop.wait(interval_seconds):
+            _compact()
+
+    _scheduler_stop.clear()
+    _scheduler_thread = threading.Thread(target=_loop, name="pending-design-compaction", daemon=True)
+    _scheduler_thread.start()
+    logger.info(f"⏱️ Compactación de diseño pendiente programada cada {interval_seconds}s")
+
+
+def stop_compaction_scheduler() -> None:
+    """Detiene el thread de compactación periódica."""
+    _scheduler_stop.set()
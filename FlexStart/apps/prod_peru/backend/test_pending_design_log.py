@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests del log incremental de diseño pendiente (pending_design_log.py) sobre un S3 local (moto).
+
+Verifica que:
+1. Cada envío escribe un segmento independiente (sin tocar el Excel entregable)
+2. La compactación mezcla segmentos en el Excel y deduplica por EAN_HIJO
+3. Solo se eliminan los segmentos compactados
+4. El scheduler puede compactar al arrancar (segmentos de una ejecución anterior)
+
+Uso:
+    python3 -m pytest test_pending_design_log.py
+"""
+
+import io
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Agregar directorio backend al path
+sys.path.insert(0, str(Path(__file__).parent))
+
+pd = pytest.importorskip("pandas")
+boto3 = pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+pytest.importorskip("openpyxl")
+
+import pending_design_log
+
+BUCKET = "prod-peru-test"
+KEY = "pendientes/ana.xlsx"
+
+mock_aws = getattr(moto, "mock_aws", None) or getattr(moto, "mock_s3")
+
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def _rows(*eans):
+    return pd.DataFrame({
+        'EAN_HIJO': list(eans),
+        'Fecha': ['2024-01-01 10:00:00'] * len(eans),
+        'Usuario': ['Ana'] * len(eans)
+    })
+
+
+def _read_deliverable(s3):
+    body = s3.get_object(Bucket=BUCKET, Key=KEY)['Body'].read()
+    return pd.read_excel(io.BytesIO(body), dtype={'EAN_HIJO': str})
+
+
+def test_envio_escribe_segmento_sin_tocar_entregable(s3):
+    pending_design_log.write_segment(s3, BUCKET, KEY, _rows("1", "2"))
+    pending_design_log.write_segment(s3, BUCKET, KEY, _rows("3"))
+
+    assert len(pending_design_log.list_segments(s3, BUCKET, KEY)) == 2
+    listed = s3.list_objects_v2(Bucket=BUCKET, Prefix=KEY)
+    assert all(obj['Key'].startswith(pending_design_log.segment_prefix(KEY)) for obj in listed['Contents'])
+
+
+def test_compactacion_mezcla_y_deduplica(s3):
+    existing = io.BytesIO()
+    _rows("1").to_excel(existing, index=False)
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=existing.getvalue())
+
+    pending_design_log.write_segment(s3, BUCKET, KEY, _rows("1", "2"))
+    pending_design_log.write_segment(s3, BUCKET, KEY, _rows("2", "3"))
+
+    result = pending_design_log.compact(s3, BUCKET, KEY)
+
+    assert result == {'segments': 2, 'rows_added': 2, 'total_rows': 3}
+    assert _read_deliverable(s3)['EAN_HIJO'].tolist() == ["1", "2", "3"]
+    assert pending_design_log.list_segments(s3, BUCKET, KEY) == []
+
+
+def test_compactacion_sin_entregable_previo(s3):
+    pending_design_log.write_segment(s3, BUCKET, KEY, _rows("9"))
+    pending_design_log.compact(s3, BUCKET, KEY)
+    assert _read_deliverable(s3)['EAN_HIJO'].tolist() == ["9"]
+
+
+def test_compactacion_sin_segmentos_no_escribe(s3):
+    assert pending_design_log.compact(s3, BUCKET, KEY)['segments'] == 0
+    assert 'Contents' not in s3.list_objects_v2(Bucket=BUCKET, Prefix=KEY)
+
+
+
+def test_scheduler_compacta_al_arrancar(s3):
+    pending_design_log.write_segment(s3, BUCKET, KEY, _rows("1"))
+
+    pending_design_log.start_compaction_scheduler(lambda: (s3, BUCKET), lambda: [KEY], 3600, compact_first=True)
+    try:
+        deadline = time.monotonic() + 5
+        while pending_design_log.list_segments(s3, BUCKET, KEY) and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        pending_design_log.stop_compaction_scheduler()
+
+    assert pending_design_log.list_segments(s3, BUCKET, KEY) == []
+    assert list(_read_deliverable(s3)['EAN_HIJO']) == ["1"]
@@ -27,6 +27,7 @@ from core.error_handlers import api_error_handler, validate_config, OperationTyp
 from services.data_service import create_data_service
 from services.filter_service import create_filter_service
 from services.export_service import create_export_service
+from services.parse_utils import shutdown_parse_executor
 
 # Sistema de capabilities con fallback
 try:
@@ -466,6 +467,18 @@ async def shutdown_event():
     else:
         logging.info("[SHUTDOWN] All executors shutdown successfully")
 
+    # Pool de procesos de parseo (carga async)
+    try:
+        shutdown_parse_executor(wait=False)
+    except Exception as e:
+        logging.warning(f"[SHUTDOWN] Error cerrando pool de parseo: {e}")
+
+    # Refresco de token SharePoint en segundo plano
+    try:
+        main_logic.get_sharepoint_authenticator().stop_background_refresh()
+    except Exception as e:
+        logging.warning(f"[SHUTDOWN] Error deteniendo refresco de token: {e}")
+
     # Paso 5/5: Limpieza completa
     logging.info("[SHUTDOWN] Paso 5/5: Limpieza completa")
     logging.info("[SHUTDOWN] Aplicación FastAPI cerrada correctamente")
@@ -1199,41 +1212,57 @@ async def stream_logs(request: Request):
     return StreamingResponse(log_generator(request), media_type="text/event-stream")
 
 
+# Clientes SSE de progreso conectados. Si el último se desconecta con una carga
+# a medias, la carga se cancela (nadie está esperando el resultado).
+data_load_sse_clients = 0
+
+
 async def data_load_progress_generator(request_param: Request):
     """Generador async para transmitir progreso de carga de datos via SSE.
 
     Consume del queue.Queue síncrono (thread-safe) que se alimenta desde ThreadPoolExecutor.
+    Al desconectarse el último cliente antes de recibir el mensaje final
+    ('complete'/'error') cancela la carga en curso.
     """
+    global data_load_sse_clients
     logging.info("Cliente SSE de progreso de carga conectado")
+    data_load_sse_clients += 1
+    load_finished = False
 
-    while True:
-        if await request_param.is_disconnected():
-            logging.info("Cliente SSE de progreso de carga desconectado")
-            break
+    try:
+        while True:
+            if await request_param.is_disconnected():
+                logging.info("Cliente SSE de progreso de carga desconectado")
+                break
 
-        try:
-            # Consumir del queue síncrono con timeout
-            # Usar run_in_executor para no bloquear el event loop
-            loop = asyncio.get_running_loop()
-
-            # Ejecutar get() del queue síncrono en executor
-            message_data = await loop.run_in_executor(
-                None,
-                lambda: data_load_progress_queue.get(timeout=15)
-            )
+            try:
+                # Consumir del queue síncrono con timeout
+                # Usar run_in_executor para no bloquear el event loop
+                loop = asyncio.get_running_loop()
+
+                # Ejecutar get() del queue síncrono en executor
+                message_data = await loop.run_in_executor(
+                    None,
+                    lambda: data_load_progress_queue.get(timeout=15)
+                )
 
-            # Enviar el mensaje de progreso al cliente
-            yield f"data: {json.dumps(message_data)}\n\n"
+                # Enviar el mensaje de progreso al cliente
+                yield f"data: {json.dumps(message_data)}\n\n"
+                load_finished = message_data.get("type") in ("complete", "error", "shutdown")
 
-        except queue.Empty:
-            # Keep-alive cada 15 segundos si no hay mensajes
-            yield ": keep-alive\n\n"
-            continue
-        except Exception as e:
-            logging.error(f"Error en generador SSE de progreso de carga: {e}")
-            break
+            except queue.Empty:
+                # Keep-alive cada 15 segundos si no hay mensajes
+                yield ": keep-alive\n\n"
+                continue
+            except Exception as e:
+                logging.error(f"Error en generador SSE de progreso de carga: {e}")
+                break
 
-        await asyncio.sleep(0.01)
+            await asyncio.sleep(0.01)
+    finally:
+        data_load_sse_clients -= 1
+        if data_load_sse_clients <= 0 and not load_finished:
+            get_data_service().cancel_active_load("cliente SSE de progreso desconectado")
 
 
 @app.get("/api/progress/load/stream", summary="Flujo de progreso de carga de datos (SSE)")
@@ -1284,6 +1313,9 @@ async def api_refresh_data(blob_display_name: str, request: Optional[DataLoadReq
     try:
         result = await get_data_service().refresh_blob_data_safe(blob_display_name, selected_columns=selected_columns)
         return result
+    except InterruptedError as ie:
+        logging.info(f"Refresh de {blob_display_name} cancelado: {ie}")
+        raise HTTPException(status_code=499, detail=str(ie))
     except ValueError as ve:
         logging.error(f"ValueError en api_refresh_data para {blob_display_name}: {ve}", exc_info=True)
         raise HTTPException(status_code=400, detail=str(ve))
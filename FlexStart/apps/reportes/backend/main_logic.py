@@ -5,11 +5,12 @@ import json
 import logging
 import os
 import tempfile
+import threading
 from collections import deque
 from datetime import datetime, timezone
 from pathlib import Path
 from urllib.parse import urlparse, quote
-from typing import List, Dict, Any, Optional, Callable, Iterator
+from typing import List, Dict, Any, Optional, Callable, Iterator, Tuple
 from concurrent.futures import ThreadPoolExecutor
 
 # Importaciones de terceros
@@ -39,10 +40,12 @@ from services.filter_service import (_get_empty_filter_response, _get_sku_column
 from services.data_service import (_create_config_parser, _parse_filter_section,
                                  _build_blob_config, get_blob_config, get_dynamic_config_path)
 from services.progress_utils import DataLoadProgressTracker
+from services.parse_utils import parse_source_bytes
 # Cache system simplified - using only persistent cache
 
 # Importaciones locales
 from services import sharepoint_service as sharepoint_auth
+from sharepoint_excel_append import append_rows_to_sharepoint_excel  # shared/services (path agregado por sharepoint_service)
 from core.sse_channel import search_progress_queue, clear_data_load_progress_queue
 from core.utils import getenv_int
 from services.cache_service import persistent_cache
@@ -512,47 +515,16 @@ def _load_from_persistent_cache(param_from_frontend_url: str, selected_columns:
         persistent_cache.clear_cache(param_from_frontend_url)
         return None
 
-def load_blob_data(param_from_frontend_url: str, selected_columns_from_api: Optional[List[str]] = None) -> Dict[str, Any]:
-    """Carga datos de blob con verificación inteligente de caché.
-
-    CACHÉ INTELIGENTE:
-    - Para fuentes SharePoint: verifica automáticamente si hay actualizaciones antes de usar caché
-    - Si hay actualización: descarga la versión nueva
-    - Si NO hay actualización: usa caché local (rápido)
-    - Para otras fuentes: usa caché sin verificación
-
-    Args:
-        param_from_frontend_url: Identificador de la fuente de datos
-        selected_columns_from_api: Lista opcional de columnas específicas desde API (prioridad sobre config)
-
-    Returns:
-        Diccionario con información de la carga realizada, incluyendo:
-        - cache_decision: 'using_cache' | 'downloading_fresh' | 'no_cache'
-    """
-    import time
-    start_time = time.time()
-    global df_original, current_blob_display_name, config_data, duckdb_conn
-
-    # Limpiar mensajes antiguos del queue de SSE antes de iniciar nueva carga
-    clear_data_load_progress_queue()
-
-    # Crear tracker de progreso para reportar al frontend via SSE
-    progress_tracker = DataLoadProgressTracker(
-        operation_name="Carga de datos",
-        blob_display_name=param_from_frontend_url
-    )
-    progress_tracker.update_progress(1, "init", f"Iniciando carga de '{param_from_frontend_url}'...")
-
-    logging.info(f"load_blob_data: Solicitud para '{param_from_frontend_url}'")
-
-    # Limpiar filtros globales
+def _reset_sku_filter_lists():
+    """Limpia las listas globales de filtros SKU/ticket antes de una nueva carga."""
     global sku_hijo_filter_list, sku_padre_filter_list, ticket_filter_list
     sku_hijo_filter_list = None
     sku_padre_filter_list = None
     ticket_filter_list = None
-    logging.info(f"Filtros globales limpiados para '{param_from_frontend_url}'.")
 
-    # Determinar columnas a cargar: API tiene prioridad sobre config
+
+def _resolve_selected_columns(param_from_frontend_url: str, selected_columns_from_api: Optional[List[str]] = None) -> Optional[List[str]]:
+    """Determina las columnas a cargar: API tiene prioridad sobre config.ini."""
     selected_columns_check = None
     if selected_columns_from_api:
         selected_columns_check = [col.strip().lower() for col in selected_columns_from_api]
@@ -566,6 +538,19 @@ def load_blob_data(param_from_frontend_url: str, selected_columns_from_api: Opti
             selected_columns_check = [col.strip().lower() for col in select_columns_check.split(',') if col.strip()]
             logging.info(f"Usando columnas desde config: {len(selected_columns_check)} columnas")
 
+    return selected_columns_check
+
+
+def _resolve_cache_decision(param_from_frontend_url: str, progress_tracker: DataLoadProgressTracker) -> Tuple[str, Dict[str, Any]]:
+    """
+    Decide si la carga puede usar el caché persistente (CACHÉ INTELIGENTE).
+
+    Verifica expiración por edad y actualizaciones remotas según el tipo de fuente.
+    Si detecta una versión más nueva limpia el caché para forzar la descarga.
+
+    Returns:
+        Tupla (cache_decision, cache_verification_status)
+    """
     # CACHÉ INTELIGENTE: Verificar actualizaciones automáticamente antes de usar caché
     cache_decision = "no_cache"  # Valores: "using_cache", "downloading_fresh", "no_cache"
 
@@ -876,26 +861,22 @@ def load_blob_data(param_from_frontend_url: str, selected_columns_from_api: Opti
                 cache_decision = "using_cache"
                 logging.info(f"Fuente tipo '{source_type}' no soporta verificación de actualizaciones - usando caché si existe")
 
-    # Intentar cargar desde caché persistente (si no se limpió por actualización)
-    cached_result = _load_from_persistent_cache(param_from_frontend_url, selected_columns=selected_columns_check)
-    if cached_result:
-        # ✅ HITO 1.3: Agregar información de verificación al resultado
-        cached_result["cache_decision"] = cache_decision
-        cached_result["cache_info"] = cache_verification_status
-        return cached_result
+    return cache_decision, cache_verification_status
 
-    # Si no hay cache, proceder con descarga normal desde la fuente original
-    if cache_decision == "no_cache":
-        logging.info(f"Datos para '{param_from_frontend_url}' no encontrados en caché. Cargando desde fuente...")
-    else:
-        logging.info(f"Caché limpiado por actualización. Descargando desde fuente...")
 
-    key_for_blob_options_lookup = param_from_frontend_url.upper()
-    found_blob_attrs = config_data.get("blob_options", {}).get(key_for_blob_options_lookup)
-
-    if not found_blob_attrs:
-        raise ValueError(f"Fuente de datos no encontrada para el display_name: {param_from_frontend_url}")
+def _read_source_dataframe(
+    param_from_frontend_url: str,
+    found_blob_attrs: Dict[str, Any],
+    selected_columns: Optional[List[str]],
+    progress_tracker: DataLoadProgressTracker
+) -> Tuple[pd.DataFrame, str, str]:
+    """
+    Descarga y parsea la fuente original de una base (ruta síncrona).
 
+    Returns:
+        Tupla (df_loaded, filename, source_type) con el source_type efectivo
+        (ajustado a local_csv/local_xlsx si la base usa archivo local).
+    """
     filename = found_blob_attrs.get("value")
     source_type = found_blob_attrs.get("source_type")
 
@@ -930,418 +911,532 @@ def load_blob_data(param_from_frontend_url: str, selected_columns_from_api: Opti
         f"Iniciando carga de '{filename}' (Display Name: {param_from_frontend_url}, Tipo: {source_type})..."
     )
 
-    # Usar selected_columns_check determinado al inicio (API o config)
-    selected_columns = selected_columns_check
     if selected_columns:
         logging.info(f"Selección de columnas activa para '{param_from_frontend_url}': {len(selected_columns)} columnas - {selected_columns}")
 
     df_loaded = pd.DataFrame()
 
-    try:
-        if source_type == 'azure':
-            connection_string = config_data.get("connection_string")
-            container_name = config_data.get("container_name")
-            if not all([connection_string, container_name, filename]):
-                raise ValueError("Falta la configuración de Azure (ConnectionString, ContainerName, o Filename).")
-            
-            # Descarga optimizada con chunks y progreso
-            blob_content = _download_blob_with_progress(connection_string, container_name, filename)
-
-            if filename.lower().endswith('.csv'):
-                df_loaded = csv_utils.read_csv_from_bytes(blob_content, filename, usecols=selected_columns)
-            elif filename.lower().endswith(('.xlsx', '.xls')):
-                if selected_columns:
-                    df_loaded = pd.read_excel(io.BytesIO(blob_content), engine='openpyxl', usecols=selected_columns)
-                else:
-                    df_loaded = pd.read_excel(io.BytesIO(blob_content), engine='openpyxl')
-
-        elif source_type == 'sharepoint':
-            # Implementación de SharePoint con soporte para selección de columnas
-            df_loaded = _read_file_from_sharepoint(filename, found_blob_attrs, usecols=selected_columns)
-
-        elif source_type in ['local_xlsx', 'local_csv']:
-            if not filename or not os.path.exists(filename):
-                raise FileNotFoundError(f"Archivo local no encontrado: '{filename}'. Configúrelo en el lanzador.")
-            if source_type == 'local_xlsx':
-                if selected_columns:
-                    df_loaded = pd.read_excel(filename, engine='openpyxl', usecols=selected_columns)
-                else:
-                    df_loaded = pd.read_excel(filename, engine='openpyxl')
-            else:
-                with open(filename, 'rb') as f:
-                    file_bytes = f.read()
-                df_loaded = csv_utils.read_csv_from_bytes(file_bytes, os.path.basename(filename), usecols=selected_columns)
+    if source_type == 'azure':
+        connection_string = config_data.get("connection_string")
+        container_name = config_data.get("container_name")
+        if not all([connection_string, container_name, filename]):
+            raise ValueError("Falta la configuración de Azure (ConnectionString, ContainerName, o Filename).")
+        
+        # Descarga optimizada con chunks y progreso
+        blob_content = _download_blob_with_progress(connection_string, container_name, filename)
 
-        elif source_type == 'local_partitioned_csv':
-            # Nuevo tipo de fuente: CSV particionados en directorio local
-            logging.info(f"Cargando archivos CSV particionados desde: {filename}")
+        if filename.lower().endswith('.csv'):
+            df_loaded = csv_utils.read_csv_from_bytes(blob_content, filename, usecols=selected_columns)
+        elif filename.lower().endswith(('.xlsx', '.xls')):
+            if selected_columns:
+                df_loaded = pd.read_excel(io.BytesIO(blob_content), engine='openpyxl', usecols=selected_columns)
+            else:
+                df_loaded = pd.read_excel(io.BytesIO(blob_content), engine='openpyxl')
+
+    elif source_type == 'sharepoint':
+        # Implementación de SharePoint con soporte para selección de columnas
+        df_loaded = _read_file_from_sharepoint(filename, found_blob_attrs, usecols=selected_columns)
+
+    elif source_type in ['local_xlsx', 'local_csv']:
+        if not filename or not os.path.exists(filename):
+            raise FileNotFoundError(f"Archivo local no encontrado: '{filename}'. Configúrelo en el lanzador.")
+        if source_type == 'local_xlsx':
+            if selected_columns:
+                df_loaded = pd.read_excel(filename, engine='openpyxl', usecols=selected_columns)
+            else:
+                df_loaded = pd.read_excel(filename, engine='openpyxl')
+        else:
+            with open(filename, 'rb') as f:
+                file_bytes = f.read()
+            df_loaded = csv_utils.read_csv_from_bytes(file_bytes, os.path.basename(filename), usecols=selected_columns)
 
-            # filename contiene el directorio base
-            base_directory = filename
+    elif source_type == 'local_partitioned_csv':
+        # Nuevo tipo de fuente: CSV particionados en directorio local
+        logging.info(f"Cargando archivos CSV particionados desde: {filename}")
 
-            # Obtener patrón de archivo desde configuración (default: *.csv)
-            file_pattern = found_blob_attrs.get("file_pattern", "*.csv")
+        # filename contiene el directorio base
+        base_directory = filename
 
-            # Validar que el directorio existe
-            if not os.path.exists(base_directory):
-                raise FileNotFoundError(
-                    f"Directorio de particiones no encontrado: '{base_directory}'. "
-                    f"Verifique que la ruta sea correcta y que OneDrive esté sincronizado."
-                )
+        # Obtener patrón de archivo desde configuración (default: *.csv)
+        file_pattern = found_blob_attrs.get("file_pattern", "*.csv")
 
-            # Progreso: descubrimiento
-            progress_tracker.update_progress(
-                10, "discovery",
-                f"Descubriendo archivos con patrón '{file_pattern}'..."
+        # Validar que el directorio existe
+        if not os.path.exists(base_directory):
+            raise FileNotFoundError(
+                f"Directorio de particiones no encontrado: '{base_directory}'. "
+                f"Verifique que la ruta sea correcta y que OneDrive esté sincronizado."
             )
 
-            # Cargar datos particionados utilizando la nueva función
-            df_loaded = csv_utils.read_partitioned_csv_from_directory(
-                base_directory=base_directory,
-                file_pattern=file_pattern,
-                usecols=selected_columns,  # Optimización de RAM
-                log_prefix=param_from_frontend_url
-            )
+        # Progreso: descubrimiento
+        progress_tracker.update_progress(
+            10, "discovery",
+            f"Descubriendo archivos con patrón '{file_pattern}'..."
+        )
 
-            progress_tracker.update_progress(
-                25, "loaded",
-                f"✓ Cargadas {len(df_loaded):,} filas desde particiones"
-            )
+        # Cargar datos particionados utilizando la nueva función
+        df_loaded = csv_utils.read_partitioned_csv_from_directory(
+            base_directory=base_directory,
+            file_pattern=file_pattern,
+            usecols=selected_columns,  # Optimización de RAM
+            log_prefix=param_from_frontend_url
+        )
 
-        elif source_type == 'sharepoint_partitioned':
-            # Nuevo tipo de fuente: CSV particionados en SharePoint
-            logging.info(f"📦 Cargando particiones SharePoint desde: {filename}")
-            logging.info(f"📋 Patrón de archivos: {found_blob_attrs.get('file_pattern', '*.csv')}")
+        progress_tracker.update_progress(
+            25, "loaded",
+            f"✓ Cargadas {len(df_loaded):,} filas desde particiones"
+        )
 
-            sharepoint_folder_url = filename  # filename contiene la URL de SharePoint
-            file_pattern = found_blob_attrs.get("file_pattern", "*.csv")
+    elif source_type == 'sharepoint_partitioned':
+        # Nuevo tipo de fuente: CSV particionados en SharePoint
+        logging.info(f"📦 Cargando particiones SharePoint desde: {filename}")
+        logging.info(f"📋 Patrón de archivos: {found_blob_attrs.get('file_pattern', '*.csv')}")
 
-            # Progreso: descubrimiento
-            progress_tracker.update_progress(
-                10, "discovery",
-                "Listando archivos SharePoint..."
-            )
+        sharepoint_folder_url = filename  # filename contiene la URL de SharePoint
+        file_pattern = found_blob_attrs.get("file_pattern", "*.csv")
 
-            # Validar que la URL sea válida
-            if not sharepoint_folder_url.startswith('https://'):
-                raise ValueError(
-                    f"URL SharePoint inválida: {sharepoint_folder_url}\n"
-                    f"Debe comenzar con 'https://'"
-                )
+        # Progreso: descubrimiento
+        progress_tracker.update_progress(
+            10, "discovery",
+            "Listando archivos SharePoint..."
+        )
 
-            # Cargar datos particionados utilizando la nueva función SharePoint
-            df_loaded = csv_utils.read_partitioned_csv_from_sharepoint(
-                sharepoint_folder_url=sharepoint_folder_url,
-                file_pattern=file_pattern,
-                usecols=selected_columns,  # Optimización de RAM
-                log_prefix=param_from_frontend_url
+        # Validar que la URL sea válida
+        if not sharepoint_folder_url.startswith('https://'):
+            raise ValueError(
+                f"URL SharePoint inválida: {sharepoint_folder_url}\n"
+                f"Debe comenzar con 'https://'"
             )
 
-            progress_tracker.update_progress(
-                25, "loaded",
-                f"✅ {len(df_loaded):,} filas cargadas desde SharePoint"
-            )
+        # Cargar datos particionados utilizando la nueva función SharePoint
+        df_loaded = csv_utils.read_partitioned_csv_from_sharepoint(
+            sharepoint_folder_url=sharepoint_folder_url,
+            file_pattern=file_pattern,
+            usecols=selected_columns,  # Optimización de RAM
+            log_prefix=param_from_frontend_url
+        )
+
+        progress_tracker.update_progress(
+            25, "loaded",
+            f"✅ {len(df_loaded):,} filas cargadas desde SharePoint"
+        )
 
-            logging.info(f"✅ SharePoint particionado cargado: {len(df_loaded):,} filas, {len(df_loaded.columns)} columnas")
+        logging.info(f"✅ SharePoint particionado cargado: {len(df_loaded):,} filas, {len(df_loaded.columns)} columnas")
 
+    else:
+        raise ValueError(f"Tipo de fuente ('_source_type') desconocido: '{source_type}'")
+
+    return df_loaded, filename, source_type
+
+
+def _finalize_loaded_dataframe(
+    param_from_frontend_url: str,
+    df_loaded: pd.DataFrame,
+    found_blob_attrs: Dict[str, Any],
+    filename: str,
+    source_type: str,
+    selected_columns_from_api: Optional[List[str]],
+    cache_decision: str,
+    progress_tracker: DataLoadProgressTracker,
+    start_time: float,
+    df_enrichment: Optional[pd.DataFrame] = None,
+    cancel_event: Optional[threading.Event] = None
+) -> Dict[str, Any]:
+    """
+    Post-procesa un DataFrame recién descargado y lo publica como estado global.
+
+    Aplica pre-filtro, enriquecimiento, normalización de SKUs y reglas de config.ini,
+    configura DuckDB, genera las opciones de filtro y guarda en caché persistente.
+    Compartido por load_blob_data() y main_logic_async.load_blob_data_async().
+
+    Args:
+        df_enrichment: Datos de enriquecimiento ya descargados (p.ej. en paralelo por
+            la ruta async). Si es None se cargan aquí con _load_enrichment_data_cached().
+        cancel_event: Evento de cancelación de la carga (ruta async). Si se activa
+            antes de publicar, se lanza InterruptedError sin tocar el estado global.
+    """
+    import time
+    global df_original, current_blob_display_name, duckdb_conn
+
+    def _check_cancelled():
+        if cancel_event is not None and cancel_event.is_set():
+            raise InterruptedError(f"Carga de '{param_from_frontend_url}' cancelada antes de publicar los datos")
+
+    key_for_blob_options_lookup = param_from_frontend_url.upper()
+
+    _check_cancelled()
+    if df_loaded.empty:
+        logging.warning(f"El DataFrame para '{param_from_frontend_url}' está vacío después de la carga.")
+        # Aún así, inicializar para evitar errores posteriores
+        df_original = pd.DataFrame()
+        current_blob_display_name = param_from_frontend_url
+        return { "message": "Archivo cargado pero vacío.", "row_count_original": 0, "columns": [], "filter_options": {}, "source_type": source_type }
+    
+    # --- PROCESAMIENTO POST-CARGA ---
+    df_loaded.columns = df_loaded.columns.str.strip().str.lower()
+    logging.info(f"Cargadas {df_loaded.shape[0]} filas y {df_loaded.shape[1]} columnas.")
+    progress_tracker.update_progress(25, "processing", f"Datos cargados: {df_loaded.shape[0]:,} filas. Procesando...")
+
+    # --- FILTRADO PREVIO (PRE-FILTER) ---
+    prefilter_column = found_blob_attrs.get("prefilter_nom_estado")
+    if prefilter_column:
+        logging.info(f"Aplicando filtrado previo: columna 'nom_estado' = '{prefilter_column}'")
+        if 'nom_estado' in df_loaded.columns:
+            df_loaded = df_loaded[df_loaded['nom_estado'] == prefilter_column]
+            logging.info(f"Después del filtrado previo: {len(df_loaded)} filas restantes")
         else:
-            raise ValueError(f"Tipo de fuente ('_source_type') desconocido: '{source_type}'")
-
-        if df_loaded.empty:
-            logging.warning(f"El DataFrame para '{param_from_frontend_url}' está vacío después de la carga.")
-            # Aún así, inicializar para evitar errores posteriores
-            df_original = pd.DataFrame()
-            current_blob_display_name = param_from_frontend_url
-            return { "message": "Archivo cargado pero vacío.", "row_count_original": 0, "columns": [], "filter_options": {}, "source_type": source_type }
-        
-        # --- PROCESAMIENTO POST-CARGA ---
-        df_loaded.columns = df_loaded.columns.str.strip().str.lower()
-        logging.info(f"Cargadas {df_loaded.shape[0]} filas y {df_loaded.shape[1]} columnas.")
-        progress_tracker.update_progress(25, "processing", f"Datos cargados: {df_loaded.shape[0]:,} filas. Procesando...")
-
-        # --- FILTRADO PREVIO (PRE-FILTER) ---
-        prefilter_column = found_blob_attrs.get("prefilter_nom_estado")
-        if prefilter_column:
-            logging.info(f"Aplicando filtrado previo: columna 'nom_estado' = '{prefilter_column}'")
-            if 'nom_estado' in df_loaded.columns:
-                df_loaded = df_loaded[df_loaded['nom_estado'] == prefilter_column]
-                logging.info(f"Después del filtrado previo: {len(df_loaded)} filas restantes")
-            else:
-                logging.warning(f"Columna 'nom_estado' no encontrada para filtrado previo")
+            logging.warning(f"Columna 'nom_estado' no encontrada para filtrado previo")
 
-        progress_tracker.update_progress(40, "filtering", "Aplicando filtros y normalizaciones...")
+    progress_tracker.update_progress(40, "filtering", "Aplicando filtros y normalizaciones...")
 
-        # --- ENRIQUECIMIENTO DE DATOS (DATA ENRICHMENT) ---
-        enrichment_source = found_blob_attrs.get("enrichment_source")
-        enrichment_join_column = found_blob_attrs.get("enrichment_join_column")
-        enrichment_columns_str = found_blob_attrs.get("enrichment_columns")
-        
-        if enrichment_source and enrichment_join_column and enrichment_columns_str:
-            logging.info(f"Iniciando enriquecimiento de datos con fuente: '{enrichment_source}'")
-            progress_tracker.update_progress(55, "enrichment", f"Enriqueciendo datos desde '{enrichment_source}'...")
+    # --- ENRIQUECIMIENTO DE DATOS (DATA ENRICHMENT) ---
+    enrichment_source = found_blob_attrs.get("enrichment_source")
+    enrichment_join_column = found_blob_attrs.get("enrichment_join_column")
+    enrichment_columns_str = found_blob_attrs.get("enrichment_columns")
+    
+    if enrichment_source and enrichment_join_column and enrichment_columns_str:
+        logging.info(f"Iniciando enriquecimiento de datos con fuente: '{enrichment_source}'")
+        progress_tracker.update_progress(55, "enrichment", f"Enriqueciendo datos desde '{enrichment_source}'...")
 
-            try:
-                # Cargar datos de enriquecimiento (con caché - HITO 1.2)
+        try:
+            # Cargar datos de enriquecimiento (con caché - HITO 1.2) salvo que ya
+            # se hayan descargado en paralelo (ruta async)
+            if df_enrichment is None:
                 df_enrichment = _load_enrichment_data_cached(enrichment_source, source_type, found_blob_attrs)
+            
+            if not df_enrichment.empty:
+                # Procesar columnas de enriquecimiento
+                enrichment_columns = [col.strip() for col in enrichment_columns_str.split(',') if col.strip()]
                 
-                if not df_enrichment.empty:
-                    # Procesar columnas de enriquecimiento
-                    enrichment_columns = [col.strip() for col in enrichment_columns_str.split(',') if col.strip()]
+                # Verificar que las columnas existan en los datos de enriquecimiento
+                available_columns = [col for col in enrichment_columns if col in df_enrichment.columns]
+                if available_columns:
+                    logging.info(f"Columnas de enriquecimiento disponibles: {available_columns}")
                     
-                    # Verificar que las columnas existan en los datos de enriquecimiento
-                    available_columns = [col for col in enrichment_columns if col in df_enrichment.columns]
-                    if available_columns:
-                        logging.info(f"Columnas de enriquecimiento disponibles: {available_columns}")
-                        
-                        # Realizar el JOIN
-                        df_loaded = dataframe_utils._enrich_dataframe(df_loaded, df_enrichment, enrichment_join_column, available_columns)
-                        logging.info(f"Enriquecimiento completado. Filas después del JOIN: {len(df_loaded)}")
-                    else:
-                        logging.warning(f"Ninguna de las columnas de enriquecimiento {enrichment_columns} encontrada en {enrichment_source}")
+                    # Realizar el JOIN
+                    df_loaded = dataframe_utils._enrich_dataframe(df_loaded, df_enrichment, enrichment_join_column, available_columns)
+                    logging.info(f"Enriquecimiento completado. Filas después del JOIN: {len(df_loaded)}")
                 else:
-                    logging.warning(f"No se pudieron cargar datos de enriquecimiento desde '{enrichment_source}'")
-                    
+                    logging.warning(f"Ninguna de las columnas de enriquecimiento {enrichment_columns} encontrada en {enrichment_source}")
+            else:
+                logging.warning(f"No se pudieron cargar datos de enriquecimiento desde '{enrichment_source}'")
+                
+        except Exception as e:
+            logging.error(f"Error durante el enriquecimiento de datos: {e}", exc_info=True)
+            # Continuar sin enriquecimiento en caso de error
+
+    # Normalizar valores de columnas SKU para evitar floats o espacios
+    for _sku_col in ['ean_hijo', 'sku_hijo', 'sku_hijo_largo']:
+        if _sku_col in df_loaded.columns:
+            df_loaded[_sku_col] = (
+                df_loaded[_sku_col]
+                .astype(str)
+                .str.replace(r"\.0$", "", regex=True)
+                .str.strip()
+            )
+
+    current_config_blob_settings = config_data["filter_configs"].get(key_for_blob_options_lookup)
+    if not current_config_blob_settings:
+        raise ValueError(f"Configuración de filtros no encontrada para: {key_for_blob_options_lookup}")
+        
+    not_empty_cols_cfg = [col.lower() for col in current_config_blob_settings.get('not_empty_cols', [])]
+    if not_empty_cols_cfg:
+        df_loaded.dropna(subset=[col for col in not_empty_cols_cfg if col in df_loaded.columns], inplace=True)
+    
+    row_exclude_rules_cfg = {k.lower(): v for k,v in current_config_blob_settings.get('exclude_rows', {}).items()}
+    if row_exclude_rules_cfg:
+        for col, values in row_exclude_rules_cfg.items():
+            if col in df_loaded.columns:
+                df_loaded = df_loaded[~df_loaded[col].isin(values)]
+
+    # OPTIMIZACIÓN: Se elimina el paso de _optimize_dataframe_dtypes() porque
+    # inmediatamente después se convierte todo a string, haciendo la optimización innecesaria.
+    # Esto ahorra 25-45 segundos de procesamiento y reduce picos de memoria en equipos lentos.
+    # Ver: OPTIMIZACION_RENDIMIENTO.md - Fase 1
+    _check_cancelled()
+    df_original = df_loaded
+    current_blob_display_name = param_from_frontend_url
+
+    # --- CONVERSIÓN SELECTIVA A STRING (OPTIMIZACIÓN FASE 1 - HITO 1.1) ---
+    # Solo convertir columnas que realmente necesitan ser string:
+    # 1. Columnas de filtro (definidas en config.ini)
+    # 2. Columnas de display (si están especificadas)
+    # 3. Columnas de SKU (sku_hijo, sku_padre, etc.)
+    # Esto reduce el tiempo de conversión de 8-12s a 2-3s y ahorra ~60 MB RAM
+
+    # Obtener columnas que necesitan conversión
+    string_required_cols = set()
+
+    # Agregar columnas de filtro (ya disponibles en cfg_filter_cols_list más adelante)
+    cfg_filter_cols_list_preview = [col.lower().strip() for col in current_config_blob_settings.get('filter_cols', [])]
+    if cfg_filter_cols_list_preview:
+        string_required_cols.update(cfg_filter_cols_list_preview)
+
+    # Agregar columnas de display si existen
+    if selected_columns_from_api:
+        string_required_cols.update([col.lower() for col in selected_columns_from_api])
+
+    # Agregar columnas SKU conocidas (siempre deben ser string para joins)
+    sku_columns = ['sku_hijo', 'sku_padre', 'sku_hijo_largo', 'sku_padre_largo',
+                   'sku_padre_corto', 'cod_padre', 'ean', 'codigo', 'codigo_producto']
+    string_required_cols.update([col for col in sku_columns])
+
+    # Convertir solo las columnas necesarias que existen en el DataFrame
+    existing_cols_to_convert = [col for col in string_required_cols if col in df_original.columns]
+
+    if existing_cols_to_convert:
+        logging.info(f"⚡ [OPTIMIZACIÓN] Conversión selectiva: {len(existing_cols_to_convert)} de {len(df_original.columns)} columnas a string")
+        logging.info(f"⚡ [DEBUG] Columnas a convertir: {sorted(existing_cols_to_convert)}")
+
+        conversion_errors = []
+        for col in existing_cols_to_convert:
+            try:
+                df_original[col] = df_original[col].astype(str)
             except Exception as e:
-                logging.error(f"Error durante el enriquecimiento de datos: {e}", exc_info=True)
-                # Continuar sin enriquecimiento en caso de error
-
-        # Normalizar valores de columnas SKU para evitar floats o espacios
-        for _sku_col in ['ean_hijo', 'sku_hijo', 'sku_hijo_largo']:
-            if _sku_col in df_loaded.columns:
-                df_loaded[_sku_col] = (
-                    df_loaded[_sku_col]
-                    .astype(str)
-                    .str.replace(r"\.0$", "", regex=True)
-                    .str.strip()
-                )
+                error_msg = f"Columna '{col}': {e}"
+                conversion_errors.append(error_msg)
+                logging.warning(f"⚠️ No se pudo convertir columna '{col}' a string: {e}")
 
-        current_config_blob_settings = config_data["filter_configs"].get(key_for_blob_options_lookup)
-        if not current_config_blob_settings:
-            raise ValueError(f"Configuración de filtros no encontrada para: {key_for_blob_options_lookup}")
-            
-        not_empty_cols_cfg = [col.lower() for col in current_config_blob_settings.get('not_empty_cols', [])]
-        if not_empty_cols_cfg:
-            df_loaded.dropna(subset=[col for col in not_empty_cols_cfg if col in df_loaded.columns], inplace=True)
-        
-        row_exclude_rules_cfg = {k.lower(): v for k,v in current_config_blob_settings.get('exclude_rows', {}).items()}
-        if row_exclude_rules_cfg:
-            for col, values in row_exclude_rules_cfg.items():
-                if col in df_loaded.columns:
-                    df_loaded = df_loaded[~df_loaded[col].isin(values)]
-
-        # OPTIMIZACIÓN: Se elimina el paso de _optimize_dataframe_dtypes() porque
-        # inmediatamente después se convierte todo a string, haciendo la optimización innecesaria.
-        # Esto ahorra 25-45 segundos de procesamiento y reduce picos de memoria en equipos lentos.
-        # Ver: OPTIMIZACION_RENDIMIENTO.md - Fase 1
-        df_original = df_loaded
-        current_blob_display_name = param_from_frontend_url
+        if conversion_errors:
+            logging.error(f"❌ {len(conversion_errors)} columnas fallaron en conversión a string: {conversion_errors}")
+        else:
+            logging.info(f"✅ Todas las columnas convertidas exitosamente")
+    else:
+        logging.warning("⚠️ No se encontraron columnas para convertir a string - verificar configuración")
 
-        # --- CONVERSIÓN SELECTIVA A STRING (OPTIMIZACIÓN FASE 1 - HITO 1.1) ---
-        # Solo convertir columnas que realmente necesitan ser string:
-        # 1. Columnas de filtro (definidas en config.ini)
-        # 2. Columnas de display (si están especificadas)
-        # 3. Columnas de SKU (sku_hijo, sku_padre, etc.)
-        # Esto reduce el tiempo de conversión de 8-12s a 2-3s y ahorra ~60 MB RAM
+    # Limpiar strings de fechas con formatos problemáticos (doble slash, etc.)
+    try:
+        df_original = dataframe_utils.clean_date_strings(df_original)
+        logging.info("✅ Limpieza de fechas aplicada exitosamente")
+    except Exception as e:
+        logging.warning(f"⚠️ Error durante limpieza de fechas: {e} - continuando sin limpieza")
 
-        # Obtener columnas que necesitan conversión
-        string_required_cols = set()
+    # Configurar DuckDB solo si está disponible
+    if DUCKDB_AVAILABLE:
+        if duckdb_conn:
+            try: duckdb_conn.close()
+            except Exception: pass
+        duckdb_conn = duckdb.connect(database=':memory:')
+        duckdb_conn.register('pandas_df', df_original)
+        duckdb_conn.execute("CREATE OR REPLACE TABLE data AS SELECT * FROM pandas_df")
+        duckdb_conn.unregister('pandas_df')
+        logging.info(f"DuckDB configurado con {len(df_original)} filas")
+    else:
+        logging.info(f"Modo legacy - DuckDB no disponible, usando Pandas puro")
+
+    logging.info(f"Procesamiento final completado. {len(df_original)} filas restantes.")
+    progress_tracker.update_progress(75, "finalizing", "Procesamiento completado. Generando opciones de filtro...")
+
+    # --- GENERACIÓN DE OPCIONES DE FILTRO (PARALELA - HITO 1.3) ---
+    filter_options_api = {}
+    MAX_FILTER_OPTIONS = 5000
+    cfg_filter_cols_list = [col.lower().strip() for col in current_config_blob_settings.get('filter_cols', [])]
+    cfg_hide_values_dict = {k.lower(): v for k, v in current_config_blob_settings.get('hide_values', {}).items()}
+
+    # Función auxiliar para generar opciones de una columna (thread-safe)
+    def _generate_filter_options_for_column(df: pd.DataFrame, col_name: str,
+                                             hide_values: set, max_options: int) -> tuple:
+        """
+        Genera opciones de filtro para una columna específica (thread-safe).
+
+        Returns:
+            Tupla (col_name, list_of_unique_values) o (col_name, None) si hay error/excede límite
+        """
+        try:
+            if col_name not in df.columns:
+                logging.warning(f"⚠️ Columna de filtro '{col_name}' no existe en DataFrame")
+                return (col_name, None)
 
-        # Agregar columnas de filtro (ya disponibles en cfg_filter_cols_list más adelante)
-        cfg_filter_cols_list_preview = [col.lower().strip() for col in current_config_blob_settings.get('filter_cols', [])]
-        if cfg_filter_cols_list_preview:
-            string_required_cols.update(cfg_filter_cols_list_preview)
+            # Obtener tipo de dato actual
+            col_dtype = df[col_name].dtype
+            logging.debug(f"Procesando filtro para columna '{col_name}' (tipo: {col_dtype})")
+
+            # Convertir a string de forma segura
+            try:
+                unique_vals = df[col_name].dropna().astype(str).unique()
+            except Exception as conv_err:
+                logging.error(f"❌ Error convirtiendo columna '{col_name}' (tipo {col_dtype}) a string: {conv_err}")
+                # Intentar sin dropna como fallback
+                try:
+                    unique_vals = df[col_name].astype(str).unique()
+                    logging.warning(f"⚠️ Fallback exitoso para '{col_name}' sin dropna")
+                except Exception as fallback_err:
+                    logging.error(f"❌ Fallback también falló para '{col_name}': {fallback_err}")
+                    return (col_name, None)
 
-        # Agregar columnas de display si existen
-        if selected_columns_from_api:
-            string_required_cols.update([col.lower() for col in selected_columns_from_api])
+            if len(unique_vals) > max_options:
+                logging.warning(f"Columna '{col_name}' excede el límite de {max_options} opciones de filtro ({len(unique_vals)} valores).")
+                return (col_name, None)
 
-        # Agregar columnas SKU conocidas (siempre deben ser string para joins)
-        sku_columns = ['sku_hijo', 'sku_padre', 'sku_hijo_largo', 'sku_padre_largo',
-                       'sku_padre_corto', 'cod_padre', 'ean', 'codigo', 'codigo_producto']
-        string_required_cols.update([col for col in sku_columns])
+            # Filtrar valores ocultos y ordenar
+            filtered_vals = sorted([val for val in unique_vals if val and val != 'nan' and val not in hide_values])
 
-        # Convertir solo las columnas necesarias que existen en el DataFrame
-        existing_cols_to_convert = [col for col in string_required_cols if col in df_original.columns]
+            logging.debug(f"✅ Columna '{col_name}': {len(filtered_vals)} opciones generadas")
+            return (col_name, filtered_vals)
 
-        if existing_cols_to_convert:
-            logging.info(f"⚡ [OPTIMIZACIÓN] Conversión selectiva: {len(existing_cols_to_convert)} de {len(df_original.columns)} columnas a string")
-            logging.info(f"⚡ [DEBUG] Columnas a convertir: {sorted(existing_cols_to_convert)}")
+        except Exception as e:
+            logging.error(f"❌ Error crítico generando opciones para columna '{col_name}': {e}", exc_info=True)
+            return (col_name, None)
+
+    # Generar opciones en paralelo usando ThreadPoolExecutor
+    if cfg_filter_cols_list:
+        import concurrent.futures
+
+        logging.info(f"⚡ [OPTIMIZACIÓN] Generando opciones de filtro para {len(cfg_filter_cols_list)} columnas en paralelo...")
+        logging.info(f"⚡ [DEBUG] Columnas de filtro: {cfg_filter_cols_list}")
+
+        failed_columns = []
+        successful_columns = []
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            # Enviar todas las columnas al thread pool
+            future_to_col = {
+                executor.submit(
+                    _generate_filter_options_for_column,
+                    df_original,
+                    col,
+                    set(cfg_hide_values_dict.get(col, [])),
+                    MAX_FILTER_OPTIONS
+                ): col
+                for col in cfg_filter_cols_list
+            }
 
-            conversion_errors = []
-            for col in existing_cols_to_convert:
+            # Recoger resultados a medida que completan
+            for future in concurrent.futures.as_completed(future_to_col):
                 try:
-                    df_original[col] = df_original[col].astype(str)
+                    col_name, unique_values = future.result()
+                    if unique_values is not None:  # Solo agregar si hay valores válidos
+                        filter_options_api[col_name] = unique_values
+                        successful_columns.append(col_name)
+                    else:
+                        failed_columns.append(col_name)
                 except Exception as e:
-                    error_msg = f"Columna '{col}': {e}"
-                    conversion_errors.append(error_msg)
-                    logging.warning(f"⚠️ No se pudo convertir columna '{col}' a string: {e}")
+                    col_name = future_to_col.get(future, 'unknown')
+                    failed_columns.append(col_name)
+                    logging.error(f"❌ Excepción en thread pool para columna '{col_name}': {e}", exc_info=True)
+
+        logging.info(f"✅ Opciones de filtro generadas: {len(filter_options_api)}/{len(cfg_filter_cols_list)} columnas exitosas")
+        if failed_columns:
+            logging.warning(f"⚠️ Columnas que fallaron en generación de filtros: {failed_columns}")
+        if successful_columns:
+            logging.info(f"✅ Columnas exitosas: {successful_columns}")
+    else:
+        logging.info("No hay columnas de filtro configuradas")
 
-            if conversion_errors:
-                logging.error(f"❌ {len(conversion_errors)} columnas fallaron en conversión a string: {conversion_errors}")
-            else:
-                logging.info(f"✅ Todas las columnas convertidas exitosamente")
-        else:
-            logging.warning("⚠️ No se encontraron columnas para convertir a string - verificar configuración")
+    # --- GUARDADO EN CACHÉ PERSISTENTE ---
+    all_columns_list = list(df_original.columns)
+    progress_tracker.update_progress(90, "caching", "Guardando datos en caché persistente...")
 
-        # Limpiar strings de fechas con formatos problemáticos (doble slash, etc.)
-        try:
-            df_original = dataframe_utils.clean_date_strings(df_original)
-            logging.info("✅ Limpieza de fechas aplicada exitosamente")
-        except Exception as e:
-            logging.warning(f"⚠️ Error durante limpieza de fechas: {e} - continuando sin limpieza")
-
-        # Configurar DuckDB solo si está disponible
-        if DUCKDB_AVAILABLE:
-            if duckdb_conn:
-                try: duckdb_conn.close()
-                except Exception: pass
-            duckdb_conn = duckdb.connect(database=':memory:')
-            duckdb_conn.register('pandas_df', df_original)
-            duckdb_conn.execute("CREATE OR REPLACE TABLE data AS SELECT * FROM pandas_df")
-            duckdb_conn.unregister('pandas_df')
-            logging.info(f"DuckDB configurado con {len(df_original)} filas")
+    # Guardar en cache persistente si es una base cacheable
+    blob_config = get_blob_config_wrapper(param_from_frontend_url)
+    source_url = blob_config.get('value', '') if blob_config else ''
+
+    if persistent_cache.is_cacheable(param_from_frontend_url):
+        success = persistent_cache.save_to_cache(param_from_frontend_url, df_original, source_url)
+        if success:
+            logging.info(f"✅ Datos de '{param_from_frontend_url}' guardados en cache persistente")
         else:
-            logging.info(f"Modo legacy - DuckDB no disponible, usando Pandas puro")
-
-        logging.info(f"Procesamiento final completado. {len(df_original)} filas restantes.")
-        progress_tracker.update_progress(75, "finalizing", "Procesamiento completado. Generando opciones de filtro...")
-
-        # --- GENERACIÓN DE OPCIONES DE FILTRO (PARALELA - HITO 1.3) ---
-        filter_options_api = {}
-        MAX_FILTER_OPTIONS = 5000
-        cfg_filter_cols_list = [col.lower().strip() for col in current_config_blob_settings.get('filter_cols', [])]
-        cfg_hide_values_dict = {k.lower(): v for k, v in current_config_blob_settings.get('hide_values', {}).items()}
-
-        # Función auxiliar para generar opciones de una columna (thread-safe)
-        def _generate_filter_options_for_column(df: pd.DataFrame, col_name: str,
-                                                 hide_values: set, max_options: int) -> tuple:
-            """
-            Genera opciones de filtro para una columna específica (thread-safe).
-
-            Returns:
-                Tupla (col_name, list_of_unique_values) o (col_name, None) si hay error/excede límite
-            """
-            try:
-                if col_name not in df.columns:
-                    logging.warning(f"⚠️ Columna de filtro '{col_name}' no existe en DataFrame")
-                    return (col_name, None)
+            logging.warning(f"⚠️ Fallo al guardar '{param_from_frontend_url}' en cache persistente")
+    
+    # Métricas de rendimiento
+    load_time = time.time() - start_time
+    logging.info(f"🚀 CARGA COMPLETADA: '{param_from_frontend_url}' en {load_time:.2f}s")
+    logging.info(f"📊 ESTADÍSTICAS: {len(df_original):,} filas, {len(all_columns_list)} columnas, {source_type}")
 
-                # Obtener tipo de dato actual
-                col_dtype = df[col_name].dtype
-                logging.debug(f"Procesando filtro para columna '{col_name}' (tipo: {col_dtype})")
+    # Guardar preferencia de columnas si se usaron columnas específicas desde API
+    if selected_columns_from_api:
+        save_column_preference(param_from_frontend_url, selected_columns_from_api)
 
-                # Convertir a string de forma segura
-                try:
-                    unique_vals = df[col_name].dropna().astype(str).unique()
-                except Exception as conv_err:
-                    logging.error(f"❌ Error convirtiendo columna '{col_name}' (tipo {col_dtype}) a string: {conv_err}")
-                    # Intentar sin dropna como fallback
-                    try:
-                        unique_vals = df[col_name].astype(str).unique()
-                        logging.warning(f"⚠️ Fallback exitoso para '{col_name}' sin dropna")
-                    except Exception as fallback_err:
-                        logging.error(f"❌ Fallback también falló para '{col_name}': {fallback_err}")
-                        return (col_name, None)
-
-                if len(unique_vals) > max_options:
-                    logging.warning(f"Columna '{col_name}' excede el límite de {max_options} opciones de filtro ({len(unique_vals)} valores).")
-                    return (col_name, None)
+    # Reportar finalización exitosa al frontend
+    progress_tracker.finish(
+        success=True,
+        final_message=f"✅ Carga completada: {len(df_original):,} filas en {load_time:.2f}s"
+    )
 
-                # Filtrar valores ocultos y ordenar
-                filtered_vals = sorted([val for val in unique_vals if val and val != 'nan' and val not in hide_values])
+    return {
+        "message": f"Datos de '{filename}' cargados en {load_time:.2f}s.",
+        "row_count_original": len(df_original),
+        "columns": all_columns_list,
+        "filter_options": filter_options_api,
+        "source_type": source_type,
+        "from_cache": False,
+        "load_time_seconds": round(load_time, 2),
+        "cache_decision": cache_decision if cache_decision == "downloading_fresh" else "no_cache"
+    }
 
-                logging.debug(f"✅ Columna '{col_name}': {len(filtered_vals)} opciones generadas")
-                return (col_name, filtered_vals)
+def load_blob_data(param_from_frontend_url: str, selected_columns_from_api: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Carga datos de blob con verificación inteligente de caché.
 
-            except Exception as e:
-                logging.error(f"❌ Error crítico generando opciones para columna '{col_name}': {e}", exc_info=True)
-                return (col_name, None)
+    CACHÉ INTELIGENTE:
+    - Para fuentes SharePoint: verifica automáticamente si hay actualizaciones antes de usar caché
+    - Si hay actualización: descarga la versión nueva
+    - Si NO hay actualización: usa caché local (rápido)
+    - Para otras fuentes: usa caché sin verificación
 
-        # Generar opciones en paralelo usando ThreadPoolExecutor
-        if cfg_filter_cols_list:
-            import concurrent.futures
-
-            logging.info(f"⚡ [OPTIMIZACIÓN] Generando opciones de filtro para {len(cfg_filter_cols_list)} columnas en paralelo...")
-            logging.info(f"⚡ [DEBUG] Columnas de filtro: {cfg_filter_cols_list}")
-
-            failed_columns = []
-            successful_columns = []
-
-            with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
-                # Enviar todas las columnas al thread pool
-                future_to_col = {
-                    executor.submit(
-                        _generate_filter_options_for_column,
-                        df_original,
-                        col,
-                        set(cfg_hide_values_dict.get(col, [])),
-                        MAX_FILTER_OPTIONS
-                    ): col
-                    for col in cfg_filter_cols_list
-                }
+    Args:
+        param_from_frontend_url: Identificador de la fuente de datos
+        selected_columns_from_api: Lista opcional de columnas específicas desde API (prioridad sobre config)
 
-                # Recoger resultados a medida que completan
-                for future in concurrent.futures.as_completed(future_to_col):
-                    try:
-                        col_name, unique_values = future.result()
-                        if unique_values is not None:  # Solo agregar si hay valores válidos
-                            filter_options_api[col_name] = unique_values
-                            successful_columns.append(col_name)
-                        else:
-                            failed_columns.append(col_name)
-                    except Exception as e:
-                        col_name = future_to_col.get(future, 'unknown')
-                        failed_columns.append(col_name)
-                        logging.error(f"❌ Excepción en thread pool para columna '{col_name}': {e}", exc_info=True)
+    Returns:
+        Diccionario con información de la carga realizada, incluyendo:
+        - cache_decision: 'using_cache' | 'downloading_fresh' | 'no_cache'
+    """
+    import time
+    start_time = time.time()
+    global df_original, current_blob_display_name, config_data, duckdb_conn
 
-            logging.info(f"✅ Opciones de filtro generadas: {len(filter_options_api)}/{len(cfg_filter_cols_list)} columnas exitosas")
-            if failed_columns:
-                logging.warning(f"⚠️ Columnas que fallaron en generación de filtros: {failed_columns}")
-            if successful_columns:
-                logging.info(f"✅ Columnas exitosas: {successful_columns}")
-        else:
-            logging.info("No hay columnas de filtro configuradas")
+    # Limpiar mensajes antiguos del queue de SSE antes de iniciar nueva carga
+    clear_data_load_progress_queue()
 
-        # --- GUARDADO EN CACHÉ PERSISTENTE ---
-        all_columns_list = list(df_original.columns)
-        progress_tracker.update_progress(90, "caching", "Guardando datos en caché persistente...")
+    # Crear tracker de progreso para reportar al frontend via SSE
+    progress_tracker = DataLoadProgressTracker(
+        operation_name="Carga de datos",
+        blob_display_name=param_from_frontend_url
+    )
+    progress_tracker.update_progress(1, "init", f"Iniciando carga de '{param_from_frontend_url}'...")
 
-        # Guardar en cache persistente si es una base cacheable
-        blob_config = get_blob_config_wrapper(param_from_frontend_url)
-        source_url = blob_config.get('value', '') if blob_config else ''
+    logging.info(f"load_blob_data: Solicitud para '{param_from_frontend_url}'")
 
-        if persistent_cache.is_cacheable(param_from_frontend_url):
-            success = persistent_cache.save_to_cache(param_from_frontend_url, df_original, source_url)
-            if success:
-                logging.info(f"✅ Datos de '{param_from_frontend_url}' guardados en cache persistente")
-            else:
-                logging.warning(f"⚠️ Fallo al guardar '{param_from_frontend_url}' en cache persistente")
-        
-        # Métricas de rendimiento
-        load_time = time.time() - start_time
-        logging.info(f"🚀 CARGA COMPLETADA: '{param_from_frontend_url}' en {load_time:.2f}s")
-        logging.info(f"📊 ESTADÍSTICAS: {len(df_original):,} filas, {len(all_columns_list)} columnas, {source_type}")
+    _reset_sku_filter_lists()
+    logging.info(f"Filtros globales limpiados para '{param_from_frontend_url}'.")
 
-        # Guardar preferencia de columnas si se usaron columnas específicas desde API
-        if selected_columns_from_api:
-            save_column_preference(param_from_frontend_url, selected_columns_from_api)
+    selected_columns_check = _resolve_selected_columns(param_from_frontend_url, selected_columns_from_api)
+    cache_decision, cache_verification_status = _resolve_cache_decision(param_from_frontend_url, progress_tracker)
 
-        # Reportar finalización exitosa al frontend
-        progress_tracker.finish(
-            success=True,
-            final_message=f"✅ Carga completada: {len(df_original):,} filas en {load_time:.2f}s"
-        )
+    # Intentar cargar desde caché persistente (si no se limpió por actualización)
+    cached_result = _load_from_persistent_cache(param_from_frontend_url, selected_columns=selected_columns_check)
+    if cached_result:
+        # ✅ HITO 1.3: Agregar información de verificación al resultado
+        cached_result["cache_decision"] = cache_decision
+        cached_result["cache_info"] = cache_verification_status
+        return cached_result
 
-        return {
-            "message": f"Datos de '{filename}' cargados en {load_time:.2f}s.",
-            "row_count_original": len(df_original),
-            "columns": all_columns_list,
-            "filter_options": filter_options_api,
-            "source_type": source_type,
-            "from_cache": False,
-            "load_time_seconds": round(load_time, 2),
-            "cache_decision": cache_decision if cache_decision == "downloading_fresh" else "no_cache"
-        }
+    # Si no hay cache, proceder con descarga normal desde la fuente original
+    if cache_decision == "no_cache":
+        logging.info(f"Datos para '{param_from_frontend_url}' no encontrados en caché. Cargando desde fuente...")
+    else:
+        logging.info(f"Caché limpiado por actualización. Descargando desde fuente...")
+
+    key_for_blob_options_lookup = param_from_frontend_url.upper()
+    found_blob_attrs = config_data.get("blob_options", {}).get(key_for_blob_options_lookup)
+
+    if not found_blob_attrs:
+        raise ValueError(f"Fuente de datos no encontrada para el display_name: {param_from_frontend_url}")
+
+    try:
+        df_loaded, filename, source_type = _read_source_dataframe(
+            param_from_frontend_url, found_blob_attrs, selected_columns_check, progress_tracker
+        )
+        return _finalize_loaded_dataframe(
+            param_from_frontend_url,
+            df_loaded,
+            found_blob_attrs,
+            filename,
+            source_type,
+            selected_columns_from_api,
+            cache_decision,
+            progress_tracker,
+            start_time
+        )
 
     except Exception as e:
         logging.error(f"Error crítico durante la carga de '{param_from_frontend_url}': {e}", exc_info=True)
@@ -2356,16 +2451,22 @@ async def get_csv_export_safe(
         
 
 # --- INSTANCIA ÚNICA DE AUTENTICACIÓN ---
-# Se crea una única instancia para que la sesión (y el token)
-# se mantenga durante toda la ejecución de la aplicación.
-sharepoint_authenticator = None
-
+# Se usa el broker de tokens compartido (mismo singleton que la ruta async)
+# para que la sesión (y el token) se mantenga durante toda la ejecución
+# y se refresque en segundo plano antes de expirar.
 def get_sharepoint_authenticator():
-    """Inicializa el autenticador de SharePoint de forma perezosa y lo devuelve."""
-    global sharepoint_authenticator
-    if sharepoint_authenticator is None:
-        sharepoint_authenticator = sharepoint_auth.SharePointAuth()
-    return sharepoint_authenticator
+    """Devuelve el autenticador/broker de SharePoint compartido por todo el proceso."""
+    return sharepoint_auth.get_sharepoint_authenticator()
+
+
+def _current_sharepoint_token(access_token: str) -> str:
+    """
+    Token vigente para operaciones largas (crawls recursivos de carpetas).
+
+    El broker refresca el token en segundo plano; si tiene uno válido en memoria
+    se usa ese en lugar del recibido al inicio del crawl, que pudo haber expirado.
+    """
+    return get_sharepoint_authenticator().peek_token() or access_token
 
 def _download_sharepoint_file_chunked(filename: str, chunk_size: int = 8192) -> bytes:
     """
@@ -2433,7 +2534,6 @@ def _read_file_from_sharepoint(filename: str, blob_attrs: dict, usecols: Optiona
     """
     # Descarga optimizada con chunks
     file_content_bytes = _download_sharepoint_file_chunked(filename)
-    file_content = io.BytesIO(file_content_bytes)
 
     # Informar tamaño del archivo descargado
     file_size_mb = len(file_content_bytes) / (1024 * 1024)
@@ -2443,112 +2543,27 @@ def _read_file_from_sharepoint(filename: str, blob_attrs: dict, usecols: Optiona
     # Obtener parámetros de configuración para esta base
     sheet_name = blob_attrs.get('sheet_name', None)  # None = primera hoja (comportamiento actual)
     values_only = blob_attrs.get('values_only', False)
-    
-    if filename.lower().endswith('.xlsx'):
-        if sheet_name and values_only:
-            # Nueva funcionalidad: hoja específica + solo valores (sin fórmulas)
-            # Usar openpyxl directamente para leer solo valores
-            import openpyxl
-            file_content.seek(0)  # Resetear posición del archivo
-            workbook = openpyxl.load_workbook(file_content, data_only=True)
-            if sheet_name in workbook.sheetnames:
-                worksheet = workbook[sheet_name]
-                data = []
-                headers = []
-                for row_num, row in enumerate(worksheet.iter_rows(values_only=True), 1):
-                    if row_num == 1:
-                        # Manejar headers correctamente, eliminando celdas vacías al final
-                        raw_headers = list(row)
-                        # Encontrar el último índice con contenido
-                        last_content_idx = -1
-                        for i, cell in enumerate(raw_headers):
-                            if cell is not None and str(cell).strip():
-                                last_content_idx = i
-                        
-                        # Solo usar headers hasta el último con contenido
-                        if last_content_idx >= 0:
-                            headers = []
-                            for i in range(last_content_idx + 1):
-                                cell = raw_headers[i]
-                                if cell is not None and str(cell).strip():
-                                    headers.append(str(cell).strip())
-                                else:
-                                    headers.append(f"Column_{i}")
-                        else:
-                            headers = ["Column_0"]  # Fallback si no hay headers
-                    else:
-                        # Solo tomar los datos correspondientes al número de headers
-                        row_data = list(row)[:len(headers)] if headers else list(row)
-                        data.append(row_data)
-                df = pd.DataFrame(data, columns=headers)
-                workbook.close()
-            else:
-                workbook.close()
-                raise ValueError(f"Hoja '{sheet_name}' no encontrada en el archivo Excel")
-        elif sheet_name:
-            # Solo hoja específica, mantener fórmulas
-            df = pd.read_excel(file_content, engine='openpyxl', sheet_name=sheet_name)
-        else:
-            # Comportamiento original (NO CAMBIA NADA)
-            df = pd.read_excel(file_content, engine='openpyxl')
-    elif filename.lower().endswith('.csv'):
-        # Mensaje específico para archivos CSV grandes
-        if file_size_mb > 100:
-            estimated_time = int(file_size_mb / 40)  # Estimación: ~40MB/min de parsing
-            logging.info(f"⏳ Procesando archivo CSV grande ({file_size_mb:.0f} MB)...")
-            logging.info(f"⏱️  Tiempo estimado: {estimated_time} minuto(s). Por favor espere, no cierre esta ventana.")
-
-        df = csv_utils.read_csv_from_bytes(file_content.getvalue(), os.path.basename(filename), usecols=usecols)
-
-        # Confirmar que el parsing terminó
-        if file_size_mb > 100:
-            logging.info(f"✅ Parsing CSV completado exitosamente.")
-    else:
-        # Intentar leer como Excel por defecto
-        if sheet_name and values_only:
-            # Usar openpyxl directamente para leer solo valores
-            import openpyxl
-            file_content.seek(0)  # Resetear posición del archivo
-            workbook = openpyxl.load_workbook(file_content, data_only=True)
-            if sheet_name in workbook.sheetnames:
-                worksheet = workbook[sheet_name]
-                data = []
-                headers = []
-                for row_num, row in enumerate(worksheet.iter_rows(values_only=True), 1):
-                    if row_num == 1:
-                        # Manejar headers correctamente, eliminando celdas vacías al final
-                        raw_headers = list(row)
-                        # Encontrar el último índice con contenido
-                        last_content_idx = -1
-                        for i, cell in enumerate(raw_headers):
-                            if cell is not None and str(cell).strip():
-                                last_content_idx = i
-                        
-                        # Solo usar headers hasta el último con contenido
-                        if last_content_idx >= 0:
-                            headers = []
-                            for i in range(last_content_idx + 1):
-                                cell = raw_headers[i]
-                                if cell is not None and str(cell).strip():
-                                    headers.append(str(cell).strip())
-                                else:
-                                    headers.append(f"Column_{i}")
-                        else:
-                            headers = ["Column_0"]  # Fallback si no hay headers
-                    else:
-                        # Solo tomar los datos correspondientes al número de headers
-                        row_data = list(row)[:len(headers)] if headers else list(row)
-                        data.append(row_data)
-                df = pd.DataFrame(data, columns=headers)
-                workbook.close()
-            else:
-                workbook.close()
-                raise ValueError(f"Hoja '{sheet_name}' no encontrada en el archivo Excel")
-        elif sheet_name:
-            df = pd.read_excel(file_content, engine='openpyxl', sheet_name=sheet_name)
-        else:
-            df = pd.read_excel(file_content, engine='openpyxl')
-    
+    is_csv = filename.lower().endswith('.csv')
+
+    # Mensaje específico para archivos CSV grandes
+    if is_csv and file_size_mb > 100:
+        estimated_time = int(file_size_mb / 40)  # Estimación: ~40MB/min de parsing
+        logging.info(f"⏳ Procesando archivo CSV grande ({file_size_mb:.0f} MB)...")
+        logging.info(f"⏱️  Tiempo estimado: {estimated_time} minuto(s). Por favor espere, no cierre esta ventana.")
+
+    # usecols solo aplica a CSV (los Excel de SharePoint se leen completos)
+    df = parse_source_bytes(
+        file_content_bytes,
+        filename,
+        usecols=usecols if is_csv else None,
+        sheet_name=sheet_name,
+        values_only=values_only
+    )
+
+    # Confirmar que el parsing terminó
+    if is_csv and file_size_mb > 100:
+        logging.info(f"✅ Parsing CSV completado exitosamente.")
+
     return df
 
 
@@ -2625,15 +2640,6 @@ def load_declaration_to_sharepoint(team_member: str, declaration_text: str) -> D
         excel_url = parser.get('TeamMembers', team_member)
         logging.info(f"URL configurada para {team_member}: {excel_url}")
         
-        # Autenticar con SharePoint
-        auth = get_sharepoint_authenticator()
-        access_token = auth.get_token()
-        
-        # Leer el archivo Excel actual desde SharePoint
-        logging.info(f"Leyendo archivo SharePoint para {team_member}: {excel_url}")
-        df = _read_file_from_sharepoint(excel_url, {})
-        logging.info(f"Archivo leído. Filas: {len(df)}, Columnas: {list(df.columns) if not df.empty else 'vacío'}")
-        
         # Preparar la nueva declaración - dividir por líneas
         declaration_lines = [line.strip() for line in declaration_text.split('\n') if line.strip()]
         current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
@@ -2642,76 +2648,21 @@ def load_declaration_to_sharepoint(team_member: str, declaration_text: str) -> D
         logging.info(f"Procesando declaración con {len(declaration_lines)} líneas")
         logging.info(f"Primeras 3 líneas: {declaration_lines[:3]}")
         
-        # Crear una fila por cada línea de declaración
-        declaration_data = {
-            'EAN_HIJO': declaration_lines,
-            'Fecha': [current_time] * len(declaration_lines),
-            'Usuario': [current_user] * len(declaration_lines)
-        }
-        
-        # Crear DataFrame con la nueva declaración
-        new_declaration_df = pd.DataFrame(declaration_data)
-        logging.info(f"Nueva declaración preparada con {len(new_declaration_df)} filas")
-        
-        # Si el archivo está vacío o no tiene la estructura esperada, crear uno nuevo
-        if df.empty or 'EAN_HIJO' not in df.columns:
-            logging.info("Archivo vacío o sin estructura esperada. Creando nuevo archivo.")
-            df = new_declaration_df
-        else:
-            logging.info("Añadiendo declaración al archivo existente.")
-            # Añadir la nueva declaración al final
-            df = pd.concat([df, new_declaration_df], ignore_index=True)
-        
-        logging.info(f"DataFrame final preparado. Filas: {len(df)}, Columnas: {list(df.columns)}")
-        
-        # Guardar el archivo actualizado en SharePoint
-        # Primero guardar temporalmente - usar directorio temporal del sistema
-        import tempfile
-        temp_dir = tempfile.gettempdir()
-        temp_file = os.path.join(temp_dir, f"declaration_{team_member}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx")
-        logging.info(f"Guardando archivo temporal: {temp_file}")
-        df.to_excel(temp_file, index=False)
-        
-        # Verificar que el archivo se guardó correctamente
-        if not os.path.exists(temp_file):
-            raise FileNotFoundError(f"No se pudo crear el archivo temporal: {temp_file}")
-        
-        file_size = os.path.getsize(temp_file)
-        logging.info(f"Archivo temporal creado. Tamaño: {file_size} bytes")
-        
-        # Subir a SharePoint usando la API de Graph
-        with open(temp_file, 'rb') as file_content:
-            # Codificar la URL de SharePoint
-            import base64
-            sharepoint_url_bytes = excel_url.encode('utf-8')
-            encoded_url = base64.urlsafe_b64encode(sharepoint_url_bytes).decode('utf-8').rstrip('=')
-            
-            # URL para subir el contenido
-            upload_url = f"https://graph.microsoft.com/v1.0/shares/u!{encoded_url}/driveItem/content"
-            logging.info(f"Subiendo archivo a SharePoint: {upload_url}")
-            
-            headers = {
-                'Authorization': 'Bearer ' + access_token,
-                'Content-Type': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            }
-            
-            file_data = file_content.read()
-            logging.info(f"Datos del archivo leídos. Tamaño: {len(file_data)} bytes")
-            
-            response = requests.put(upload_url, headers=headers, data=file_data, verify=False)
-            logging.info(f"Respuesta de SharePoint: {response.status_code} - {response.text}")
-            response.raise_for_status()
-        
-        # Limpiar archivo temporal
-        os.remove(temp_file)
-        logging.info("Archivo temporal eliminado")
+        # Agregar una fila por cada línea de declaración (append-only vía Excel API,
+        # sin descargar ni re-subir el archivo completo)
+        rows_added = append_rows_to_sharepoint_excel(
+            excel_url,
+            columns=['EAN_HIJO', 'Fecha', 'Usuario'],
+            rows=[[line, current_time, current_user] for line in declaration_lines],
+            auth=get_sharepoint_authenticator()
+        )
         
         logging.info(f"Declaración cargada exitosamente para {team_member}")
         return {
             'success': True,
             'message': f'Declaración cargada exitosamente para {team_member.replace("_", " ").title()}',
             'team_member': team_member,
-            'declaration_count': len(df)
+            'declaration_count': rows_added
         }
         
     except Exception as e:
@@ -2768,14 +2719,6 @@ def load_rejection_to_sharepoint(team_member: str, rejection_text: str, rejectio
         
         excel_url = parser.get('TeamMembersReject', team_member)
         
-        # Autenticar con SharePoint
-        auth = get_sharepoint_authenticator()
-        access_token = auth.get_token()
-        
-        # Leer el archivo Excel actual desde SharePoint
-        df = _read_file_from_sharepoint(excel_url, {})
-        logging.info(f"Archivo de rechazo leído. Filas: {len(df)}, Columnas: {list(df.columns) if not df.empty else 'vacío'}")
-        
         # Preparar el nuevo rechazo - dividir por líneas
         rejection_lines = [line.strip() for line in rejection_text.split('\n') if line.strip()]
         current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
@@ -2784,62 +2727,21 @@ def load_rejection_to_sharepoint(team_member: str, rejection_text: str, rejectio
         logging.info(f"Procesando rechazo con {len(rejection_lines)} líneas")
         logging.info(f"Primeras 3 líneas: {rejection_lines[:3]}")
         
-        # Crear una fila por cada línea de rechazo
-        rejection_data = {
-            'EAN_HIJO': rejection_lines,
-            'OBS_SIN_FOTO': [rejection_obs] * len(rejection_lines),
-            'Fecha': [current_time] * len(rejection_lines),
-            'Usuario': [current_user] * len(rejection_lines)
-        }
-        
-        # Crear DataFrame con el nuevo rechazo
-        new_rejection_df = pd.DataFrame(rejection_data)
-        logging.info(f"Nuevo rechazo preparado con {len(new_rejection_df)} filas")
-        
-        # Si el archivo está vacío o no tiene la estructura esperada, crear uno nuevo
-        if df.empty or 'EAN_HIJO' not in df.columns:
-            logging.info("Archivo vacío o sin estructura esperada. Creando nuevo archivo.")
-            df = new_rejection_df
-        else:
-            logging.info("Añadiendo rechazo al archivo existente.")
-            # Asegurar que la columna OBS_SIN_FOTO existe en el DataFrame existente
-            if 'OBS_SIN_FOTO' not in df.columns:
-                df['OBS_SIN_FOTO'] = ''
-            # Añadir el nuevo rechazo al final
-            df = pd.concat([df, new_rejection_df], ignore_index=True)
-        
-        # Guardar el archivo actualizado en SharePoint
-        # Primero guardar temporalmente
-        temp_file = f"/tmp/rejection_{team_member}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        df.to_excel(temp_file, index=False)
-        
-        # Subir a SharePoint usando la API de Graph
-        with open(temp_file, 'rb') as file_content:
-            # Codificar la URL de SharePoint
-            import base64
-            sharepoint_url_bytes = excel_url.encode('utf-8')
-            encoded_url = base64.urlsafe_b64encode(sharepoint_url_bytes).decode('utf-8').rstrip('=')
-            
-            # URL para subir el contenido
-            upload_url = f"https://graph.microsoft.com/v1.0/shares/u!{encoded_url}/driveItem/content"
-            
-            headers = {
-                'Authorization': 'Bearer ' + access_token,
-                'Content-Type': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            }
-            
-            response = requests.put(upload_url, headers=headers, data=file_content.read(), verify=False)
-            response.raise_for_status()
-        
-        # Limpiar archivo temporal
-        os.remove(temp_file)
+        # Agregar una fila por cada línea de rechazo (append-only vía Excel API;
+        # la columna OBS_SIN_FOTO se agrega a la tabla si no existe)
+        rows_added = append_rows_to_sharepoint_excel(
+            excel_url,
+            columns=['EAN_HIJO', 'OBS_SIN_FOTO', 'Fecha', 'Usuario'],
+            rows=[[line, rejection_obs, current_time, current_user] for line in rejection_lines],
+            auth=get_sharepoint_authenticator()
+        )
         
         logging.info(f"Rechazo cargado exitosamente para {team_member}")
         return {
             'success': True,
             'message': f'Rechazo cargado exitosamente para {team_member.replace("_", " ").title()}',
             'team_member': team_member,
-            'rejection_count': len(df)
+            'rejection_count': rows_added
         }
         
     except Exception as e:
@@ -3053,7 +2955,7 @@ def _list_folder_contents(drive_id: str, folder_path: str, access_token: str) ->
         encoded_path = quote(clean_path)
         graph_url = f"https://graph.microsoft.com/v1.0/drives/{drive_id}/root:/{encoded_path}:/children"
     
-    headers = {'Authorization': f'Bearer {access_token}'}
+    headers = {'Authorization': f'Bearer {_current_sharepoint_token(access_token)}'}
     
     response = requests.get(graph_url, headers=headers, verify=False, timeout=30)
     response.raise_for_status()
@@ -3095,7 +2997,7 @@ def _download_file_from_sharepoint(drive_id: str, file_path: str, access_token:
     """
     encoded_path = quote(file_path)
     graph_url = f"https://graph.microsoft.com/v1.0/drives/{drive_id}/root:/{encoded_path}:/content"
-    headers = {'Authorization': f'Bearer {access_token}'}
+    headers = {'Authorization': f'Bearer {_current_sharepoint_token(access_token)}'}
     
     response = requests.get(graph_url, headers=headers, verify=False, timeout=60, stream=True)
     response.raise_for_status()
@@ -3606,7 +3508,7 @@ def _search_folder_recursive_in_path(site_id: str, base_path: str, folder_name:
         else:
             encoded_path = quote(base_path)
             graph_url = f"https://graph.microsoft.com/v1.0/sites/{site_id}/drive/root:/{encoded_path}:/children"
-        headers = {'Authorization': f'Bearer {access_token}'}
+        headers = {'Authorization': f'Bearer {_current_sharepoint_token(access_token)}'}
         logging.info(f"[DEBUG] Listando hijos: {graph_url}")
         sse_progress(f"DEBUG: Listando hijos en {base_path}")
         response = requests.get(graph_url, headers=headers, verify=False, timeout=30)
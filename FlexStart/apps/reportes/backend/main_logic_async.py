@@ -2,39 +2,51 @@
 FASE 2.1b: Versión Async de load_blob_data()
 Orquestador async puro con paralelización de operaciones I/O
 
-Este archivo contiene la versión refactorizada async de load_blob_data()
-que reemplazará la versión síncrona en main_logic.py
+Ruta de producción de /api/data/load y /api/data/refresh (vía DataService).
+Reutiliza las etapas de main_logic.load_blob_data() (decisión de caché,
+post-procesamiento y publicación del estado global) y reemplaza solo la parte
+de I/O y parseo:
+
+- Descarga principal + enrichment en paralelo con asyncio.gather()
+- Descargas Azure/SharePoint con aiohttp (sin bloquear el event loop)
+- Parseo CSV/Excel en pool de procesos (services.parse_utils)
+- Cancelable: si la tarea se cancela (cliente SSE desconectado) se abortan
+  las descargas en curso y se reporta al frontend
 
 Fecha: 2025-11-14
 Versión: 2.0.5
-Optimizaciones:
-- Operaciones I/O verdaderamente asíncronas (sin run_in_executor para I/O)
-- Paralelización con asyncio.gather() para descargas simultáneas
-- Descarga principal + enrichment en paralelo
-- CPU-bound operations (pandas) en thread pool con asyncio.to_thread()
 """
 
 import asyncio
-import io
 import logging
+import threading
 import time
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 import pandas as pd
 
 # Imports de módulos async (Fase 2.1a)
 from services.async_storage_utils import (
-    download_blob_with_progress_async
+    download_blob_with_progress_async,
+    download_from_azure_blob_async,
+    AZURE_ASYNC_AVAILABLE,
+    AIOHTTP_AVAILABLE
 )
 from services.async_sharepoint_service import (
-    download_sharepoint_with_progress_async
+    download_sharepoint_url_with_progress_async
 )
 
 # Imports de módulos existentes
-from services.csv_utils import csv_utils
-from services.dataframe_utils import dataframe_utils
 from services.cache_service import persistent_cache
+from services.parse_utils import parse_source_bytes_async
 from services.progress_utils import DataLoadProgressTracker
-from services.sharepoint_service import get_sharepoint_authenticator
+from core.sse_channel import clear_data_load_progress_queue
+
+# Sin cliente HTTP async no hay ruta async (DataService hace fallback a síncrono)
+ASYNC_STORAGE_AVAILABLE = AIOHTTP_AVAILABLE
+
+# Tipos de fuente con descarga async nativa. El resto (local, particionados)
+# usa la ruta síncrona de main_logic en un thread.
+ASYNC_SOURCE_TYPES = ("azure", "sharepoint")
 
 
 async def load_blob_data_async(
@@ -46,306 +58,246 @@ async def load_blob_data_async(
     """
     Versión ASYNC de load_blob_data con paralelización de operaciones I/O.
 
-    MEJORAS FASE 2.1:
-    - I/O verdaderamente asíncrono (Azure, FTP, S3, SharePoint)
-    - Descarga principal + enrichment en paralelo con asyncio.gather()
-    - Procesamiento CPU-bound (pandas) con asyncio.to_thread()
-    - Sin bloqueo del event loop
+    Mismo contrato que main_logic.load_blob_data(): actualiza el estado global
+    (df_original, DuckDB, filtros) y devuelve el mismo diccionario de respuesta.
 
     Args:
         param_from_frontend_url: Identificador de la fuente de datos
         selected_columns_from_api: Lista opcional de columnas específicas
-        config_data: Configuración global (inyectada desde main_logic)
+        config_data: Configuración global (por defecto main_logic.config_data)
         progress_tracker: Tracker de progreso SSE
 
     Returns:
         Dict con información de la carga realizada
     """
+    # Import perezoso: main_logic es pesado y no debe cargarse en los procesos de parseo
+    import main_logic
+
     start_time = time.time()
+    if config_data is None:
+        config_data = main_logic.config_data
+
+    # Limpiar mensajes antiguos del queue de SSE antes de iniciar nueva carga
+    clear_data_load_progress_queue()
 
     if not progress_tracker:
         progress_tracker = DataLoadProgressTracker(
-            operation_name="Carga de datos async",
+            operation_name="Carga de datos",
             blob_display_name=param_from_frontend_url
         )
 
-    progress_tracker.update_progress(1, "init", f"Iniciando carga async de '{param_from_frontend_url}'...")
+    progress_tracker.update_progress(1, "init", f"Iniciando carga de '{param_from_frontend_url}'...")
     logging.info(f"⚡ [ASYNC] load_blob_data_async: '{param_from_frontend_url}'")
 
-    # --- PASO 1: DETERMINAR COLUMNAS A CARGAR ---
-    selected_columns = None
-    if selected_columns_from_api:
-        selected_columns = [col.strip().lower() for col in selected_columns_from_api]
-        logging.info(f"Usando columnas desde API: {len(selected_columns)} columnas")
-    else:
-        # Leer configuración de selectcolumns del config.ini
-        key_for_config = param_from_frontend_url.upper()
-        config_settings = config_data["filter_configs"].get(key_for_config, {})
-        select_columns_cfg = config_settings.get('selectcolumns', '')
-        if select_columns_cfg and select_columns_cfg.strip():
-            selected_columns = [col.strip().lower() for col in select_columns_cfg.split(',') if col.strip()]
-            logging.info(f"Usando columnas desde config: {len(selected_columns)} columnas")
-
-    # --- PASO 2: VERIFICACIÓN DE CACHÉ INTELIGENTE ---
-    cache_decision = "no_cache"
-
-    if persistent_cache.is_cacheable(param_from_frontend_url) and persistent_cache.has_cached_data(param_from_frontend_url):
-        key_for_blob_lookup = param_from_frontend_url.upper()
-        found_blob_attrs = config_data.get("blob_options", {}).get(key_for_blob_lookup)
-
-        if found_blob_attrs:
-            source_type = found_blob_attrs.get("source_type")
-
-            # Verificar actualizaciones para SharePoint/Azure
-            if source_type in ["sharepoint", "azure"]:
-                try:
-                    progress_tracker.update_progress(2, "verifying", "Verificando actualizaciones...")
-
-                    if source_type == "sharepoint":
-                        # SharePoint check (síncrono - mover a thread)
-                        auth = get_sharepoint_authenticator()
-                        access_token = await asyncio.to_thread(auth.get_token)
-                        auth_headers = {"Authorization": f"Bearer {access_token}"}
-                        source_url = found_blob_attrs.get("source_url", "")
-
-                        update_info = await asyncio.to_thread(
-                            persistent_cache.check_remote_update,
-                            param_from_frontend_url,
-                            source_url,
-                            auth_headers,
-                            "sharepoint"
-                        )
-
-                    elif source_type == "azure":
-                        # Azure check (también mover a thread - usa SDK síncrono)
-                        filename = found_blob_attrs.get("filename")
-                        azure_config = {
-                            'connection_string': config_data.get("connection_string"),
-                            'container_name': config_data.get("container_name"),
-                            'blob_name': filename
-                        }
-
-                        update_info = await asyncio.to_thread(
-                            persistent_cache.check_remote_update,
-                            param_from_frontend_url,
-                            "",
-                            None,
-                            "azure",
-                            azure_config
-                        )
-
-                    # Decisión común
-                    if update_info.get('error'):
-                        cache_decision = "using_cache"
-                        logging.warning(f"⚠️ Error verificando actualizaciones - usando caché")
-                    elif update_info.get('update_available'):
-                        await asyncio.to_thread(persistent_cache.clear_cache, param_from_frontend_url)
-                        cache_decision = "downloading_fresh"
-                        logging.info(f"🔄 Actualización detectada - descargando nuevo")
-                    else:
-                        cache_decision = "using_cache"
-                        logging.info(f"✅ Caché actualizado - usando versión local")
-
-                except Exception as e:
-                    cache_decision = "using_cache"
-                    logging.warning(f"⚠️ Error verificando actualizaciones: {e}")
-            else:
-                cache_decision = "using_cache"
-
-    # --- PASO 3: INTENTAR CARGAR DESDE CACHÉ ---
-    if cache_decision == "using_cache":
-        cached_data = await asyncio.to_thread(
-            persistent_cache.load_cached_data,
-            param_from_frontend_url
-        )
-
-        if cached_data is not None and not cached_data.empty:
-            # Aplicar selección de columnas si aplica
-            if selected_columns:
-                available_cols = [col for col in selected_columns if col in cached_data.columns]
-                if available_cols:
-                    cached_data = cached_data[available_cols]
-
-            load_time = time.time() - start_time
-            progress_tracker.finish(
-                success=True,
-                final_message=f"✅ Cargado desde caché: {len(cached_data):,} filas en {load_time:.2f}s"
-            )
-
-            return {
-                "message": f"Datos cargados desde caché en {load_time:.2f}s",
-                "row_count_original": len(cached_data),
-                "columns": list(cached_data.columns),
-                "filter_options": {},
-                "from_cache": True,
-                "load_time_seconds": round(load_time, 2),
-                "cache_decision": "using_cache",
-                "df_loaded": cached_data  # Retornar DataFrame para procesamiento posterior
-            }
+    main_logic._reset_sku_filter_lists()
 
-    # --- PASO 4: DESCARGAR DESDE FUENTE ORIGINAL (ASYNC) ---
-    logging.info(f"Descargando desde fuente original...")
+    try:
+        # --- PASO 1: DETERMINAR COLUMNAS A CARGAR ---
+        selected_columns = main_logic._resolve_selected_columns(param_from_frontend_url, selected_columns_from_api)
 
-    key_for_blob_lookup = param_from_frontend_url.upper()
-    found_blob_attrs = config_data.get("blob_options", {}).get(key_for_blob_lookup)
+        # --- PASO 2: VERIFICACIÓN DE CACHÉ INTELIGENTE (I/O remoto en thread) ---
+        cache_decision, cache_verification_status = await asyncio.to_thread(
+            main_logic._resolve_cache_decision,
+            param_from_frontend_url,
+            progress_tracker
+        )
 
-    if not found_blob_attrs:
-        raise ValueError(f"Fuente de datos no encontrada: {param_from_frontend_url}")
+        # --- PASO 3: INTENTAR CARGAR DESDE CACHÉ ---
+        cached_result = await asyncio.to_thread(
+            main_logic._load_from_persistent_cache,
+            param_from_frontend_url,
+            selected_columns
+        )
+        if cached_result:
+            cached_result["cache_decision"] = cache_decision
+            cached_result["cache_info"] = cache_verification_status
+            return cached_result
 
-    filename = found_blob_attrs.get("value")
-    source_type = found_blob_attrs.get("source_type")
+        found_blob_attrs = config_data.get("blob_options", {}).get(param_from_frontend_url.upper())
+        if not found_blob_attrs:
+            raise ValueError(f"Fuente de datos no encontrada para el display_name: {param_from_frontend_url}")
 
-    progress_tracker.update_progress(5, "download", f"Descargando desde {source_type}...")
+        cancel_event = threading.Event()
+        try:
+            # --- PASO 4: DESCARGA PRINCIPAL + ENRICHMENT EN PARALELO ---
+            download_tasks = [asyncio.create_task(_download_main_dataframe(
+                param_from_frontend_url, found_blob_attrs, selected_columns, config_data, progress_tracker
+            ))]
+
+            enrichment_source = found_blob_attrs.get("enrichment_source")
+            if (enrichment_source and found_blob_attrs.get("enrichment_join_column")
+                    and found_blob_attrs.get("enrichment_columns")):
+                download_tasks.append(asyncio.create_task(_load_enrichment_data_cached_async(
+                    enrichment_source, found_blob_attrs.get("source_type"), found_blob_attrs, config_data
+                )))
+
+            logging.info(f"⚡ [ASYNC] Ejecutando {len(download_tasks)} descargas en paralelo...")
+            try:
+                download_results = await asyncio.gather(*download_tasks)
+            except BaseException:
+                # gather() no cancela las tareas hermanas cuando una falla
+                for task in download_tasks:
+                    task.cancel()
+                raise
+
+            df_loaded, filename, source_type = download_results[0]
+            df_enrichment = download_results[1] if len(download_results) > 1 else None
+
+            # --- PASO 5: POST-PROCESAMIENTO Y PUBLICACIÓN DEL ESTADO GLOBAL ---
+            # El thread no se detiene al cancelar la tarea: el evento le avisa que no publique
+            return await asyncio.to_thread(
+                main_logic._finalize_loaded_dataframe,
+                param_from_frontend_url,
+                df_loaded,
+                found_blob_attrs,
+                filename,
+                source_type,
+                selected_columns_from_api,
+                cache_decision,
+                progress_tracker,
+                start_time,
+                df_enrichment,
+                cancel_event
+            )
 
-    # --- PASO 5: PARALELIZACIÓN - DESCARGA PRINCIPAL + ENRICHMENT ---
-    download_tasks = []
+        except asyncio.CancelledError:
+            cancel_event.set()
+            raise
+        except Exception as e:
+            logging.error(f"Error crítico durante la carga async de '{param_from_frontend_url}': {e}", exc_info=True)
+            progress_tracker.error(f"❌ Error en la carga: {str(e)}")
+            main_logic.df_original = pd.DataFrame()
+            main_logic.current_blob_display_name = None
+            raise
 
-    # Tarea 1: Descarga principal
-    async def download_main_data():
-        """Descarga datos principales según el tipo de fuente."""
-        if source_type == 'azure':
-            connection_string = config_data.get("connection_string")
-            container_name = config_data.get("container_name")
+    except asyncio.CancelledError:
+        elapsed = time.time() - start_time
+        logging.warning(f"⚠️ [ASYNC] Carga de '{param_from_frontend_url}' cancelada tras {elapsed:.1f}s")
+        progress_tracker.error("⚠️ Carga cancelada")
+        raise
 
-            if not all([connection_string, container_name, filename]):
-                raise ValueError("Falta configuración de Azure")
 
-            # Descarga async con progreso
-            blob_content = await download_blob_with_progress_async(
-                connection_string,
-                container_name,
-                filename,
-                progress_tracker=progress_tracker,
-                step=5
-            )
+async def refresh_blob_data_async(
+    param_from_frontend_url: str,
+    selected_columns_from_api: Optional[List[str]] = None,
+    config_data: dict = None
+) -> Dict[str, Any]:
+    """
+    Versión ASYNC de refresh_blob_data: limpia el caché persistente y recarga desde la fuente.
+    """
+    logging.info(f"⚡ [ASYNC] refresh_blob_data_async: forzando actualización de '{param_from_frontend_url}'")
 
-            return blob_content
+    if persistent_cache.is_cacheable(param_from_frontend_url):
+        if await asyncio.to_thread(persistent_cache.has_cached_data, param_from_frontend_url):
+            success = await asyncio.to_thread(persistent_cache.clear_cache, param_from_frontend_url)
+            if not success:
+                logging.warning(f"⚠️ No se pudo limpiar el cache persistente para '{param_from_frontend_url}'")
+
+    return await load_blob_data_async(
+        param_from_frontend_url,
+        selected_columns_from_api=selected_columns_from_api,
+        config_data=config_data
+    )
 
-        elif source_type == 'sharepoint':
-            # SharePoint async
-            blob_content = await download_sharepoint_with_progress_async(
-                site_id=found_blob_attrs.get('site_id'),
-                drive_id=found_blob_attrs.get('drive_id'),
-                item_path=filename,
-                progress_tracker=progress_tracker,
-                step=5
-            )
-            return blob_content
 
-        else:
-            raise ValueError(f"Tipo de fuente no soportado para async: {source_type}")
-
-    download_tasks.append(download_main_data())
-
-    # Tarea 2: Descarga enrichment (si aplica) - EN PARALELO
-    enrichment_source = found_blob_attrs.get("enrichment_source")
-    if enrichment_source:
-        async def download_enrichment_data():
-            """Descarga datos de enriquecimiento en paralelo."""
-            logging.info(f"⚡ [ASYNC] Descargando enrichment '{enrichment_source}' en paralelo...")
-            # TODO: Implementar descarga async de enrichment
-            # Por ahora, retornar None para indicar que no hay enrichment
-            return None
-
-        download_tasks.append(download_enrichment_data())
-
-    # EJECUTAR DESCARGAS EN PARALELO
-    logging.info(f"⚡ [ASYNC] Ejecutando {len(download_tasks)} descargas en paralelo...")
-    download_results = await asyncio.gather(*download_tasks, return_exceptions=True)
-
-    # Procesar resultados
-    main_blob_content = download_results[0]
-    if isinstance(main_blob_content, Exception):
-        raise main_blob_content
-
-    enrichment_data = download_results[1] if len(download_results) > 1 else None
-
-    # --- PASO 6: PARSEAR DATOS (CPU-BOUND en thread pool) ---
-    progress_tracker.update_progress(25, "processing", "Parseando datos...")
-
-    async def parse_data(blob_content: bytes):
-        """Parsea CSV/Excel en thread separado (CPU-bound)."""
-        if filename.lower().endswith('.csv'):
-            # Parsear CSV
-            df = await asyncio.to_thread(
-                csv_utils.read_csv_from_bytes,
-                blob_content,
-                filename,
-                usecols=selected_columns
-            )
-        elif filename.lower().endswith(('.xlsx', '.xls')):
-            # Parsear Excel
-            buffer = io.BytesIO(blob_content)
-            df = await asyncio.to_thread(
-                pd.read_excel,
-                buffer,
-                engine='openpyxl',
-                usecols=selected_columns
-            )
-        else:
-            raise ValueError(f"Formato de archivo no soportado: {filename}")
-
-        return df
+# =============================================================================
+# FUNCIONES AUXILIARES ASYNC
+# =============================================================================
 
-    df_loaded = await parse_data(main_blob_content)
+async def _download_main_dataframe(
+    param_from_frontend_url: str,
+    found_blob_attrs: dict,
+    selected_columns: Optional[List[str]],
+    config_data: dict,
+    progress_tracker: DataLoadProgressTracker
+) -> Tuple[pd.DataFrame, str, str]:
+    """
+    Descarga y parsea la fuente principal.
 
-    # Normalizar columnas
-    df_loaded.columns = df_loaded.columns.str.strip().str.lower()
-    logging.info(f"⚡ [ASYNC] Datos parseados: {df_loaded.shape[0]:,} filas, {df_loaded.shape[1]} columnas")
+    Returns:
+        Tupla (df_loaded, filename, source_type), igual que main_logic._read_source_dataframe()
+    """
+    import main_logic
 
-    # --- PASO 7: POST-PROCESAMIENTO (en thread pool) ---
-    # TODO: Aplicar filtros previos, enriquecimiento, normalización de SKUs, etc.
-    # Por ahora, retornar datos básicos
+    filename = found_blob_attrs.get("value")
+    source_type = found_blob_attrs.get("source_type")
 
-    # --- PASO 8: GUARDAR EN CACHÉ (background task - no esperar) ---
-    if persistent_cache.is_cacheable(param_from_frontend_url):
-        # Guardar en background sin esperar
-        asyncio.create_task(
-            asyncio.to_thread(
-                persistent_cache.save_to_cache,
-                param_from_frontend_url,
-                df_loaded,
-                filename
-            )
+    use_async_download = (
+        source_type in ASYNC_SOURCE_TYPES
+        and not found_blob_attrs.get("use_local")
+        and (source_type != 'azure' or AZURE_ASYNC_AVAILABLE)
+    )
+    if not use_async_download:
+        logging.info(f"Fuente '{source_type}' sin descarga async nativa - usando ruta síncrona en thread")
+        return await asyncio.to_thread(
+            main_logic._read_source_dataframe,
+            param_from_frontend_url,
+            found_blob_attrs,
+            selected_columns,
+            progress_tracker
         )
-        logging.info(f"⚡ [ASYNC] Guardando en caché en background...")
 
-    # --- PASO 9: RETORNAR RESULTADO ---
-    load_time = time.time() - start_time
-    logging.info(f"🚀 [ASYNC] CARGA COMPLETADA en {load_time:.2f}s")
-
-    progress_tracker.finish(
-        success=True,
-        final_message=f"✅ Carga async completada: {len(df_loaded):,} filas en {load_time:.2f}s"
+    progress_tracker.update_progress(5, "download", f"Descargando desde {source_type}...")
+    logging.info(
+        f"⚡ [ASYNC] Iniciando carga de '{filename}' (Display Name: {param_from_frontend_url}, Tipo: {source_type})..."
     )
 
-    return {
-        "message": f"Datos cargados async en {load_time:.2f}s",
-        "row_count_original": len(df_loaded),
-        "columns": list(df_loaded.columns),
-        "filter_options": {},
-        "source_type": source_type,
-        "from_cache": False,
-        "load_time_seconds": round(load_time, 2),
-        "cache_decision": cache_decision,
-        "df_loaded": df_loaded  # Retornar DataFrame para procesamiento posterior
-    }
+    sheet_name = None
+    values_only = False
+    usecols = selected_columns
+
+    if source_type == 'azure':
+        connection_string = config_data.get("connection_string")
+        container_name = config_data.get("container_name")
+        if not all([connection_string, container_name, filename]):
+            raise ValueError("Falta la configuración de Azure (ConnectionString, ContainerName, o Filename).")
+
+        blob_content = await download_blob_with_progress_async(
+            connection_string,
+            container_name,
+            filename,
+            progress_tracker=progress_tracker,
+            step=5
+        )
+    else:
+        blob_content = await download_sharepoint_url_with_progress_async(
+            filename,
+            progress_tracker=progress_tracker,
+            step=5
+        )
+        # Mismo criterio que _read_file_from_sharepoint: usecols solo para CSV
+        sheet_name = found_blob_attrs.get('sheet_name')
+        values_only = found_blob_attrs.get('values_only', False)
+        if not filename.lower().endswith('.csv'):
+            usecols = None
+
+    # --- PARSEO (CPU-BOUND en pool de procesos) ---
+    progress_tracker.update_progress(20, "processing", "Parseando datos...")
+    df_loaded = await parse_source_bytes_async(
+        blob_content,
+        filename,
+        usecols=usecols,
+        sheet_name=sheet_name,
+        values_only=values_only
+    )
+    logging.info(f"⚡ [ASYNC] Datos parseados: {df_loaded.shape[0]:,} filas, {df_loaded.shape[1]} columnas")
 
+    return df_loaded, filename, source_type
 
-# =============================================================================
-# FUNCIONES AUXILIARES ASYNC
-# =============================================================================
 
 async def _load_enrichment_data_cached_async(
     enrichment_source: str,
     source_type: str,
     blob_attrs: dict,
     config_data: dict
-) -> Optional[pd.DataFrame]:
+) -> pd.DataFrame:
     """
     Versión ASYNC de _load_enrichment_data_cached.
     Descarga y cachea fuentes de enriquecimiento de forma asíncrona.
 
+    Nunca falla la carga principal: ante cualquier error devuelve un DataFrame
+    vacío (mismo comportamiento que la versión síncrona).
+
     Args:
         enrichment_source: Nombre de la fuente de enriquecimiento
         source_type: Tipo de fuente (azure, ftp, s3, sharepoint)
@@ -353,8 +305,10 @@ async def _load_enrichment_data_cached_async(
         config_data: Configuración global
 
     Returns:
-        DataFrame con datos de enriquecimiento o None si falla
+        DataFrame con datos de enriquecimiento (vacío si falla)
     """
+    import main_logic
+
     cache_name = f"enrichment_{enrichment_source.replace('/', '_').replace('.', '_')}"
 
     # 1. Intentar cargar desde caché
@@ -369,9 +323,37 @@ async def _load_enrichment_data_cached_async(
             logging.warning(f"Error cargando enrichment desde caché: {e}")
             await asyncio.to_thread(persistent_cache.clear_cache, cache_name)
 
-    # 2. Si no hay caché, descargar desde fuente original (async)
-    logging.info(f"⚡ [ASYNC] Descargando enrichment '{enrichment_source}' desde fuente...")
+    # 2. Si no hay caché, descargar desde fuente original (en paralelo con la principal)
+    logging.info(f"⚡ [ASYNC] Descargando enrichment '{enrichment_source}' en paralelo...")
+    try:
+        if source_type == 'azure' and AZURE_ASYNC_AVAILABLE:
+            connection_string = config_data.get("connection_string")
+            container_name = config_data.get("container_name")
+            if not all([connection_string, container_name]):
+                raise ValueError("Falta la configuración de Azure para datos de enriquecimiento.")
+
+            blob_content = await download_from_azure_blob_async(connection_string, container_name, enrichment_source)
+            df_enrichment = await parse_source_bytes_async(blob_content, enrichment_source)
+            df_enrichment.columns = df_enrichment.columns.str.strip().str.lower()
+        else:
+            df_enrichment = await asyncio.to_thread(
+                main_logic._load_enrichment_data, enrichment_source, source_type, blob_attrs
+            )
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logging.error(f"Error al cargar datos de enriquecimiento async: {e}", exc_info=True)
+        return pd.DataFrame()
+
+    # 3. Guardar en caché para futuras cargas (solo si hay datos)
+    if not df_enrichment.empty:
+        source_url = enrichment_source
+        if source_type == 'azure':
+            source_url = f"azure://{config_data.get('container_name', 'unknown')}/{enrichment_source}"
+        try:
+            if await asyncio.to_thread(persistent_cache.save_to_cache, cache_name, df_enrichment, source_url):
+                logging.info(f"✅ Enrichment '{enrichment_source}' guardado en caché ({len(df_enrichment)} filas)")
+        except Exception as e:
+            logging.warning(f"⚠️ No se pudo guardar enrichment en caché: {e}")
 
-    # TODO: Implementar descarga async según source_type
-    # Por ahora, retornar None
-    return None
+    return df_enrichment
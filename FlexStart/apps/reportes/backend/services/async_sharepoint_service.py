@@ -150,7 +150,7 @@ async def download_sharepoint_file_with_auth_async(
     """
     # Obtener token usando el autenticador existente (síncrono)
     auth = get_sharepoint_authenticator()
-    access_token = await asyncio.to_thread(auth.get_token)
+    access_token = await auth.get_token_async()
 
     # Construir URL de Graph API
     # Formato: /sites/{site-id}/drives/{drive-id}/root:/{item-path}
@@ -280,7 +280,7 @@ async def get_sharepoint_file_metadata_async(
 
     # Obtener token
     auth = get_sharepoint_authenticator()
-    access_token = await asyncio.to_thread(auth.get_token)
+    access_token = await auth.get_token_async()
 
     # Construir URL
     encoded_path = quote(item_path)
@@ -410,6 +410,65 @@ async def download_sharepoint_with_progress_async(
     return file_content
 
 
+async def download_sharepoint_url_with_progress_async(
+    sharepoint_url: str,
+    progress_tracker: Optional[Any] = None,
+    step: int = 3
+) -> bytes:
+    """
+    Descarga un archivo de SharePoint a partir de su URL completa (la forma en que
+    config.ini declara las bases) usando el endpoint /shares de Graph API.
+
+    Equivalente async de main_logic._download_sharepoint_file_chunked().
+
+    Args:
+        sharepoint_url: URL completa del archivo en SharePoint
+        progress_tracker: Objeto con método update_progress(step, status, message)
+        step: Número de paso para progress tracking
+
+    Returns:
+        bytes: Contenido del archivo descargado
+    """
+    import base64
+
+    if '#' in sharepoint_url:
+        sharepoint_url = sharepoint_url.split('#')[0].strip()
+
+    encoded_url = base64.urlsafe_b64encode(sharepoint_url.encode('utf-8')).decode('utf-8').rstrip('=')
+    file_url = f"{GRAPH_API_BASE}/shares/u!{encoded_url}/driveItem"
+
+    start_time = datetime.now()
+
+    async def update_progress(downloaded: int, total: int):
+        if progress_tracker:
+            percent = (downloaded / total * 100) if total > 0 else 0
+            message = (
+                f"Descargando SharePoint: {downloaded / 1024 / 1024:.1f} MB / "
+                f"{total / 1024 / 1024:.1f} MB ({percent:.1f}%)"
+            )
+            try:
+                progress_tracker.update_progress(step, "processing", message)
+            except Exception as e:
+                logging.warning(f"Error actualizando progress_tracker: {e}")
+
+    auth = get_sharepoint_authenticator()
+    access_token = await auth.get_token_async()
+
+    file_content = await download_from_sharepoint_async(file_url, access_token, progress_callback=update_progress)
+
+    elapsed = (datetime.now() - start_time).total_seconds()
+    speed_mbps = (len(file_content) / 1024 / 1024) / elapsed if elapsed > 0 else 0
+
+    if progress_tracker:
+        progress_tracker.update_progress(
+            step,
+            "completed",
+            f"Descarga SharePoint completada: {len(file_content) / 1024 / 1024:.2f} MB en {elapsed:.1f}s ({speed_mbps:.2f} MB/s)"
+        )
+
+    return file_content
+
+
 # =============================================================================
 # UTILITIES
 # =============================================================================
@@ -77,7 +77,7 @@ def detect_csv_separator(csv_content: str, filename: str) -> str:
             # Intentar parsear la muestra con este separador
             df_sample = pd.read_csv(
                 io.StringIO(sample_content),
-                separator=separator,
+                sep=separator,
                 nrows=3,
                 header=0
             )
@@ -263,6 +263,71 @@ def read_csv_from_bytes(blob_content_bytes: bytes, filename_for_log: str, usecol
         raise ValueError(f"No se pudo cargar el archivo CSV '{filename_for_log}': {e}")
 
 
+def read_csv_file_with_arrow(file_path: str, filename_for_log: str, usecols: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Lee un CSV grande desde disco con el lector multihilo de Arrow.
+
+    Mantiene el mismo contrato que read_csv_from_bytes() (columnas normalizadas,
+    todo como string, usecols sobre nombres normalizados, EAN corregidos) pero sin
+    cargar el archivo completo como bytes/str en memoria: encoding y separador se
+    detectan sobre una muestra inicial y Arrow lee el archivo por bloques.
+
+    Args:
+        file_path: Ruta local del CSV
+        filename_for_log: Nombre del archivo para logging
+        usecols: Lista opcional de nombres de columnas (normalizados) a cargar
+
+    Returns:
+        DataFrame con los datos del CSV
+    """
+    import csv
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    with open(file_path, 'rb') as f:
+        sample = f.read(256 * 1024)
+    if not sample.strip():
+        logging.warning(f"Archivo '{filename_for_log}' está vacío")
+        return pd.DataFrame()
+
+    # Cortar la muestra en el último salto de línea para no partir caracteres multibyte
+    last_newline = sample.rfind(b'\n')
+    if last_newline > 0:
+        sample = sample[:last_newline]
+
+    sample_text, encoding_used = decode_csv_bytes(sample, filename_for_log)
+    separator = detect_csv_separator(sample_text, filename_for_log)
+    header = next(csv.reader(io.StringIO(sample_text.lstrip('\ufeff')), delimiter=separator))
+
+    arrow_encoding = 'utf8' if encoding_used.startswith('utf-8') else encoding_used
+    include_columns = None
+    if usecols:
+        wanted = set(usecols)
+        include_columns = [name for name in header if name.strip().lower() in wanted]
+        missing_cols = wanted - {name.strip().lower() for name in include_columns}
+        if missing_cols:
+            logging.warning(f"Columnas solicitadas no encontradas en '{filename_for_log}': {sorted(missing_cols)}")
+
+    # Todo como string, igual que try_parse_csv (evita perder ceros a la izquierda en EAN)
+    convert_kwargs = {'column_types': {name: pa.string() for name in header}}
+    if include_columns:
+        convert_kwargs['include_columns'] = include_columns
+
+    table = pa_csv.read_csv(
+        file_path,
+        read_options=pa_csv.ReadOptions(encoding=arrow_encoding, use_threads=True),
+        parse_options=pa_csv.ParseOptions(delimiter=separator),
+        convert_options=pa_csv.ConvertOptions(**convert_kwargs)
+    )
+    df = table.to_pandas()
+
+    df.columns = df.columns.str.strip().str.lower()
+    df = fix_ean_columns(df)
+
+    logging.info(f"CSV '{filename_for_log}' cargado con Arrow: {len(df)} filas, {len(df.columns)} columnas")
+    return df
+
+
 def read_partitioned_csv_from_directory(
     base_directory: str,
     file_pattern: str,
@@ -606,6 +671,10 @@ class CSVUtils:
     def read_csv_from_bytes(blob_content_bytes: bytes, filename_for_log: str, usecols: Optional[List[str]] = None) -> pd.DataFrame:
         return read_csv_from_bytes(blob_content_bytes, filename_for_log, usecols=usecols)
 
+    @staticmethod
+    def read_csv_file_with_arrow(file_path: str, filename_for_log: str, usecols: Optional[List[str]] = None) -> pd.DataFrame:
+        return read_csv_file_with_arrow(file_path, filename_for_log, usecols=usecols)
+
     @staticmethod
     def read_partitioned_csv_from_directory(
         base_directory: str,
@@ -13,6 +13,7 @@ Extraído de main_logic.py para mejorar mantenibilidad y testabilidad.
 FASE 2.1: Soporte para operaciones I/O asíncronas verdaderas
 - Usa main_logic_async.load_blob_data_async() cuando está disponible
 - Fallback automático a versión síncrona si async no disponible
+- Cargas cancelables (cancel_active_load) al desconectarse el cliente SSE
 """
 
 import asyncio
@@ -60,6 +61,8 @@ class DataService:
         """
         self.config_data = config_data
         self.io_executor = io_executor
+        self._active_load_task: Optional[asyncio.Task] = None
+        self._active_load_cancelled = False
 
     def get_blob_options_for_api(self) -> Dict[str, Any]:
         """
@@ -144,21 +147,23 @@ class DataService:
         """
         Versión asíncrona de load_blob_data - thread-safe y optimizada.
 
+        La carga corre como tarea registrada para poder cancelarla con
+        cancel_active_load() (p.ej. cuando el cliente SSE de progreso se desconecta).
+
         Args:
             param_from_frontend_url: Identificador de la fuente de datos
             selected_columns: Lista opcional de columnas específicas para cargar (optimización)
 
         Returns:
             Diccionario con información de la carga realizada
+
+        Raises:
+            InterruptedError: Si la carga fue cancelada vía cancel_active_load()
         """
-        # Crear tarea para ejecutar la carga en background con mejor control
-        load_task = asyncio.create_task(
+        return await self._run_cancellable_load(
             self._load_blob_data_async(param_from_frontend_url, selected_columns)
         )
 
-        # Esperamos el resultado de la tarea
-        return await load_task
-
     async def _load_blob_data_async(self, param_from_frontend_url: str, selected_columns: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         Versión completamente asíncrona de load_blob_data (FASE 2.1).
@@ -209,25 +214,74 @@ class DataService:
         Returns:
             Diccionario con información del refresh realizado
         """
-        # Crear tarea para ejecutar el refresh en background con mejor control
-        refresh_task = asyncio.create_task(
+        return await self._run_cancellable_load(
             self._refresh_blob_data_async(param_from_frontend_url, selected_columns)
         )
 
-        # Esperamos el resultado de la tarea
-        return await refresh_task
-
     async def _refresh_blob_data_async(self, param_from_frontend_url: str, selected_columns: Optional[List[str]] = None) -> Dict[str, Any]:
-        """Versión completamente asíncrona de refresh_blob_data."""
-        loop = asyncio.get_running_loop()
-
-        # Ejecutar operaciones I/O bound en pool dedicado para mejor rendimiento
-        return await loop.run_in_executor(
-            self.io_executor,
-            self._refresh_blob_data_sync,
-            param_from_frontend_url,
-            selected_columns
-        )
+        """Versión completamente asíncrona de refresh_blob_data (misma estrategia que la carga)."""
+        try:
+            from main_logic_async import refresh_blob_data_async, ASYNC_STORAGE_AVAILABLE
+
+            if ASYNC_STORAGE_AVAILABLE:
+                return await refresh_blob_data_async(
+                    param_from_frontend_url,
+                    selected_columns_from_api=selected_columns,
+                    config_data=self.config_data
+                )
+            raise ImportError("Async storage not available")
+
+        except ImportError as e:
+            logging.info(f"Fallback a modo síncrono para refresh de '{param_from_frontend_url}': {e}")
+            loop = asyncio.get_running_loop()
+
+            # Ejecutar operaciones I/O bound en pool dedicado para mejor rendimiento
+            return await loop.run_in_executor(
+                self.io_executor,
+                self._refresh_blob_data_sync,
+                param_from_frontend_url,
+                selected_columns
+            )
+
+    async def _run_cancellable_load(self, load_coro) -> Dict[str, Any]:
+        """
+        Ejecuta una carga como tarea registrada y traduce su cancelación.
+
+        Solo hay un DataFrame global activo, así que la última carga iniciada es
+        la que se puede cancelar.
+        """
+        load_task = asyncio.create_task(load_coro)
+        self._active_load_task = load_task
+        self._active_load_cancelled = False
+
+        try:
+            return await load_task
+        except asyncio.CancelledError:
+            if self._active_load_cancelled and load_task.cancelled():
+                raise InterruptedError("Carga de datos cancelada: el cliente se desconectó")
+            raise
+        finally:
+            if self._active_load_task is load_task:
+                self._active_load_task = None
+
+    def cancel_active_load(self, reason: str = "") -> bool:
+        """
+        Cancela la carga de datos en curso (si existe).
+
+        Las descargas y el parseo pendientes se abortan. El post-procesamiento que
+        ya corre en un thread recibe el aviso y no publica el estado global.
+
+        Returns:
+            True si había una carga en curso y se solicitó su cancelación
+        """
+        load_task = self._active_load_task
+        if load_task is None or load_task.done():
+            return False
+
+        logging.warning(f"⚠️ Cancelando carga de datos en curso{f': {reason}' if reason else ''}")
+        self._active_load_cancelled = True
+        load_task.cancel()
+        return True
 
     def _load_blob_data_sync(self, param_from_frontend_url: str, selected_columns: Optional[List[str]] = None) -> Dict[str, Any]:
         """
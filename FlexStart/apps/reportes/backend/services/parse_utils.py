@@ -0,0 +1,163 @@
+"""
+Parse Utils - Parseo de archivos descargados (CSV/Excel) fuera del event loop.
+
+Este módulo contiene:
+- parse_source_bytes(): convierte bytes CSV/Excel a DataFrame (función pura, picklable)
+- Pool de procesos compartido para parsear en paralelo sin competir por el GIL
+- parse_source_bytes_async(): wrapper async con fallback a thread si el pool no está disponible
+
+Se mantiene deliberadamente liviano (solo pandas + csv_utils) porque cada proceso
+del pool lo importa al arrancar.
+"""
+
+import asyncio
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional
+
+import pandas as pd
+
+from .csv_utils import read_csv_from_bytes
+from core.utils import getenv_int
+
+# Procesos para parseo CPU-bound. 0 desactiva el pool (parseo en thread).
+PARSE_PROCESS_WORKERS = getenv_int("PARSE_PROCESS_WORKERS", 2)
+
+_parse_executor: Optional[ProcessPoolExecutor] = None
+_parse_executor_lock = threading.Lock()
+
+
+def _read_excel_values_only(file_content: io.BytesIO, sheet_name: str) -> pd.DataFrame:
+    """Lee una hoja específica con openpyxl en modo solo valores (sin fórmulas)."""
+    import openpyxl
+
+    file_content.seek(0)
+    workbook = openpyxl.load_workbook(file_content, data_only=True)
+    try:
+        if sheet_name not in workbook.sheetnames:
+            raise ValueError(f"Hoja '{sheet_name}' no encontrada en el archivo Excel")
+
+        worksheet = workbook[sheet_name]
+        data = []
+        headers = []
+        for row_num, row in enumerate(worksheet.iter_rows(values_only=True), 1):
+            if row_num == 1:
+                # Manejar headers correctamente, eliminando celdas vacías al final
+                raw_headers = list(row)
+                last_content_idx = -1
+                for i, cell in enumerate(raw_headers):
+                    if cell is not None and str(cell).strip():
+                        last_content_idx = i
+
+                # Solo usar headers hasta el último con contenido
+                if last_content_idx >= 0:
+                    headers = []
+                    for i in range(last_content_idx + 1):
+                        cell = raw_headers[i]
+                        if cell is not None and str(cell).strip():
+                            headers.append(str(cell).strip())
+                        else:
+                            headers.append(f"Column_{i}")
+                else:
+                    headers = ["Column_0"]  # Fallback si no hay headers
+            else:
+                # Solo tomar los datos correspondientes al número de headers
+                row_data = list(row)[:len(headers)] if headers else list(row)
+                data.append(row_data)
+        return pd.DataFrame(data, columns=headers)
+    finally:
+        workbook.close()
+
+
+def parse_source_bytes(
+    file_content_bytes: bytes,
+    filename: str,
+    usecols: Optional[List[str]] = None,
+    sheet_name: Optional[str] = None,
+    values_only: bool = False
+) -> pd.DataFrame:
+    """
+    Convierte el contenido descargado de una fuente a DataFrame según su extensión.
+
+    Args:
+        file_content_bytes: Contenido del archivo en bytes
+        filename: Nombre o URL del archivo (define el formato por extensión)
+        usecols: Columnas a cargar (CSV, y Excel sin hoja específica)
+        sheet_name: Hoja específica para Excel (None = primera hoja)
+        values_only: Leer solo valores calculados (requiere sheet_name)
+
+    Returns:
+        DataFrame con los datos del archivo
+    """
+    lower_name = filename.lower()
+
+    if lower_name.endswith('.csv'):
+        return read_csv_from_bytes(file_content_bytes, os.path.basename(filename), usecols=usecols)
+
+    # Excel (extensión .xlsx/.xls o formato desconocido: intentar como Excel por defecto)
+    file_content = io.BytesIO(file_content_bytes)
+    if sheet_name and values_only:
+        return _read_excel_values_only(file_content, sheet_name)
+    if sheet_name:
+        return pd.read_excel(file_content, engine='openpyxl', sheet_name=sheet_name)
+    if usecols:
+        return pd.read_excel(file_content, engine='openpyxl', usecols=usecols)
+    return pd.read_excel(file_content, engine='openpyxl')
+
+
+def get_parse_executor() -> Optional[ProcessPoolExecutor]:
+    """Devuelve el pool de procesos de parseo (creación perezosa) o None si está desactivado."""
+    global _parse_executor
+    if PARSE_PROCESS_WORKERS <= 0:
+        return None
+    with _parse_executor_lock:
+        if _parse_executor is None:
+            _parse_executor = ProcessPoolExecutor(max_workers=PARSE_PROCESS_WORKERS)
+            logging.info(f"Pool de procesos de parseo creado ({PARSE_PROCESS_WORKERS} workers)")
+        return _parse_executor
+
+
+def shutdown_parse_executor(wait: bool = False) -> None:
+    """Cierra el pool de procesos de parseo (llamar en shutdown del servidor)."""
+    global _parse_executor
+    with _parse_executor_lock:
+        if _parse_executor is not None:
+            _parse_executor.shutdown(wait=wait, cancel_futures=True)
+            _parse_executor = None
+
+
+async def parse_source_bytes_async(
+    file_content_bytes: bytes,
+    filename: str,
+    usecols: Optional[List[str]] = None,
+    sheet_name: Optional[str] = None,
+    values_only: bool = False
+) -> pd.DataFrame:
+    """
+    Versión async de parse_source_bytes() ejecutada en el pool de procesos.
+
+    Si el pool está desactivado o se rompe (p.ej. un worker murió por memoria),
+    hace fallback a un thread para no perder la carga.
+    """
+    global _parse_executor
+    executor = get_parse_executor()
+    if executor is not None:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                executor, parse_source_bytes,
+                file_content_bytes, filename, usecols, sheet_name, values_only
+            )
+        except BrokenProcessPool as e:
+            logging.warning(f"⚠️ Pool de parseo no disponible ({e}) - parseando en thread")
+            with _parse_executor_lock:
+                if _parse_executor is executor:
+                    _parse_executor = None
+
+    return await asyncio.to_thread(
+        parse_source_bytes, file_content_bytes, filename, usecols, sheet_name, values_only
+    )
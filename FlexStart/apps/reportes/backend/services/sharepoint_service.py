@@ -9,7 +9,7 @@ import sys
 from pathlib import Path
 
 # Agregar el directorio shared/services al path
-shared_services_dir = Path(__file__).parent.parent.parent.parent.parent / "shared" / "services"
+shared_services_dir = Path(__file__).resolve().parents[4] / "shared" / "services"
 if str(shared_services_dir) not in sys.path:
     sys.path.insert(0, str(shared_services_dir))
 
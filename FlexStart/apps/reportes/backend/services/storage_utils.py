@@ -10,19 +10,29 @@ Este módulo contiene funciones auxiliares para:
 Extraído de main_logic.py para mejorar reutilización y mantenibilidad.
 """
 
-import io
+import hashlib
 import logging
 import os
 import tempfile
+import threading
+from contextlib import contextmanager
 from functools import lru_cache
 from typing import Dict, Any, Optional, Tuple, List, Union
 from urllib.parse import urlparse
 
 import keyring
 
+from core.utils import getenv_int
+
 # Constantes
 S3_KEYRING_SERVICE = "ReportesRodrobusS3"
 
+# Pool de conexiones y transferencia multipart S3 (configurables por entorno)
+S3_MAX_POOL_CONNECTIONS = getenv_int("S3_MAX_POOL_CONNECTIONS", 32)
+S3_TRANSFER_CONCURRENCY = getenv_int("S3_TRANSFER_CONCURRENCY", 10)
+S3_MULTIPART_THRESHOLD_MB = getenv_int("S3_MULTIPART_THRESHOLD_MB", 16)
+S3_MULTIPART_CHUNK_MB = getenv_int("S3_MULTIPART_CHUNK_MB", 16)
+
 # Imports condicionales para librerías de storage
 try:
     from azure.storage.blob import BlobServiceClient
@@ -34,6 +44,8 @@ except ImportError:
 
 try:
     import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.config import Config as BotoConfig
     from botocore.exceptions import ClientError, NoCredentialsError
     S3_AVAILABLE = True
 except ImportError:
@@ -263,8 +275,6 @@ def _download_blob_with_progress(connection_string: str, container_name: str, fi
 
 def _read_xlsx_from_s3(s3_path: str) -> 'pd.DataFrame':
     """Lee un XLSX desde S3; para archivos grandes usa caché Parquet local."""
-    import hashlib
-    import io
     import pandas as pd
     from pathlib import Path
 
@@ -296,10 +306,9 @@ def _read_xlsx_from_s3(s3_path: str) -> 'pd.DataFrame':
     # Si el archivo es menor a 10 MB, leerlo directamente para no sobrecargar.
     THRESHOLD_BYTES = 10 * 1024 * 1024
     logging.info(f"Descargando XLSX desde S3 (tamaño {size_bytes/1e6:.1f} MB): s3://{bucket}/{key}")
-    obj = client.get_object(Bucket=bucket, Key=key)
-    data = obj['Body'].read()
-
-    df = pd.read_excel(io.BytesIO(data), engine='openpyxl')
+    # Descarga multipart paralela a disco; openpyxl lee desde el archivo (sin copia en memoria)
+    with _download_s3_to_tempfile(client, bucket, key, suffix='.xlsx') as local_path:
+        df = pd.read_excel(local_path, engine='openpyxl')
 
     # Guardar en Parquet si el tamaño supera el umbral (mejora cargas futuras)
     try:
@@ -307,7 +316,6 @@ def _read_xlsx_from_s3(s3_path: str) -> 'pd.DataFrame':
             logging.info(f"Guardando caché Parquet ({parquet_path})…")
             df.to_parquet(parquet_path, index=False)
             # Limpiar versiones antiguas de este archivo
-            prefix = CACHE_DIR / f"{sanitized_key}__"
             for old_file in CACHE_DIR.glob(f"{sanitized_key}__*.parquet"):
                 if old_file != parquet_path:
                     old_file.unlink(missing_ok=True)
@@ -319,7 +327,6 @@ def _read_xlsx_from_s3(s3_path: str) -> 'pd.DataFrame':
 
 def _read_csv_from_s3(s3_path: str) -> 'pd.DataFrame':
     """Lee un CSV desde S3; para archivos grandes usa caché Parquet local."""
-    import hashlib
     import pandas as pd
     from pathlib import Path
     from .csv_utils import csv_utils
@@ -350,10 +357,18 @@ def _read_csv_from_s3(s3_path: str) -> 'pd.DataFrame':
         return pd.read_parquet(parquet_path)
 
     logging.info(f"Descargando CSV desde S3 (tamaño {size_bytes/1e6:.1f} MB): s3://{bucket}/{key}")
-    obj = client.get_object(Bucket=bucket, Key=key)
-    raw_data = obj['Body'].read()
-
-    df = csv_utils.read_csv_from_bytes(raw_data, key)
+    if size_bytes >= S3_MULTIPART_THRESHOLD_MB * 1024 * 1024:
+        # Archivo grande: descarga multipart paralela a disco + lector Arrow por bloques
+        with _download_s3_to_tempfile(client, bucket, key, suffix='.csv') as local_path:
+            try:
+                df = csv_utils.read_csv_file_with_arrow(local_path, key)
+            except Exception as arrow_err:
+                logging.warning(f"Lector Arrow falló para {key} ({arrow_err}); usando parser robusto")
+                with open(local_path, 'rb') as f:
+                    df = csv_utils.read_csv_from_bytes(f.read(), key)
+    else:
+        obj = client.get_object(Bucket=bucket, Key=key)
+        df = csv_utils.read_csv_from_bytes(obj['Body'].read(), key)
 
     # Si el archivo es grande, guardar caché Parquet
     THRESHOLD_BYTES = 5 * 1024 * 1024  # 5MB para CSV
@@ -372,18 +387,71 @@ def _read_csv_from_s3(s3_path: str) -> 'pd.DataFrame':
 
 
 # Funciones auxiliares S3
+# Clientes boto3 compartidos por credenciales/región: boto3 es thread-safe a nivel
+# de cliente y reutilizarlo conserva el pool de conexiones HTTP (keep-alive).
+# La clave incluye un hash de la clave secreta (no la clave en claro): si la
+# secreta de una access key rota, se crea un cliente nuevo con la vigente.
+_s3_clients: Dict[Tuple[str, str, str], Any] = {}
+_s3_clients_lock = threading.Lock()
+
+
+def _get_pooled_s3_client(access_key: str, secret_key: str, region_name: Optional[str] = None):
+    """Devuelve (creando una sola vez) el cliente S3 con pool de conexiones ajustado."""
+    cache_key = (access_key, hashlib.sha256(secret_key.encode("utf-8")).hexdigest(), region_name or "")
+    with _s3_clients_lock:
+        client = _s3_clients.get(cache_key)
+        if client is None:
+            client = boto3.client(
+                "s3",
+                aws_access_key_id=access_key,
+                aws_secret_access_key=secret_key,
+                region_name=region_name,
+                config=BotoConfig(
+                    max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+                    retries={'max_attempts': 5, 'mode': 'adaptive'},
+                    tcp_keepalive=True
+                )
+            )
+            _s3_clients[cache_key] = client
+        return client
+
+
+def _get_s3_transfer_config() -> 'TransferConfig':
+    """TransferConfig para descargas multipart paralelas de objetos grandes."""
+    return TransferConfig(
+        multipart_threshold=S3_MULTIPART_THRESHOLD_MB * 1024 * 1024,
+        multipart_chunksize=S3_MULTIPART_CHUNK_MB * 1024 * 1024,
+        max_concurrency=min(S3_TRANSFER_CONCURRENCY, S3_MAX_POOL_CONNECTIONS),
+        use_threads=True
+    )
+
+
+@contextmanager
+def _download_s3_to_tempfile(client, bucket: str, key: str, suffix: str = "", callback=None):
+    """
+    Descarga un objeto S3 a un archivo temporal con transferencia multipart
+    paralela y entrega su ruta; el archivo se elimina al salir del contexto.
+    """
+    fd, local_path = tempfile.mkstemp(prefix="s3_", suffix=suffix)
+    os.close(fd)
+    try:
+        client.download_file(bucket, key, local_path, Config=_get_s3_transfer_config(), Callback=callback)
+        yield local_path
+    finally:
+        try:
+            os.remove(local_path)
+        except OSError as e:
+            logging.debug(f"No se pudo eliminar temporal S3 {local_path}: {e}")
+
+
 def _get_s3_client():
-    """Devuelve un cliente boto3 usando credenciales almacenadas en keyring."""
+    """Devuelve el cliente boto3 compartido usando credenciales almacenadas en keyring."""
     try:
         access_key = keyring.get_password(S3_KEYRING_SERVICE, "AWS_ACCESS_KEY_ID")
         secret_key = keyring.get_password(S3_KEYRING_SERVICE, "AWS_SECRET_ACCESS_KEY")
         if not all([access_key, secret_key]):
             raise ValueError("Credenciales AWS no encontradas en keyring.")
-        return boto3.client(
-            "s3",
-            aws_access_key_id=access_key.strip(),
-            aws_secret_access_key=secret_key.strip()
-        )
+        return _get_pooled_s3_client(access_key.strip(), secret_key.strip())
     except Exception as e:
         logging.error(f"Error obteniendo cliente S3: {e}")
         raise
@@ -423,10 +491,15 @@ def _sanitize_key_for_filename(key: str) -> str:
 
 def download_from_s3(aws_access_key: str, aws_secret_key: str, bucket_name: str,
                     object_key: str, region_name: str = "us-east-1",
-                    progress_tracker: Optional[DownloadProgressTracker] = None) -> bytes:
+                    progress_tracker: Optional[DownloadProgressTracker] = None,
+                    destination: Optional[str] = None) -> Union[bytes, str]:
     """
     Descarga un archivo desde Amazon S3.
 
+    La transferencia multipart se escribe en streaming a disco (sin un buffer
+    en memoria por parte): al archivo `destination` si se indica, o a un
+    temporal que se lee una sola vez.
+
     Args:
         aws_access_key: Clave de acceso AWS
         aws_secret_key: Clave secreta AWS
@@ -434,20 +507,16 @@ def download_from_s3(aws_access_key: str, aws_secret_key: str, bucket_name: str,
         object_key: Clave del objeto a descargar
         region_name: Región de AWS
         progress_tracker: Tracker de progreso opcional
+        destination: Ruta donde guardar el objeto (opcional)
 
     Returns:
-        Contenido del objeto en bytes
+        Contenido del objeto en bytes, o la ruta `destination` si se indicó
     """
     if not S3_AVAILABLE:
         raise ImportError("Amazon S3 no está disponible. Instalar boto3")
 
     try:
-        s3_client = boto3.client(
-            's3',
-            aws_access_key_id=aws_access_key,
-            aws_secret_access_key=aws_secret_key,
-            region_name=region_name
-        )
+        s3_client = _get_pooled_s3_client(aws_access_key, aws_secret_key, region_name)
 
         if progress_tracker:
             progress_tracker.update_bytes(0, f"Conectando a Amazon S3...")
@@ -462,19 +531,31 @@ def download_from_s3(aws_access_key: str, aws_secret_key: str, bucket_name: str,
         except ClientError:
             object_size = 0
 
-        # Descargar el objeto
-        response = s3_client.get_object(Bucket=bucket_name, Key=object_key)
-        content = response['Body'].read()
+        # Descargar el objeto (multipart paralelo por rangos para objetos grandes)
+        callback = progress_tracker.update_bytes if progress_tracker else None
+        if destination:
+            s3_client.download_file(
+                bucket_name, object_key, destination,
+                Config=_get_s3_transfer_config(),
+                Callback=callback
+            )
+            result = destination
+            downloaded_size = os.path.getsize(destination)
+        else:
+            with _download_s3_to_tempfile(s3_client, bucket_name, object_key, callback=callback) as local_path:
+                with open(local_path, "rb") as f:
+                    result = f.read()
+            downloaded_size = len(result)
 
         if progress_tracker:
-            progress_tracker.update_bytes(len(content), f"Descarga completada desde S3")
+            progress_tracker.update_bytes(0, f"Descarga completada desde S3")
 
-        logging.info(f"Objeto '{object_key}' descargado exitosamente desde S3 ({len(content)} bytes)")
-        return content
+        logging.info(f"Objeto '{object_key}' descargado exitosamente desde S3 ({downloaded_size} bytes)")
+        return result
 
     except ClientError as e:
         error_code = e.response['Error']['Code']
-        if error_code == 'NoSuchKey':
+        if error_code in ('NoSuchKey', '404'):
             logging.error(f"Objeto '{object_key}' no encontrado en bucket '{bucket_name}'")
             raise FileNotFoundError(f"Objeto '{object_key}' no encontrado")
         else:
@@ -689,8 +770,10 @@ class StorageUtils:
     @staticmethod
     def download_from_s3(aws_access_key: str, aws_secret_key: str, bucket_name: str,
                         object_key: str, region_name: str = "us-east-1",
-                        progress_tracker: Optional[DownloadProgressTracker] = None) -> bytes:
-        return download_from_s3(aws_access_key, aws_secret_key, bucket_name, object_key, region_name, progress_tracker)
+                        progress_tracker: Optional[DownloadProgressTracker] = None,
+                        destination: Optional[str] = None) -> Union[bytes, str]:
+        return download_from_s3(aws_access_key, aws_secret_key, bucket_name, object_key, region_name,
+                                progress_tracker, destination)
 
     @staticmethod
     def download_from_sharepoint(site_url: str, username: str, password: str,
@@ -759,7 +842,6 @@ def list_sharepoint_directory_files(
     """
     import fnmatch
     import logging
-    from typing import List, Dict, Any
 
     # Import absoluto para evitar problemas de módulos
     import main_logic
@@ -840,7 +922,6 @@ def get_sharepoint_partition_metadata(
     """
     from datetime import datetime
     import logging
-    from typing import Dict, Any
 
     # Listar archivos
     files = list_sharepoint_directory_files(sharepoint_folder_url, file_pattern, access_token)
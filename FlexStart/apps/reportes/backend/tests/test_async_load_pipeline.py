@@ -0,0 +1,107 @@
+"""
+Tests de la ruta async de carga de datos (FASE 2.1).
+
+Cubre:
+1. Parseo de bytes CSV/Excel compartido por la ruta síncrona y async (parse_utils)
+2. Fallback a thread cuando el pool de procesos está desactivado
+3. Cancelación de la carga en curso desde DataService (cliente SSE desconectado)
+4. El post-procesamiento cancelado no publica el estado global
+"""
+
+import asyncio
+import io
+import sys
+import threading
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Agregar el directorio backend al path para importar módulos locales
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services import parse_utils
+from services.parse_utils import parse_source_bytes, parse_source_bytes_async
+from services.data_service import DataService
+
+
+class TestParseSourceBytes:
+    """Parseo de contenido descargado según extensión."""
+
+    def test_csv_normaliza_columnas_y_aplica_usecols(self):
+        content = "SKU_HIJO;Marca;Precio\n123;ACME;10\n456;OTRA;20\n".encode("utf-8")
+        df = parse_source_bytes(content, "https://x/sites/a/base.csv", usecols=["sku_hijo", "marca"])
+        assert list(df.columns) == ["sku_hijo", "marca"]
+        assert len(df) == 2
+
+    def test_excel_hoja_especifica_solo_valores(self):
+        pytest.importorskip("openpyxl")
+        buffer = io.BytesIO()
+        with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+            pd.DataFrame({"a": [1]}).to_excel(writer, sheet_name="Otra", index=False)
+            pd.DataFrame({"sku": [1, 2], "estado": ["x", "y"]}).to_excel(writer, sheet_name="Data", index=False)
+
+        df = parse_source_bytes(buffer.getvalue(), "base.xlsx", sheet_name="Data", values_only=True)
+        assert list(df.columns) == ["sku", "estado"]
+        assert len(df) == 2
+
+    def test_excel_hoja_inexistente(self):
+        pytest.importorskip("openpyxl")
+        buffer = io.BytesIO()
+        pd.DataFrame({"a": [1]}).to_excel(buffer, index=False, engine="openpyxl")
+        with pytest.raises(ValueError):
+            parse_source_bytes(buffer.getvalue(), "base.xlsx", sheet_name="NoExiste", values_only=True)
+
+    def test_async_sin_pool_usa_thread(self, monkeypatch):
+        monkeypatch.setattr(parse_utils, "PARSE_PROCESS_WORKERS", 0)
+        content = b"a,b\n1,2\n"
+        df = asyncio.run(parse_source_bytes_async(content, "x.csv"))
+        assert list(df.columns) == ["a", "b"]
+
+
+class TestCancellableLoad:
+    """Cancelación de cargas registradas en DataService."""
+
+    def test_cancel_active_load_traduce_a_interrupted_error(self):
+        service = DataService(config_data={}, io_executor=None)
+
+        async def slow_load():
+            await asyncio.sleep(30)
+            return {"row_count_original": 1}
+
+        async def scenario():
+            load = asyncio.create_task(service._run_cancellable_load(slow_load()))
+            await asyncio.sleep(0.05)
+            assert service.cancel_active_load("test") is True
+            with pytest.raises(InterruptedError):
+                await load
+            assert service._active_load_task is None
+
+        asyncio.run(scenario())
+
+    def test_cancel_sin_carga_activa(self):
+        service = DataService(config_data={}, io_executor=None)
+        assert service.cancel_active_load() is False
+
+
+class TestFinalizeCancelado:
+    """_finalize_loaded_dataframe no toca el estado global si la carga se canceló."""
+
+    def test_no_publica_si_el_evento_esta_activo(self, monkeypatch):
+        import main_logic
+
+        previo = pd.DataFrame({"sku_hijo": ["1"]})
+        monkeypatch.setattr(main_logic, "df_original", previo)
+        monkeypatch.setattr(main_logic, "current_blob_display_name", "ANTERIOR")
+        cancel_event = threading.Event()
+        cancel_event.set()
+
+        for df_loaded in (pd.DataFrame({"SKU_HIJO": ["2", "3"]}), pd.DataFrame()):
+            with pytest.raises(InterruptedError):
+                main_logic._finalize_loaded_dataframe(
+                    "NUEVA", df_loaded, {}, "nueva.csv", "azure_blob", None,
+                    "download", None, 0.0, cancel_event=cancel_event
+                )
+
+        assert main_logic.df_original is previo
+        assert main_logic.current_blob_display_name == "ANTERIOR"
@@ -0,0 +1,178 @@
+"""
+Tests de la escritura append-only en Excel de SharePoint (shared/services/sharepoint_excel_append.py).
+
+Se simula la Graph Excel API en memoria para verificar:
+1. Que solo se envían las filas nuevas (rows/add), sin descargar/subir el archivo
+2. La migración única a tabla cuando el archivo no tiene una
+3. El alineamiento de columnas por nombre y el alta de columnas faltantes
+4. Que los textos (EAN con ceros a la izquierda) se envían como texto
+5. Que rows/add no se reintenta ante 5xx (pudo haberse aplicado)
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+requests = pytest.importorskip("requests")
+
+shared_services_dir = Path(__file__).resolve().parents[4] / "shared" / "services"
+sys.path.insert(0, str(shared_services_dir))
+
+import sharepoint_excel_append as excel_append
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, payload=None):
+        self.status_code = status_code
+        self._payload = payload or {}
+        self.content = b"{}" if payload is not None else b""
+        self.text = str(payload)
+        self.headers = {}
+
+    def json(self):
+        return self._payload
+
+
+class FakeGraph:
+    """Workbook en memoria con una hoja y, opcionalmente, una tabla."""
+
+    def __init__(self, table_columns=None, used_values=None, rows_add_responses=None):
+        self.table_columns = table_columns
+        self.used_values = used_values or []
+        self.calls = []
+        self.added_rows = []
+        # Respuestas a devolver (en orden) antes de aceptar rows/add
+        self.rows_add_responses = list(rows_add_responses or [])
+
+    def get(self, url, headers=None, verify=None, timeout=None):
+        self.calls.append(("GET", url))
+        return FakeResponse(payload={"id": "item1", "parentReference": {"driveId": "drive1"}})
+
+    def request(self, method, url, headers=None, json=None, verify=None, timeout=None):
+        path = url.split("/workbook", 1)[1]
+        self.calls.append((method, path))
+        if path == "/createSession":
+            return FakeResponse(payload={"id": "session1"})
+        if path == "/closeSession":
+            return FakeResponse(payload=None)
+        if path == "/tables":
+            tables = [{"name": "Tabla1"}] if self.table_columns is not None else []
+            return FakeResponse(payload={"value": tables})
+        if path == "/worksheets":
+            return FakeResponse(payload={"value": [{"name": "Sheet1"}]})
+        if path.endswith("usedRange(valuesOnly=true)"):
+            return FakeResponse(payload={"address": "Sheet1!A1:C3", "values": self.used_values})
+        if "/range(address=" in path:
+            return FakeResponse(payload={})
+        if path.endswith("/tables/add"):
+            header = self.used_values[0] if self.used_values else []
+            self.table_columns = [str(h) for h in header if str(h).strip()]
+            return FakeResponse(payload={"name": "Tabla1"})
+        if path.endswith("/columns"):
+            return FakeResponse(payload={"value": [{"name": c} for c in self.table_columns]})
+        if path.endswith("/columns/add"):
+            self.table_columns.append(json["name"])
+            return FakeResponse(payload={})
+        if path.endswith("/rows/add"):
+            if self.rows_add_responses:
+                return self.rows_add_responses.pop(0)
+            self.added_rows.extend(json["values"])
+            return FakeResponse(payload={})
+        raise AssertionError(f"Llamada inesperada: {method} {path}")
+
+
+class FakeAuth:
+    def get_token(self):
+        return "token"
+
+
+@pytest.fixture(autouse=True)
+def clear_item_cache():
+    excel_append._item_cache.clear()
+    yield
+    excel_append._item_cache.clear()
+
+
+def _install(monkeypatch, graph):
+    monkeypatch.setattr(excel_append.requests, "get", graph.get)
+    monkeypatch.setattr(excel_append.requests, "request", graph.request)
+
+
+class TestAppendRows:
+
+    def test_agrega_solo_filas_nuevas_en_tabla_existente(self, monkeypatch):
+        graph = FakeGraph(table_columns=["EAN_HIJO", "Fecha", "Usuario"])
+        _install(monkeypatch, graph)
+
+        added = excel_append.append_rows_to_sharepoint_excel(
+            "https://x.sharepoint.com/a.xlsx", ["EAN_HIJO", "Fecha", "Usuario"],
+            [["1", "2024-01-01", "Ana"], ["2", "2024-01-01", "Ana"]], FakeAuth()
+        )
+
+        assert added == 2
+        assert graph.added_rows == [["'1", "'2024-01-01", "'Ana"], ["'2", "'2024-01-01", "'Ana"]]
+        assert ("POST", "/closeSession") in graph.calls
+        assert not any(path.endswith("/content") for _, path in graph.calls)
+
+    def test_migra_a_tabla_y_alinea_columnas(self, monkeypatch):
+        graph = FakeGraph(used_values=[["EAN_HIJO", "Fecha", "Usuario"], ["9", "x", "y"]])
+        _install(monkeypatch, graph)
+
+        excel_append.append_rows_to_sharepoint_excel(
+            "https://x.sharepoint.com/b.xlsx", ["EAN_HIJO", "OBS_SIN_FOTO", "Fecha", "Usuario"],
+            [["1", "sin foto", "2024-01-01", "Ana"]], FakeAuth()
+        )
+
+        assert ("POST", "/worksheets/Sheet1/tables/add") in graph.calls
+        assert graph.table_columns == ["EAN_HIJO", "Fecha", "Usuario", "OBS_SIN_FOTO"]
+        assert graph.added_rows == [["'1", "'2024-01-01", "'Ana", "'sin foto"]]
+
+    def test_sin_filas_no_llama_a_graph(self, monkeypatch):
+        graph = FakeGraph(table_columns=["EAN_HIJO"])
+        _install(monkeypatch, graph)
+        assert excel_append.append_rows_to_sharepoint_excel("u", ["EAN_HIJO"], [], FakeAuth()) == 0
+        assert graph.calls == []
+
+    def test_ean_con_ceros_y_numeros(self, monkeypatch):
+        graph = FakeGraph(table_columns=["EAN_HIJO", "Cantidad", "Obs"])
+        _install(monkeypatch, graph)
+
+        excel_append.append_rows_to_sharepoint_excel(
+            "u", ["EAN_HIJO", "Cantidad", "Obs"], [["0012345678905", 3, ""]], FakeAuth()
+        )
+
+        assert graph.added_rows == [["'0012345678905", 3, ""]]
+
+
+def _response_with_headers(status_code, headers):
+    response = FakeResponse(status_code=status_code, payload={"error": status_code})
+    response.headers = headers
+    return response
+
+
+class TestRetries:
+
+    def test_rows_add_no_se_reintenta_ante_5xx(self, monkeypatch):
+        graph = FakeGraph(table_columns=["EAN_HIJO"],
+                          rows_add_responses=[_response_with_headers(503, {})])
+        _install(monkeypatch, graph)
+        monkeypatch.setattr(excel_append.time, "sleep", lambda s: None)
+
+        with pytest.raises(excel_append.ExcelAppendError):
+            excel_append.append_rows_to_sharepoint_excel("u", ["EAN_HIJO"], [["1"]], FakeAuth())
+
+        assert sum(1 for _, path in graph.calls if path.endswith("/rows/add")) == 1
+        assert graph.added_rows == []
+
+    def test_rows_add_se_reintenta_ante_429_con_retry_after(self, monkeypatch):
+        graph = FakeGraph(table_columns=["EAN_HIJO"],
+                          rows_add_responses=[_response_with_headers(429, {"Retry-After": "1"})])
+        _install(monkeypatch, graph)
+        sleeps = []
+        monkeypatch.setattr(excel_append.time, "sleep", sleeps.append)
+
+        excel_append.append_rows_to_sharepoint_excel("u", ["EAN_HIJO"], [["1"]], FakeAuth())
+
+        assert sleeps == [1.0]
+        assert graph.added_rows == [["'1"]]
@@ -0,0 +1,77 @@
+"""
+Tests del broker de tokens SharePoint compartido (shared/services/sharepoint_service.py).
+
+Cubre:
+1. Reutilización del token en memoria sin volver a llamar a MSAL
+2. Invalidación y refresco forzado
+3. Singleton compartido entre main_logic y los servicios async
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("msal")
+
+# Agregar el directorio backend al path para importar módulos locales
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services import sharepoint_service
+
+
+class FakeMsalApp:
+    """App MSAL mínima: cuenta las adquisiciones silenciosas."""
+
+    def __init__(self):
+        self.silent_calls = 0
+
+    def get_accounts(self):
+        return [{"username": "test@ripley.com"}]
+
+    def acquire_token_silent(self, scopes, account=None, force_refresh=False):
+        self.silent_calls += 1
+        return {"access_token": f"token-{self.silent_calls}", "expires_in": 3600}
+
+    def acquire_token_interactive(self, scopes, prompt=None):
+        raise AssertionError("No debería pedir login interactivo")
+
+
+@pytest.fixture(autouse=True)
+def sin_red(monkeypatch):
+    """Evita que MSAL consulte login.microsoftonline.com al crear la app."""
+    monkeypatch.setattr(sharepoint_service.SharePointAuth, "_create_msal_app", lambda self: FakeMsalApp())
+
+
+@pytest.fixture
+def broker():
+    auth = sharepoint_service.SharePointAuth()
+    yield auth
+    auth.stop_background_refresh()
+
+
+class TestTokenBroker:
+    """Caché en memoria y refresco del token."""
+
+    def test_token_en_memoria_se_reutiliza(self, broker):
+        first = broker.get_token()
+        second = broker.get_token()
+        assert first == second == "token-1"
+        assert broker.app.silent_calls == 1
+        assert broker.peek_token() == "token-1"
+
+    def test_invalidate_fuerza_nueva_adquisicion(self, broker):
+        broker.get_token()
+        broker.invalidate_token()
+        assert broker.peek_token() is None
+        assert broker.get_token() == "token-2"
+
+    def test_force_refresh_ignora_memoria(self, broker):
+        broker.get_token()
+        assert broker.get_token(force_refresh=True) == "token-2"
+
+
+def test_main_logic_usa_singleton_compartido():
+    pytest.importorskip("pandas")
+    import main_logic
+    assert main_logic.get_sharepoint_authenticator() is sharepoint_service.get_sharepoint_authenticator()
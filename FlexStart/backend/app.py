@@ -124,6 +124,14 @@ def cleanup_child_processes(timeout: float = 3.0):
 # Modelo para solicitudes de scripts
 class ScriptRequest(BaseModel):
     script_id: str
+    # headless=True encola el núcleo de la herramienta como trabajo (sin ventana)
+    headless: bool = False
+    params: dict = {}
+
+# Modelo para trabajos headless
+class JobRequest(BaseModel):
+    script_id: str
+    params: dict = {}
 
 def get_allowed_scripts():
     """Genera diccionario de scripts permitidos."""
@@ -275,6 +283,144 @@ def _execute_script_sync(script_path: str, script_dir: str) -> dict:
             "message": f"Error al ejecutar script: {str(e)}"
         }
 
+# ==================== Trabajos headless ====================
+# Núcleo de las herramientas de diseño sin ventana (apps/diseno/trabajos.py).
+# Cada trabajo corre en su propio proceso y reporta eventos JSON por stdout;
+# job_executor limita cuántos corren a la vez y el resto queda en cola.
+def _load_jobs_module():
+    import importlib.util
+    spec = importlib.util.spec_from_file_location("trabajos_diseno", os.path.join(APPS_DIR, "diseno", "trabajos.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+trabajos = _load_jobs_module()
+
+JOB_WORKERS = int(os.environ.get("SUITE_JOB_WORKERS", "2"))
+MAX_JOB_EVENTS = 500      # Eventos guardados por trabajo (los más recientes)
+MAX_FINISHED_JOBS = 100   # Trabajos terminados que se conservan para consulta
+JOB_FINAL_STATES = ("done", "error", "cancelled")
+
+job_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="JobExec")
+_jobs = {}
+_job_processes = {}
+_jobs_lock = threading.Lock()
+_job_counter = 0
+
+def _job_summary(job: dict, with_events: bool = False) -> dict:
+    summary = {k: v for k, v in job.items() if k != "events"}
+    if with_events:
+        summary["events"] = list(job["events"])
+    return summary
+
+def _record_job_event(job_id: str, event: dict):
+    """Guarda un evento del trabajo y actualiza su progreso/resultado."""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return
+        job["seq"] += 1
+        job["events"].append(dict(event, seq=job["seq"]))
+        if len(job["events"]) > MAX_JOB_EVENTS:
+            del job["events"][:-MAX_JOB_EVENTS]
+        kind = event.get("evento")
+        if kind == "progreso":
+            job["progress"] = {"done": event.get("hechos"), "total": event.get("total")}
+        elif kind == "fin":
+            job["result"] = event.get("resultado")
+        elif kind == "error":
+            job["error"] = event.get("mensaje")
+
+def _run_job_sync(job_id: str):
+    """Ejecuta un trabajo encolado en un subproceso y sigue sus eventos hasta que termina."""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is None or job["status"] == "cancelled":
+            return
+        job["status"] = "running"
+        job["started_at"] = datetime.now().isoformat(timespec="seconds")
+        spec = {"herramienta": job["script_id"], "parametros": job["params"]}
+
+    try:
+        process = trabajos.lanzar_subproceso(spec)
+    except Exception as e:
+        logger.error(f"[JOBS] Error launching job {job_id}: {e}")
+        _record_job_event(job_id, {"evento": "error", "mensaje": str(e)})
+        with _jobs_lock:
+            job["status"] = "error"
+            job["finished_at"] = datetime.now().isoformat(timespec="seconds")
+        return
+
+    track_child_process(process.pid)
+    with _jobs_lock:
+        # Si se canceló mientras se lanzaba, cancel_job no encontró el proceso: se termina aquí
+        cancelled_while_starting = job["status"] == "cancelled"
+        _job_processes[job_id] = process
+        job["pid"] = process.pid
+        if cancelled_while_starting:
+            _terminate_process_tree(process)
+    if cancelled_while_starting:
+        logger.info(f"[JOBS] Job {job_id} cancelled while starting (PID {process.pid})")
+    else:
+        logger.info(f"[JOBS] Job {job_id} ({spec['herramienta']}) running with PID {process.pid}")
+
+    exit_code = trabajos.leer_eventos(process, lambda event: _record_job_event(job_id, event))
+
+    _child_processes.discard(process.pid)
+    with _jobs_lock:
+        _job_processes.pop(job_id, None)
+        if job["status"] != "cancelled":
+            job["status"] = "done" if exit_code == 0 else "error"
+        job["finished_at"] = datetime.now().isoformat(timespec="seconds")
+    logger.info(f"[JOBS] Job {job_id} finished: {job['status']}")
+
+def _submit_job(script_id: str, params: dict) -> dict:
+    """Valida y encola un trabajo headless. Lanza HTTPException si la solicitud no es válida."""
+    global _job_counter
+    try:
+        trabajos.validar({"herramienta": script_id, "parametros": params})
+    except trabajos.ErrorTrabajo as e:
+        status = 404 if script_id not in trabajos.HERRAMIENTAS else 400
+        raise HTTPException(status_code=status, detail=str(e))
+
+    with _jobs_lock:
+        _job_counter += 1
+        job_id = f"{datetime.now():%Y%m%d%H%M%S}-{_job_counter}"
+        _jobs[job_id] = {
+            "id": job_id,
+            "script_id": script_id,
+            "params": params,
+            "status": "queued",
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "started_at": None,
+            "finished_at": None,
+            "pid": None,
+            "progress": None,
+            "result": None,
+            "error": None,
+            "seq": 0,
+            "events": [],
+        }
+        # Retención: se descartan los trabajos terminados más antiguos
+        finished = [jid for jid, j in _jobs.items() if j["status"] in JOB_FINAL_STATES]
+        for jid in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del _jobs[jid]
+
+    job_executor.submit(_run_job_sync, job_id)
+    return {"job_id": job_id, "script_id": script_id, "status": "queued"}
+
+def _terminate_process_tree(process):
+    """Termina el subproceso de un trabajo y los pools de procesos que haya lanzado."""
+    if HAS_PSUTIL:
+        try:
+            parent = psutil.Process(process.pid)
+            for child in parent.children(recursive=True):
+                child.terminate()
+        except psutil.NoSuchProcess:
+            pass
+    process.terminate()
+
+
 def integrate_reportes():
     """Integra aplicación reportes."""
     try:
@@ -342,6 +488,10 @@ def integrate_prod_peru():
         
         # Montar prod_peru en /prod_peru DESPUÉS de las rutas estáticas
         app.mount("/prod_peru", prod_peru_module.app, name="prod_peru")
+        # Starlette no ejecuta el lifespan de una app montada: sus tareas de
+        # arranque y cierre se enganchan a los eventos del gateway
+        app.on_event("startup")(prod_peru_module.start_background_tasks)
+        app.on_event("shutdown")(prod_peru_module.stop_background_tasks)
         
         logging.info("Aplicación Prod PERÚ integrada correctamente en /prod_peru")
     except ImportError as e:
@@ -585,6 +735,9 @@ async def get_birthdays_by_month(month: int):
 @app.post("/api/run-script", summary="Ejecutar un script de herramienta local de forma asíncrona")
 async def run_script(request: ScriptRequest):
     """Ejecuta una herramienta de diseño de forma asíncrona."""
+    if request.headless:
+        return _submit_job(request.script_id, request.params)
+
     script_path = ALLOWED_SCRIPTS.get(request.script_id)
 
     if not script_path:
@@ -624,6 +777,87 @@ async def run_script(request: ScriptRequest):
         raise HTTPException(status_code=500, detail=f"Error interno al iniciar el script: {str(e)}")
 
 
+@app.get("/api/jobs/tools", summary="Herramientas disponibles en modo headless")
+async def list_job_tools():
+    """Lista las herramientas que pueden ejecutarse como trabajo y sus parámetros."""
+    return {
+        script_id: {
+            "description": definition["descripcion"],
+            "params": {
+                name: {"type": kind.__name__, "required": default is trabajos.REQUERIDO,
+                       "default": None if default is trabajos.REQUERIDO else default}
+                for name, (kind, default) in definition["parametros"].items()
+            },
+        }
+        for script_id, definition in trabajos.HERRAMIENTAS.items()
+    }
+
+
+@app.post("/api/jobs", summary="Encolar una herramienta de diseño como trabajo headless")
+async def create_job(request: JobRequest):
+    """Encola un trabajo; el progreso se consulta en /api/jobs/{job_id} o /api/jobs/{job_id}/events."""
+    return _submit_job(request.script_id, request.params)
+
+
+@app.get("/api/jobs", summary="Listar trabajos headless")
+async def list_jobs():
+    with _jobs_lock:
+        return [_job_summary(job) for job in _jobs.values()]
+
+
+@app.get("/api/jobs/{job_id}", summary="Estado de un trabajo headless")
+async def get_job(job_id: str):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Trabajo no encontrado.")
+        return _job_summary(job, with_events=True)
+
+
+@app.get("/api/jobs/{job_id}/events", summary="Progreso de un trabajo como Server-Sent Events")
+async def stream_job_events(job_id: str, after: int = 0):
+    """Emite cada evento del trabajo (con su número 'seq') y termina cuando el trabajo finaliza."""
+    with _jobs_lock:
+        if job_id not in _jobs:
+            raise HTTPException(status_code=404, detail="Trabajo no encontrado.")
+
+    async def event_stream():
+        last_seq = after
+        while True:
+            with _jobs_lock:
+                job = _jobs.get(job_id)
+                if job is None:
+                    return
+                pending = [event for event in job["events"] if event["seq"] > last_seq]
+                status = job["status"]
+            for event in pending:
+                last_seq = event["seq"]
+                yield f"id: {event['seq']}\ndata: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+            if status in JOB_FINAL_STATES:
+                yield f"event: end\ndata: {json.dumps({'status': status})}\n\n"
+                return
+            await asyncio.sleep(0.5)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+
+@app.delete("/api/jobs/{job_id}", summary="Cancelar un trabajo headless")
+async def cancel_job(job_id: str):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Trabajo no encontrado.")
+        if job["status"] in JOB_FINAL_STATES:
+            return _job_summary(job)
+        job["status"] = "cancelled"
+        process = _job_processes.get(job_id)
+    if process is not None:
+        logger.info(f"[JOBS] Cancelling job {job_id} (PID {process.pid})")
+        _terminate_process_tree(process)
+    return {"job_id": job_id, "status": "cancelled"}
+
+
 @app.get("/api/download-tool/{script_id}", summary="Descargar herramienta como ZIP")
 async def download_tool(script_id: str):
     """Descarga una herramienta de diseño como archivo ZIP."""
@@ -738,6 +972,9 @@ async def shutdown_event():
     if script_executor:
         logger.info("[SHUTDOWN] Shutting down script executor")
         script_executor.shutdown(wait=False, cancel_futures=True)
+    if job_executor:
+        logger.info("[SHUTDOWN] Shutting down job executor")
+        job_executor.shutdown(wait=False, cancel_futures=True)
 
     # Paso 2: Kill child processes (scripts activos)
     cleanup_child_processes(timeout=3.0)
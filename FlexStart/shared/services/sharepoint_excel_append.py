@@ -0,0 +1,258 @@
+"""
+Escritura append-only en archivos Excel de SharePoint vía Graph Excel API.
+
+En lugar de descargar el archivo completo, concatenar filas y volver a subirlo
+(costo proporcional al historial y con carreras entre envíos concurrentes),
+las filas nuevas se agregan con `tables/{tabla}/rows/add` dentro de una sesión
+de workbook. Graph serializa las escrituras sobre el mismo archivo, por lo que
+dos envíos simultáneos ya no se pisan.
+
+Si el archivo todavía no tiene una tabla Excel (archivos históricos generados con
+pandas), se crea una sobre el rango usado la primera vez (migración única).
+
+Las celdas de texto se envían con el prefijo de texto de Excel (apóstrofo) para
+que códigos como EAN/UPC "0012345..." no se conviertan a número (ni fechas a
+fecha), igual que cuando el archivo se escribía con pandas. `rows/add` no es
+idempotente: solo se reintenta cuando Graph lo rechazó sin procesarlo.
+"""
+
+# Standard library
+import base64
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+# Third-party
+import requests
+
+GRAPH_API_BASE = "https://graph.microsoft.com/v1.0"
+
+# Reintentos ante throttling/errores transitorios de la Excel API
+MAX_RETRIES = 4
+RETRYABLE_STATUS = {429, 502, 503, 504}
+# Métodos que se pueden repetir sin duplicar cambios en el workbook
+IDEMPOTENT_METHODS = {'GET', 'PATCH', 'DELETE'}
+
+# driveItem resuelto por URL compartida: {excel_url: (drive_id, item_id)}
+_item_cache: Dict[str, Tuple[str, str]] = {}
+# Locks por archivo para serializar la migración a tabla dentro del proceso
+_file_locks: Dict[str, threading.Lock] = {}
+_file_locks_guard = threading.Lock()
+
+
+class ExcelAppendError(Exception):
+    """Error al agregar filas a un Excel de SharePoint."""
+
+
+def _file_lock(excel_url: str) -> threading.Lock:
+    with _file_locks_guard:
+        if excel_url not in _file_locks:
+            _file_locks[excel_url] = threading.Lock()
+        return _file_locks[excel_url]
+
+
+def _column_letter(index: int) -> str:
+    """Convierte un índice de columna 1-based a letra Excel (1 -> A, 27 -> AA)."""
+    letters = ""
+    while index > 0:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+class _GraphWorkbookClient:
+    """Cliente mínimo de la Excel API sobre un driveItem, con sesión persistente."""
+
+    def __init__(self, auth, drive_id: str, item_id: str, verify: bool = False) -> None:
+        self.auth = auth
+        self.verify = verify
+        self.base_url = f"{GRAPH_API_BASE}/drives/{drive_id}/items/{item_id}/workbook"
+        self.session_id: Optional[str] = None
+
+    def request(self, method: str, path: str, json_body: Optional[dict] = None) -> Dict[str, Any]:
+        """
+        Ejecuta una llamada a la Excel API con reintentos y renovación de token en 401.
+
+        GET/PATCH/DELETE se reintentan ante 429/5xx. Los POST (rows/add, columns/add,
+        tables/add) solo ante 429 con Retry-After o si la conexión no llegó a
+        establecerse: un 5xx o un timeout pudo haber aplicado el cambio igual.
+        """
+        url = f"{self.base_url}{path}"
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        token_refreshed = False
+
+        for attempt in range(MAX_RETRIES + 1):
+            headers = {'Authorization': f'Bearer {self.auth.get_token()}'}
+            if self.session_id:
+                headers['workbook-session-id'] = self.session_id
+
+            try:
+                response = requests.request(method, url, headers=headers, json=json_body,
+                                            verify=self.verify, timeout=60)
+            except requests.exceptions.ConnectTimeout:
+                # La solicitud no se envió: se puede repetir aunque no sea idempotente
+                if attempt >= MAX_RETRIES:
+                    raise
+                logging.warning(f"⚠️ Excel API sin conexión, reintentando en {2 ** attempt}s")
+                time.sleep(2 ** attempt)
+                continue
+
+            if response.status_code == 401 and not token_refreshed and hasattr(self.auth, 'invalidate_token'):
+                self.auth.invalidate_token()
+                token_refreshed = True
+                continue
+
+            retry_after = response.headers.get('Retry-After')
+            retryable = response.status_code in RETRYABLE_STATUS if idempotent else (
+                response.status_code == 429 and bool(retry_after)
+            )
+            if retryable and attempt < MAX_RETRIES:
+                delay = float(retry_after) if retry_after and retry_after.isdigit() else 2 ** attempt
+                logging.warning(f"⚠️ Excel API respondió {response.status_code}, reintentando en {delay:.0f}s")
+                time.sleep(delay)
+                continue
+
+            if response.status_code >= 400:
+                raise ExcelAppendError(f"Excel API {method} {path} falló: {response.status_code} - {response.text}")
+
+            return response.json() if response.content else {}
+
+        raise ExcelAppendError(f"Excel API {method} {path} agotó los reintentos")
+
+    def __enter__(self) -> "_GraphWorkbookClient":
+        result = self.request('POST', '/createSession', {'persistChanges': True})
+        self.session_id = result.get('id')
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self.session_id:
+            try:
+                self.request('POST', '/closeSession')
+            except Exception as e:
+                logging.debug(f"No se pudo cerrar la sesión de workbook: {e}")
+            self.session_id = None
+
+
+def _resolve_drive_item(excel_url: str, auth, verify: bool) -> Tuple[str, str]:
+    """Resuelve (drive_id, item_id) desde una URL compartida de SharePoint (con caché)."""
+    if excel_url in _item_cache:
+        return _item_cache[excel_url]
+
+    clean_url = excel_url.split('#')[0].strip()
+    encoded_url = base64.urlsafe_b64encode(clean_url.encode('utf-8')).decode('utf-8').rstrip('=')
+    response = requests.get(
+        f"{GRAPH_API_BASE}/shares/u!{encoded_url}/driveItem",
+        headers={'Authorization': f'Bearer {auth.get_token()}'},
+        verify=verify,
+        timeout=30
+    )
+    if response.status_code != 200:
+        raise ExcelAppendError(f"No se pudo resolver el archivo en SharePoint: {response.status_code} - {response.text}")
+
+    item = response.json()
+    drive_id = item.get('parentReference', {}).get('driveId')
+    item_id = item.get('id')
+    if not drive_id or not item_id:
+        raise ExcelAppendError("Respuesta de SharePoint sin driveId/id para el archivo")
+
+    _item_cache[excel_url] = (drive_id, item_id)
+    return drive_id, item_id
+
+
+def _ensure_table(client: _GraphWorkbookClient, columns: List[str]) -> str:
+    """
+    Devuelve el nombre de la tabla del workbook, creándola sobre el rango usado si no existe.
+
+    Si la hoja está vacía (o sin encabezados) se escriben los encabezados en la fila 1.
+    """
+    tables = client.request('GET', '/tables').get('value', [])
+    if tables:
+        return tables[0]['name']
+
+    worksheets = client.request('GET', '/worksheets').get('value', [])
+    if not worksheets:
+        raise ExcelAppendError("El workbook no tiene hojas")
+    sheet_name = worksheets[0]['name']
+    sheet_path = f"/worksheets/{quote(sheet_name)}"
+
+    used_range = client.request('GET', f"{sheet_path}/usedRange(valuesOnly=true)")
+    values = used_range.get('values') or []
+    has_header = bool(values) and any(str(cell).strip() for cell in values[0])
+
+    if has_header:
+        address = used_range['address'].split('!')[-1]
+    else:
+        last_col = _column_letter(len(columns))
+        address = f"A1:{last_col}1"
+        client.request('PATCH', f"{sheet_path}/range(address='{address}')", {'values': [columns]})
+
+    logging.info(f"📋 Creando tabla Excel sobre {sheet_name}!{address} (migración única a append-only)")
+    table = client.request('POST', f"{sheet_path}/tables/add", {'address': address, 'hasHeaders': True})
+    return table['name']
+
+
+def _cell_value(value: Any) -> Any:
+    """Valor para la Excel API: los textos no vacíos llevan el prefijo de texto (')."""
+    if isinstance(value, str) and value:
+        return f"'{value}"
+    return value
+
+
+def append_rows_to_sharepoint_excel(
+    excel_url: str,
+    columns: List[str],
+    rows: List[List[Any]],
+    auth,
+    verify: bool = False
+) -> int:
+    """
+    Agrega filas al final de un Excel de SharePoint sin descargar ni re-subir el archivo.
+
+    Las columnas se alinean por nombre con los encabezados de la tabla; columnas
+    nuevas se agregan a la tabla y columnas de la tabla sin valor quedan vacías.
+
+    Args:
+        excel_url: URL compartida del archivo Excel en SharePoint
+        columns: Nombres de columna de las filas a agregar
+        rows: Filas a agregar (cada una en el orden de `columns`)
+        auth: Broker de tokens (SharePointAuth) con get_token()
+        verify: Verificación SSL de requests
+
+    Returns:
+        Número de filas agregadas
+    """
+    if not rows:
+        return 0
+
+    drive_id, item_id = _resolve_drive_item(excel_url, auth, verify)
+
+    try:
+        with _GraphWorkbookClient(auth, drive_id, item_id, verify=verify) as client:
+            with _file_lock(excel_url):
+                table_name = _ensure_table(client, columns)
+            table_path = f"/tables/{quote(table_name)}"
+
+            table_columns = [c['name'] for c in client.request('GET', f"{table_path}/columns").get('value', [])]
+            for column in columns:
+                if column not in table_columns:
+                    logging.info(f"➕ Agregando columna '{column}' a la tabla {table_name}")
+                    client.request('POST', f"{table_path}/columns/add", {'index': None, 'name': column})
+                    table_columns.append(column)
+
+            column_positions = {name: i for i, name in enumerate(columns)}
+            aligned_rows = [
+                [_cell_value(row[column_positions[name]]) if name in column_positions else ''
+                 for name in table_columns]
+                for row in rows
+            ]
+
+            client.request('POST', f"{table_path}/rows/add", {'index': None, 'values': aligned_rows})
+    except Exception:
+        # El archivo pudo haber sido reemplazado: resolver de nuevo en el próximo intento
+        _item_cache.pop(excel_url, None)
+        raise
+
+    logging.info(f"✅ {len(rows)} filas agregadas a {excel_url}")
+    return len(rows)
@@ -1,13 +1,37 @@
-"""SharePoint authentication module using MSAL."""
+"""SharePoint authentication module using MSAL.
+
+The authenticator doubles as a process-wide token broker: a single MSAL app
+lives for the whole process, the current access token is kept in memory and a
+daemon thread refreshes it silently before it expires, so callers (including
+long SharePoint crawls) get a valid token without blocking.
+"""
 
 # Standard library
+import asyncio
 import logging
+import os
 import threading
+import time
 from typing import Optional
 
 # Third-party
 import msal
 
+
+def _getenv_int(name: str, default: int) -> int:
+    """Lee un entero desde variables de entorno con fallback al default."""
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+# Segundos antes de la expiración en que el token se refresca en segundo plano
+TOKEN_REFRESH_MARGIN_SECONDS = _getenv_int("SHAREPOINT_TOKEN_REFRESH_MARGIN", 300)
+# Espera entre reintentos cuando el refresco silencioso falla
+TOKEN_REFRESH_RETRY_SECONDS = _getenv_int("SHAREPOINT_TOKEN_REFRESH_RETRY", 60)
+
+
 class SharePointAuth:
     """Handles SharePoint authentication using Microsoft Authentication Library (MSAL).
 
@@ -26,6 +50,15 @@ class SharePointAuth:
         self._auth_lock = threading.Lock()  # Prevent concurrent interactive auth
         self.app = self._create_msal_app()
 
+        # Token vigente en memoria (evita pasar por MSAL en cada llamada)
+        self._token_lock = threading.Lock()
+        self._access_token: Optional[str] = None
+        self._expires_at: float = 0.0
+
+        # Refresco proactivo en segundo plano
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._stop_refresh = threading.Event()
+
     def _create_msal_app(self) -> msal.PublicClientApplication:
         """Create MSAL public client application with in-memory cache."""
         return msal.PublicClientApplication(
@@ -35,42 +68,138 @@ class SharePointAuth:
             verify=False
         )
 
-    def get_token(self) -> str:
-        """Get access token, trying silent acquisition first.
+    def peek_token(self) -> Optional[str]:
+        """Return the in-memory token if it is still valid, without blocking.
+
+        Never touches MSAL nor the network; returns None when there is no
+        usable token (callers then fall back to get_token()).
+        """
+        with self._token_lock:
+            if self._access_token and time.time() < self._expires_at - 30:
+                return self._access_token
+        return None
+
+    def get_token(self, force_refresh: bool = False) -> str:
+        """Get access token, trying the in-memory token and silent acquisition first.
 
         Returns cached token if available and valid, otherwise prompts
         for interactive authentication (opens browser once per session).
+
+        Args:
+            force_refresh: Ignore the in-memory token (e.g. after a 401)
         """
-        # First, try to get token silently from cache
-        accounts = self.app.get_accounts()
-        if accounts:
-            # Try silent acquisition with the first account
-            result = self.app.acquire_token_silent(
-                self.SCOPES,
-                account=accounts[0]
-            )
-            if result and "access_token" in result:
-                logging.debug("Token obtenido silenciosamente desde caché")
-                return result["access_token"]
+        if not force_refresh:
+            token = self.peek_token()
+            if token:
+                return token
+
+        # Try to get token silently from MSAL cache (uses refresh token if needed)
+        result = self._acquire_silent(force_refresh=force_refresh)
+        if result:
+            logging.debug("Token obtenido silenciosamente desde caché")
+            return self._store_result(result)
 
         # No cached token available, need interactive auth
         # Use lock to prevent multiple browser tabs
         with self._auth_lock:
             # Double-check after acquiring lock (another thread might have authenticated)
-            accounts = self.app.get_accounts()
-            if accounts:
-                result = self.app.acquire_token_silent(
-                    self.SCOPES,
-                    account=accounts[0]
-                )
-                if result and "access_token" in result:
-                    logging.debug("Token obtenido silenciosamente después de lock")
-                    return result["access_token"]
+            token = self.peek_token()
+            if token and not force_refresh:
+                return token
+            result = self._acquire_silent()
+            if result:
+                logging.debug("Token obtenido silenciosamente después de lock")
+                return self._store_result(result)
 
             # Perform interactive authentication
             logging.info("Iniciando autenticación interactiva de SharePoint...")
             result = self._try_interactive_acquisition()
-            return self._extract_token(result)
+            return self._store_result(result)
+
+    async def get_token_async(self) -> str:
+        """Async variant: returns the in-memory token directly, else acquires in a thread."""
+        token = self.peek_token()
+        if token:
+            return token
+        return await asyncio.to_thread(self.get_token)
+
+    def get_auth_headers(self) -> dict:
+        """Authorization header with the current token."""
+        return {'Authorization': f'Bearer {self.get_token()}'}
+
+    def invalidate_token(self) -> None:
+        """Discard the in-memory token (next get_token() re-acquires it)."""
+        with self._token_lock:
+            self._access_token = None
+            self._expires_at = 0.0
+
+    def stop_background_refresh(self) -> None:
+        """Stop the background refresh thread (call on server shutdown)."""
+        self._stop_refresh.set()
+
+    def _acquire_silent(self, force_refresh: bool = False) -> Optional[dict]:
+        """Silent acquisition from the MSAL cache; None if no usable account/token."""
+        accounts = self.app.get_accounts()
+        if not accounts:
+            return None
+        result = self.app.acquire_token_silent(
+            self.SCOPES,
+            account=accounts[0],
+            force_refresh=force_refresh
+        )
+        if result and "access_token" in result:
+            return result
+        return None
+
+    def _store_result(self, result: dict) -> str:
+        """Keep the acquired token in memory and make sure the refresher is running."""
+        token = self._extract_token(result)
+        expires_in = int(result.get("expires_in", 3600))
+        with self._token_lock:
+            self._access_token = token
+            self._expires_at = time.time() + expires_in
+        self._ensure_refresh_thread()
+        return token
+
+    def _ensure_refresh_thread(self) -> None:
+        """Start the daemon refresh thread once per authenticator."""
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+        self._stop_refresh.clear()
+        self._refresh_thread = threading.Thread(
+            target=self._refresh_loop,
+            name="sharepoint-token-refresh",
+            daemon=True
+        )
+        self._refresh_thread.start()
+
+    def _refresh_loop(self) -> None:
+        """Refresh the token silently before it expires, until stopped or the session is lost."""
+        while True:
+            with self._token_lock:
+                expires_at = self._expires_at
+            wait_seconds = max(expires_at - TOKEN_REFRESH_MARGIN_SECONDS - time.time(), 1)
+            if self._stop_refresh.wait(wait_seconds):
+                return
+
+            try:
+                result = self._acquire_silent(force_refresh=True)
+            except Exception as e:
+                logging.warning(f"⚠️ Error refrescando token de SharePoint: {e}")
+                result = None
+
+            if result:
+                self._store_result(result)
+                logging.debug("🔄 Token de SharePoint refrescado en segundo plano")
+                continue
+
+            if time.time() >= expires_at:
+                # Sesión perdida: la próxima llamada a get_token() pedirá login interactivo
+                logging.warning("⚠️ No se pudo refrescar el token de SharePoint; se requerirá autenticación")
+                self.invalidate_token()
+                return
+            if self._stop_refresh.wait(TOKEN_REFRESH_RETRY_SECONDS):
+                return
 
     def _try_interactive_acquisition(self) -> dict:
         """Perform interactive token acquisition."""
@@ -91,19 +220,15 @@ class SharePointAuth:
 
 # Instancia global para usar en toda la aplicación
 _auth_instance = None
+_auth_instance_lock = threading.Lock()
 
 def get_valid_token() -> Optional[dict]:
     """
     Función compatible con el código existente del backend.
     Retorna información del token en formato dict.
     """
-    global _auth_instance
-
-    if _auth_instance is None:
-        _auth_instance = SharePointAuth()
-
     try:
-        access_token = _auth_instance.get_token()
+        access_token = get_sharepoint_authenticator().get_token()
         return {
             'access_token': access_token,
             'token_type': 'Bearer'
@@ -127,7 +252,9 @@ def get_sharepoint_authenticator() -> SharePointAuth:
     global _auth_instance
 
     if _auth_instance is None:
-        _auth_instance = SharePointAuth()
+        with _auth_instance_lock:
+            if _auth_instance is None:
+                _auth_instance = SharePointAuth()
 
     return _auth_instance
 